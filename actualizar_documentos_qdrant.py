@@ -42,29 +42,15 @@ def verificar_documentos_sin_texto():
         tuple: (total_documentos, documentos_sin_texto, documentos_texto_incompleto)
     """
     total_documentos = DocumentoSimplificado.objects.count()
-    documentos_sin_texto = DocumentoSimplificado.objects.filter(texto__isnull=True).count()
-    documentos_texto_vacio = DocumentoSimplificado.objects.filter(texto='').count()
+    # Los textos se guardan aparte: longitud_texto es None si no se ha descargado (o estaba vacío)
+    documentos_sin_texto = DocumentoSimplificado.objects.filter(longitud_texto__isnull=True).count()
     
-    # Para documentos con texto potencialmente incompleto, debemos hacerlo manualmente
-    # ya que Django no soporta __length para TextField
-    documentos_texto_incompleto = 0
+    # Con la longitud guardada el recuento es exacto, sin leer los textos
+    documentos_texto_incompleto = DocumentoSimplificado.objects.filter(
+        longitud_texto__lt=LONGITUD_MINIMA_TEXTO
+    ).count()
     
-    # Tomar una muestra de documentos con texto para verificar longitud
-    documentos_con_texto = DocumentoSimplificado.objects.exclude(texto__isnull=True).exclude(texto='')
-    
-    # Limitar a 1000 documentos para no sobrecargar la memoria
-    muestra = documentos_con_texto.order_by('-fecha_publicacion')[:1000]
-    
-    for doc in muestra:
-        if len(doc.texto) < LONGITUD_MINIMA_TEXTO:
-            documentos_texto_incompleto += 1
-    
-    # Estimar el total basado en la proporción de la muestra
-    if muestra.count() > 0:
-        proporcion = documentos_texto_incompleto / muestra.count()
-        documentos_texto_incompleto = int(proporcion * documentos_con_texto.count())
-    
-    return total_documentos, documentos_sin_texto + documentos_texto_vacio, documentos_texto_incompleto
+    return total_documentos, documentos_sin_texto, documentos_texto_incompleto
 
 def obtener_texto_completo(url_xml):
     """
@@ -127,11 +113,8 @@ def actualizar_textos_documentos(dias_atras=30, limite=None):
     query = DocumentoSimplificado.objects.filter(
         fecha_publicacion__gte=fecha_limite
     ).filter(
-        # Sin texto o texto vacío
-        texto__isnull=True
-    ) | DocumentoSimplificado.objects.filter(
-        fecha_publicacion__gte=fecha_limite,
-        texto=''
+        # Sin texto (los textos vacíos no se guardan)
+        longitud_texto__isnull=True
     )
     
     # Si hay un límite, aplicarlo
@@ -249,7 +232,7 @@ def actualizar_documentos_qdrant(dias_atras=30, recrear=False, solo_con_texto=Tr
         
         # Filtrar según parámetros
         if solo_con_texto:
-            query = query.exclude(texto__isnull=True).exclude(texto='')
+            query = query.filter(longitud_texto__isnull=False)
             print(f"\nSincronizando SOLO documentos con texto de los últimos {dias_atras} días")
             
             if texto_completo:
@@ -276,7 +259,7 @@ def actualizar_documentos_qdrant(dias_atras=30, recrear=False, solo_con_texto=Tr
             campos_completos = True
             campos_faltantes = []
             
-            if not documento.texto or documento.texto.strip() == '':
+            if not documento.longitud_texto:
                 campos_completos = False
                 campos_faltantes.append('texto')
                 
@@ -299,8 +282,8 @@ def actualizar_documentos_qdrant(dias_atras=30, recrear=False, solo_con_texto=Tr
                 continue
             
             # Verificar longitud del texto si se requiere texto completo
-            if texto_completo and documento.texto and len(documento.texto) < LONGITUD_MINIMA_TEXTO:
-                logger.warning(f"Documento {documento.identificador} con texto potencialmente incompleto ({len(documento.texto)} caracteres)")
+            if texto_completo and documento.longitud_texto and documento.longitud_texto < LONGITUD_MINIMA_TEXTO:
+                logger.warning(f"Documento {documento.identificador} con texto potencialmente incompleto ({documento.longitud_texto} caracteres)")
                 filtrados_por_longitud += 1
                 continue
             
@@ -93,12 +93,8 @@ def actualizar_textos_documentos(fecha_str=None, forzar=False, limite=None):
         else:
             # Si no se fuerza, actualizar solo los documentos sin texto
             documentos = DocumentoSimplificado.objects.filter(
-                fecha_publicacion=fecha
-            ).filter(
-                texto__isnull=True
-            ) | DocumentoSimplificado.objects.filter(
-                fecha_publicacion=fecha, 
-                texto=''
+                fecha_publicacion=fecha,
+                longitud_texto__isnull=True
             )
             logger.info(f"Se actualizarán {documentos.count()} documentos sin texto para la fecha {fecha}")
         
@@ -143,8 +139,8 @@ def actualizar_textos_documentos(fecha_str=None, forzar=False, limite=None):
         total_docs = DocumentoSimplificado.objects.filter(fecha_publicacion=fecha).count()
         docs_con_texto = DocumentoSimplificado.objects.filter(
             fecha_publicacion=fecha, 
-            texto__isnull=False
-        ).exclude(texto='').count()
+            longitud_texto__isnull=False
+        ).count()
         
         docs_sin_texto = total_docs - docs_con_texto
         
@@ -249,7 +249,7 @@ def actualizar_textos():
     """
     try:
         # Obtener documentos sin texto
-        docs_sin_texto = DocumentoSimplificado.objects.filter(texto__isnull=True) | DocumentoSimplificado.objects.filter(texto='')
+        docs_sin_texto = DocumentoSimplificado.objects.filter(longitud_texto__isnull=True)
         
         logger.info(f"Documentos sin texto: {docs_sin_texto.count()}")
         
@@ -1,14 +1,106 @@
 from tastypie.resources import ModelResource
 from tastypie import fields
+from tastypie.exceptions import BadRequest
+from tastypie.paginator import Paginator
 from boe_analisis.models import *
+from boe_analisis.paginator import KeysetPaginator, CursorInvalido
+from boe_analisis.utils_http import api_condicional, volcar_json
 from tastypie.constants import ALL, ALL_WITH_RELATIONS
 from django.db.models import Q
+from urllib.parse import urlencode
 import datetime
 
-class MyModelResource(ModelResource):
+class RespuestasApiMixin:
+    """
+    Respuestas de los recursos de Tastypie con ETag de la generación de los
+    datos (304 sin consultar la base de datos), comprimidas y con el JSON
+    serializado por volcar_json.
+    """
+    def wrap_view(self, view):
+        return api_condicional(super().wrap_view(view))
+
+    def serialize(self, request, data, format, options=None):
+        if format == 'application/json':
+            return volcar_json(self._meta.serializer.to_simple(data, options or {})).decode('utf-8')
+        return super().serialize(request, data, format, options)
+
+class MyModelResource(RespuestasApiMixin, ModelResource):
     def determine_format(self, request):
         return 'application/json'
 
+class CursorPaginator(Paginator):
+    """
+    Paginador de Tastypie por cursor sobre (fecha_publicacion, pk).
+    Evita COUNT(*) y OFFSET: meta.next/meta.previous llevan un cursor opaco.
+    Las peticiones con ?offset= explícito siguen usando la paginación clásica.
+    Con ?order_by= la clave del cursor son esas columnas seguidas de la clave
+    primaria, que desempata (el identificador del BOE no es único). En las
+    columnas que admiten nulos, estos van al final (ver KeysetPaginator).
+    """
+    orden = ('fecha_publicacion', 'pk')
+
+    def _orden(self):
+        """
+        Columnas de ordenación del cursor: las de order_by, si las hay, más la
+        clave primaria.
+
+        Raises:
+            BadRequest: Si order_by usa una columna que no admite cursor
+        """
+        if hasattr(self.request_data, 'getlist'):
+            criterios = self.request_data.getlist('order_by')
+        else:
+            criterios = self.request_data.get('order_by') or []
+            if isinstance(criterios, str):
+                criterios = [criterios]
+        if not criterios:
+            return self.orden
+
+        modelo = self.objects.model
+        columnas = {campo.name for campo in modelo._meta.concrete_fields if not campo.is_relation}
+        for criterio in criterios:
+            if criterio.lstrip('-') not in columnas | {'pk'}:
+                raise BadRequest(
+                    f"order_by={criterio} no se puede usar con la paginación por cursor (use offset)"
+                )
+        campos = {criterio.lstrip('-') for criterio in criterios}
+        if campos & {'pk', modelo._meta.pk.name}:
+            return tuple(criterios)
+        return tuple(criterios) + ('pk',)
+
+    def _generar_uri_cursor(self, limit, cursor):
+        if self.resource_uri is None or cursor is None:
+            return None
+
+        request_params = {
+            clave: valor for clave, valor in self.request_data.items()
+            if clave not in ('offset', 'cursor', 'limit')
+        }
+        request_params.update({'limit': limit, 'cursor': cursor})
+        return f"{self.resource_uri}?{urlencode(request_params)}"
+
+    def page(self):
+        cursor = self.request_data.get('cursor')
+        if 'offset' in self.request_data and not cursor:
+            return super().page()
+
+        limit = self.get_limit()
+        paginador = KeysetPaginator(self.objects, per_page=limit or self.max_limit or 1000, orden=self._orden())
+
+        try:
+            pagina = paginador.page(cursor)
+        except CursorInvalido as e:
+            raise BadRequest(str(e))
+
+        return {
+            self.collection_name: pagina.object_list,
+            'meta': {
+                'limit': limit,
+                'next': self._generar_uri_cursor(limit, pagina.next_cursor),
+                'previous': self._generar_uri_cursor(limit, pagina.previous_cursor),
+            },
+        }
+
 class DiarioResource(MyModelResource):
     class Meta:
         queryset = Diario.objects.all()
@@ -90,6 +182,7 @@ class DocumentoResource(MyModelResource):
     class Meta:
         queryset = Documento.objects.exclude(url_xml=None).order_by('fecha_publicacion')
         resource_name = 'documento'
+        paginator_class = CursorPaginator
         filtering = {
             'identificador': ALL,
             'fecha_publicacion': ALL,
@@ -138,6 +231,7 @@ class BOEResource(DocumentoResource):
     class Meta:
         queryset = Documento.objects.exclude(url_xml=None).filter(diario__nombre='BOE').order_by('fecha_publicacion')
         resource_name = 'boe'
+        paginator_class = CursorPaginator
         filtering = {
             'identificador': ALL,
             'fecha_publicacion': ALL,
@@ -203,10 +297,11 @@ class AlertaResource(MyModelResource):
 from django.http import JsonResponse
 from tastypie.resources import Resource
 from .utils_qdrant import QdrantBOE
-from .models_simplified import DocumentoSimplificado
+from .utils_facetas import contar_facetas
+from .utils_resultados import hidratar_resultados, serializar_documento
 from tastypie.authorization import Authorization
 
-class BusquedaSemanticaResource(Resource):
+class BusquedaSemanticaResource(RespuestasApiMixin, Resource):
     """
     Recurso para realizar búsquedas semánticas en documentos del BOE utilizando Qdrant.
     Permite a las IAs y otros sistemas realizar búsquedas por similitud conceptual.
@@ -271,42 +366,23 @@ class BusquedaSemanticaResource(Resource):
         # Realizar búsqueda semántica
         try:
             qdrant_client = QdrantBOE()
-            resultados_qdrant = qdrant_client.buscar_similares(
+            resultados_qdrant = qdrant_client.buscar_ids_similares(
                 query, 
                 limit=limite, 
                 score_threshold=umbral, 
                 filtros=filtros
             )
             
-            # Formatear resultados
-            documentos = []
-            for resultado in resultados_qdrant:
-                # Obtener documento completo de la base de datos
-                try:
-                    doc_id = resultado.get('identificador')
-                    doc = DocumentoSimplificado.objects.get(identificador=doc_id)
-                    
-                    # Crear objeto de documento con los datos relevantes
-                    documento = {
-                        'identificador': doc.identificador,
-                        'titulo': doc.titulo,
-                        'fecha_publicacion': doc.fecha_publicacion.strftime('%Y-%m-%d'),
-                        'departamento': doc.departamento,
-                        'materias': doc.materias,
-                        'url_pdf': doc.url_pdf,
-                        'url_xml': doc.url_xml,
-                        'score': resultado.get('score', 0),  # Puntuación de similitud
-                    }
-                    documentos.append(documento)
-                except DocumentoSimplificado.DoesNotExist:
-                    # Si el documento no existe en la base de datos, usar solo los datos de Qdrant
-                    documentos.append(resultado)
+            # Obtener todos los documentos en una sola consulta, preservando el orden de Qdrant
+            hidratados = hidratar_resultados(resultados_qdrant)
+            documentos = [serializar_documento(doc) for doc in hidratados]
             
             return self.create_response(request, {
                 'success': True,
                 'query': query,
                 'total': len(documentos),
-                'resultados': documentos
+                'resultados': documentos,
+                'facetas': contar_facetas(hidratados)
             })
             
         except Exception as e:
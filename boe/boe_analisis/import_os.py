@@ -7,7 +7,8 @@ from dotenv import load_dotenv
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import Filter, FieldCondition, MatchValue
 from mistralai import Mistral
-from transformers import pipeline
+
+from .utils_embeddings import obtener_modelo_embeddings
 
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
@@ -24,8 +25,9 @@ client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
 mistral_api_key = os.getenv("MISTRAL_API_KEY")
 mistral_client = Mistral(api_key=mistral_api_key)
 
-# Configuración del modelo de embeddings
-embedding_model = pipeline("feature-extraction", model="sentence-transformers/all-MiniLM-L6-v2")
+# Configuración del modelo de embeddings: el servidor compartido si EMBEDDINGS_URL
+# está definida; si no, el mismo modelo sentence-transformers con el que se indexa
+embedding_model = obtener_modelo_embeddings()
 
 # Nombre correcto de la colección en Qdrant
 QDRANT_COLLECTION_NAME = "boe_documentos"  # Nombre correcto de la colección
@@ -94,8 +96,7 @@ class PlanningAgent(Agent):
                 return cached_response
 
             # Generar embedding para la consulta
-            embeddings = embedding_model(query)
-            query_vector = embeddings[0][0]  # Obtener el vector de embedding
+            query_vector = embedding_model.encode(query).tolist()
 
             # Buscar en Qdrant
             logging.info(f"Buscando en Qdrant con la consulta: {query}")
@@ -11,6 +11,7 @@ from nltk.tokenize import word_tokenize
 
 from boe_analisis.models_simplified import DocumentoSimplificado
 from boe_analisis.models_alertas import CategoriaAlerta
+from boe_analisis.utils_textos import precargar_textos
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -221,8 +222,8 @@ class Command(BaseCommand):
             r'\b[A-Za-z]+\s+[0-9]+/[0-9]+\b',  # Referencias a leyes (ej. "Ley 7/2021")
         ]
         
-        # Procesar cada documento
-        for doc in documentos:
+        # Procesar cada documento (con sus textos en una consulta)
+        for doc in precargar_textos(documentos):
             texto = f"{doc.titulo} {doc.materias if doc.materias else ''}"
             
             # Añadir texto completo si está disponible (limitado para eficiencia)
@@ -1,7 +1,8 @@
 import logging
 from django.core.management.base import BaseCommand
 from boe_analisis.models_simplified import DocumentoSimplificado
-from boe_analisis.utils_boe import obtener_texto_documento
+from boe_analisis.utils_articulos import guardar_secciones
+from boe_analisis.utils_boe import obtener_documento_xml
 from datetime import datetime
 
 class Command(BaseCommand):
@@ -52,12 +53,8 @@ class Command(BaseCommand):
             else:
                 # Si no se fuerza, actualizar solo los documentos sin texto
                 documentos = DocumentoSimplificado.objects.filter(
-                    fecha_publicacion=fecha
-                ).filter(
-                    texto__isnull=True
-                ) | DocumentoSimplificado.objects.filter(
-                    fecha_publicacion=fecha, 
-                    texto=''
+                    fecha_publicacion=fecha,
+                    longitud_texto__isnull=True
                 )
                 self.stdout.write(f"Se encontraron {documentos.count()} documentos sin texto para la fecha {fecha}")
             
@@ -79,13 +76,14 @@ class Command(BaseCommand):
                     
                     # Solo actualizar si hay URL XML disponible
                     if documento.url_xml:
-                        # Obtener texto completo del documento
-                        texto = obtener_texto_documento(documento.url_xml, self.timeout)
+                        # Obtener texto completo del documento y su estructura por artículos
+                        texto, _, secciones = obtener_documento_xml(documento.url_xml, self.timeout)
                         
                         if texto and (not documento.texto or documento.texto != texto):
-                            # Guardar el texto en el documento
+                            # Guardar el texto en el documento (las posiciones de las secciones dependen de él)
                             documento.texto = texto
-                            documento.save(update_fields=['texto'])
+                            documento.save(update_fields=['longitud_texto', 'actualizado'])
+                            guardar_secciones({documento.identificador: secciones})
                             actualizados += 1
                             self.logger.info(f"Documento {documento.identificador} actualizado con {len(texto)} caracteres")
                             self.stdout.write(self.style.SUCCESS(f"Documento {documento.identificador} actualizado con {len(texto)} caracteres"))
@@ -108,8 +106,8 @@ class Command(BaseCommand):
             # Mostrar estadísticas finales
             docs_con_texto = DocumentoSimplificado.objects.filter(
                 fecha_publicacion=fecha, 
-                texto__isnull=False
-            ).exclude(texto='').count()
+                longitud_texto__isnull=False
+            ).count()
             
             total_docs = DocumentoSimplificado.objects.filter(fecha_publicacion=fecha).count()
             docs_sin_texto = total_docs - docs_con_texto
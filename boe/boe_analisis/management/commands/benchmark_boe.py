@@ -0,0 +1,147 @@
+"""
+Comando para ejecutar la suite de benchmarks sin conexión y compararla con la referencia.
+"""
+
+import logging
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from boe_analisis.utils_benchmark import (
+    RUTA_REFERENCIA, TOLERANCIA, cargar_json, comparar_con_referencia, ejecutar_benchmarks, guardar_json
+)
+
+class Command(BaseCommand):
+    help = 'Ejecuta los benchmarks de ingesta, embeddings, búsquedas y alertas sobre una base de datos de prueba'
+
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escala',
+            type=int,
+            default=1,
+            help='Copias del sumario de referencia en el corpus sintético (por defecto: 1)'
+        )
+        parser.add_argument(
+            '--modelo',
+            choices=['hash', 'real', 'onnx'],
+            default='hash',
+            help='Codificador de embeddings: hash (determinista, sin conexión), real (sentence-transformers) '
+                 'u onnx (modelo exportado, requiere --directorio-onnx)'
+        )
+        parser.add_argument(
+            '--directorio-onnx',
+            type=str,
+            default=None,
+            help='Directorio del modelo ONNX (exportar_onnx); además compara la latencia y la paridad de ambos backends'
+        )
+        parser.add_argument(
+            '--qdrant-url',
+            type=str,
+            default=None,
+            help='URL de un Qdrant local (por defecto: instancia en memoria)'
+        )
+        parser.add_argument(
+            '--alertas',
+            type=str,
+            default='1,10,50',
+            help='Números de alertas para la medición de alertas, separados por comas'
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=20,
+            help='Consultas medidas en cada tipo de búsqueda'
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=0,
+            help='Semilla de los generadores aleatorios'
+        )
+        parser.add_argument(
+            '--salida',
+            type=str,
+            default='benchmark_resultados.json',
+            help='Archivo JSON donde se guardan los resultados'
+        )
+        parser.add_argument(
+            '--referencia',
+            type=str,
+            default=str(RUTA_REFERENCIA),
+            help='Archivo JSON de referencia con el que se comparan los resultados'
+        )
+        parser.add_argument(
+            '--guardar-referencia',
+            action='store_true',
+            help='Guardar los resultados como nueva referencia'
+        )
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=TOLERANCIA,
+            help='Desviación relativa admitida antes de marcar una regresión (por defecto: 0.2)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            numeros_alertas = [int(numero) for numero in options['alertas'].split(',') if numero.strip()]
+        except ValueError:
+            raise CommandError("--alertas debe ser una lista de enteros separados por comas")
+        if options['modelo'] == 'onnx' and not options['directorio_onnx']:
+            raise CommandError("--modelo onnx requiere --directorio-onnx")
+
+        # Los benchmarks escriben datos: se ejecutan sobre una base de datos de prueba nueva
+        self.stdout.write(self.style.NOTICE("Creando base de datos de prueba..."))
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            resultados = ejecutar_benchmarks(
+                escala=options['escala'],
+                modelo=options['modelo'],
+                qdrant_url=options['qdrant_url'],
+                numeros_alertas=numeros_alertas,
+                repeticiones=options['repeticiones'],
+                semilla=options['semilla'],
+                directorio_onnx=options['directorio_onnx'],
+            )
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        guardar_json(resultados, Path(options['salida']))
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+        for metrica, valor in sorted(resultados['metricas'].items()):
+            self.stdout.write(f"  {metrica}: {valor:.2f}")
+
+        ruta_referencia = Path(options['referencia'])
+        if options['guardar_referencia']:
+            guardar_json(resultados, ruta_referencia)
+            self.stdout.write(self.style.SUCCESS(f"Referencia actualizada en {ruta_referencia}"))
+            return
+
+        referencia = cargar_json(ruta_referencia)
+        if referencia is None:
+            self.stdout.write(self.style.WARNING(
+                f"No existe la referencia {ruta_referencia}; usa --guardar-referencia para crearla"
+            ))
+            return
+
+        if referencia.get('metadatos', {}).get('escala') != options['escala']:
+            self.stdout.write(self.style.WARNING("La referencia se generó con otra escala: la comparación no es fiable"))
+
+        comparacion = comparar_con_referencia(resultados, referencia, options['tolerancia'])
+        self.stdout.write("\nComparación con la referencia:")
+        for fila in comparacion:
+            texto = f"  {fila['metrica']}: {fila['referencia']:.2f} -> {fila['actual']:.2f} ({fila['cambio']:+.1%})"
+            self.stdout.write(self.style.ERROR(texto) if fila['regresion'] else texto)
+
+        regresiones = [fila['metrica'] for fila in comparacion if fila['regresion']]
+        if regresiones:
+            raise CommandError(f"Regresiones respecto a la referencia: {', '.join(regresiones)}")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones respecto a la referencia"))
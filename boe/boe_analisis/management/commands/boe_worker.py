@@ -0,0 +1,126 @@
+"""
+Comando que procesa la cola de tareas persistente (ver utils_tareas):
+descarga de textos, indexación en Qdrant, evaluación de alertas y resúmenes.
+Sustituye a la ejecución periódica de actualizar_textos_completos,
+procesar_alertas_enhanced y procesar_ia cuando la ingesta se lanza con --encolar.
+"""
+
+import logging
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from boe_analisis.utils_tareas import (
+    DURACION_ARRENDAMIENTO, MANEJADORES, ejecutar_trabajador, purgar_completadas, reactivar_muertas
+)
+
+class Command(BaseCommand):
+    help = 'Procesa las tareas pendientes de la cola (textos, embeddings, alertas y resúmenes)'
+
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=1,
+            help='Número de procesos trabajadores'
+        )
+        parser.add_argument(
+            '--tipos',
+            type=str,
+            default=None,
+            help=f"Tipos de tarea separados por comas (por defecto todos: {', '.join(sorted(MANEJADORES))})"
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=10,
+            help='Tareas reclamadas por cada proceso en cada consulta'
+        )
+        parser.add_argument(
+            '--arrendamiento',
+            type=int,
+            default=DURACION_ARRENDAMIENTO,
+            help='Segundos tras los que una tarea no completada puede reclamarla otro trabajador'
+        )
+        parser.add_argument(
+            '--espera',
+            type=float,
+            default=5.0,
+            help='Segundos de espera cuando la cola está vacía'
+        )
+        parser.add_argument(
+            '--hasta-vaciar',
+            action='store_true',
+            help='Terminar cuando no queden tareas disponibles'
+        )
+        parser.add_argument(
+            '--purgar-dias',
+            type=int,
+            default=None,
+            help='Eliminar las tareas completadas hace más de N días y salir'
+        )
+        parser.add_argument(
+            '--reactivar-muertas',
+            action='store_true',
+            help='Volver a encolar las tareas muertas (de los tipos indicados) y salir'
+        )
+
+    def handle(self, *args, **options):
+        tipos = [tipo.strip() for tipo in options['tipos'].split(',') if tipo.strip()] if options['tipos'] else None
+        desconocidos = set(tipos or []) - set(MANEJADORES)
+        if desconocidos:
+            raise CommandError(f"Tipos de tarea desconocidos: {', '.join(sorted(desconocidos))}")
+
+        if options['purgar_dias'] is not None:
+            eliminadas = purgar_completadas(options['purgar_dias'])
+            self.stdout.write(self.style.SUCCESS(f"Eliminadas {eliminadas} tareas completadas"))
+            return
+
+        if options['reactivar_muertas']:
+            reactivadas = sum(reactivar_muertas(tipo) for tipo in tipos) if tipos else reactivar_muertas()
+            self.stdout.write(self.style.SUCCESS(f"Reactivadas {reactivadas} tareas muertas"))
+            return
+
+        parametros = dict(
+            tipos=tipos,
+            limite=options['lote'],
+            duracion=options['arrendamiento'],
+            espera=options['espera'],
+            hasta_vaciar=options['hasta_vaciar'],
+        )
+        procesos = max(1, options['procesos'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Iniciando {procesos} trabajadores para las tareas: {', '.join(tipos or sorted(MANEJADORES))}"
+        ))
+
+        if procesos == 1:
+            total = ejecutar_trabajador(**parametros)
+            self.stdout.write(self.style.SUCCESS(f"Trabajador terminado. Tareas procesadas: {total}"))
+            return
+
+        # Los procesos hijos no deben heredar las conexiones abiertas del padre
+        connections.close_all()
+        contexto = multiprocessing.get_context('fork')
+        trabajadores = [contexto.Process(target=ejecutar_trabajador, kwargs=parametros) for _ in range(procesos)]
+        for proceso in trabajadores:
+            proceso.start()
+        try:
+            for proceso in trabajadores:
+                proceso.join()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Deteniendo trabajadores..."))
+            for proceso in trabajadores:
+                proceso.terminate()
+                proceso.join()
+
+        fallidos = [proceso for proceso in trabajadores if proceso.exitcode]
+        if fallidos:
+            raise CommandError(f"{len(fallidos)} trabajadores terminaron con error")
+        self.stdout.write(self.style.SUCCESS("Trabajadores terminados"))
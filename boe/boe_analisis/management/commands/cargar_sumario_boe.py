@@ -2,7 +2,12 @@ import logging
 import xml.etree.ElementTree as ET
 from django.core.management.base import BaseCommand
 from boe_analisis.models_simplified import DocumentoSimplificado
-from boe_analisis.utils_boe import obtener_sumario_boe, obtener_texto_documento, extraer_palabras_clave
+from boe_analisis.utils_articulos import guardar_secciones
+from boe_analisis.utils_cubo import actualizar_cubo, estado_cubo
+from boe_analisis.utils_facetas import actualizar_facetas, estado_facetas
+from boe_analisis.utils_http import nueva_generacion
+from boe_analisis.utils_sumario import actualizar_sumarios
+from boe_analisis.utils_boe import obtener_sumario_boe, obtener_texto_documento, extraer_palabras_clave, texto_y_secciones_xml
 from datetime import datetime
 from tqdm import tqdm
 import requests
@@ -29,6 +34,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Obtener también el texto completo de los documentos'
         )
+        parser.add_argument(
+            '--archivo',
+            type=str,
+            default=None,
+            help='Leer el sumario de un archivo XML local en lugar de descargarlo de la API del BOE'
+        )
         parser.add_argument(
             '--limite',
             type=int,
@@ -40,6 +51,7 @@ class Command(BaseCommand):
         fecha_str = options['fecha']
         con_texto = options['con_texto']
         limite = options['limite']
+        archivo = options['archivo']
         
         try:
             # Usar la fecha proporcionada o la fecha actual
@@ -50,8 +62,12 @@ class Command(BaseCommand):
             
             self.stdout.write(self.style.SUCCESS(f"Cargando sumario del BOE para la fecha: {fecha}"))
             
-            # Obtener el sumario del BOE
-            sumario_xml = obtener_sumario_boe(fecha, self.timeout)
+            # Obtener el sumario del BOE (de la API o de un archivo local)
+            if archivo:
+                with open(archivo, 'rb') as f:
+                    sumario_xml = f.read()
+            else:
+                sumario_xml = obtener_sumario_boe(fecha, self.timeout)
             
             if not sumario_xml:
                 self.stdout.write(self.style.ERROR(f"No se pudo obtener el sumario del BOE para la fecha {fecha}"))
@@ -141,20 +157,27 @@ class Command(BaseCommand):
                     
                     if doc_existente:
                         # Actualizar documento existente
+                        facetas_anteriores = estado_facetas(doc_existente)
+                        cubo_anterior = estado_cubo(doc_existente)
                         doc_existente.titulo = titulo
                         doc_existente.url_pdf = url_pdf
                         doc_existente.url_xml = url_xml
                         doc_existente.departamento = departamento
                         
                         # Obtener texto completo si se solicita
-                        if con_texto and url_xml and (not doc_existente.texto or doc_existente.texto == ''):
-                            texto = self.obtener_texto_completo(url_xml)
+                        secciones = None
+                        if con_texto and url_xml and not doc_existente.longitud_texto:
+                            texto, secciones = self.obtener_texto_completo(url_xml)
                             if texto:
                                 doc_existente.texto = texto
                                 self.logger.info(f"Texto actualizado para {identificador}: {len(texto)} caracteres")
                         
                         # Guardar cambios
                         doc_existente.save()
+                        if doc_existente.texto and secciones is not None:
+                            guardar_secciones({identificador: secciones})
+                        actualizar_facetas(doc_existente, facetas_anteriores)
+                        actualizar_cubo(doc_existente, cubo_anterior)
                         actualizados += 1
                         self.logger.info(f"Documento actualizado: {identificador}")
                     else:
@@ -169,14 +192,19 @@ class Command(BaseCommand):
                         )
                         
                         # Obtener texto completo si se solicita
+                        secciones = None
                         if con_texto and url_xml:
-                            texto = self.obtener_texto_completo(url_xml)
+                            texto, secciones = self.obtener_texto_completo(url_xml)
                             if texto:
                                 nuevo_doc.texto = texto
                                 self.logger.info(f"Texto obtenido para {identificador}: {len(texto)} caracteres")
                         
                         # Guardar nuevo documento
                         nuevo_doc.save()
+                        if nuevo_doc.texto and secciones:
+                            guardar_secciones({identificador: secciones})
+                        actualizar_facetas(nuevo_doc)
+                        actualizar_cubo(nuevo_doc)
                         creados += 1
                         self.logger.info(f"Documento creado: {identificador}")
                     
@@ -185,6 +213,12 @@ class Command(BaseCommand):
                     self.logger.error(f"Error al procesar documento {identificador if 'identificador' in locals() else i+1}: {str(e)}")
                     self.stdout.write(self.style.ERROR(f"Error al procesar documento {identificador if 'identificador' in locals() else i+1}: {str(e)}"))
             
+            # Abrir una nueva generación de los datos (ver utils_http), que invalida
+            # los sumarios en caché, y construir ya el de la fecha (ver utils_sumario)
+            if creados or actualizados:
+                nueva_generacion()
+                actualizar_sumarios([fecha])
+            
             # Mostrar resumen
             self.logger.info(f"Proceso completado. Documentos creados: {creados}, actualizados: {actualizados}, errores: {errores}")
             self.stdout.write(self.style.SUCCESS(f"Proceso completado. Documentos creados: {creados}, actualizados: {actualizados}, errores: {errores}"))
@@ -193,8 +227,8 @@ class Command(BaseCommand):
             total_docs = DocumentoSimplificado.objects.filter(fecha_publicacion=fecha).count()
             docs_con_texto = DocumentoSimplificado.objects.filter(
                 fecha_publicacion=fecha, 
-                texto__isnull=False
-            ).exclude(texto='').count()
+                longitud_texto__isnull=False
+            ).count()
             
             docs_sin_texto = total_docs - docs_con_texto
             
@@ -210,34 +244,27 @@ class Command(BaseCommand):
     
     def obtener_texto_completo(self, url_xml):
         """
-        Obtiene el texto completo de un documento a partir de su URL XML
+        Obtiene el texto completo de un documento a partir de su URL XML,
+        con un párrafo por línea, y sus secciones (ver utils_articulos)
         """
         try:
             # Obtener el XML del documento
             response = requests.get(url_xml, timeout=self.timeout)
             if response.status_code != 200:
                 self.logger.warning(f"Error al obtener el XML del documento: {response.status_code}")
-                return None
+                return None, []
             
             # Parsear el XML
             root = ET.fromstring(response.content)
             
             # Buscar el elemento 'texto'
-            texto_elem = root.find('.//texto')
-            if texto_elem is None:
+            if root.find('.//texto') is None:
                 self.logger.warning(f"No se encontró el elemento 'texto' en el XML")
-                return None
-            
-            # Extraer todo el texto del elemento 'texto'
-            texto_completo = ""
-            for elem in texto_elem.iter():
-                if elem.text:
-                    texto_completo += elem.text + " "
-                if elem.tail:
-                    texto_completo += elem.tail + " "
+                return None, []
             
-            return texto_completo.strip()
+            texto, secciones = texto_y_secciones_xml(root)
+            return texto, secciones
             
         except Exception as e:
             self.logger.error(f"Error al obtener el texto completo: {str(e)}")
-            return None
+            return None, []
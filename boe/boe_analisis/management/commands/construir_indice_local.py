@@ -0,0 +1,92 @@
+"""
+Comando para construir el índice vectorial local de respaldo (ver utils_indice_local)
+a partir de la colección de Qdrant o, si Qdrant no está disponible, de la base de datos.
+Después, QdrantBOE lo mantiene sincronizado al indexar.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from boe_analisis.models_simplified import DocumentoSimplificado
+from boe_analisis.utils_indice_local import IndiceLocal
+from boe_analisis.utils_qdrant import COLLECTION_NAME, VECTOR_SIZE, get_qdrant_client
+from boe_analisis.utils_textos import precargar_textos
+
+class Command(BaseCommand):
+    help = 'Construye el índice vectorial local que se usa cuando Qdrant no está disponible'
+
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directorio',
+            type=str,
+            default=None,
+            help='Directorio del índice (por defecto: settings.INDICE_LOCAL_DIR)'
+        )
+        parser.add_argument(
+            '--desde-bd',
+            action='store_true',
+            help='Generar los embeddings desde la base de datos en lugar de copiarlos de Qdrant'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=256,
+            help='Documentos por lote'
+        )
+
+    def handle(self, *args, **options):
+        directorio = options['directorio'] or getattr(settings, 'INDICE_LOCAL_DIR', None)
+        if not directorio:
+            raise CommandError("Indica --directorio o define INDICE_LOCAL_DIR en los settings")
+
+        # El índice se reconstruye desde cero
+        indice = IndiceLocal(directorio, VECTOR_SIZE)
+        indice.vaciar()
+        qdrant = get_qdrant_client()
+        lote = options['lote']
+
+        if options['desde_bd']:
+            documentos = DocumentoSimplificado.objects.order_by('identificador').only(
+                'identificador', 'titulo', 'longitud_texto', 'fecha_publicacion', 'departamento'
+            )
+            total = documentos.count()
+            for inicio in range(0, total, lote):
+                bloque = precargar_textos(documentos[inicio:inicio + lote])
+                embeddings = qdrant.generar_embeddings([qdrant.texto_para_embedding(doc) for doc in bloque], lote)
+                indice.anadir(
+                    [doc.identificador for doc in bloque],
+                    embeddings,
+                    [doc.fecha_publicacion for doc in bloque],
+                    [doc.departamento or '' for doc in bloque],
+                )
+                self.stdout.write(f"  {min(inicio + lote, total)}/{total} documentos")
+        else:
+            desplazamiento = None
+            while True:
+                try:
+                    puntos, desplazamiento = qdrant.client.scroll(
+                        COLLECTION_NAME, limit=lote, offset=desplazamiento, with_vectors=True,
+                        with_payload=['identificador', 'fecha_publicacion', 'departamento'],
+                    )
+                except Exception as e:
+                    raise CommandError(f"No se pudo leer la colección de Qdrant ({str(e)}); prueba con --desde-bd")
+                if puntos:
+                    indice.anadir(
+                        [punto.payload['identificador'] for punto in puntos],
+                        [punto.vector for punto in puntos],
+                        [punto.payload['fecha_publicacion'] for punto in puntos],
+                        [punto.payload.get('departamento', '') for punto in puntos],
+                    )
+                    self.stdout.write(f"  {len(indice)} documentos")
+                if desplazamiento is None:
+                    break
+
+        self.stdout.write(self.style.SUCCESS(f"Índice local construido en {directorio}: {len(indice)} documentos"))
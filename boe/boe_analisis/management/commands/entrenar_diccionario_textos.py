@@ -0,0 +1,48 @@
+"""
+Comando para entrenar el diccionario de compresión de los textos de los documentos.
+"""
+
+import logging
+from django.core.management.base import BaseCommand, CommandError
+from boe_analisis.utils_textos import TAMANO_DICCIONARIO, entrenar_diccionario, recomprimir_textos
+
+class Command(BaseCommand):
+    help = 'Entrena un diccionario de zstd con textos recientes del BOE y, opcionalmente, recomprime los textos guardados'
+    
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+        
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--muestras',
+            type=int,
+            default=2000,
+            help='Número de textos recientes con los que se entrena el diccionario (por defecto: 2000)'
+        )
+        parser.add_argument(
+            '--tamano',
+            type=int,
+            default=TAMANO_DICCIONARIO,
+            help=f'Tamaño del diccionario en bytes (por defecto: {TAMANO_DICCIONARIO})'
+        )
+        parser.add_argument(
+            '--recomprimir',
+            action='store_true',
+            help='Recomprimir con el nuevo diccionario los textos ya guardados'
+        )
+        
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE(f"Entrenando diccionario con hasta {options['muestras']} textos..."))
+        try:
+            diccionario = entrenar_diccionario(options['muestras'], options['tamano'])
+        except (RuntimeError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Creado: {diccionario}"))
+        
+        if options['recomprimir']:
+            self.stdout.write(self.style.NOTICE("Recomprimiendo textos..."))
+            total = recomprimir_textos()
+            self.stdout.write(self.style.SUCCESS(f"{total} textos recomprimidos"))
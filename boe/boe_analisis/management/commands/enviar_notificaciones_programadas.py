@@ -6,6 +6,7 @@ from django.template.loader import render_to_string
 from django.db.models import Count, Q
 
 from boe_analisis.models_alertas import AlertaUsuario, NotificacionAlerta
+from boe_analisis.utils_estadisticas import invalidar_estadisticas
 import logging
 from datetime import timedelta
 
@@ -100,6 +101,8 @@ class Command(BaseCommand):
                     notificaciones.update(
                         fecha_envio=ahora
                     )
+                    # update() no emite señales: invalidar a mano las estadísticas del usuario
+                    invalidar_estadisticas(alerta.usuario_id)
                     
                     emails_enviados += 1
                     self.stdout.write(self.style.SUCCESS(
@@ -0,0 +1,74 @@
+"""
+Comando para medir el recall@k y la latencia de la búsqueda aproximada de
+Qdrant frente a la búsqueda exacta con la configuración actual de la colección
+(HNSW y cuantización, ver utils_qdrant.CONFIG_COLECCION).
+"""
+
+import logging
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from boe_analisis.utils_benchmark import guardar_json, medir_recall
+from boe_analisis.utils_qdrant import get_qdrant_client
+
+class Command(BaseCommand):
+    help = 'Mide el recall@k y la latencia de las búsquedas de Qdrant frente a la búsqueda exacta'
+
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--muestra',
+            type=int,
+            default=100,
+            help='Número de consultas (vectores de documentos de la colección)'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=10,
+            help='Resultados por consulta'
+        )
+        parser.add_argument(
+            '--hnsw-ef',
+            type=str,
+            default='16,32,64,128',
+            help='Valores de hnsw_ef a evaluar, separados por comas'
+        )
+        parser.add_argument(
+            '--salida',
+            type=str,
+            default=None,
+            help='Archivo JSON donde guardar los resultados (opcional)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            valores_ef = [int(valor) for valor in options['hnsw_ef'].split(',') if valor.strip()]
+        except ValueError:
+            raise CommandError("--hnsw-ef debe ser una lista de enteros separados por comas")
+
+        qdrant = get_qdrant_client()
+        estado = qdrant.verificar_estado()
+        if not estado.get('coleccion_existe'):
+            raise CommandError(f"La colección no existe: {estado}")
+
+        self.stdout.write(self.style.NOTICE(
+            f"Configuración de la colección: {', '.join(f'{clave}={valor}' for clave, valor in sorted(qdrant.config.items()))}"
+        ))
+        try:
+            metricas = medir_recall(qdrant, options['muestra'], options['k'], valores_ef)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for metrica, valor in sorted(metricas.items()):
+            self.stdout.write(f"  {metrica}: {valor:.3f}")
+
+        if options['salida']:
+            guardar_json({'configuracion': qdrant.config, 'metricas': metricas}, Path(options['salida']))
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
@@ -0,0 +1,80 @@
+"""
+Comando para exportar los documentos en NDJSON, CSV o Parquet.
+"""
+
+import logging
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from boe_analisis.utils_exportacion import FORMATOS, TAMANO_LOTE, exportar_documentos, parametros_exportacion
+
+class Command(BaseCommand):
+    help = 'Exporta los documentos (todos, por rango de fechas o los modificados desde una fecha) en NDJSON, CSV o Parquet'
+    
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+        
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--formato',
+            choices=list(FORMATOS),
+            default='ndjson',
+            help='Formato de la exportación (por defecto: ndjson)'
+        )
+        parser.add_argument(
+            '--desde',
+            help='Fecha de publicación mínima (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--hasta',
+            help='Fecha de publicación máxima (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--cambiados-desde',
+            help='Solo los documentos modificados desde esta fecha (YYYY-MM-DD o fecha y hora ISO 8601)'
+        )
+        parser.add_argument(
+            '--texto',
+            action='store_true',
+            help='Incluir el texto completo de los documentos'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Filas leídas por viaje a la base de datos (por defecto: {TAMANO_LOTE})'
+        )
+        parser.add_argument(
+            '--salida',
+            help='Fichero de salida (por defecto, la salida estándar)'
+        )
+        
+    def handle(self, *args, **options):
+        try:
+            parametros = parametros_exportacion({
+                'formato': options['formato'],
+                'desde': options['desde'],
+                'hasta': options['hasta'],
+                'cambiados_desde': options['cambiados_desde'],
+                'texto': options['texto'],
+            })
+            trozos = exportar_documentos(lote=options['lote'], **parametros)
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        if not options['salida']:
+            # Los mensajes no se mezclan con los datos: solo se escriben los trozos
+            for trozo in trozos:
+                sys.stdout.buffer.write(trozo)
+            sys.stdout.buffer.flush()
+            return
+        
+        total = 0
+        with open(options['salida'], 'wb') as salida:
+            for trozo in trozos:
+                salida.write(trozo)
+                total += len(trozo)
+        self.logger.info(f"Exportación {options['formato']} escrita en {options['salida']}: {total} bytes")
+        self.stdout.write(self.style.SUCCESS(f"Exportación escrita en {options['salida']} ({total} bytes)"))
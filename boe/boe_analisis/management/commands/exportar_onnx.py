@@ -0,0 +1,59 @@
+"""
+Comando para exportar el modelo de embeddings a ONNX cuantizado a int8 y
+comprobar que sus vectores coinciden con los del modelo de PyTorch.
+"""
+
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from boe_analisis.utils_benchmark import CONSULTAS
+from boe_analisis.utils_embeddings import (
+    MODEL_NAME, CodificadorONNX, cargar_modelo_local, exportar_onnx, similitud_minima
+)
+
+# Similitud coseno mínima exigida frente a los vectores de PyTorch
+SIMILITUD_MINIMA = 0.99
+
+class Command(BaseCommand):
+    help = 'Exporta el modelo de embeddings a ONNX (int8) para el backend onnx de QdrantBOE'
+
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directorio',
+            type=str,
+            help='Directorio donde se guardan el modelo ONNX y el tokenizador'
+        )
+        parser.add_argument(
+            '--modelo',
+            type=str,
+            default=MODEL_NAME,
+            help='Modelo de Hugging Face a exportar'
+        )
+        parser.add_argument(
+            '--sin-cuantizar',
+            action='store_true',
+            help='Exportar solo el modelo en float32'
+        )
+
+    def handle(self, *args, **options):
+        directorio = options['directorio']
+        try:
+            ruta = exportar_onnx(directorio, options['modelo'], cuantizar=not options['sin_cuantizar'])
+        except ImportError as e:
+            raise CommandError(f"Faltan dependencias para exportar (torch, transformers, onnxruntime): {str(e)}")
+        self.stdout.write(self.style.SUCCESS(f"Modelo exportado en {ruta}"))
+
+        # Comprobar la paridad con el modelo original
+        referencia = cargar_modelo_local(options['modelo'])
+        similitud = similitud_minima(referencia.encode(CONSULTAS), CodificadorONNX(directorio).encode(CONSULTAS))
+        texto = f"Similitud coseno mínima frente a PyTorch: {similitud:.4f}"
+        if similitud < SIMILITUD_MINIMA:
+            raise CommandError(f"{texto} (menor que {SIMILITUD_MINIMA})")
+        self.stdout.write(self.style.SUCCESS(texto))
@@ -3,13 +3,20 @@ from django.core.management.base import BaseCommand
 from datetime import datetime, timedelta
 import xml.etree.ElementTree as ET
 from boe_analisis.models_simplified import DocumentoSimplificado as Documento
-from boe_analisis.models_alertas import CategoriaAlerta
 from boe_analisis.utils_boe import (
     obtener_sumario_boe, 
-    obtener_texto_documento, 
+    obtener_documento_xml, 
     extraer_codigo_departamento,
-    extraer_palabras_clave
+    extraer_palabras_clave,
+    obtener_extractor
 )
+from boe_analisis.utils_articulos import guardar_secciones
+from boe_analisis.utils_cubo import actualizar_cubo, estado_cubo
+from boe_analisis.utils_enriquecimiento import cargar_categorias_alertas, normalizar_departamento
+from boe_analisis.utils_facetas import actualizar_facetas, estado_facetas
+from boe_analisis.utils_http import nueva_generacion
+from boe_analisis.utils_sumario import actualizar_sumarios
+from boe_analisis.utils_textos import precargar_textos
 
 class Command(BaseCommand):
     help = 'Obtiene nueva información del BOE usando el modelo simplificado y actualiza materias y palabras clave'
@@ -21,75 +28,8 @@ class Command(BaseCommand):
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger(__name__)
         # Cargar categorías de alertas para extraer palabras clave
-        self.categorias_alertas = self._cargar_categorias_alertas()
-        # Mapa de normalización de departamentos
-        self.mapa_departamentos = self._crear_mapa_departamentos()
-        
-    def _cargar_categorias_alertas(self):
-        """
-        Carga las categorías de alertas y sus palabras clave para usarlas en la extracción
-        """
-        categorias = {}
-        for categoria in CategoriaAlerta.objects.all():
-            if categoria.palabras_clave:
-                palabras = [p.strip().lower() for p in categoria.palabras_clave.split(',')]
-                categorias[categoria.nombre] = palabras
-        
-        self.logger.info(f"Se cargaron {len(categorias)} categorías de alertas con palabras clave")
-        return categorias
-    
-    def _crear_mapa_departamentos(self):
-        """
-        Crea un mapa para normalizar los nombres de departamentos
-        """
-        # Patrones comunes y sus normalizaciones
-        return {
-            r'ministerio\s+de\s+hacienda.*': 'Ministerio de Hacienda',
-            r'ministerio\s+de\s+cultura.*': 'Ministerio de Cultura',
-            r'ministerio\s+de\s+educaci[oó]n.*': 'Ministerio de Educación',
-            r'ministerio\s+de\s+trabajo.*': 'Ministerio de Trabajo',
-            r'ministerio\s+de\s+justicia.*': 'Ministerio de Justicia',
-            r'ministerio\s+de\s+sanidad.*': 'Ministerio de Sanidad',
-            r'ministerio\s+de\s+interior.*': 'Ministerio del Interior',
-            r'ministerio\s+de\s+defensa.*': 'Ministerio de Defensa',
-            r'ministerio\s+de\s+econom[ií]a.*': 'Ministerio de Economía',
-            r'ministerio\s+de\s+industria.*': 'Ministerio de Industria',
-            r'ministerio\s+de\s+ciencia.*': 'Ministerio de Ciencia',
-            r'ministerio\s+de\s+agricultura.*': 'Ministerio de Agricultura',
-            r'ministerio\s+de\s+transporte.*': 'Ministerio de Transportes',
-            r'ministerio\s+de\s+asuntos\s+exteriores.*': 'Ministerio de Asuntos Exteriores',
-            r'ministerio\s+de\s+transici[oó]n\s+ecol[oó]gica.*': 'Ministerio de Transición Ecológica',
-            r'ministerio\s+de\s+igualdad.*': 'Ministerio de Igualdad',
-            r'ministerio\s+de\s+inclusi[oó]n.*': 'Ministerio de Inclusión',
-            r'ministerio\s+de\s+universidades.*': 'Ministerio de Universidades',
-            r'ministerio\s+de\s+consumo.*': 'Ministerio de Consumo',
-            r'ministerio\s+de\s+derechos\s+sociales.*': 'Ministerio de Derechos Sociales',
-            r'ministerio\s+de\s+pol[ií]tica\s+territorial.*': 'Ministerio de Política Territorial',
-            r'banco\s+de\s+espa[ñn]a.*': 'Banco de España',
-            r'universidad.*': 'Universidades',
-            r'cortes\s+generales.*': 'Cortes Generales',
-            r'tribunal\s+constitucional.*': 'Tribunal Constitucional',
-            r'tribunal\s+supremo.*': 'Tribunal Supremo',
-            r'tribunal\s+de\s+cuentas.*': 'Tribunal de Cuentas',
-            r'consejo\s+general\s+del\s+poder\s+judicial.*': 'Consejo General del Poder Judicial',
-            r'junta\s+electoral\s+central.*': 'Junta Electoral Central',
-            r'comisi[oó]n\s+nacional.*': 'Comisión Nacional',
-        }
-    
-    def _normalizar_departamento(self, departamento):
-        """
-        Normaliza el nombre del departamento para evitar duplicados
-        """
-        if not departamento:
-            return None
-            
-        departamento_lower = departamento.lower()
-        
-        for patron, normalizacion in self.mapa_departamentos.items():
-            if re.search(patron, departamento_lower):
-                return normalizacion
-                
-        return departamento
+        self.categorias_alertas = cargar_categorias_alertas()
+        self.logger.info(f"Se cargaron {len(self.categorias_alertas)} categorías de alertas con palabras clave")
         
     def add_arguments(self, parser):
         parser.add_argument('--days', action='store', dest='days', default=1, type=int,
@@ -103,6 +43,8 @@ class Command(BaseCommand):
         days = options['days']
         start = options['start']
         update_existing = options['update_existing']
+        # Fechas de publicación de los documentos creados o modificados
+        self.fechas_escritas = set()
         
         if start:
             try:
@@ -131,6 +73,13 @@ class Command(BaseCommand):
                 self.process_sumario(sumario_xml)
             else:
                 self.logger.error(f"No se pudo obtener el sumario para la fecha {current_date.strftime('%Y-%m-%d')}")
+        
+        # Abrir una nueva generación de los datos (ver utils_http), que invalida
+        # las respuestas de la API, las estadísticas y los sumarios en caché, y
+        # construir ya los sumarios de las fechas escritas (ver utils_sumario)
+        if self.fechas_escritas:
+            nueva_generacion()
+            actualizar_sumarios(sorted(self.fechas_escritas))
     
     def _actualizar_documentos_existentes(self):
         """
@@ -140,11 +89,15 @@ class Command(BaseCommand):
         docs_sin_palabras_clave = Documento.objects.filter(palabras_clave__isnull=True) | Documento.objects.filter(palabras_clave='')
         self.logger.info(f"Se encontraron {docs_sin_palabras_clave.count()} documentos sin palabras clave")
         
-        for doc in docs_sin_palabras_clave:
-            palabras_clave = extraer_palabras_clave(doc.titulo, doc.texto if doc.texto else '', self.categorias_alertas)
+        docs_sin_palabras_clave = precargar_textos(docs_sin_palabras_clave)
+        extractor = obtener_extractor(self.categorias_alertas)
+        lote = extractor.extraer_lote((doc.titulo, doc.texto if doc.texto else '') for doc in docs_sin_palabras_clave)
+        for doc, palabras_clave in zip(docs_sin_palabras_clave, lote):
             if palabras_clave:
                 doc.palabras_clave = ", ".join(palabras_clave)
-                doc.save(update_fields=['palabras_clave'])
+                doc.save(update_fields=['palabras_clave', 'actualizado'])
+                actualizar_facetas(doc, estado_facetas(doc))
+                self.fechas_escritas.add(doc.fecha_publicacion)
                 self.logger.info(f"Actualizadas palabras clave para documento {doc.identificador}")
         
         # Obtener documentos sin código de departamento
@@ -156,7 +109,8 @@ class Command(BaseCommand):
                 codigo = extraer_codigo_departamento(doc.departamento)
                 if codigo:
                     doc.codigo_departamento = codigo
-                    doc.save(update_fields=['codigo_departamento'])
+                    doc.save(update_fields=['codigo_departamento', 'actualizado'])
+                    self.fechas_escritas.add(doc.fecha_publicacion)
                     self.logger.info(f"Actualizado código de departamento para documento {doc.identificador}")
     
     def process_sumario(self, sumario_xml):
@@ -218,7 +172,7 @@ class Command(BaseCommand):
                                     # Extraer departamento si está disponible
                                     departamento_elem = documento.find('./departamento')
                                     if departamento_elem is not None:
-                                        doc.departamento = self._normalizar_departamento(departamento_elem.text)
+                                        doc.departamento = normalizar_departamento(departamento_elem.text)
                                         # Extraer código de departamento
                                         doc.codigo_departamento = extraer_codigo_departamento(doc.departamento)
                                     
@@ -231,9 +185,10 @@ class Command(BaseCommand):
                                                 materias.append(materia.text)
                                         doc.materias = ", ".join(materias) if materias else None
                                     
-                                    # Obtener texto completo si está disponible
+                                    # Obtener texto completo y artículos si está disponible
+                                    secciones = []
                                     if doc.url_xml:
-                                        doc.texto = obtener_texto_documento(doc.url_xml, self.timeout)
+                                        doc.texto, _, secciones = obtener_documento_xml(doc.url_xml, self.timeout)
                                     
                                     # Extraer palabras clave
                                     palabras_clave = extraer_palabras_clave(doc.titulo, doc.texto if doc.texto else '', self.categorias_alertas)
@@ -249,6 +204,11 @@ class Command(BaseCommand):
                                     
                                     # Guardar el documento
                                     doc.save()
+                                    if doc.texto and secciones:
+                                        guardar_secciones({doc_id: secciones})
+                                    actualizar_facetas(doc)
+                                    actualizar_cubo(doc)
+                                    self.fechas_escritas.add(doc.fecha_publicacion)
                                     self.logger.info(f"Documento guardado: {doc_id}")
                                 else:
                                     self.logger.error(f"No se encontró título para el documento {doc_id}")
@@ -260,6 +220,8 @@ class Command(BaseCommand):
                             # Si se ha solicitado actualizar documentos existentes
                             if not doc_existente.palabras_clave or not doc_existente.materias or not doc_existente.codigo_departamento:
                                 self.logger.info(f"Actualizando información para documento existente: {doc_id}")
+                                facetas_anteriores = estado_facetas(doc_existente)
+                                cubo_anterior = estado_cubo(doc_existente)
                                 
                                 # Actualizar materias si no existen
                                 if not doc_existente.materias:
@@ -276,10 +238,11 @@ class Command(BaseCommand):
                                     doc_existente.codigo_departamento = extraer_codigo_departamento(doc_existente.departamento)
                                 
                                 # Actualizar palabras clave si no existen
+                                secciones = None
                                 if not doc_existente.palabras_clave:
                                     # Obtener texto si no existe
                                     if not doc_existente.texto and doc_existente.url_xml:
-                                        doc_existente.texto = obtener_texto_documento(doc_existente.url_xml, self.timeout)
+                                        doc_existente.texto, _, secciones = obtener_documento_xml(doc_existente.url_xml, self.timeout)
                                     
                                     palabras_clave = extraer_palabras_clave(
                                         doc_existente.titulo, 
@@ -295,6 +258,11 @@ class Command(BaseCommand):
                                 
                                 # Guardar cambios
                                 doc_existente.save()
+                                if doc_existente.texto and secciones is not None:
+                                    guardar_secciones({doc_id: secciones})
+                                actualizar_facetas(doc_existente, facetas_anteriores)
+                                actualizar_cubo(doc_existente, cubo_anterior)
+                                self.fechas_escritas.add(doc_existente.fecha_publicacion)
                                 self.logger.info(f"Documento actualizado: {doc_id}")
                 
                 except Exception as e:
@@ -5,6 +5,10 @@ from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import xml.etree.ElementTree as ET
 from boe_analisis.models_simplified import DocumentoSimplificado as Documento
+from boe_analisis.utils_cubo import actualizar_cubo
+from boe_analisis.utils_facetas import actualizar_facetas
+from boe_analisis.utils_http import nueva_generacion
+from boe_analisis.utils_sumario import actualizar_sumarios
 
 class Command(BaseCommand):
     help = 'Get new information from BOE using simplified model'
@@ -26,6 +30,8 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         days = options['days']
         start = options['start']
+        # Fechas de publicación de los documentos creados
+        self.fechas_escritas = set()
         
         if start:
             try:
@@ -50,6 +56,13 @@ class Command(BaseCommand):
                 self.process_sumario(sumario_xml)
             else:
                 self.logger.error(f"No se pudo obtener el sumario para la fecha {current_date.strftime('%Y-%m-%d')}")
+        
+        # Abrir una nueva generación de los datos (ver utils_http), que invalida
+        # las respuestas de la API, las estadísticas y los sumarios en caché, y
+        # construir ya los sumarios de las fechas escritas (ver utils_sumario)
+        if self.fechas_escritas:
+            nueva_generacion()
+            actualizar_sumarios(sorted(self.fechas_escritas))
     
     def get_sumario(self, date):
         """
@@ -184,6 +197,9 @@ class Command(BaseCommand):
                                     
                                     # Guardar el documento
                                     doc.save()
+                                    actualizar_facetas(doc)
+                                    actualizar_cubo(doc)
+                                    self.fechas_escritas.add(doc.fecha_publicacion)
                                     self.logger.info(f"Documento guardado: {doc_id}")
                                 else:
                                     self.logger.error(f"No se encontró título para el documento {doc_id}")
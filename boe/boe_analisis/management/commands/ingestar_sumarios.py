@@ -0,0 +1,114 @@
+"""
+Comando para ingerir sumarios del BOE con el pipeline asíncrono por etapas:
+descarga, parseo, textos, base de datos, embeddings y Qdrant en un solo paso.
+Sustituye a ejecutar cargar_sumario_boe y después sincronizar_qdrant.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from boe_analisis.utils_pipeline import PipelineIngesta
+
+class Command(BaseCommand):
+    help = 'Ingiere los sumarios del BOE de un rango de fechas y los indexa en Qdrant con un pipeline por etapas'
+
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fecha',
+            type=str,
+            default=None,
+            help='Fecha en formato YYYY-MM-DD (por defecto: fecha actual)'
+        )
+        parser.add_argument(
+            '--hasta',
+            type=str,
+            default=None,
+            help='Última fecha del rango en formato YYYY-MM-DD (por defecto: la misma que --fecha)'
+        )
+        parser.add_argument(
+            '--archivo',
+            type=str,
+            default=None,
+            help='Leer el sumario de un archivo XML local en lugar de descargarlo (una sola fecha)'
+        )
+        parser.add_argument(
+            '--con-texto',
+            action='store_true',
+            help='Descargar también el texto completo de los documentos que no lo tengan'
+        )
+        parser.add_argument(
+            '--sin-qdrant',
+            action='store_true',
+            help='Solo guardar en la base de datos, sin generar embeddings ni indexar en Qdrant'
+        )
+        parser.add_argument(
+            '--recrear',
+            action='store_true',
+            help='Recrear la colección de Qdrant antes de indexar'
+        )
+        parser.add_argument(
+            '--encolar',
+            action='store_true',
+            help='Encolar la descarga de textos, las alertas y la indexación para el comando boe_worker'
+        )
+        parser.add_argument('--descargas-sumario', type=int, default=2, help='Sumarios descargados en paralelo')
+        parser.add_argument('--descargas-texto', type=int, default=8, help='Textos descargados en paralelo')
+        parser.add_argument('--lote-bd', type=int, default=200, help='Documentos por transacción de escritura')
+        parser.add_argument('--lote-embeddings', type=int, default=32, help='Textos por llamada al modelo de embeddings')
+        parser.add_argument('--subidas', type=int, default=2, help='Lotes subidos a Qdrant en paralelo')
+        parser.add_argument('--tamano-cola', type=int, default=256, help='Capacidad de cada cola entre etapas')
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.strptime(options['fecha'], '%Y-%m-%d').date() if options['fecha'] else datetime.now().date()
+            hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date() if options['hasta'] else desde
+        except ValueError:
+            raise CommandError("Las fechas deben tener el formato YYYY-MM-DD")
+        if hasta < desde:
+            raise CommandError("--hasta no puede ser anterior a --fecha")
+        if options['archivo'] and hasta != desde:
+            raise CommandError("--archivo solo admite una fecha")
+
+        fechas = [desde + timedelta(days=dias) for dias in range((hasta - desde).days + 1)]
+
+        qdrant = None
+        if not options['sin_qdrant']:
+            from boe_analisis.utils_qdrant import get_qdrant_client
+            qdrant = get_qdrant_client()
+            if not qdrant.crear_coleccion(recrear=options['recrear']):
+                raise CommandError("No se pudo crear o verificar la colección de Qdrant")
+
+        pipeline = PipelineIngesta(
+            qdrant=qdrant,
+            con_texto=options['con_texto'],
+            descargas_sumario=options['descargas_sumario'],
+            descargas_texto=options['descargas_texto'],
+            lote_bd=options['lote_bd'],
+            lote_embeddings=options['lote_embeddings'],
+            subidas=options['subidas'],
+            tamano_cola=options['tamano_cola'],
+            archivo=options['archivo'],
+            encolar=options['encolar'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Ingiriendo {len(fechas)} sumarios del BOE ({desde} - {hasta})"))
+        inicio = datetime.now()
+        estadisticas = pipeline.ejecutar(fechas)
+        duracion = (datetime.now() - inicio).total_seconds()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Proceso completado en {duracion:.1f} s. Sumarios: {estadisticas['sumarios']}, "
+            f"documentos: {estadisticas['documentos']}, creados: {estadisticas['creados']}, "
+            f"actualizados: {estadisticas['actualizados']}, textos descargados: {estadisticas['textos']}, "
+            f"referencias: {estadisticas['referencias']}, secciones: {estadisticas['secciones']}, "
+            f"indexados en Qdrant: {estadisticas['indexados']}, tareas encoladas: {estadisticas['encoladas']}, "
+            f"sumarios en caché: {estadisticas['sumarios_cache']}, errores: {estadisticas['errores']}"
+        ))
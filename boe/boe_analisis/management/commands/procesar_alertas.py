@@ -6,8 +6,10 @@ from django.conf import settings
 from django.template.loader import render_to_string
 from django.contrib.auth.models import User
 
-from boe_analisis.models import DocumentoSimplificado
+from boe_analisis.models_simplified import DocumentoSimplificado
 from boe_analisis.models_alertas import AlertaUsuario, NotificacionAlerta
+from boe_analisis.utils_facetas import terminos_documentos
+from boe_analisis.utils_textos import precargar_textos
 import re
 import logging
 from datetime import timedelta
@@ -86,6 +88,9 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS(f'Procesando {alertas.count()} alertas activas'))
         
+        # Materias normalizadas de todos los documentos, en una sola pasada
+        terminos = terminos_documentos(documentos)
+        
         # Contador de notificaciones creadas
         notificaciones_creadas = 0
         emails_enviados = 0
@@ -113,17 +118,18 @@ class Command(BaseCommand):
                     
                     docs_filtrados = docs_filtrados.filter(q_departamentos)
             
-            # Buscar coincidencias en los documentos filtrados
-            for documento in docs_filtrados:
+            # Buscar coincidencias en los documentos filtrados (con sus textos en una consulta)
+            for documento in precargar_textos(docs_filtrados):
                 # Verificar si ya existe una notificación para esta alerta y documento
                 if NotificacionAlerta.objects.filter(alerta=alerta, documento=documento.identificador).exists():
                     continue
                 
                 # Calcular relevancia basada en coincidencias de palabras clave
+                materias_documento = terminos.get(documento.identificador, {}).get('materias', [])
                 texto_completo = (
-                    f"{documento.titulo.lower()} {documento.texto.lower()} "
-                    f"{documento.departamento.lower()} {documento.rango.lower()} "
-                    f"{documento.materias.lower()}"
+                    f"{documento.titulo.lower()} {(documento.texto or '').lower()} "
+                    f"{(documento.departamento or '').lower()} "
+                    f"{', '.join(materias_documento).lower()}"
                 )
                 
                 coincidencias = 0
@@ -8,7 +8,11 @@ from django.contrib.auth.models import User
 
 from boe_analisis.models_simplified import DocumentoSimplificado
 from boe_analisis.models_alertas import AlertaUsuario, NotificacionAlerta, CategoriaAlerta
-import re
+from boe_analisis.utils_alertas import (
+    calcular_coincidencias, calcular_relevancia, crear_notificacion, preparar_texto_documento
+)
+from boe_analisis.utils_facetas import terminos_documentos
+from boe_analisis.utils_textos import precargar_textos
 import logging
 from datetime import timedelta
 
@@ -103,6 +107,9 @@ class Command(BaseCommand):
             
             self.stdout.write(self.style.SUCCESS(f'Cargadas {len(categorias_dict)} categorías con palabras clave'))
         
+        # Materias y palabras clave normalizadas de todos los documentos, en dos consultas
+        terminos = terminos_documentos(documentos)
+        
         # Contador de notificaciones creadas
         notificaciones_creadas = 0
         emails_enviados = 0
@@ -142,29 +149,29 @@ class Command(BaseCommand):
                     
                     docs_filtrados = docs_filtrados.filter(q_departamentos)
             
-            # Buscar coincidencias en los documentos filtrados
-            for documento in docs_filtrados:
+            # Buscar coincidencias en los documentos filtrados (con sus textos en una consulta)
+            for documento in precargar_textos(docs_filtrados):
                 # Verificar si ya existe una notificación para esta alerta y documento
                 if NotificacionAlerta.objects.filter(alerta=alerta, documento=documento.identificador).exists():
                     continue
                 
                 # Preparar el texto completo para buscar coincidencias
-                texto_completo = self._preparar_texto_documento(documento)
+                texto_completo = preparar_texto_documento(documento, terminos.get(documento.identificador))
                 
                 # Calcular relevancia basada en coincidencias de palabras clave
-                coincidencias, palabras_encontradas = self._calcular_coincidencias(texto_completo, palabras_clave)
+                coincidencias, palabras_encontradas = calcular_coincidencias(texto_completo, palabras_clave)
                 
                 # Si no hay coincidencias, pasar al siguiente documento
                 if not coincidencias:
                     continue
                 
                 # Calcular relevancia
-                relevancia = self._calcular_relevancia(coincidencias, palabras_encontradas, palabras_clave)
+                relevancia = calcular_relevancia(coincidencias, palabras_encontradas, palabras_clave)
                 
                 # Si la relevancia supera el umbral, crear notificación
                 if relevancia >= alerta.umbral_relevancia:
                     # Crear la notificación
-                    notificacion = self._crear_notificacion(alerta, documento, relevancia, palabras_encontradas)
+                    notificacion = crear_notificacion(alerta, documento, relevancia, palabras_encontradas)
                     
                     notificaciones_creadas += 1
                     self.stdout.write(self.style.SUCCESS(
@@ -190,74 +197,6 @@ class Command(BaseCommand):
                 f'Emails enviados: {emails_enviados}'
             ))
     
-    def _preparar_texto_documento(self, documento):
-        """
-        Prepara el texto completo del documento para buscar coincidencias
-        """
-        texto_completo = f"{documento.titulo.lower()} "
-        
-        if documento.texto:
-            texto_completo += f"{documento.texto.lower()} "
-        
-        if documento.departamento:
-            texto_completo += f"{documento.departamento.lower()} "
-        
-        if documento.materias:
-            texto_completo += f"{documento.materias.lower()} "
-        
-        if documento.palabras_clave:
-            texto_completo += f"{documento.palabras_clave.lower()} "
-            
-        return texto_completo
-    
-    def _calcular_coincidencias(self, texto_completo, palabras_clave):
-        """
-        Calcula las coincidencias de palabras clave en el texto
-        """
-        coincidencias = 0
-        palabras_encontradas = set()
-        
-        for palabra in palabras_clave:
-            if len(palabra) < 3:  # Ignorar palabras muy cortas
-                continue
-                
-            # Usar expresión regular para encontrar palabras completas
-            patron = r'\b' + re.escape(palabra) + r'\b'
-            if re.search(patron, texto_completo):
-                num_coincidencias = len(re.findall(patron, texto_completo))
-                coincidencias += num_coincidencias
-                palabras_encontradas.add(palabra)
-                
-        return coincidencias, palabras_encontradas
-    
-    def _calcular_relevancia(self, coincidencias, palabras_encontradas, palabras_clave):
-        """
-        Calcula la relevancia del documento para la alerta
-        """
-        # Fórmula mejorada: considera tanto el número de palabras clave distintas que coinciden
-        # como el número total de coincidencias
-        factor_palabras_distintas = len(palabras_encontradas) / len(palabras_clave)
-        factor_frecuencia = min(1.0, coincidencias / (len(palabras_clave) * 3))
-        
-        # Combinar ambos factores (70% importancia a palabras distintas, 30% a frecuencia)
-        relevancia = (factor_palabras_distintas * 0.7) + (factor_frecuencia * 0.3)
-        
-        return relevancia
-    
-    def _crear_notificacion(self, alerta, documento, relevancia, palabras_encontradas):
-        """
-        Crea una notificación para la alerta y el documento
-        """
-        return NotificacionAlerta.objects.create(
-            alerta=alerta,
-            documento=documento.identificador,
-            titulo_documento=documento.titulo,
-            fecha_documento=documento.fecha_publicacion,
-            relevancia=relevancia,
-            estado='pendiente',
-            resumen=f"Palabras clave encontradas: {', '.join(palabras_encontradas)}"
-        )
-    
     def _enviar_email_notificacion(self, notificacion):
         """Envía un email de notificación al usuario"""
         usuario = notificacion.alerta.usuario
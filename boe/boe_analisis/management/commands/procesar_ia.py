@@ -25,6 +25,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Procesar incluso documentos ya procesados'
         )
+        parser.add_argument(
+            '--encolar',
+            action='store_true',
+            help='Encolar los resúmenes para el comando boe_worker en lugar de generarlos aquí'
+        )
 
     def handle(self, *args, **options):
         limit = options['limit']
@@ -39,6 +44,12 @@ class Command(BaseCommand):
         
         notificaciones = query.order_by('-fecha_notificacion')[:limit]
         
+        if options['encolar']:
+            from boe_analisis.utils_tareas import TAREA_RESUMEN, encolar
+            encoladas = encolar(TAREA_RESUMEN, [str(notificacion.id) for notificacion in notificaciones])
+            self.stdout.write(self.style.SUCCESS(f'{encoladas} resúmenes encolados'))
+            return
+        
         count = 0
         for notificacion in notificaciones:
             try:
@@ -2,7 +2,9 @@ __author__ = 'Carlos'
 from django.db import models
 from django.core.management.base import BaseCommand, CommandError
 from boe_analisis.models import Diario, DocumentoAnuncio, Legislatura, Documento, Departamento, Rango, Origen_legislativo
-from boe_analisis.models import Estado_consolidacion, Nota, Materia, Alerta, Palabra, Referencia
+from boe_analisis.models import Estado_consolidacion, Nota, Materia, Alerta
+from boe_analisis.utils_boe import extraer_referencias_xml
+from boe_analisis.utils_referencias import guardar_referencias
 from boe_analisis.models import Modalidad, Tipo, Tramitacion, Procedimiento, Precio
 import os
 import sys
@@ -157,49 +159,11 @@ class ProcessDocument():
         return result
 
     def processReferencias(self, doc):
-        """Procesa las referencias anteriores y posteriores del documento."""
-        if not self.existElement(self.analisis, 'referencias'):
-            return
-
-        ref = self.analisis.referencias
-
-        # Procesar referencias anteriores
-        if self.existElement(ref, 'anteriores') and self.existElement(ref.anteriores, 'anterior'):
-            ref_ant = []
-            for anterior in ref.anteriores.anterior:
-                try:
-                    referencia = anterior.get('referencia')
-                    doc_ref = self.get_or_create(Documento, identificador=referencia)
-                    palabra_codigo = anterior.palabra.get('codigo')
-                    palabra_texto = anterior.palabra.text
-                    texto = anterior.texto.text
-                    palabra = self.get_or_create(Palabra, codigo=palabra_codigo, titulo=palabra_texto)
-                    ref = self.get_or_create(Referencia, 
-                                          busqueda={'referencia': doc_ref, 'palabra': palabra},
-                                          insert={'texto': texto})
-                    ref_ant.append(ref)
-                except Exception as e:
-                    logging.error(f"Error procesando referencia anterior {referencia}: {str(e)}")
-            doc.referencias_anteriores = ref_ant
-
-        # Procesar referencias posteriores
-        if self.existElement(ref, 'posteriores') and self.existElement(ref.posteriores, 'posterior'):
-            ref_post = []
-            for posterior in ref.posteriores.posterior:
-                try:
-                    referencia = posterior.get('referencia')
-                    doc_ref = self.get_or_create(Documento, identificador=referencia)
-                    palabra_codigo = posterior.palabra.get('codigo')
-                    palabra_texto = posterior.palabra.text
-                    texto = posterior.texto.text
-                    palabra = self.get_or_create(Palabra, codigo=palabra_codigo, titulo=palabra_texto)
-                    ref = self.get_or_create(Referencia,
-                                          busqueda={'referencia': doc_ref, 'palabra': palabra},
-                                          insert={'texto': texto})
-                    ref_post.append(ref)
-                except Exception as e:
-                    logging.error(f"Error procesando referencia posterior {referencia}: {str(e)}")
-            doc.referencias_posteriores = ref_post
+        """Guarda en el grafo de referencias las referencias anteriores y posteriores del documento."""
+        try:
+            guardar_referencias(extraer_referencias_xml(self.rootXML, doc.identificador))
+        except Exception as e:
+            logging.error(f"Error procesando referencias de {doc.identificador}: {str(e)}")
 
     def createDocument(self):
         """Crea o actualiza un documento con todos sus metadatos y relaciones."""
@@ -0,0 +1,24 @@
+"""
+Comando para reconstruir el cubo de estadísticas de documentos.
+"""
+
+import logging
+from django.core.management.base import BaseCommand
+from boe_analisis.utils_cubo import recalcular_cubo
+from boe_analisis.utils_http import nueva_generacion
+
+class Command(BaseCommand):
+    help = 'Reconstruye el cubo de estadísticas (fecha × departamento × rango × materia × legislatura)'
+    
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+        
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE("Recalculando el cubo de estadísticas..."))
+        celdas = recalcular_cubo()
+        # Las estadísticas en caché se calcularon con el cubo anterior
+        nueva_generacion()
+        self.stdout.write(self.style.SUCCESS(f"Cubo recalculado: {celdas} celdas"))
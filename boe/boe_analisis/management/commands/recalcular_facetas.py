@@ -0,0 +1,38 @@
+"""
+Comando para recalcular las tablas de facetas de departamentos y materias.
+"""
+
+import logging
+from django.core.management.base import BaseCommand
+from boe_analisis.utils_facetas import recalcular_facetas, reconstruir_terminos
+from boe_analisis.utils_http import nueva_generacion
+
+class Command(BaseCommand):
+    help = 'Recalcula las tablas de facetas (departamentos y materias con su número de documentos)'
+    
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+        
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--terminos',
+            action='store_true',
+            help='Reconstruir también las tablas normalizadas de materias y palabras clave a partir de los campos de texto'
+        )
+        
+    def handle(self, *args, **options):
+        if options.get('terminos'):
+            self.stdout.write(self.style.NOTICE("Reconstruyendo materias y palabras clave normalizadas..."))
+            procesados = reconstruir_terminos()
+            self.stdout.write(self.style.SUCCESS(f"Términos reconstruidos para {procesados} documentos"))
+        
+        self.stdout.write(self.style.NOTICE("Recalculando facetas..."))
+        resultado = recalcular_facetas()
+        # Las respuestas en caché se calcularon con las facetas anteriores
+        nueva_generacion()
+        self.stdout.write(self.style.SUCCESS(
+            f"Facetas recalculadas: {resultado['departamentos']} departamentos, {resultado['materias']} materias"
+        ))
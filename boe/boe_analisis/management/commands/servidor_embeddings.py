@@ -0,0 +1,83 @@
+"""
+Comando para arrancar el servidor local de embeddings (ver utils_embeddings).
+Carga el modelo una sola vez; el resto de procesos lo usan definiendo
+EMBEDDINGS_URL con la misma dirección.
+"""
+
+import logging
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from boe_analisis.utils_embeddings import (
+    BACKENDS, MODEL_NAME, URL_POR_DEFECTO, VARIABLE_BACKEND, VARIABLE_DIRECTORIO_ONNX, VARIABLE_URL,
+    cargar_modelo_local, crear_servidor
+)
+
+class Command(BaseCommand):
+    help = 'Arranca el servidor local de embeddings con agrupación de peticiones en microlotes'
+
+    def __init__(self):
+        super(Command, self).__init__()
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            type=str,
+            default=None,
+            help=f'Dirección de escucha: http://host:puerto o unix:///ruta/al/socket '
+                 f'(por defecto: {VARIABLE_URL} o {URL_POR_DEFECTO})'
+        )
+        parser.add_argument(
+            '--modelo',
+            type=str,
+            default=MODEL_NAME,
+            help='Modelo de sentence-transformers'
+        )
+        parser.add_argument(
+            '--backend',
+            choices=BACKENDS,
+            default=os.environ.get(VARIABLE_BACKEND, 'torch'),
+            help='Motor de inferencia: torch (sentence-transformers) u onnx (modelo exportado con exportar_onnx)'
+        )
+        parser.add_argument(
+            '--directorio-onnx',
+            type=str,
+            default=os.environ.get(VARIABLE_DIRECTORIO_ONNX),
+            help='Directorio del modelo ONNX exportado'
+        )
+        parser.add_argument('--lote-maximo', type=int, default=64, help='Textos máximos por microlote')
+        parser.add_argument('--espera-ms', type=float, default=5.0, help='Milisegundos máximos para completar un microlote')
+        parser.add_argument('--tamano-lote', type=int, default=32, help='Tamaño de lote interno del modelo')
+
+    def handle(self, *args, **options):
+        url = options['url'] or os.environ.get(VARIABLE_URL) or URL_POR_DEFECTO
+
+        self.stdout.write(self.style.NOTICE(f"Cargando el modelo {options['modelo']} ({options['backend']})..."))
+        try:
+            modelo = cargar_modelo_local(options['modelo'], options['backend'], options['directorio_onnx'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo cargar el modelo: {str(e)}")
+
+        try:
+            servidor = crear_servidor(
+                modelo,
+                url,
+                lote_maximo=options['lote_maximo'],
+                espera=options['espera_ms'] / 1000,
+                tamano_lote=options['tamano_lote'],
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo iniciar el servidor en {url}: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS(f"Servidor de embeddings escuchando en {url}"))
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Deteniendo el servidor de embeddings..."))
+        finally:
+            servidor.server_close()
+            servidor.agrupador.detener()
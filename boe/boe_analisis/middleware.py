@@ -0,0 +1,51 @@
+"""
+Middleware de la aplicación boe_analisis.
+Para activarlo, añadir 'boe_analisis.middleware.MiddlewareTrazas' a MIDDLEWARE en los settings.
+"""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .utils_trazas import (
+    CONSULTAS_PETICIONES, DURACION_CONSULTAS, DURACION_PETICIONES, ContadorConsultas, iniciar_traza
+)
+
+
+class MiddlewareTrazas:
+    """
+    Mide cada petición: duración total, tramos instrumentados y consultas ORM.
+    Los datos se acumulan en los histogramas expuestos en /metrics y, con DEBUG
+    activo, se devuelven en la cabecera Server-Timing de la respuesta.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        with iniciar_traza() as traza:
+            with ExitStack() as pila:
+                contador = ContadorConsultas(traza)
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(contador))
+                response = self.get_response(request)
+
+        total = time.perf_counter() - inicio
+        vista = _nombre_vista(request)
+        DURACION_PETICIONES.observar(vista, total)
+        CONSULTAS_PETICIONES.observar(vista, traza.consultas)
+        DURACION_CONSULTAS.observar(vista, traza.duracion_consultas)
+
+        if settings.DEBUG:
+            response['Server-Timing'] = traza.server_timing(total)
+        return response
+
+
+def _nombre_vista(request) -> str:
+    """Nombre de la vista resuelta (evita una serie por URL con parámetros)"""
+    coincidencia = getattr(request, 'resolver_match', None)
+    if coincidencia is None:
+        return 'sin_resolver'
+    return coincidencia.view_name or coincidencia._func_path
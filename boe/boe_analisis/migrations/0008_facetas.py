@@ -0,0 +1,75 @@
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def poblar_facetas(apps, schema_editor):
+    """Calcula los recuentos iniciales a partir de los documentos existentes"""
+    DocumentoSimplificado = apps.get_model('boe_analisis', 'DocumentoSimplificado')
+    FacetaDepartamento = apps.get_model('boe_analisis', 'FacetaDepartamento')
+    FacetaMateria = apps.get_model('boe_analisis', 'FacetaMateria')
+
+    departamentos = Counter()
+    filas = (
+        DocumentoSimplificado.objects.exclude(departamento__isnull=True).exclude(departamento='')
+        .order_by().values_list('departamento').annotate(total=Count('identificador'))
+    )
+    for departamento, total in filas:
+        departamentos[departamento[:200]] += total
+
+    materias = Counter()
+    filas = (
+        DocumentoSimplificado.objects.exclude(materias__isnull=True).exclude(materias='')
+        .order_by().values_list('materias').annotate(total=Count('identificador'))
+    )
+    for texto, total in filas:
+        for materia in {m.strip()[:200] for m in texto.split(',')}:
+            if materia:
+                materias[materia] += total
+
+    FacetaDepartamento.objects.bulk_create(
+        [FacetaDepartamento(nombre=nombre, total_documentos=total) for nombre, total in departamentos.items()],
+        batch_size=1000
+    )
+    FacetaMateria.objects.bulk_create(
+        [FacetaMateria(nombre=nombre, total_documentos=total) for nombre, total in materias.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0007_documentosimplificado_palabras_clave'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetaDepartamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200, unique=True)),
+                ('total_documentos', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Faceta de Departamento',
+                'verbose_name_plural': 'Facetas de Departamentos',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FacetaMateria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200, unique=True)),
+                ('total_documentos', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Faceta de Materia',
+                'verbose_name_plural': 'Facetas de Materias',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.RunPython(poblar_facetas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def separar(texto):
+    """Divide un campo separado por comas en valores únicos"""
+    if not texto:
+        return set()
+    return {valor.strip()[:200] for valor in texto.split(',') if valor.strip()}
+
+
+def poblar_terminos(apps, schema_editor):
+    """Rellena las tablas normalizadas a partir de los campos materias y palabras_clave"""
+    DocumentoSimplificado = apps.get_model('boe_analisis', 'DocumentoSimplificado')
+    FacetaMateria = apps.get_model('boe_analisis', 'FacetaMateria')
+    PalabraClave = apps.get_model('boe_analisis', 'PalabraClave')
+    DocumentoMateria = apps.get_model('boe_analisis', 'DocumentoMateria')
+    DocumentoPalabraClave = apps.get_model('boe_analisis', 'DocumentoPalabraClave')
+
+    documentos = {}
+    for identificador, materias, palabras_clave in (
+        DocumentoSimplificado.objects.order_by().values_list('identificador', 'materias', 'palabras_clave').iterator()
+    ):
+        materias, palabras_clave = separar(materias), separar(palabras_clave)
+        if materias or palabras_clave:
+            documentos[identificador] = (materias, palabras_clave)
+
+    # Vocabularios: las materias ya existen en FacetaMateria desde la migración 0008
+    todas_materias = set().union(*(m for m, _ in documentos.values()))
+    todas_palabras = set().union(*(p for _, p in documentos.values()))
+    FacetaMateria.objects.bulk_create(
+        [FacetaMateria(nombre=nombre) for nombre in todas_materias], batch_size=1000, ignore_conflicts=True
+    )
+    PalabraClave.objects.bulk_create(
+        [PalabraClave(nombre=nombre) for nombre in todas_palabras], batch_size=1000, ignore_conflicts=True
+    )
+    ids_materias = dict(FacetaMateria.objects.values_list('nombre', 'id'))
+    ids_palabras = dict(PalabraClave.objects.values_list('nombre', 'id'))
+
+    enlaces_materias = []
+    enlaces_palabras = []
+    for identificador, (materias, palabras_clave) in documentos.items():
+        enlaces_materias.extend(
+            DocumentoMateria(documento_id=identificador, materia_id=ids_materias[nombre]) for nombre in materias
+        )
+        enlaces_palabras.extend(
+            DocumentoPalabraClave(documento_id=identificador, palabra_id=ids_palabras[nombre]) for nombre in palabras_clave
+        )
+    DocumentoMateria.objects.bulk_create(enlaces_materias, batch_size=1000)
+    DocumentoPalabraClave.objects.bulk_create(enlaces_palabras, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0008_facetas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PalabraClave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Palabra Clave',
+                'verbose_name_plural': 'Palabras Clave',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DocumentoMateria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('documento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enlaces_materias', to='boe_analisis.documentosimplificado')),
+                ('materia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enlaces_documentos', to='boe_analisis.facetamateria')),
+            ],
+            options={
+                'verbose_name': 'Materia de Documento',
+                'verbose_name_plural': 'Materias de Documentos',
+                'indexes': [models.Index(fields=['materia', 'documento'], name='docmateria_materia_idx')],
+                'unique_together': {('documento', 'materia')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DocumentoPalabraClave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('documento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enlaces_palabras_clave', to='boe_analisis.documentosimplificado')),
+                ('palabra', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enlaces_documentos', to='boe_analisis.palabraclave')),
+            ],
+            options={
+                'verbose_name': 'Palabra Clave de Documento',
+                'verbose_name_plural': 'Palabras Clave de Documentos',
+                'indexes': [models.Index(fields=['palabra', 'documento'], name='docpalabra_palabra_idx')],
+                'unique_together': {('documento', 'palabra')},
+            },
+        ),
+        migrations.RunPython(poblar_terminos, migrations.RunPython.noop),
+    ]
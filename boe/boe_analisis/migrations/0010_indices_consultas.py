@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0009_terminos_normalizados'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentosimplificado',
+            index=models.Index(fields=['fecha_publicacion', 'departamento'], name='docsimp_fecha_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentosimplificado',
+            index=models.Index(fields=['-fecha_publicacion', '-identificador'], name='docsimp_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentosimplificado',
+            index=models.Index(fields=['departamento', 'fecha_publicacion'], name='docsimp_dep_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentosimplificado',
+            index=models.Index(fields=['codigo_departamento', 'fecha_publicacion'], name='docsimp_coddep_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentosimplificado',
+            index=models.Index(condition=models.Q(('texto__isnull', True)), fields=['fecha_publicacion'], name='docsimp_sin_texto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacionalerta',
+            index=models.Index(fields=['alerta', 'estado'], name='notif_alerta_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacionalerta',
+            index=models.Index(fields=['alerta', 'documento'], name='notif_alerta_doc_idx'),
+        ),
+    ]
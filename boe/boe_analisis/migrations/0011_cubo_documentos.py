@@ -0,0 +1,75 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:35
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_cubo(apps, schema_editor):
+    """Calcula el cubo inicial a partir de los documentos existentes"""
+    from boe_analisis.utils_boe import extraer_rango
+
+    DocumentoSimplificado = apps.get_model('boe_analisis', 'DocumentoSimplificado')
+    FacetaMateria = apps.get_model('boe_analisis', 'FacetaMateria')
+    Legislatura = apps.get_model('boe_analisis', 'Legislatura')
+    CuboDocumentos = apps.get_model('boe_analisis', 'CuboDocumentos')
+
+    legislaturas = list(Legislatura.objects.order_by('-inicio').values_list('inicio', 'fin', 'id'))
+    ids_materias = dict(FacetaMateria.objects.values_list('nombre', 'id'))
+
+    def legislatura_para_fecha(fecha):
+        for inicio, fin, legislatura_id in legislaturas:
+            if inicio <= fecha and (fin is None or fecha <= fin):
+                return legislatura_id
+        return None
+
+    celdas = Counter()
+    documentos = DocumentoSimplificado.objects.order_by().values_list(
+        'fecha_publicacion', 'departamento', 'titulo', 'materias'
+    )
+    for fecha, departamento, titulo, materias in documentos.iterator():
+        clave = (fecha, (departamento or '')[:200], extraer_rango(titulo) or '')
+        celdas[clave + (None,)] += 1
+        for materia in {m.strip()[:200] for m in (materias or '').split(',') if m.strip()}:
+            if materia in ids_materias:
+                celdas[clave + (ids_materias[materia],)] += 1
+
+    CuboDocumentos.objects.bulk_create(
+        [
+            CuboDocumentos(
+                fecha=fecha, departamento=departamento, rango=rango, materia_id=materia_id,
+                legislatura_id=legislatura_para_fecha(fecha), total=total
+            )
+            for (fecha, departamento, rango, materia_id), total in celdas.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0010_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CuboDocumentos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('departamento', models.CharField(blank=True, default='', max_length=200)),
+                ('rango', models.CharField(blank=True, default='', max_length=100)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('legislatura', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cubo', to='boe_analisis.legislatura')),
+                ('materia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cubo', to='boe_analisis.facetamateria')),
+            ],
+            options={
+                'verbose_name': 'Celda del Cubo de Documentos',
+                'verbose_name_plural': 'Cubo de Documentos',
+                'indexes': [models.Index(fields=['materia', 'legislatura', 'fecha'], name='cubo_materia_leg_fecha_idx'), models.Index(fields=['materia', 'fecha'], name='cubo_materia_fecha_idx'), models.Index(fields=['fecha', 'departamento', 'rango'], name='cubo_fecha_dep_rango_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_cubo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0011_cubo_documentos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=30)),
+                ('referencia', models.CharField(max_length=40)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('completada', 'Completada'), ('muerta', 'Muerta')], default='pendiente', max_length=20)),
+                ('prioridad', models.SmallIntegerField(default=0)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('max_intentos', models.PositiveSmallIntegerField(default=5)),
+                ('disponible_en', models.DateTimeField()),
+                ('bloqueada_hasta', models.DateTimeField(blank=True, null=True)),
+                ('trabajador', models.CharField(blank=True, default='', max_length=100)),
+                ('error', models.TextField(blank=True, default='')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'indexes': [models.Index(condition=models.Q(('estado', 'pendiente')), fields=['prioridad', 'disponible_en'], name='tarea_pendiente_idx'), models.Index(condition=models.Q(('estado', 'en_curso')), fields=['bloqueada_hasta'], name='tarea_en_curso_idx'), models.Index(fields=['tipo', 'estado'], name='tarea_tipo_estado_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('estado__in', ['pendiente', 'en_curso'])), fields=('tipo', 'referencia'), name='tarea_activa_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0012_tareas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenciaNorma',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origen', models.CharField(max_length=20)),
+                ('destino', models.CharField(max_length=20)),
+                ('relacion', models.CharField(choices=[('modifica', 'Modifica'), ('deroga', 'Deroga'), ('anula', 'Anula'), ('corrige', 'Corrige'), ('desarrolla', 'Desarrolla'), ('cita', 'Cita')], max_length=20)),
+                ('palabra', models.CharField(blank=True, default='', max_length=100)),
+                ('codigo_palabra', models.CharField(blank=True, default='', max_length=10)),
+                ('texto', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Referencia entre normas',
+                'verbose_name_plural': 'Referencias entre normas',
+                'indexes': [models.Index(fields=['destino', 'relacion'], name='referencia_destino_idx')],
+                'constraints': [models.UniqueConstraint(fields=('origen', 'destino', 'relacion'), name='referencia_norma_unica')],
+            },
+        ),
+    ]
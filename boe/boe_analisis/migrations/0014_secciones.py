@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0013_referencias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeccionDocumento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField()),
+                ('tipo', models.CharField(choices=[('preambulo', 'Preámbulo'), ('anexo', 'Anexo'), ('titulo', 'Título'), ('capitulo', 'Capítulo'), ('seccion', 'Sección'), ('articulo', 'Artículo'), ('disposicion', 'Disposición'), ('firma', 'Firma')], max_length=20)),
+                ('clave', models.CharField(max_length=100)),
+                ('titulo', models.TextField(blank=True, default='')),
+                ('ruta', models.CharField(blank=True, default='', max_length=300)),
+                ('inicio', models.PositiveIntegerField()),
+                ('fin', models.PositiveIntegerField()),
+                ('documento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='secciones', to='boe_analisis.documentosimplificado')),
+            ],
+            options={
+                'verbose_name': 'Sección de documento',
+                'verbose_name_plural': 'Secciones de documentos',
+                'ordering': ['documento', 'orden'],
+                'indexes': [models.Index(fields=['documento', 'clave'], name='seccion_documento_clave_idx')],
+                'constraints': [models.UniqueConstraint(fields=('documento', 'orden'), name='seccion_documento_orden_unica')],
+            },
+        ),
+    ]
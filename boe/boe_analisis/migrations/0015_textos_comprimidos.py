@@ -0,0 +1,100 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mover_textos(apps, schema_editor):
+    """Comprime los textos existentes en TextoDocumento (sin diccionario: aún no hay ninguno)"""
+    from boe_analisis.utils_textos import comprimir
+
+    DocumentoSimplificado = apps.get_model('boe_analisis', 'DocumentoSimplificado')
+    TextoDocumento = apps.get_model('boe_analisis', 'TextoDocumento')
+
+    ultimo = ''
+    while True:
+        lote = list(
+            DocumentoSimplificado.objects.filter(identificador__gt=ultimo, texto__isnull=False)
+            .exclude(texto='').order_by('identificador').only('identificador', 'texto')[:500]
+        )
+        if not lote:
+            return
+        textos = []
+        for documento in lote:
+            formato, contenido = comprimir(documento.texto)
+            textos.append(TextoDocumento(documento_id=documento.identificador, formato=formato, contenido=contenido))
+            documento.longitud_texto = len(documento.texto)
+        TextoDocumento.objects.bulk_create(textos)
+        DocumentoSimplificado.objects.bulk_update(lote, ['longitud_texto'])
+        ultimo = lote[-1].identificador
+
+
+def restaurar_textos(apps, schema_editor):
+    """Vuelve a copiar los textos descomprimidos en la tabla de documentos"""
+    from boe_analisis.utils_textos import descomprimir
+
+    DocumentoSimplificado = apps.get_model('boe_analisis', 'DocumentoSimplificado')
+    TextoDocumento = apps.get_model('boe_analisis', 'TextoDocumento')
+
+    for texto in TextoDocumento.objects.order_by('documento_id').iterator(chunk_size=500):
+        DocumentoSimplificado.objects.filter(identificador=texto.documento_id).update(
+            texto=descomprimir(texto.formato, texto.contenido, texto.diccionario_id)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0014_secciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiccionarioTexto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('datos', models.BinaryField()),
+                ('muestras', models.PositiveIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Diccionario de compresión',
+                'verbose_name_plural': 'Diccionarios de compresión',
+            },
+        ),
+        migrations.CreateModel(
+            name='TextoDocumento',
+            fields=[
+                ('documento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='texto_comprimido', serialize=False, to='boe_analisis.documentosimplificado')),
+                ('formato', models.CharField(choices=[('zstd', 'zstd'), ('zlib', 'zlib')], max_length=10)),
+                ('contenido', models.BinaryField()),
+            ],
+            options={
+                'verbose_name': 'Texto de documento',
+                'verbose_name_plural': 'Textos de documentos',
+            },
+        ),
+        migrations.AddField(
+            model_name='textodocumento',
+            name='diccionario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='boe_analisis.diccionariotexto'),
+        ),
+        migrations.AddField(
+            model_name='documentosimplificado',
+            name='longitud_texto',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(mover_textos, restaurar_textos),
+        migrations.RemoveIndex(
+            model_name='documentosimplificado',
+            name='docsimp_sin_texto_idx',
+        ),
+        migrations.RemoveField(
+            model_name='documentosimplificado',
+            name='texto',
+        ),
+        migrations.AddIndex(
+            model_name='documentosimplificado',
+            index=models.Index(condition=models.Q(('longitud_texto__isnull', True)), fields=['fecha_publicacion'], name='docsimp_sin_texto_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0015_textos_comprimidos'),
+    ]
+
+    operations = [
+        # Los documentos existentes quedan marcados como modificados en el momento de la migración
+        migrations.AddField(
+            model_name='documentosimplificado',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='documentosimplificado',
+            index=models.Index(fields=['actualizado'], name='docsimp_actualizado_idx'),
+        ),
+    ]
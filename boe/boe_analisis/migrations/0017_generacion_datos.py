@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0016_documento_actualizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneracionDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generacion', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Generación de los datos',
+                'verbose_name_plural': 'Generaciones de los datos',
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+def calcular_vocabulario(apps, schema_editor):
+    """Calcula el vocabulario de los textos ya guardados"""
+    from boe_analisis.utils_busqueda import vocabulario
+    from boe_analisis.utils_textos import descomprimir
+
+    TextoDocumento = apps.get_model('boe_analisis', 'TextoDocumento')
+
+    ultimo = ''
+    while True:
+        lote = list(
+            TextoDocumento.objects.filter(documento_id__gt=ultimo).order_by('documento_id')
+            .only('documento_id', 'formato', 'contenido', 'diccionario_id')[:500]
+        )
+        if not lote:
+            return
+        for texto in lote:
+            texto.vocabulario = vocabulario(descomprimir(texto.formato, texto.contenido, texto.diccionario_id))
+        TextoDocumento.objects.bulk_update(lote, ['vocabulario'])
+        ultimo = lote[-1].documento_id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0017_generacion_datos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textodocumento',
+            name='vocabulario',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(calcular_vocabulario, migrations.RunPython.noop),
+    ]
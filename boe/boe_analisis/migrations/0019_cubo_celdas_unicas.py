@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:47
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def fusionar_celdas(apps, schema_editor):
+    """Suma en una sola fila las celdas repetidas por inserciones concurrentes"""
+    CuboDocumentos = apps.get_model('boe_analisis', 'CuboDocumentos')
+
+    repetidas = (
+        CuboDocumentos.objects.order_by().values('fecha', 'departamento', 'rango', 'materia_id')
+        .annotate(filas=Count('id'), primera=Min('id'), suma=Sum('total')).filter(filas__gt=1)
+    )
+    for celda in repetidas:
+        celdas = CuboDocumentos.objects.filter(
+            fecha=celda['fecha'], departamento=celda['departamento'], rango=celda['rango'],
+            materia_id=celda['materia_id']
+        )
+        celdas.exclude(id=celda['primera']).delete()
+        celdas.update(total=celda['suma'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boe_analisis', '0018_vocabulario_textos'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_celdas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cubodocumentos',
+            constraint=models.UniqueConstraint(fields=('fecha', 'departamento', 'rango', 'materia'), name='cubo_celda_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='cubodocumentos',
+            constraint=models.UniqueConstraint(condition=models.Q(('materia__isnull', True)), fields=('fecha', 'departamento', 'rango'), name='cubo_celda_total_unica'),
+        ),
+    ]
@@ -152,3 +152,11 @@ class DocumentoAnuncio(Documento):
 
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
+
+# Los modelos del resto de módulos se importan aquí para que el registro de
+# aplicaciones los cargue siempre (makemigrations, migrate, shell...) y no
+# solo cuando alguna vista o comando los importa
+from . import (  # noqa: E402,F401
+    models_alertas, models_articulos, models_cubo, models_facetas, models_generacion, models_referencias,
+    models_simplified, models_tareas, models_textos,
+)
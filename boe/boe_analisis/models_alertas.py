@@ -65,6 +65,27 @@ class AlertaUsuario(models.Model):
         verbose_name = "Alerta de Usuario"
         verbose_name_plural = "Alertas de Usuarios"
 
+class NotificacionAlertaQuerySet(models.QuerySet):
+    """Perfiles de consulta de las notificaciones"""
+
+    def listado(self):
+        """
+        Columnas de los listados de notificaciones y el nombre de su alerta,
+        sin el resumen generado por IA
+        """
+        return self.select_related('alerta').only(
+            'alerta__nombre', 'documento', 'titulo_documento', 'fecha_documento',
+            'fecha_notificacion', 'relevancia', 'estado'
+        )
+
+    def recuentos(self):
+        """Total de notificaciones y pendientes en una sola consulta ({'total', 'pendientes'})"""
+        return self.order_by().aggregate(
+            total=models.Count('id'),
+            pendientes=models.Count('id', filter=models.Q(estado='pendiente')),
+        )
+
+
 class NotificacionAlerta(models.Model):
     """
     Notificaciones generadas para los usuarios
@@ -84,6 +105,8 @@ class NotificacionAlerta(models.Model):
     relevancia = models.FloatField(default=0.0)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
     resumen = models.TextField(blank=True, null=True)
+
+    objects = NotificacionAlertaQuerySet.as_manager()
     
     def __str__(self):
         return f"Notificación para {self.alerta.usuario.username}: {self.titulo_documento[:50]}..."
@@ -92,3 +115,44 @@ class NotificacionAlerta(models.Model):
         verbose_name = "Notificación de Alerta"
         verbose_name_plural = "Notificaciones de Alertas"
         ordering = ['-fecha_notificacion']
+        indexes = [
+            # Notificaciones pendientes de una alerta y recuentos por estado
+            models.Index(fields=['alerta', 'estado'], name='notif_alerta_estado_idx'),
+            # Comprobación de notificación existente para un documento
+            models.Index(fields=['alerta', 'documento'], name='notif_alerta_doc_idx'),
+        ]
+
+# Invalidación de la caché de estadísticas del panel (ver utils_estadisticas)
+def invalidar_estadisticas_notificacion(sender, instance, **kwargs):
+    from .utils_estadisticas import invalidar_estadisticas
+    try:
+        invalidar_estadisticas(instance.alerta.usuario_id)
+    except AlertaUsuario.DoesNotExist:
+        pass
+
+def invalidar_estadisticas_alerta(sender, instance, **kwargs):
+    from .utils_estadisticas import invalidar_estadisticas
+    invalidar_estadisticas(instance.usuario_id)
+
+def invalidar_estadisticas_categorias(sender, instance, action, reverse, pk_set, **kwargs):
+    from .utils_estadisticas import invalidar_estadisticas
+    if not reverse:
+        # alerta.categorias.add(...): instance es la alerta
+        if action.startswith('post_'):
+            invalidar_estadisticas(instance.usuario_id)
+        return
+    # categoria.alertas.add(...): instance es la categoría y pk_set las alertas
+    if action in ('post_add', 'post_remove'):
+        alertas = AlertaUsuario.objects.filter(pk__in=pk_set)
+    elif action == 'pre_clear':
+        alertas = instance.alertas.all()
+    else:
+        return
+    for usuario_id in set(alertas.values_list('usuario_id', flat=True)):
+        invalidar_estadisticas(usuario_id)
+
+models.signals.post_save.connect(invalidar_estadisticas_notificacion, sender=NotificacionAlerta)
+models.signals.post_delete.connect(invalidar_estadisticas_notificacion, sender=NotificacionAlerta)
+models.signals.post_save.connect(invalidar_estadisticas_alerta, sender=AlertaUsuario)
+models.signals.post_delete.connect(invalidar_estadisticas_alerta, sender=AlertaUsuario)
+models.signals.m2m_changed.connect(invalidar_estadisticas_categorias, sender=AlertaUsuario.categorias.through)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+from .models_simplified import DocumentoSimplificado
+
+# Estructura de los documentos del BOE (títulos, capítulos, artículos,
+# disposiciones, anexos...). Las secciones se extraen del elemento <texto>
+# del XML durante la ingesta (ver utils_articulos) y guardan la posición de
+# cada una en DocumentoSimplificado.texto, de modo que se puede trabajar con
+# un solo artículo en lugar de con el texto completo.
+
+class SeccionDocumento(models.Model):
+    """
+    División estructural del texto de un documento, delimitada por sus
+    posiciones [inicio, fin) en DocumentoSimplificado.texto. Las secciones
+    contenedoras (anexo, título, capítulo, sección) abarcan todo su contenido.
+    """
+    PREAMBULO = 'preambulo'
+    ANEXO = 'anexo'
+    TITULO = 'titulo'
+    CAPITULO = 'capitulo'
+    SECCION = 'seccion'
+    ARTICULO = 'articulo'
+    DISPOSICION = 'disposicion'
+    FIRMA = 'firma'
+    TIPO_CHOICES = [
+        (PREAMBULO, 'Preámbulo'),
+        (ANEXO, 'Anexo'),
+        (TITULO, 'Título'),
+        (CAPITULO, 'Capítulo'),
+        (SECCION, 'Sección'),
+        (ARTICULO, 'Artículo'),
+        (DISPOSICION, 'Disposición'),
+        (FIRMA, 'Firma'),
+    ]
+
+    documento = models.ForeignKey(DocumentoSimplificado, on_delete=models.CASCADE, related_name='secciones')
+    orden = models.PositiveIntegerField()
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    clave = models.CharField(max_length=100)  # Encabezado normalizado, p. ej. "Artículo 3" o "Título I"
+    titulo = models.TextField(blank=True, default='')  # Encabezado completo, p. ej. "Artículo 3. Definiciones."
+    ruta = models.CharField(max_length=300, blank=True, default='')  # Contenedores, p. ej. "Título I > Capítulo II"
+    inicio = models.PositiveIntegerField()
+    fin = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.documento_id} {self.clave}"
+
+    class Meta:
+        ordering = ['documento', 'orden']
+        verbose_name = "Sección de documento"
+        verbose_name_plural = "Secciones de documentos"
+        constraints = [
+            # También sirve de índice para leer la estructura de un documento en orden
+            models.UniqueConstraint(fields=['documento', 'orden'], name='seccion_documento_orden_unica'),
+        ]
+        indexes = [
+            # Un artículo concreto de un documento
+            models.Index(fields=['documento', 'clave'], name='seccion_documento_clave_idx'),
+        ]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+from .models import Legislatura
+from .models_facetas import FacetaMateria
+
+# Cubo de estadísticas materializado a partir de DocumentoSimplificado.
+# Se actualiza de forma incremental durante la ingesta (ver utils_cubo)
+# y se puede reconstruir con el comando recalcular_cubo.
+
+class CuboDocumentos(models.Model):
+    """
+    Número de documentos por fecha, departamento, rango, materia y legislatura.
+    Cada documento suma uno en la fila sin materia (materia nula, total de documentos)
+    y uno en la fila de cada una de sus materias.
+    """
+    fecha = models.DateField()
+    departamento = models.CharField(max_length=200, blank=True, default='')
+    rango = models.CharField(max_length=100, blank=True, default='')
+    materia = models.ForeignKey(FacetaMateria, on_delete=models.CASCADE, null=True, blank=True, related_name='cubo')
+    legislatura = models.ForeignKey(Legislatura, on_delete=models.SET_NULL, null=True, blank=True, related_name='cubo')
+    total = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.fecha} {self.departamento} {self.rango} ({self.total})"
+
+    class Meta:
+        verbose_name = "Celda del Cubo de Documentos"
+        verbose_name_plural = "Cubo de Documentos"
+        indexes = [
+            models.Index(fields=['materia', 'legislatura', 'fecha'], name='cubo_materia_leg_fecha_idx'),
+            models.Index(fields=['materia', 'fecha'], name='cubo_materia_fecha_idx'),
+            models.Index(fields=['fecha', 'departamento', 'rango'], name='cubo_fecha_dep_rango_idx'),
+        ]
+        # Una fila por celda (la legislatura depende de la fecha). Las filas de
+        # totales tienen la materia nula, que no cuenta en una restricción única,
+        # así que tienen la suya propia.
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'departamento', 'rango', 'materia'], name='cubo_celda_unica'),
+            models.UniqueConstraint(
+                fields=['fecha', 'departamento', 'rango'], condition=models.Q(materia__isnull=True),
+                name='cubo_celda_total_unica'
+            ),
+        ]
+
+# Las celdas del cubo guardan la legislatura de su fecha (ver utils_cubo.reasignar_legislaturas)
+def reasignar_legislaturas_cubo(sender, **kwargs):
+    from .utils_cubo import reasignar_legislaturas
+    reasignar_legislaturas()
+
+models.signals.post_save.connect(reasignar_legislaturas_cubo, sender=Legislatura)
+models.signals.post_delete.connect(reasignar_legislaturas_cubo, sender=Legislatura)
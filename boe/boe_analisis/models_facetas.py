@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+from .models_simplified import DocumentoSimplificado
+
+# Tablas de facetas precalculadas para los filtros de búsqueda y almacenamiento
+# normalizado de materias y palabras clave de DocumentoSimplificado.
+# Se actualizan de forma incremental durante la ingesta (ver utils_facetas)
+# y se pueden reconstruir con el comando recalcular_facetas.
+
+class FacetaDepartamento(models.Model):
+    """
+    Departamento normalizado con el número de documentos publicados
+    """
+    nombre = models.CharField(max_length=200, unique=True)
+    total_documentos = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.total_documentos})"
+
+    class Meta:
+        ordering = ['nombre']
+        verbose_name = "Faceta de Departamento"
+        verbose_name_plural = "Facetas de Departamentos"
+
+class FacetaMateria(models.Model):
+    """
+    Materia normalizada con el número de documentos que la incluyen.
+    Es también el vocabulario de materias al que apunta DocumentoMateria.
+    """
+    nombre = models.CharField(max_length=200, unique=True)
+    total_documentos = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.total_documentos})"
+
+    class Meta:
+        ordering = ['nombre']
+        verbose_name = "Faceta de Materia"
+        verbose_name_plural = "Facetas de Materias"
+
+class PalabraClave(models.Model):
+    """
+    Palabra clave normalizada extraída de los documentos
+    """
+    nombre = models.CharField(max_length=200, unique=True)
+
+    def __str__(self):
+        return self.nombre
+
+    class Meta:
+        ordering = ['nombre']
+        verbose_name = "Palabra Clave"
+        verbose_name_plural = "Palabras Clave"
+
+class DocumentoMateria(models.Model):
+    """
+    Relación entre un documento y cada una de sus materias
+    """
+    documento = models.ForeignKey(DocumentoSimplificado, on_delete=models.CASCADE, related_name='enlaces_materias')
+    materia = models.ForeignKey(FacetaMateria, on_delete=models.CASCADE, related_name='enlaces_documentos')
+
+    def __str__(self):
+        return f"{self.documento_id} - {self.materia_id}"
+
+    class Meta:
+        unique_together = ('documento', 'materia')
+        indexes = [
+            models.Index(fields=['materia', 'documento'], name='docmateria_materia_idx'),
+        ]
+        verbose_name = "Materia de Documento"
+        verbose_name_plural = "Materias de Documentos"
+
+class DocumentoPalabraClave(models.Model):
+    """
+    Relación entre un documento y cada una de sus palabras clave
+    """
+    documento = models.ForeignKey(DocumentoSimplificado, on_delete=models.CASCADE, related_name='enlaces_palabras_clave')
+    palabra = models.ForeignKey(PalabraClave, on_delete=models.CASCADE, related_name='enlaces_documentos')
+
+    def __str__(self):
+        return f"{self.documento_id} - {self.palabra_id}"
+
+    class Meta:
+        unique_together = ('documento', 'palabra')
+        indexes = [
+            models.Index(fields=['palabra', 'documento'], name='docpalabra_palabra_idx'),
+        ]
+        verbose_name = "Palabra Clave de Documento"
+        verbose_name_plural = "Palabras Clave de Documentos"
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+# Generación de los datos públicos (ver utils_http).
+# Se guarda en la base de datos porque la abren procesos distintos de los que
+# la leen: la ingesta, el enriquecimiento y boe_worker la incrementan y los
+# procesos web derivan de ella los ETag y las claves de caché.
+
+class GeneracionDatos(models.Model):
+    """
+    Fila única con la generación actual de los datos: la marca de tiempo (en
+    segundos) del último cambio, estrictamente creciente.
+    """
+    generacion = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Generación {self.generacion}"
+
+    class Meta:
+        verbose_name = "Generación de los datos"
+        verbose_name_plural = "Generaciones de los datos"
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+# Grafo de referencias entre normas del BOE.
+# Cada arista se extrae del apartado <referencias> del XML de un documento
+# (ver utils_referencias) y se orienta siempre de la norma que actúa a la
+# norma afectada, tanto si viene de sus referencias anteriores ("MODIFICA")
+# como de las posteriores ("SE MODIFICA por").
+
+class ReferenciaNorma(models.Model):
+    """
+    Arista del grafo de referencias: 'origen' actúa sobre 'destino' con la relación indicada.
+    Los extremos son identificadores del BOE y no claves ajenas, porque la norma
+    citada no tiene por qué estar cargada en la base de datos.
+    """
+    MODIFICA = 'modifica'
+    DEROGA = 'deroga'
+    ANULA = 'anula'
+    CORRIGE = 'corrige'
+    DESARROLLA = 'desarrolla'
+    CITA = 'cita'
+    RELACION_CHOICES = [
+        (MODIFICA, 'Modifica'),
+        (DEROGA, 'Deroga'),
+        (ANULA, 'Anula'),
+        (CORRIGE, 'Corrige'),
+        (DESARROLLA, 'Desarrolla'),
+        (CITA, 'Cita'),
+    ]
+
+    origen = models.CharField(max_length=20)
+    destino = models.CharField(max_length=20)
+    relacion = models.CharField(max_length=20, choices=RELACION_CHOICES)
+    palabra = models.CharField(max_length=100, blank=True, default='')  # Término del BOE en voz activa (p. ej. "MODIFICA")
+    codigo_palabra = models.CharField(max_length=10, blank=True, default='')
+    texto = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return f"{self.origen} {self.relacion} {self.destino}"
+
+    class Meta:
+        verbose_name = "Referencia entre normas"
+        verbose_name_plural = "Referencias entre normas"
+        constraints = [
+            # La misma referencia aparece en el XML de ambas normas: se guarda una vez
+            models.UniqueConstraint(fields=['origen', 'destino', 'relacion'], name='referencia_norma_unica'),
+        ]
+        indexes = [
+            # Quién modifica o deroga una norma (y cadenas de modificaciones).
+            # Las consultas por origen usan el índice de la restricción única.
+            models.Index(fields=['destino', 'relacion'], name='referencia_destino_idx'),
+        ]
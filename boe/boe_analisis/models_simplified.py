@@ -5,6 +5,39 @@ import datetime
 # Modelo simplificado para BOE_API
 # Basado en el plan de simplificación acordado
 
+# Columnas que se muestran en los listados (sumario, búsqueda, panel y resultados de la API)
+CAMPOS_LISTADO = (
+    'identificador',
+    'fecha_publicacion',
+    'titulo',
+    'departamento',
+    'codigo_departamento',
+    'materias',
+    'url_pdf',
+    'url_xml',
+    'vigente',
+)
+
+
+class DocumentoSimplificadoQuerySet(models.QuerySet):
+    """
+    Perfiles de consulta de los documentos: cada vista pide solo las columnas
+    que muestra, en el orden en que las muestra.
+    """
+
+    def listado(self):
+        """Solo las columnas de los listados (CAMPOS_LISTADO)"""
+        return self.only(*CAMPOS_LISTADO)
+
+    def sumario(self, fecha):
+        """Documentos de un día para el sumario, ordenados por departamento"""
+        return self.listado().filter(fecha_publicacion=fecha).order_by('departamento', 'identificador')
+
+    def ultima_fecha(self):
+        """Fecha de publicación más reciente (None si no hay documentos)"""
+        return self.order_by('-fecha_publicacion').values_list('fecha_publicacion', flat=True).first()
+
+
 class DocumentoSimplificado(models.Model):
     """
     Modelo simplificado de Documento que contiene solo los campos esenciales.
@@ -13,7 +46,8 @@ class DocumentoSimplificado(models.Model):
     identificador = models.CharField(max_length=20, primary_key=True)
     fecha_publicacion = models.DateField()
     titulo = models.TextField()
-    texto = models.TextField(null=True, blank=True)
+    # El texto completo se guarda comprimido en otra tabla (ver la propiedad texto)
+    longitud_texto = models.PositiveIntegerField(null=True, blank=True)  # Caracteres del texto, None si no se ha descargado
     url_pdf = models.URLField(max_length=500, null=True, blank=True)
     url_xml = models.URLField(max_length=500, null=True, blank=True)
     
@@ -25,15 +59,65 @@ class DocumentoSimplificado(models.Model):
     codigo_departamento = models.CharField(max_length=20, null=True, blank=True)  # Código numérico del departamento
     materias = models.TextField(null=True, blank=True)  # Almacenará materias como texto separado por comas
     palabras_clave = models.TextField(null=True, blank=True)  # Almacenará palabras clave como texto separado por comas
+    # Última modificación del documento o de su texto (exportaciones incrementales). Las escrituras en
+    # bloque (bulk_update, save con update_fields) deben incluirlo explícitamente
+    actualizado = models.DateTimeField(auto_now=True)
+
+    objects = DocumentoSimplificadoQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.identificador} - {self.titulo[:100]}"
 
+    @property
+    def texto(self):
+        """
+        Texto completo del documento. Se guarda comprimido en TextoDocumento y se
+        lee al primer acceso; para recorrer muchos documentos, cargarlos antes en
+        una consulta con utils_textos.precargar_textos.
+        """
+        if '_texto' not in self.__dict__:
+            texto = None
+            if self.longitud_texto:
+                from .utils_textos import cargar_textos
+                texto = cargar_textos([self.pk]).get(self.pk)
+            self.__dict__['_texto'] = texto
+        return self.__dict__['_texto']
+
+    @texto.setter
+    def texto(self, valor):
+        self.__dict__['_texto'] = valor or None
+        self.__dict__['_texto_pendiente'] = True
+        self.longitud_texto = len(valor) if valor else None
+
+    def save(self, *args, **kwargs):
+        """Guarda el documento y, si se le ha asignado uno, su texto"""
+        super().save(*args, **kwargs)
+        if self.__dict__.pop('_texto_pendiente', False):
+            from .utils_textos import guardar_textos
+            guardar_textos({self.pk: self._texto}, actualizar_longitud=False)
+
     class Meta:
         ordering = ['-fecha_publicacion']
         verbose_name = "Documento Simplificado"
         verbose_name_plural = "Documentos Simplificados"
         db_table = 'boe_analisis_documentosimplificado'  # Nombre de la tabla que coincide con la migración
+        indexes = [
+            # Sumario del día, rangos de fechas de las alertas y agrupación por departamento
+            models.Index(fields=['fecha_publicacion', 'departamento'], name='docsimp_fecha_dep_idx'),
+            # Ordenación de listados y paginación por cursor (más recientes primero)
+            models.Index(fields=['-fecha_publicacion', '-identificador'], name='docsimp_orden_idx'),
+            # Filtros por departamento y por código de departamento
+            models.Index(fields=['departamento', 'fecha_publicacion'], name='docsimp_dep_fecha_idx'),
+            models.Index(fields=['codigo_departamento', 'fecha_publicacion'], name='docsimp_coddep_fecha_idx'),
+            # Exportación de los documentos modificados desde una fecha
+            models.Index(fields=['actualizado'], name='docsimp_actualizado_idx'),
+            # Documentos pendientes de descargar el texto (índice parcial)
+            models.Index(
+                fields=['fecha_publicacion'],
+                condition=models.Q(longitud_texto__isnull=True),
+                name='docsimp_sin_texto_idx'
+            ),
+        ]
 
 # La tabla de alertas se implementará en una fase posterior
 """
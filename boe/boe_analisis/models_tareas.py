@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+# Cola de tareas persistente en la base de datos.
+# La ingesta encola tareas por documento y el comando boe_worker las reclama
+# con un arrendamiento (ver utils_tareas), en lugar de que cada comando
+# periódico recorra las tablas buscando trabajo pendiente.
+
+class Tarea(models.Model):
+    """
+    Tarea de procesamiento en segundo plano sobre un objeto (normalmente un documento).
+    Un trabajador la reclama durante un tiempo limitado (bloqueada_hasta); si no la
+    completa a tiempo, otro trabajador puede reclamarla. Tras agotar los intentos
+    queda como 'muerta' para revisión manual.
+    """
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    COMPLETADA = 'completada'
+    MUERTA = 'muerta'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADA, 'Completada'),
+        (MUERTA, 'Muerta'),
+    ]
+
+    tipo = models.CharField(max_length=30)
+    referencia = models.CharField(max_length=40)  # Identificador del documento u objeto a procesar
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    prioridad = models.SmallIntegerField(default=0)  # Menor valor, antes se procesa
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    disponible_en = models.DateTimeField()
+    bloqueada_hasta = models.DateTimeField(null=True, blank=True)
+    trabajador = models.CharField(max_length=100, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tipo} {self.referencia} ({self.estado})"
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        constraints = [
+            # Una sola tarea activa por tipo y objeto: volver a encolar no duplica trabajo
+            models.UniqueConstraint(
+                fields=['tipo', 'referencia'],
+                condition=models.Q(estado__in=['pendiente', 'en_curso']),
+                name='tarea_activa_unica'
+            ),
+        ]
+        indexes = [
+            # Reclamación de tareas: pendientes disponibles por prioridad y antigüedad
+            models.Index(
+                fields=['prioridad', 'disponible_en'],
+                condition=models.Q(estado='pendiente'),
+                name='tarea_pendiente_idx'
+            ),
+            # Recuperación de arrendamientos vencidos
+            models.Index(
+                fields=['bloqueada_hasta'],
+                condition=models.Q(estado='en_curso'),
+                name='tarea_en_curso_idx'
+            ),
+            models.Index(fields=['tipo', 'estado'], name='tarea_tipo_estado_idx'),
+        ]
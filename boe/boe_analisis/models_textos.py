@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+from .models_simplified import DocumentoSimplificado
+
+# Textos completos de los documentos, fuera de la tabla principal.
+# Se guardan comprimidos (zstd, con un diccionario entrenado sobre textos del
+# BOE si lo hay; zlib si zstandard no está instalado) y se leen a través de
+# DocumentoSimplificado.texto solo cuando hacen falta (ver utils_textos).
+# Para poder buscar en ellos se guarda aparte su vocabulario sin comprimir
+# (ver utils_busqueda.filtro_cuerpo).
+
+class DiccionarioTexto(models.Model):
+    """
+    Diccionario de zstd entrenado con una muestra de textos del BOE.
+    El más reciente se usa para comprimir; los anteriores se conservan
+    mientras haya textos comprimidos con ellos.
+    """
+    datos = models.BinaryField()
+    muestras = models.PositiveIntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Diccionario {self.pk} ({len(self.datos)} bytes, {self.muestras} muestras)"
+
+    class Meta:
+        verbose_name = "Diccionario de compresión"
+        verbose_name_plural = "Diccionarios de compresión"
+
+
+class TextoDocumento(models.Model):
+    """Texto completo de un documento, comprimido"""
+    ZSTD = 'zstd'
+    ZLIB = 'zlib'
+    FORMATO_CHOICES = [
+        (ZSTD, 'zstd'),
+        (ZLIB, 'zlib'),
+    ]
+
+    documento = models.OneToOneField(
+        DocumentoSimplificado, on_delete=models.CASCADE, primary_key=True, related_name='texto_comprimido'
+    )
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES)
+    diccionario = models.ForeignKey(DiccionarioTexto, null=True, blank=True, on_delete=models.PROTECT)
+    contenido = models.BinaryField()
+    vocabulario = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return f"Texto de {self.documento_id} ({self.formato}, {len(self.contenido)} bytes)"
+
+    class Meta:
+        verbose_name = "Texto de documento"
+        verbose_name_plural = "Textos de documentos"
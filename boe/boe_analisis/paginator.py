@@ -1,72 +1,272 @@
-__author__ = 'Carlos'
-from django.core.paginator import Paginator, InvalidPage, EmptyPage
-from django.db.models import Max,Count,Q,F
-
-class ModelPagination:
-    model = None
-    items_per_page = None
-    count = None
-    page_range = []
-
-    def __init__(self, model, items_per_page):
-        self.model = model
-        self.items_per_page = items_per_page
-        self.count = self.model.aggregate(Max('id'))['id__max']
-        print self.count
-        self.num_pages = divmod(self.count, self.items_per_page)[0]+1
-
-        for i in range(self.num_pages):
-            self.page_range.append(i+1)
-
-    def page(self, page_number):
-        if page_number > self.num_pages:
-            raise EmptyPage, "That page contains no results"
-
-        if page_number <= 0:
-            raise EmptyPage, "That page number is less than 1"
-
-        start = self.items_per_page * (page_number-1)
-        end = self.items_per_page * page_number
-
-        object_list = self.model.filter(id__gte=start, id__lt=end)
-        return ModelPaginationPage(object_list, page_number, self.count, start, end, self)
-
-class ModelPaginationPage:
-    object_list = None
-    number = None
-    count = None
-    start = None
-    end = None
-    paginator = None
-
-    def __unicode__(self):
-        return "<Page %s of %s>"%(self.number, self.count)
-
-    def __init__(self, object_list, number, count, start, end, paginator):
-        self.number = number
-        self.count = count
+"""
+Paginación por cursor (keyset/seek) para documentos y resultados de búsqueda.
+
+En lugar de COUNT(*) + OFFSET, cada página se obtiene con una condición
+WHERE sobre la última fila de la página anterior, de modo que la página N
+cuesta lo mismo que la primera. Los cursores son opacos para el cliente.
+"""
+import base64
+import json
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from django.db.models import F, Q
+
+# Ordenación por defecto: más recientes primero, con el identificador como desempate
+ORDEN_DOCUMENTOS = ('-fecha_publicacion', '-identificador')
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se puede decodificar"""
+    pass
+
+
+def codificar_cursor(valores: Sequence[Any], direccion: str = 'n') -> str:
+    """
+    Codifica la posición de una página como un cursor opaco.
+
+    Args:
+        valores: Valores de las columnas de ordenación (o el offset en búsquedas semánticas)
+        direccion: 'n' para avanzar, 'p' para retroceder
+
+    Returns:
+        str: Cursor codificado en base64 apto para URLs
+    """
+    datos = {'v': [v.isoformat() if hasattr(v, 'isoformat') else v for v in valores], 'd': direccion}
+    cursor = base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode('utf-8'))
+    return cursor.decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: str) -> Tuple[List[Any], str]:
+    """
+    Decodifica un cursor generado por codificar_cursor.
+
+    Args:
+        cursor: Cursor recibido del cliente
+
+    Returns:
+        Tuple[List[Any], str]: Valores de la posición y dirección
+
+    Raises:
+        CursorInvalido: Si el cursor no tiene el formato esperado
+    """
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode((cursor + relleno).encode('ascii')))
+        valores = datos['v']
+        direccion = datos.get('d', 'n')
+    except (ValueError, TypeError, KeyError, UnicodeError) as e:
+        raise CursorInvalido(f"Cursor inválido: {cursor}") from e
+
+    if not isinstance(valores, list) or direccion not in ('n', 'p'):
+        raise CursorInvalido(f"Cursor inválido: {cursor}")
+
+    return valores, direccion
+
+
+class PaginaCursor:
+    """
+    Página de resultados obtenida con un paginador por cursor.
+    Se comporta como una lista en las plantillas.
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor=None, previous_cursor=None):
         self.object_list = object_list
-        self.start = start
-        self.end = end
-        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<PaginaCursor ({len(self.object_list)} elementos)>"
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
 
     def has_next(self):
-        return False if self.number >= self.count else True
+        return self._has_next
 
     def has_previous(self):
-        return False if self.number <= 1 else True
+        return self._has_previous
 
     def has_other_pages(self):
-        return True if self.has_next or self.has_previous else False
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor para QuerySets.
+    La ordenación debe ser total: la última columna tiene que ser única
+    (normalmente 'pk'). En las columnas que admiten nulos, los nulos van
+    después del resto de valores (NULLS LAST) en ambos sentidos de la ordenación.
+    """
+
+    def __init__(self, queryset, per_page: int = 20, orden: Sequence[str] = ORDEN_DOCUMENTOS):
+        """
+        Args:
+            queryset: QuerySet a paginar
+            per_page: Número de elementos por página
+            orden: Columnas de ordenación ('-' para orden descendente)
+        """
+        self.queryset = queryset
+        self.per_page = per_page
+        self.orden = tuple(orden)
+        self.campos = [campo.lstrip('-') for campo in self.orden]
+        self.nulos = [self._campo_modelo(campo).null for campo in self.campos]
+
+    def _campo_modelo(self, campo: str):
+        opciones = self.queryset.model._meta
+        return opciones.pk if campo == 'pk' else opciones.get_field(campo)
+
+    def _valores(self, obj) -> List[Any]:
+        return [getattr(obj, campo) for campo in self.campos]
+
+    def _condicion(self, valores: Sequence[Any], hacia_atras: bool) -> Q:
+        """
+        Construye la condición lexicográfica "después de" (o "antes de") una fila.
+        Para (a, b) descendente: a < va OR (a = va AND b < vb).
+        Los nulos van al final: después de un valor están también los nulos de
+        la columna, y antes de un nulo están todos los valores no nulos.
+        """
+        condicion = Q()
+        for i, criterio in enumerate(self.orden):
+            campo, valor = self.campos[i], valores[i]
+            descendente = criterio.startswith('-')
+            if hacia_atras:
+                descendente = not descendente
+            operador = 'lt' if descendente else 'gt'
+
+            if valor is None:
+                if not hacia_atras:
+                    # Detrás de los nulos no hay nada en esta columna
+                    continue
+                parte = Q(**{f"{campo}__isnull": False})
+            else:
+                parte = Q(**{f"{campo}__{operador}": valor})
+                if self.nulos[i] and not hacia_atras:
+                    parte |= Q(**{f"{campo}__isnull": True})
+            for j in range(i):
+                if valores[j] is None:
+                    parte &= Q(**{f"{self.campos[j]}__isnull": True})
+                else:
+                    parte &= Q(**{self.campos[j]: valores[j]})
+            condicion |= parte
+        return condicion
+
+    def _orden_consulta(self, hacia_atras: bool) -> List[Any]:
+        """Ordenación de la consulta; al retroceder se invierte, con los nulos al principio"""
+        orden = []
+        for criterio, campo, nulos in zip(self.orden, self.campos, self.nulos):
+            descendente = criterio.startswith('-') != hacia_atras
+            if nulos:
+                expresion = F(campo).desc if descendente else F(campo).asc
+                orden.append(expresion(nulls_first=True) if hacia_atras else expresion(nulls_last=True))
+            else:
+                orden.append(f"-{campo}" if descendente else campo)
+        return orden
+
+    def _convertir(self, valores: Sequence[Any]) -> List[Any]:
+        """Convierte los valores del cursor al tipo Python de cada columna"""
+        if len(valores) != len(self.campos):
+            raise CursorInvalido("El cursor no corresponde a esta ordenación")
+        try:
+            return [self._campo_modelo(campo).to_python(valor) for campo, valor in zip(self.campos, valores)]
+        except Exception as e:
+            raise CursorInvalido(str(e)) from e
+
+    def page(self, cursor: Optional[str] = None) -> PaginaCursor:
+        """
+        Obtiene la página indicada por el cursor (o la primera si no hay cursor).
+
+        Raises:
+            CursorInvalido: Si el cursor no es válido para este paginador
+        """
+        hacia_atras = False
+        queryset = self.queryset
+
+        if cursor:
+            valores, direccion = decodificar_cursor(cursor)
+            hacia_atras = direccion == 'p'
+            queryset = queryset.filter(self._condicion(self._convertir(valores), hacia_atras))
+
+        orden = self._orden_consulta(hacia_atras)
+
+        # Pedimos un elemento de más para saber si hay otra página sin usar COUNT(*)
+        filas = list(queryset.order_by(*orden)[:self.per_page + 1])
+        hay_mas = len(filas) > self.per_page
+        filas = filas[:self.per_page]
+
+        if hacia_atras:
+            filas.reverse()
+            has_previous, has_next = hay_mas, True
+        else:
+            has_previous, has_next = bool(cursor), hay_mas
+
+        next_cursor = codificar_cursor(self._valores(filas[-1]), 'n') if has_next and filas else None
+        previous_cursor = codificar_cursor(self._valores(filas[0]), 'p') if has_previous and filas else None
+
+        return PaginaCursor(filas, has_next, has_previous, next_cursor, previous_cursor)
+
+    def get_page(self, cursor: Optional[str] = None) -> PaginaCursor:
+        """Como page(), pero devuelve la primera página si el cursor no es válido"""
+        try:
+            return self.page(cursor)
+        except CursorInvalido:
+            return self.page(None)
+
+
+class PaginadorSemantico:
+    """
+    Paginador por cursor para resultados de Qdrant.
+    El cursor guarda el offset del ranking, que Qdrant aplica en el servidor,
+    y los documentos de cada página se hidratan en una sola consulta.
+    """
+
+    def __init__(self, buscar: Callable[[int, int], List[Tuple[str, float]]], per_page: int = 20):
+        """
+        Args:
+            buscar: Función (limit, offset) -> [(identificador, score)], por ejemplo
+                un functools.partial de QdrantBOE.buscar_ids_similares
+            per_page: Número de elementos por página
+        """
+        self.buscar = buscar
+        self.per_page = per_page
+
+    def page(self, cursor: Optional[str] = None) -> PaginaCursor:
+        """
+        Obtiene la página indicada por el cursor (o la primera si no hay cursor).
+
+        Raises:
+            CursorInvalido: Si el cursor no es válido para este paginador
+        """
+        from .utils_resultados import hidratar_resultados
+
+        offset = 0
+        if cursor:
+            valores, _ = decodificar_cursor(cursor)
+            if len(valores) != 1 or not isinstance(valores[0], int) or valores[0] < 0:
+                raise CursorInvalido("El cursor no corresponde a una búsqueda semántica")
+            offset = valores[0]
+
+        resultados = self.buscar(self.per_page + 1, offset)
+        has_next = len(resultados) > self.per_page
+        has_previous = offset > 0
 
-    def next_number(self):
-        return self.number + 1
+        documentos = hidratar_resultados(resultados[:self.per_page])
 
-    def previous_number(self):
-        return self.number + 1
+        next_cursor = codificar_cursor([offset + self.per_page], 'n') if has_next else None
+        previous_cursor = codificar_cursor([max(0, offset - self.per_page)], 'p') if has_previous else None
 
-    def start_index(self):
-        return self.start
+        return PaginaCursor(documentos, has_next, has_previous, next_cursor, previous_cursor)
 
-    def end_index(self):
-        return self.end
+    def get_page(self, cursor: Optional[str] = None) -> PaginaCursor:
+        """Como page(), pero devuelve la primera página si el cursor no es válido"""
+        try:
+            return self.page(cursor)
+        except CursorInvalido:
+            return self.page(None)
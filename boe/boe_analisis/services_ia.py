@@ -11,6 +11,8 @@ import openai
 import json
 import os
 
+from .utils_trazas import medir
+
 logger = logging.getLogger(__name__)
 
 class ServicioIA:
@@ -20,6 +22,7 @@ class ServicioIA:
     """
     
     @staticmethod
+    @medir('ia.huggingface')
     def _llamar_api_huggingface(texto, max_tokens=500):
         """
         Método interno para llamar a la API de HuggingFace
@@ -142,6 +145,7 @@ class ServicioIA:
             return None
     
     @staticmethod
+    @medir('ia.openai')
     def _llamar_api_openai(texto, max_tokens=150):
         """
         Método interno para llamar a la API de OpenAI
@@ -197,6 +201,7 @@ class ServicioIA:
             return f"No se pudo generar un resumen con OpenAI. Error: {str(e)}"
     
     @staticmethod
+    @medir('ia.mistral')
     def _llamar_api_mistral(texto, max_tokens=500):
         """
         Método interno para llamar a la API de Mistral
@@ -290,6 +295,7 @@ class ServicioIA:
             return f"No se pudo generar un resumen con Mistral. Error: {str(e)}"
     
     @staticmethod
+    @medir('ia.deepseek')
     def _llamar_api_deepseek(texto, max_tokens=150):
         """
         Método interno para llamar a la API de DeepSeek
@@ -5,7 +5,161 @@ when you run "manage.py test".
 Replace this with more appropriate tests for your application.
 """
 
-from django.test import TestCase
+import csv
+import datetime
+import importlib.util
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import unittest
+import xml.etree.ElementTree as ET
+import zlib
+from contextlib import contextmanager
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.backends.utils import CursorWrapper
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.http import HttpResponse
+from django.template import Context, Engine
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .middleware import MiddlewareTrazas
+from .models import Legislatura
+from .models_alertas import AlertaUsuario, CategoriaAlerta, NotificacionAlerta
+from .models_articulos import SeccionDocumento
+from .models_cubo import CuboDocumentos
+from .models_facetas import DocumentoMateria, FacetaDepartamento, FacetaMateria
+from .models_simplified import CAMPOS_LISTADO, DocumentoSimplificado
+from .models_referencias import ReferenciaNorma
+from .models_tareas import Tarea
+from .models_textos import DiccionarioTexto, TextoDocumento
+from .paginator import ORDEN_DOCUMENTOS, KeysetPaginator, PaginadorSemantico
+from .utils_articulos import guardar_secciones, secciones_documento, segmentar_xml, texto_seccion
+from .utils_benchmark import (
+    CONSULTAS, CodificadorHash, FECHA_SUMARIO, RUTA_SUMARIO, comparar_con_referencia, generar_sumario_sintetico,
+    medir_recall, memoria_vectores
+)
+from .utils_boe import (
+    TERMINOS_LEGALES, ExtractorPalabrasClave, extraer_palabras_clave, extraer_referencias_xml, obtener_extractor
+)
+from .utils_busqueda import busqueda_multiple_campos, filtro_cuerpo, vocabulario
+from .utils_cubo import (
+    actualizar_cubo, agregar_cubo, estado_cubo, invalidar_legislaturas, legislatura_para_fecha, materias_principales,
+    totales_por_legislatura
+)
+from .utils_diff import comparar_textos, diferencias_palabras, segmentar_articulos
+from .utils_embeddings import (
+    ClienteEmbeddings, CodificadorONNX, cargar_modelo_local, crear_servidor, exportar_onnx, similitud_minima
+)
+from .utils_enriquecimiento import MAPA_DEPARTAMENTOS, EnriquecedorMetadatos, normalizar_departamento
+from .utils_estadisticas import invalidar_estadisticas, obtener_estadisticas
+from .utils_exportacion import CAMPOS_EXPORTACION, exportar_documentos, interpretar_momento
+from .utils_facetas import (
+    actualizar_facetas, contar_facetas, estado_facetas, recalcular_facetas, reconstruir_terminos, separar_valores,
+    terminos_documentos
+)
+from .utils_http import api_condicional, generacion_datos, nueva_generacion, respuesta_json, volcar_json
+from .utils_indice_local import IndiceLocal
+from .utils_pipeline import PipelineIngesta
+from .utils_referencias import cadena_modificaciones, guardar_referencias, historial_versiones
+from .utils_resultados import hidratar_resultados
+from .utils_tareas import (
+    MANEJADORES, completar, encolar, ejecutar_tarea, manejador, procesar_lote, reactivar_muertas, reclamar
+)
+from .utils_sumario import (
+    actualizar_sumarios, clave_sumario, construir_sumario, fecha_sumario, obtener_sumario, respuesta_sumario
+)
+from .utils_textos import (
+    cargar_textos, comprimir, descomprimir, entrenar_diccionario, guardar_textos, precargar_textos, recomprimir_textos
+)
+from .utils_trazas import exportar_metricas, medir, reiniciar_metricas, tramo
+from .utils_versiones import AlmacenVersiones, fechas_versiones, texto_en_fecha
+
+
+class Lecturas:
+    """Consultas ejecutadas y filas y bytes leídos de la base de datos"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.filas = 0
+        self.bytes = 0
+
+    def contar(self, filas):
+        for fila in filas:
+            self.filas += 1
+            for valor in fila:
+                if valor is None:
+                    continue
+                if isinstance(valor, (bytes, bytearray, memoryview)):
+                    self.bytes += len(valor)
+                else:
+                    self.bytes += len(str(valor).encode('utf-8'))
+
+
+@contextmanager
+def medir_lecturas():
+    """
+    Mide las consultas y los bytes que lee un bloque de código (por ejemplo, una
+    vista con su plantilla). Los bytes se cuentan sobre las filas que devuelve
+    el cursor, así que incluyen las columnas que se cargan y no se usan.
+    """
+    lecturas = Lecturas()
+
+    def ejecutar(execute, sql, params, many, context):
+        lecturas.consultas += 1
+        return execute(sql, params, many, context)
+
+    def fetchone(cursor):
+        fila = cursor.cursor.fetchone()
+        if fila is not None:
+            lecturas.contar([fila])
+        return fila
+
+    def fetchmany(cursor, *args, **kwargs):
+        filas = cursor.cursor.fetchmany(*args, **kwargs)
+        lecturas.contar(filas)
+        return filas
+
+    def fetchall(cursor):
+        filas = cursor.cursor.fetchall()
+        lecturas.contar(filas)
+        return filas
+
+    with connection.execute_wrapper(ejecutar), \
+            mock.patch.object(CursorWrapper, 'fetchone', fetchone, create=True), \
+            mock.patch.object(CursorWrapper, 'fetchmany', fetchmany, create=True), \
+            mock.patch.object(CursorWrapper, 'fetchall', fetchall, create=True):
+        yield lecturas
+
+
+class LecturasMixin:
+    """
+    Aserción del perfil de lectura de una vista o consulta:
+
+        with self.assertLecturas(consultas=3, max_bytes=20000):
+            self.client.get(reverse('dashboard'))
+    """
+
+    @contextmanager
+    def assertLecturas(self, consultas: int, max_bytes: int):
+        with medir_lecturas() as lecturas:
+            yield lecturas
+        self.assertEqual(lecturas.consultas, consultas, f"Se esperaban {consultas} consultas")
+        self.assertLessEqual(
+            lecturas.bytes, max_bytes, f"Se han leído {lecturas.bytes} bytes en {lecturas.filas} filas"
+        )
 
 
 class SimpleTest(TestCase):
@@ -14,3 +168,1722 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class MigracionesTest(TestCase):
+    """Todos los modelos de la aplicación están cubiertos por las migraciones"""
+
+    def test_sin_migraciones_pendientes(self):
+        salida = io.StringIO()
+        try:
+            call_command('makemigrations', 'boe_analisis', '--check', '--dry-run', stdout=salida)
+        except SystemExit:
+            self.fail(f"Hay cambios en los modelos sin migración:\n{salida.getvalue()}")
+        self.assertIn('No changes detected', salida.getvalue())
+
+
+class PaginacionCursorTest(TestCase):
+    """
+    Recorrer todas las páginas hacia delante y hacia atrás no pierde ni repite
+    filas, aunque muchas compartan la fecha de publicación
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        DocumentoSimplificado.objects.bulk_create([
+            DocumentoSimplificado(
+                identificador=f'BOE-A-2024-{700 + i}', fecha_publicacion=datetime.date(2024, 3, 1 + i % 4),
+                titulo=f'Documento {i}'
+            )
+            for i in range(23)
+        ])
+
+    def recorrer(self, paginador):
+        """Identificadores de cada página, hacia delante y luego hacia atrás desde la última"""
+        pagina = paginador.page()
+        adelante = [[documento.pk for documento in pagina]]
+        while pagina.has_next():
+            pagina = paginador.page(pagina.next_cursor)
+            adelante.append([documento.pk for documento in pagina])
+        atras = [adelante[-1]]
+        while pagina.has_previous():
+            pagina = paginador.page(pagina.previous_cursor)
+            atras.insert(0, [documento.pk for documento in pagina])
+        return adelante, atras
+
+    def test_keyset_sin_huecos_ni_duplicados(self):
+        documentos = DocumentoSimplificado.objects.all()
+        for orden in (ORDEN_DOCUMENTOS, ('fecha_publicacion', 'pk'), ('-fecha_publicacion', 'pk')):
+            with self.subTest(orden=orden):
+                adelante, atras = self.recorrer(KeysetPaginator(documentos, per_page=5, orden=orden))
+                esperados = list(documentos.order_by(*orden).values_list('pk', flat=True))
+                self.assertEqual(sum(adelante, []), esperados)
+                self.assertEqual([len(pagina) for pagina in adelante], [5, 5, 5, 5, 3])
+                self.assertEqual(atras, adelante)
+
+    def test_keyset_con_nulos(self):
+        # Un tercio de los documentos sin departamento, también en los límites de las páginas
+        for i, documento in enumerate(DocumentoSimplificado.objects.order_by('pk')):
+            documento.departamento = None if i % 3 == 0 else f'Ministerio {"AB"[i % 2]}'
+            documento.save(update_fields=['departamento'])
+        documentos = DocumentoSimplificado.objects.all()
+        departamentos = dict(documentos.values_list('pk', 'departamento'))
+        for orden in (('departamento', 'pk'), ('-departamento', 'pk'), ('-departamento', '-pk')):
+            with self.subTest(orden=orden):
+                adelante, atras = self.recorrer(KeysetPaginator(documentos, per_page=4, orden=orden))
+                # Ordenaciones estables de la última columna a la primera; los nulos al final en ambos sentidos
+                esperados = sorted(departamentos, reverse=orden[1] == '-pk')
+                esperados.sort(key=lambda pk: departamentos[pk] or '', reverse=orden[0] == '-departamento')
+                esperados.sort(key=lambda pk: departamentos[pk] is None)
+                self.assertEqual(sum(adelante, []), esperados)
+                self.assertEqual(atras, adelante)
+
+    def test_semantico_sin_huecos_ni_duplicados(self):
+        # Ranking con empates de score, como los que devuelve Qdrant
+        ranking = [
+            (identificador, 0.9 if i < 12 else 0.5)
+            for i, identificador in enumerate(
+                DocumentoSimplificado.objects.order_by('titulo').values_list('pk', flat=True)
+            )
+        ]
+        paginador = PaginadorSemantico(lambda limit, offset: ranking[offset:offset + limit], per_page=5)
+        adelante, atras = self.recorrer(paginador)
+        self.assertEqual(sum(adelante, []), [identificador for identificador, _ in ranking])
+        self.assertEqual(atras, adelante)
+
+
+class HidratarResultadosTest(TestCase):
+    """
+    Los resultados de Qdrant se convierten en documentos con una consulta,
+    conservando el ranking y las puntuaciones
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(4):
+            DocumentoSimplificado.objects.create(
+                identificador=f'BOE-A-2024-{800 + i}', fecha_publicacion=datetime.date(2024, 3, 1),
+                titulo=f'Documento {i}'
+            )
+
+    def test_orden_y_puntuaciones(self):
+        resultados = [('BOE-A-2024-802', 0.91), ('BOE-A-2024-800', 0.87), ('BOE-A-2024-803', 0.5)]
+        with self.assertNumQueries(1):
+            documentos = hidratar_resultados(resultados)
+        self.assertEqual([(documento.pk, documento.score) for documento in documentos], resultados)
+
+    def test_omite_los_que_no_estan_en_la_base_de_datos(self):
+        resultados = [
+            ('BOE-A-2024-999', 0.95), ('BOE-A-2024-801', 0.9), ('BOE-A-2024-998', 0.8), ('BOE-A-2024-800', 0.7)
+        ]
+        with self.assertNumQueries(1):
+            documentos = hidratar_resultados(resultados)
+        self.assertEqual([(documento.pk, documento.score) for documento in documentos],
+                         [('BOE-A-2024-801', 0.9), ('BOE-A-2024-800', 0.7)])
+
+    def test_duplicados_y_vacio(self):
+        # Un documento repetido conserva su mejor posición
+        documentos = hidratar_resultados([('BOE-A-2024-803', 0.9), ('BOE-A-2024-801', 0.8), ('BOE-A-2024-803', 0.4)])
+        self.assertEqual([(documento.pk, documento.score) for documento in documentos],
+                         [('BOE-A-2024-803', 0.9), ('BOE-A-2024-801', 0.8)])
+        with self.assertNumQueries(0):
+            self.assertEqual(hidratar_resultados([]), [])
+
+
+class PlanesConsultaTest(TestCase):
+    """
+    Comprueba con EXPLAIN que las consultas principales usan índices.
+    Falla si alguna vuelve a recorrer una tabla completa (sequential scan).
+    """
+    FECHA = datetime.date(2025, 3, 7)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('planes', 'planes@example.com', 'clave')
+        cls.alerta = AlertaUsuario.objects.create(usuario=cls.usuario, nombre='Sanidad', palabras_clave='salud')
+        for i in range(20):
+            DocumentoSimplificado.objects.create(
+                identificador=f'BOE-A-2025-{i:05d}',
+                fecha_publicacion=cls.FECHA - datetime.timedelta(days=i % 5),
+                titulo=f'Documento {i}',
+                texto=None if i % 2 else 'texto',
+                departamento='Ministerio de Sanidad' if i % 3 else 'Ministerio de Hacienda',
+                codigo_departamento=str(i % 3),
+            )
+            NotificacionAlerta.objects.create(
+                alerta=cls.alerta,
+                documento=f'BOE-A-2025-{i:05d}',
+                titulo_documento=f'Documento {i}',
+                fecha_documento=cls.FECHA,
+                estado='pendiente' if i % 2 else 'leida',
+            )
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Con tablas tan pequeñas PostgreSQL preferiría siempre leerlas enteras
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertSinEscaneoSecuencial(self, queryset):
+        plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            escaneos = re.findall(r'Seq Scan on (\w+)', plan)
+        elif connection.vendor == 'sqlite':
+            # "SCAN tabla" sin "USING ... INDEX" es un recorrido completo de la tabla
+            escaneos = [
+                linea for linea in plan.splitlines()
+                if re.search(r'\bSCAN \w+', linea) and 'INDEX' not in linea
+            ]
+        else:
+            self.skipTest(f'EXPLAIN no soportado para {connection.vendor}')
+        self.assertFalse(escaneos, f'Escaneo secuencial en el plan:\n{plan}')
+
+    def test_procesar_alertas_documentos_recientes(self):
+        self.assertSinEscaneoSecuencial(
+            DocumentoSimplificado.objects.filter(fecha_publicacion__gte=self.FECHA - datetime.timedelta(days=1))
+        )
+
+    def test_procesar_alertas_notificacion_existente(self):
+        self.assertSinEscaneoSecuencial(
+            NotificacionAlerta.objects.filter(alerta=self.alerta, documento='BOE-A-2025-00001')
+        )
+
+    def test_enviar_notificaciones_pendientes(self):
+        self.assertSinEscaneoSecuencial(
+            NotificacionAlerta.objects.filter(alerta=self.alerta, estado='pendiente')
+        )
+
+    def test_sumario_hoy(self):
+        self.assertSinEscaneoSecuencial(DocumentoSimplificado.objects.filter(fecha_publicacion=self.FECHA))
+        self.assertSinEscaneoSecuencial(DocumentoSimplificado.objects.order_by('-fecha_publicacion')[:1])
+
+    def test_actualizar_textos_boe(self):
+        self.assertSinEscaneoSecuencial(
+            DocumentoSimplificado.objects.filter(fecha_publicacion=self.FECHA, longitud_texto__isnull=True)
+        )
+
+    def test_estadisticas(self):
+        notificaciones = NotificacionAlerta.objects.filter(alerta__usuario=self.usuario).order_by()
+        self.assertSinEscaneoSecuencial(notificaciones)
+        self.assertSinEscaneoSecuencial(
+            notificaciones.annotate(fecha=TruncDate('fecha_notificacion')).values('fecha').annotate(total=Count('id'))
+        )
+
+
+class EstadisticasAlertasTest(TestCase):
+    """
+    Comprueba el servicio de estadísticas del panel de alertas y su caché por usuario.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('estadisticas', 'estadisticas@example.com', 'clave')
+        cls.alerta = AlertaUsuario.objects.create(usuario=cls.usuario, nombre='Sanidad', palabras_clave='salud, Hospital')
+        for i, (estado, relevancia) in enumerate([('pendiente', 80), ('pendiente', 60), ('leida', 10)]):
+            NotificacionAlerta.objects.create(
+                alerta=cls.alerta,
+                documento=f'BOE-A-2025-{i:05d}',
+                titulo_documento=f'Documento {i}',
+                fecha_documento=datetime.date(2025, 3, 7),
+                estado=estado,
+                relevancia=relevancia,
+            )
+
+    def setUp(self):
+        invalidar_estadisticas(self.usuario.pk)
+
+    def test_series(self):
+        with self.assertNumQueries(4):
+            estadisticas = obtener_estadisticas(self.usuario)
+        self.assertEqual(estadisticas['total_alertas'], 1)
+        self.assertEqual(estadisticas['total_notificaciones'], 3)
+        self.assertEqual(estadisticas['estados_labels'], ['Pendiente', 'Leida'])
+        self.assertEqual(estadisticas['estados_data'], [2, 1])
+        self.assertEqual(estadisticas['relevancia_data'], [1, 1, 1])
+        self.assertEqual(estadisticas['alertas_data'], [3])
+        self.assertEqual(sum(estadisticas['tendencia_data']), 3)
+        self.assertEqual(sorted(estadisticas['palabras_labels']), ['hospital', 'salud'])
+
+    def test_cache_se_invalida_al_cambiar_notificaciones(self):
+        obtener_estadisticas(self.usuario)
+        with self.assertNumQueries(0):
+            obtener_estadisticas(self.usuario)
+
+        notificacion = NotificacionAlerta.objects.filter(alerta=self.alerta, estado='pendiente').first()
+        notificacion.estado = 'leida'
+        notificacion.save()
+
+        self.assertEqual(obtener_estadisticas(self.usuario)['estados_data'], [1, 2])
+
+    def test_cache_se_invalida_al_cambiar_categorias(self):
+        categoria = CategoriaAlerta.objects.create(nombre='Sanidad')
+        otra = CategoriaAlerta.objects.create(nombre='Empleo')
+        for cambiar in (
+            lambda: self.alerta.categorias.add(categoria),
+            lambda: otra.alertas.add(self.alerta),
+            lambda: categoria.alertas.remove(self.alerta),
+            lambda: otra.alertas.clear(),
+        ):
+            obtener_estadisticas(self.usuario)
+            cambiar()
+            with self.assertNumQueries(4):
+                obtener_estadisticas(self.usuario)
+
+
+class FacetasTest(TestCase):
+    """
+    Los recuentos de facetas se mantienen de forma incremental y coinciden con
+    los que se calculan desde cero
+    """
+
+    def crear(self, identificador, departamento, materias):
+        documento = DocumentoSimplificado.objects.create(
+            identificador=identificador, fecha_publicacion=datetime.date(2024, 5, 2),
+            titulo=f'Documento {identificador}', departamento=departamento, materias=materias
+        )
+        actualizar_facetas(documento)
+        return documento
+
+    def recuentos(self):
+        return (
+            dict(FacetaDepartamento.objects.filter(total_documentos__gt=0).values_list('nombre', 'total_documentos')),
+            dict(FacetaMateria.objects.filter(total_documentos__gt=0).values_list('nombre', 'total_documentos')),
+        )
+
+    def desde_cero(self):
+        """Recuentos con un GROUP BY sobre los documentos y sus materias"""
+        departamentos = dict(
+            DocumentoSimplificado.objects.exclude(departamento='').order_by().values_list('departamento')
+            .annotate(total=Count('identificador'))
+        )
+        materias = dict(
+            DocumentoMateria.objects.order_by().values_list('materia__nombre').annotate(total=Count('documento'))
+        )
+        return departamentos, materias
+
+    def setUp(self):
+        self.crear('BOE-A-2024-900', 'Ministerio de Sanidad', 'Sanidad, Farmacia')
+        self.crear('BOE-A-2024-901', 'Ministerio de Sanidad', 'Sanidad')
+        self.crear('BOE-A-2024-902', 'Ministerio de Hacienda', 'Impuestos, Sanidad')
+
+    def test_recuentos_al_insertar(self):
+        self.assertEqual(self.recuentos(), (
+            {'Ministerio de Sanidad': 2, 'Ministerio de Hacienda': 1},
+            {'Sanidad': 3, 'Farmacia': 1, 'Impuestos': 1},
+        ))
+        self.assertEqual(self.recuentos(), self.desde_cero())
+
+    def test_recuentos_al_reclasificar(self):
+        documento = DocumentoSimplificado.objects.get(pk='BOE-A-2024-901')
+        anterior = estado_facetas(documento)
+        documento.departamento = 'Ministerio de Hacienda'
+        documento.materias = 'Impuestos, Aduanas'
+        documento.save()
+        actualizar_facetas(documento, anterior)
+        self.assertEqual(self.recuentos(), (
+            {'Ministerio de Sanidad': 1, 'Ministerio de Hacienda': 2},
+            {'Sanidad': 2, 'Farmacia': 1, 'Impuestos': 2, 'Aduanas': 1},
+        ))
+        self.assertEqual(self.recuentos(), self.desde_cero())
+
+    def test_recalcular_como_desde_cero(self):
+        # Recuentos desajustados, como tras escrituras que no pasan por actualizar_facetas
+        FacetaDepartamento.objects.update(total_documentos=7)
+        FacetaMateria.objects.filter(nombre='Sanidad').update(total_documentos=0)
+        DocumentoSimplificado.objects.filter(pk='BOE-A-2024-902').update(departamento='Ministerio de Sanidad')
+        self.assertEqual(recalcular_facetas(), {'departamentos': 1, 'materias': 3})
+        self.assertEqual(self.recuentos(), self.desde_cero())
+
+    def test_contar_facetas_con_filtros(self):
+        filtrados = DocumentoSimplificado.objects.filter(enlaces_materias__materia__nombre='Sanidad').exclude(
+            departamento='Ministerio de Hacienda'
+        )
+        esperado = {
+            'departamentos': [{'nombre': 'Ministerio de Sanidad', 'total': 2}],
+            'materias': [{'nombre': 'Sanidad', 'total': 2}, {'nombre': 'Farmacia', 'total': 1}],
+        }
+        self.assertEqual(contar_facetas(filtrados), esperado)
+        # Una página ya cargada da lo mismo que el QuerySet
+        self.assertEqual(contar_facetas(list(filtrados)), esperado)
+        self.assertEqual(contar_facetas(filtrados.filter(fecha_publicacion__year=2023)),
+                         {'departamentos': [], 'materias': []})
+        # Sin resultados se leen las tablas precalculadas del corpus completo
+        self.assertEqual(contar_facetas()['materias'][0], {'nombre': 'Sanidad', 'total': 3})
+
+
+class TerminosNormalizadosTest(TestCase):
+    """
+    Las materias y palabras clave separadas por comas se guardan como términos
+    normalizados, y el filtro por materia es exacto
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Documentos escritos sin sincronizar los términos, como antes de la migración 0009
+        DocumentoSimplificado.objects.bulk_create([
+            DocumentoSimplificado(
+                identificador='BOE-A-2024-950', fecha_publicacion=datetime.date(2024, 5, 3), titulo='Orden de vacunas',
+                materias=' Sanidad ,Sanidad animal,, Sanidad', palabras_clave='vacunas, gripe ,vacunas,'
+            ),
+            DocumentoSimplificado(
+                identificador='BOE-A-2024-951', fecha_publicacion=datetime.date(2024, 5, 3), titulo='Orden ganadera',
+                materias='Sanidad animal', palabras_clave=''
+            ),
+            DocumentoSimplificado(
+                identificador='BOE-A-2024-952', fecha_publicacion=datetime.date(2024, 5, 3), titulo='Sin materias'
+            ),
+        ])
+
+    def poblar(self):
+        migracion = importlib.import_module('.migrations.0009_terminos_normalizados', __package__)
+        migracion.poblar_terminos(apps, None)
+
+    def terminos(self):
+        return {
+            identificador: {clave: sorted(valores) for clave, valores in terminos.items()}
+            for identificador, terminos in terminos_documentos(DocumentoSimplificado.objects.all()).items()
+        }
+
+    def test_separar_valores(self):
+        self.assertEqual(separar_valores(' Sanidad ,Sanidad animal,, Sanidad'), ['Sanidad', 'Sanidad animal'])
+        self.assertEqual(separar_valores(''), [])
+        self.assertEqual(separar_valores(None), [])
+
+    def test_migracion_divide_y_deduplica(self):
+        self.poblar()
+        esperado = {
+            'BOE-A-2024-950': {'materias': ['Sanidad', 'Sanidad animal'], 'palabras_clave': ['gripe', 'vacunas']},
+            'BOE-A-2024-951': {'materias': ['Sanidad animal'], 'palabras_clave': []},
+        }
+        self.assertEqual(self.terminos(), esperado)
+        self.assertEqual(FacetaMateria.objects.filter(nombre__startswith='Sanidad').count(), 2)
+        # La sincronización incremental llega a los mismos términos
+        self.assertEqual(reconstruir_terminos(), 3)
+        self.assertEqual(self.terminos(), esperado)
+
+    def test_filtro_exacto_por_materia(self):
+        reconstruir_terminos()
+        exacto = DocumentoSimplificado.objects.filter(enlaces_materias__materia__nombre='Sanidad')
+        self.assertEqual(list(exacto.values_list('pk', flat=True)), ['BOE-A-2024-950'])
+        # El filtro anterior por subcadena también encontraba 'Sanidad animal'
+        self.assertEqual(DocumentoSimplificado.objects.filter(materias__icontains='Sanidad').count(), 2)
+        self.assertEqual(
+            DocumentoSimplificado.objects.filter(enlaces_materias__materia__nombre='Sanidad animal').count(), 2
+        )
+
+
+class CuboDocumentosTest(TestCase):
+    """
+    Comprueba el mantenimiento incremental del cubo de estadísticas y sus agregaciones.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.legislatura = Legislatura.objects.create(presidente='Presidente', inicio=datetime.date(2023, 11, 17))
+        invalidar_legislaturas()
+        documentos = [
+            ('BOE-A-2024-00001', datetime.date(2024, 1, 10), 'Ley 1/2024, de 9 de enero', 'Sanidad, Empleo'),
+            ('BOE-A-2024-00002', datetime.date(2024, 1, 20), 'Real Decreto 2/2024', 'Sanidad'),
+            ('BOE-A-2025-00001', datetime.date(2025, 3, 7), 'Resolución de 3 de marzo', ''),
+        ]
+        for identificador, fecha, titulo, materias in documentos:
+            documento = DocumentoSimplificado.objects.create(
+                identificador=identificador, fecha_publicacion=fecha, titulo=titulo,
+                departamento='Ministerio de Sanidad', materias=materias
+            )
+            actualizar_cubo(documento)
+
+    def test_totales_por_legislatura(self):
+        self.assertEqual(totales_por_legislatura(), {self.legislatura.id: 3})
+        self.assertEqual(totales_por_legislatura(rango='Ley'), {self.legislatura.id: 1})
+        self.assertEqual(totales_por_legislatura(dias=90), {self.legislatura.id: 2})
+
+    def test_agregaciones(self):
+        anios = agregar_cubo(['anio'])
+        self.assertEqual([(fila['anio'].year, fila['total']) for fila in anios], [(2024, 2), (2025, 1)])
+
+        sanidad = FacetaMateria.objects.get(nombre='Sanidad')
+        meses = agregar_cubo(['mes'], materia=sanidad.id)
+        self.assertEqual([(fila['mes'].month, fila['total']) for fila in meses], [(1, 2)])
+
+    def test_actualizacion_incremental(self):
+        documento = DocumentoSimplificado.objects.get(identificador='BOE-A-2024-00002')
+        anterior = estado_cubo(documento)
+        documento.materias = 'Empleo'
+        documento.save()
+        actualizar_cubo(documento, anterior)
+
+        sanidad = FacetaMateria.objects.get(nombre='Sanidad')
+        empleo = FacetaMateria.objects.get(nombre='Empleo')
+        self.assertEqual(totales_por_legislatura(materia=sanidad.id), {self.legislatura.id: 1})
+        self.assertEqual(totales_por_legislatura(materia=empleo.id), {self.legislatura.id: 2})
+        self.assertEqual(totales_por_legislatura(), {self.legislatura.id: 3})
+
+    def test_una_fila_por_celda(self):
+        documento = DocumentoSimplificado.objects.create(
+            identificador='BOE-A-2024-00003', fecha_publicacion=datetime.date(2024, 1, 20), titulo='Real Decreto 3/2024',
+            departamento='Ministerio de Sanidad', materias='Sanidad'
+        )
+        filas = CuboDocumentos.objects.count()
+        actualizar_cubo(documento)
+        self.assertEqual(CuboDocumentos.objects.count(), filas)
+        celda = CuboDocumentos.objects.get(fecha=datetime.date(2024, 1, 20), rango='Real Decreto', materia__isnull=True)
+        self.assertEqual(celda.total, 2)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CuboDocumentos.objects.create(
+                fecha=celda.fecha, departamento=celda.departamento, rango=celda.rango, total=1
+            )
+
+    def test_legislaturas_al_guardar(self):
+        nueva = Legislatura.objects.create(presidente='Presidenta', inicio=datetime.date(2025, 1, 1))
+        # Sin esperar a que caduquen los rangos leídos antes
+        self.assertEqual(legislatura_para_fecha(datetime.date(2025, 3, 7)), nueva.id)
+        self.assertEqual(totales_por_legislatura(), {self.legislatura.id: 2, nueva.id: 1})
+        nueva.delete()
+        self.assertEqual(totales_por_legislatura(), {self.legislatura.id: 3})
+
+    def test_materias_principales(self):
+        materias = materias_principales()
+        self.assertEqual(
+            [(materia['nombre'], materia['total']) for materia in materias], [('Sanidad', 2), ('Empleo', 1)]
+        )
+        # El id es el de FacetaMateria, el que aceptan los filtros por materia
+        for materia in materias:
+            self.assertEqual(totales_por_legislatura(materia=materia['id']), {self.legislatura.id: materia['total']})
+        self.assertEqual(materias_principales(1, rango='Ley')[0]['nombre'], 'Empleo')
+
+
+class TrazasTest(TestCase):
+    """
+    Comprueba la medición de tramos, el recuento de consultas ORM y la exportación de métricas.
+    """
+
+    def setUp(self):
+        reiniciar_metricas()
+
+    def _vista(self, request):
+        @medir('prueba.funcion')
+        def funcion():
+            return DocumentoSimplificado.objects.count()
+
+        with tramo('prueba.bloque'):
+            funcion()
+            list(Legislatura.objects.all())
+        return HttpResponse('ok')
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_en_debug(self):
+        response = MiddlewareTrazas(self._vista)(RequestFactory().get('/'))
+
+        cabecera = response['Server-Timing']
+        self.assertIn('prueba.bloque;dur=', cabecera)
+        self.assertIn('prueba.funcion;dur=', cabecera)
+        self.assertIn('desc="2 consultas"', cabecera)
+        self.assertIn('total;dur=', cabecera)
+
+    @override_settings(DEBUG=False)
+    def test_sin_server_timing_fuera_de_debug(self):
+        response = MiddlewareTrazas(self._vista)(RequestFactory().get('/'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_formato_prometheus(self):
+        MiddlewareTrazas(self._vista)(RequestFactory().get('/'))
+        with tramo('fuera.de.peticion'):
+            pass
+
+        metricas = exportar_metricas()
+        self.assertIn('# TYPE boe_tramo_duracion_segundos histogram', metricas)
+        self.assertIn('boe_tramo_duracion_segundos_count{tramo="prueba.funcion"} 1', metricas)
+        self.assertIn('boe_tramo_duracion_segundos_count{tramo="fuera.de.peticion"} 1', metricas)
+        self.assertIn('boe_peticion_consultas_orm_bucket{vista="sin_resolver",le="2"} 1', metricas)
+        self.assertIn('boe_peticion_consultas_orm_bucket{vista="sin_resolver",le="1"} 0', metricas)
+
+
+class BenchmarkTest(TestCase):
+    """
+    Comprueba el corpus sintético y la comparación con la referencia de la suite de benchmarks.
+    """
+
+    def test_sumario_sintetico(self):
+        original = [item.findtext('identificador') for item in ET.fromstring(generar_sumario_sintetico(1)).iter('item')]
+        sintetico = [item.findtext('identificador') for item in ET.fromstring(generar_sumario_sintetico(3)).iter('item')]
+
+        self.assertEqual(len(sintetico), 3 * len(original))
+        self.assertEqual(len(set(sintetico)), len(sintetico))
+        self.assertTrue(all(len(identificador) <= 20 for identificador in sintetico))
+        self.assertEqual(generar_sumario_sintetico(2, semilla=1), generar_sumario_sintetico(2, semilla=1))
+
+    def test_comparacion_con_referencia(self):
+        referencia = {'metricas': {'carga_docs_por_segundo': 100.0, 'busqueda_p95_ms': 10.0, 'documentos': 137}}
+        resultados = {'metricas': {'carga_docs_por_segundo': 70.0, 'busqueda_p95_ms': 9.0, 'documentos': 137}}
+
+        comparacion = {fila['metrica']: fila for fila in comparar_con_referencia(resultados, referencia, 0.2)}
+        self.assertEqual(set(comparacion), {'carga_docs_por_segundo', 'busqueda_p95_ms'})
+        self.assertTrue(comparacion['carga_docs_por_segundo']['regresion'])
+        self.assertFalse(comparacion['busqueda_p95_ms']['regresion'])
+
+
+class PipelineIngestaTest(TransactionTestCase):
+    """
+    Ingiere el sumario de referencia con el pipeline por etapas (sin Qdrant ni descargas).
+    La escritura se hace desde otro hilo, por eso no se usa TestCase.
+    """
+
+    def setUp(self):
+        invalidar_legislaturas()
+
+    def _ingerir(self):
+        pipeline = PipelineIngesta(archivo=str(RUTA_SUMARIO), lote_bd=50, espera_lote=0.05)
+        return pipeline.ejecutar([FECHA_SUMARIO])
+
+    def test_ingesta_y_reingesta(self):
+        estadisticas = self._ingerir()
+        total = estadisticas['documentos']
+
+        self.assertGreater(total, 0)
+        self.assertEqual(estadisticas['creados'], total)
+        self.assertEqual(estadisticas['errores'], 0)
+        self.assertEqual(DocumentoSimplificado.objects.filter(fecha_publicacion=FECHA_SUMARIO).count(), total)
+        documento = DocumentoSimplificado.objects.get(identificador='BOE-A-2025-4518')
+        self.assertEqual(documento.departamento, 'TRIBUNAL CONSTITUCIONAL')
+        self.assertEqual(FacetaDepartamento.objects.get(nombre='TRIBUNAL CONSTITUCIONAL').total_documentos,
+                         DocumentoSimplificado.objects.filter(departamento='TRIBUNAL CONSTITUCIONAL').count())
+
+        # Al terminar se construye el sumario en caché de la fecha ingerida
+        self.assertEqual(estadisticas['sumarios_cache'], 1)
+        self.assertEqual(cache.get(clave_sumario(FECHA_SUMARIO, generacion_datos()))['total_documentos'], total)
+
+        estadisticas = self._ingerir()
+        self.assertEqual(estadisticas['creados'], 0)
+        self.assertEqual(estadisticas['actualizados'], total)
+        self.assertEqual(DocumentoSimplificado.objects.count(), total)
+
+
+
+class ExtractorPalabrasClaveTest(TestCase):
+    """
+    Extractor de palabras clave compilado: límites de palabra, coincidencias
+    solapadas, API por lotes y caché por versión de las categorías.
+    """
+
+    CATEGORIAS = {
+        'Vivienda': ['vivienda', 'alquiler', 'ley'],
+        'Empleo': ['convenio colectivo', 'colectivo de trabajadores', 'i+d+i'],
+    }
+
+    def _por_terminos(self, titulo, texto, categorias):
+        """Referencia: una búsqueda por término con los mismos límites de palabra"""
+        texto_completo = f"{titulo} {texto}".lower()
+        terminos = set(TERMINOS_LEGALES) | {p for palabras in categorias.values() for p in palabras if len(p) > 3}
+        encontradas = {t for t in terminos if re.search(rf'(?<!\w){re.escape(t)}(?!\w)', texto_completo)}
+        for patron in [r'(?<!\w)ley\s+\d+/\d+', r'(?<!\w)real\s+decreto\s+\d+/\d+', r'(?<!\w)decreto\s+\d+/\d+']:
+            encontradas.update(re.findall(patron, texto_completo))
+        return encontradas
+
+    def test_coincide_con_la_busqueda_por_terminos(self):
+        documentos = [
+            ('Real Decreto 12/2024, de ayudas al alquiler de vivienda', 'Disposición de la Ley 3/2020 y su leyenda.'),
+            ('Convenio colectivo de trabajadores del metal', 'Resolución sobre el programa de I+D+I'),
+            ('Orden de bases', 'ordenación del territorio, contratos y nombramientos'),
+            ('Anuncio', ''),
+        ]
+        extractor = ExtractorPalabrasClave(self.CATEGORIAS)
+        for (titulo, texto), palabras in zip(documentos, extractor.extraer_lote(documentos)):
+            self.assertEqual(set(palabras), self._por_terminos(titulo, texto, self.CATEGORIAS))
+
+        palabras = set(extractor.extraer(*documentos[0]))
+        self.assertTrue({'real decreto', 'decreto', 'real decreto 12/2024', 'decreto 12/2024', 'ley 3/2020'} <= palabras)
+        self.assertNotIn('ayuda', palabras)
+        self.assertTrue({'convenio colectivo', 'colectivo de trabajadores', 'convenio', 'i+d+i'}
+                        <= set(extractor.extraer(*documentos[1])))
+
+    def test_cache_por_version(self):
+        extractor = obtener_extractor(self.CATEGORIAS)
+        self.assertIs(obtener_extractor({nombre: list(palabras) for nombre, palabras in self.CATEGORIAS.items()}),
+                      extractor)
+        otras = dict(self.CATEGORIAS, Becas=['becas'])
+        self.assertIsNot(obtener_extractor(otras), extractor)
+        self.assertIn('becas', extraer_palabras_clave('Convocatoria de becas', '', otras))
+        self.assertNotIn('becas', extraer_palabras_clave('Convocatoria de becas', '', self.CATEGORIAS))
+
+
+class EnriquecimientoTest(TestCase):
+    """
+    Enriquecimiento de metadatos por lotes: normalización de departamentos con
+    una sola expresión, palabras clave, materias y escritura con bulk_update.
+    """
+
+    CATEGORIAS = {'Vivienda': ['vivienda', 'alquiler'], 'Empleo': ['oposiciones', 'funcionarios']}
+
+    def setUp(self):
+        invalidar_legislaturas()
+
+    def test_normalizar_departamento(self):
+        def por_patrones(departamento):
+            for patron, normalizacion in MAPA_DEPARTAMENTOS.items():
+                if re.search(patron, departamento.lower()):
+                    return normalizacion
+            return departamento
+
+        for departamento in [
+            'MINISTERIO DE HACIENDA Y FUNCIÓN PÚBLICA',
+            'UNIVERSIDADES. Ministerio de Ciencia, Innovación y Universidades',
+            'Ministerio de\nTransición   Ecológica',
+            'TRIBUNAL CONSTITUCIONAL',
+            'COMUNIDAD AUTÓNOMA DE CATALUÑA',
+        ]:
+            self.assertEqual(normalizar_departamento(departamento), por_patrones(departamento))
+        self.assertEqual(normalizar_departamento('UNIVERSIDADES. Ministerio de Ciencia'), 'Ministerio de Ciencia')
+        self.assertIsNone(normalizar_departamento(''))
+
+    def test_enriquecer_documentos(self):
+        for i, (titulo, departamento) in enumerate([
+            ('Real Decreto 12/2024 sobre ayudas al alquiler de vivienda', 'MINISTERIO DE VIVIENDA 105'),
+            ('Resolución de oposiciones al cuerpo de funcionarios', 'MINISTERIO DE HACIENDA Y FUNCIÓN PÚBLICA'),
+            ('Sentencia en el recurso de amparo', 'TRIBUNAL CONSTITUCIONAL'),
+        ]):
+            DocumentoSimplificado.objects.create(
+                identificador=f'BOE-A-2024-{i:05d}', fecha_publicacion=datetime.date(2024, 5, 2),
+                titulo=titulo, departamento=departamento
+            )
+        DocumentoSimplificado.objects.create(
+            identificador='BOE-A-2024-99999', fecha_publicacion=datetime.date(2024, 5, 2),
+            titulo='Orden ya procesada', departamento='Cortes Generales', palabras_clave='orden', materias='orden'
+        )
+
+        recuentos = EnriquecedorMetadatos(categorias=self.CATEGORIAS, tamano_lote=2).ejecutar()
+        self.assertEqual(recuentos['procesados'], 3)
+        self.assertEqual(recuentos['actualizados'], 3)
+        self.assertEqual(recuentos['errores'], 0)
+
+        vivienda = DocumentoSimplificado.objects.get(identificador='BOE-A-2024-00000')
+        self.assertEqual(vivienda.codigo_departamento, '105')
+        self.assertEqual(vivienda.palabras_clave, 'alquiler, decreto, decreto 12/2024, real decreto, '
+                                                  'real decreto 12/2024, vivienda')
+        self.assertEqual(vivienda.materias, vivienda.palabras_clave)
+        hacienda = DocumentoSimplificado.objects.get(identificador='BOE-A-2024-00001')
+        self.assertEqual(hacienda.departamento, 'Ministerio de Hacienda')
+        self.assertEqual(FacetaDepartamento.objects.get(nombre='Ministerio de Hacienda').total_documentos, 1)
+        self.assertFalse(FacetaDepartamento.objects.filter(nombre='MINISTERIO DE HACIENDA Y FUNCIÓN PÚBLICA',
+                                                           total_documentos__gt=0).exists())
+
+        # Solo queda pendiente el documento sin palabras clave, y con --forzar no cambia nada
+        recuentos = EnriquecedorMetadatos(categorias=self.CATEGORIAS).ejecutar()
+        self.assertEqual((recuentos['procesados'], recuentos['actualizados']), (1, 0))
+        recuentos = EnriquecedorMetadatos(forzar=True, categorias=self.CATEGORIAS).ejecutar(limite=2)
+        self.assertEqual(recuentos['procesados'], 2)
+        self.assertEqual(recuentos['actualizados'], 0)
+
+
+class ReferenciasTest(TestCase):
+    """
+    Grafo de referencias entre normas: extracción del XML, guardado en bloque
+    sin duplicados y consultas por nivel.
+    """
+
+    XML = """<documento>
+      <metadatos><identificador>BOE-A-2024-200</identificador></metadatos>
+      <analisis><referencias>
+        <anteriores>
+          <anterior referencia="BOE-A-2015-10565" orden="2070">
+            <palabra codigo="270">MODIFICA</palabra><texto>el art. 3 de la Ley 39/2015</texto>
+          </anterior>
+          <anterior referencia="BOE-A-2010-100" orden="2080">
+            <palabra codigo="210">DEROGA</palabra><texto>el Real Decreto 10/2010</texto>
+          </anterior>
+          <anterior referencia="BOE-A-1978-31229" orden="3010">
+            <palabra codigo="440">DE CONFORMIDAD con</palabra><texto>la Constitución</texto>
+          </anterior>
+        </anteriores>
+        <posteriores>
+          <posterior referencia="BOE-A-2025-50" orden="1000">
+            <palabra codigo="407">SE MODIFICA</palabra><texto>el art. 1, por Ley 2/2025</texto>
+          </posterior>
+        </posteriores>
+      </referencias></analisis>
+    </documento>"""
+
+    def test_extraer_referencias(self):
+        referencias = extraer_referencias_xml(ET.fromstring(self.XML))
+        self.assertEqual(
+            [(r['origen'], r['destino'], r['relacion']) for r in referencias],
+            [
+                ('BOE-A-2024-200', 'BOE-A-2015-10565', 'modifica'),
+                ('BOE-A-2024-200', 'BOE-A-2010-100', 'deroga'),
+                ('BOE-A-2024-200', 'BOE-A-1978-31229', 'cita'),
+                ('BOE-A-2025-50', 'BOE-A-2024-200', 'modifica'),
+            ]
+        )
+        self.assertEqual(referencias[0]['codigo_palabra'], '270')
+        self.assertEqual(referencias[0]['texto'], 'el art. 3 de la Ley 39/2015')
+
+        self.assertEqual(guardar_referencias(referencias), 4)
+        # La misma referencia vista desde la otra norma no se duplica
+        guardar_referencias(referencias + [dict(referencias[3], texto='otra redacción')])
+        self.assertEqual(ReferenciaNorma.objects.count(), 4)
+
+    def test_cadena_e_historial(self):
+        for identificador, fecha in [('BOE-A-2015-10565', datetime.date(2015, 10, 2)),
+                                     ('BOE-A-2024-200', datetime.date(2024, 1, 5))]:
+            DocumentoSimplificado.objects.create(identificador=identificador, fecha_publicacion=fecha,
+                                                 titulo=f'Norma {identificador}')
+        guardar_referencias(extraer_referencias_xml(ET.fromstring(self.XML)))
+        guardar_referencias([
+            {'origen': 'BOE-A-2021-9', 'destino': 'BOE-A-2015-10565', 'relacion': 'modifica'},
+            {'origen': 'BOE-A-2021-9', 'destino': 'BOE-A-2015-10565', 'relacion': 'deroga'},
+            # Un ciclo no hace que el recorrido se repita
+            {'origen': 'BOE-A-2015-10565', 'destino': 'BOE-A-2025-50', 'relacion': 'modifica'},
+        ])
+
+        # Una consulta por nivel (3 niveles, el último sin resultados nuevos) y otra para los títulos
+        with self.assertNumQueries(4):
+            cadena = cadena_modificaciones('BOE-A-2015-10565')
+        self.assertEqual(
+            [(a['nivel'], a['origen'], a['relacion']) for a in cadena],
+            [(1, 'BOE-A-2021-9', 'deroga'), (1, 'BOE-A-2021-9', 'modifica'), (1, 'BOE-A-2024-200', 'modifica'),
+             (2, 'BOE-A-2025-50', 'modifica'), (3, 'BOE-A-2015-10565', 'modifica')]
+        )
+        self.assertEqual(cadena[2]['fecha_publicacion'], datetime.date(2024, 1, 5))
+        self.assertEqual(len(cadena_modificaciones('BOE-A-2015-10565', max_profundidad=1)), 3)
+
+        historial = historial_versiones('BOE-A-2015-10565')
+        self.assertEqual([(v['identificador'], v['relacion']) for v in historial],
+                         [('BOE-A-2015-10565', None), ('BOE-A-2021-9', 'deroga'), ('BOE-A-2024-200', 'modifica')])
+        self.assertEqual(historial[0]['fecha_publicacion'], datetime.date(2015, 10, 2))
+        self.assertEqual(historial_versiones('BOE-A-1978-31229'), [])
+
+    def test_api_referencias(self):
+        from .views_api import api_referencias
+        guardar_referencias(extraer_referencias_xml(ET.fromstring(self.XML)))
+        respuesta = api_referencias(RequestFactory().get('/'), 'BOE-A-2024-200')
+        datos = json.loads(respuesta.content)
+        self.assertEqual([a['origen'] for a in datos['afectada_por']], ['BOE-A-2025-50'])
+        self.assertEqual(sorted(a['destino'] for a in datos['afecta_a']), ['BOE-A-2010-100', 'BOE-A-2015-10565'])
+        self.assertEqual(len(datos['cadena']), 1)
+        self.assertEqual(api_referencias(RequestFactory().get('/', {'profundidad': 'x'}), 'BOE-A-2024-200').status_code,
+                         400)
+
+
+class TareasTest(TestCase):
+    """
+    Cola de tareas persistente: encolado sin duplicados, reclamación con
+    arrendamiento, reintentos con espera y tareas muertas.
+    """
+
+    def setUp(self):
+        self.ejecutadas = []
+        self.fallos = {}
+
+        @manejador('prueba')
+        def procesar(referencia):
+            if self.fallos.get(referencia):
+                self.fallos[referencia] -= 1
+                raise ValueError(f"Fallo en {referencia}")
+            self.ejecutadas.append(referencia)
+
+    def tearDown(self):
+        MANEJADORES.pop('prueba', None)
+
+    def test_encolar_no_duplica_tareas_activas(self):
+        encolar('prueba', ['A', 'B', 'A'])
+        encolar('prueba', ['B', 'C'])
+        self.assertEqual(sorted(Tarea.objects.values_list('referencia', flat=True)), ['A', 'B', 'C'])
+
+        # Una vez completada, la misma referencia se puede volver a encolar
+        self.assertEqual(procesar_lote('trabajador', ['prueba'], limite=10), 3)
+        encolar('prueba', ['A'])
+        self.assertEqual(Tarea.objects.filter(referencia='A').count(), 2)
+
+    def test_reclamar_respeta_arrendamiento_y_prioridad(self):
+        encolar('prueba', ['lenta'], prioridad=5)
+        encolar('prueba', ['urgente'], prioridad=0)
+        encolar('prueba', ['futura'], retraso=3600)
+
+        tareas = reclamar('uno', ['prueba'], limite=1)
+        self.assertEqual([tarea.referencia for tarea in tareas], ['urgente'])
+        self.assertEqual(tareas[0].estado, Tarea.EN_CURSO)
+        self.assertEqual(tareas[0].intentos, 1)
+
+        # Otro trabajador no puede reclamar la misma tarea mientras dure el arrendamiento
+        self.assertEqual([tarea.referencia for tarea in reclamar('dos', ['prueba'], limite=10)], ['lenta'])
+        self.assertEqual(reclamar('tres', ['prueba'], limite=10), [])
+
+        # Con el arrendamiento vencido, la tarea vuelve a estar disponible y el primero pierde el derecho a completarla
+        Tarea.objects.filter(referencia='urgente').update(bloqueada_hasta=timezone.now() - datetime.timedelta(seconds=1))
+        reclamada = reclamar('tres', ['prueba'], limite=10)
+        self.assertEqual([tarea.referencia for tarea in reclamada], ['urgente'])
+        self.assertFalse(completar(tareas[0]))
+        self.assertTrue(completar(reclamada[0]))
+
+    def test_reintentos_y_tarea_muerta(self):
+        self.fallos = {'X': 10}
+        encolar('prueba', ['X'], max_intentos=2)
+
+        tarea = reclamar('uno', ['prueba'])[0]
+        self.assertEqual(ejecutar_tarea(tarea), Tarea.PENDIENTE)
+        tarea.refresh_from_db()
+        self.assertGreater(tarea.disponible_en, timezone.now())
+        self.assertIn('Fallo en X', tarea.error)
+        self.assertEqual(reclamar('uno', ['prueba']), [])
+
+        Tarea.objects.filter(id=tarea.id).update(disponible_en=timezone.now())
+        tarea = reclamar('uno', ['prueba'])[0]
+        self.assertEqual(ejecutar_tarea(tarea), Tarea.MUERTA)
+        self.assertEqual(reclamar('uno', ['prueba']), [])
+
+        # Reactivada, se reintenta desde cero
+        self.fallos = {}
+        self.assertEqual(reactivar_muertas('prueba'), 1)
+        self.assertEqual(procesar_lote('uno', ['prueba']), 1)
+        self.assertEqual(self.ejecutadas, ['X'])
+        self.assertEqual(Tarea.objects.get(id=tarea.id).estado, Tarea.COMPLETADA)
+
+
+class ServidorEmbeddingsTest(TestCase):
+    """
+    Servidor local de embeddings: las peticiones concurrentes se agrupan en
+    microlotes y el cliente devuelve los mismos vectores que el modelo.
+    """
+
+    class ModeloContador(CodificadorHash):
+        def __init__(self):
+            super().__init__()
+            self.llamadas = 0
+
+        def encode(self, textos, batch_size=32, **kwargs):
+            self.llamadas += 1
+            return super().encode(textos, batch_size, **kwargs)
+
+    def _arrancar(self, url):
+        modelo = self.ModeloContador()
+        servidor = crear_servidor(modelo, url, lote_maximo=64, espera=0.05)
+        hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+        hilo.start()
+
+        def detener():
+            servidor.shutdown()
+            servidor.server_close()
+            servidor.agrupador.detener()
+        self.addCleanup(detener)
+        return servidor, modelo
+
+    def test_peticiones_concurrentes_en_microlotes(self):
+        servidor, modelo = self._arrancar('http://127.0.0.1:0')
+        cliente = ClienteEmbeddings(f'http://127.0.0.1:{servidor.server_address[1]}')
+        textos = [f'real decreto número {i} sobre subvenciones' for i in range(16)]
+        resultados = {}
+
+        def consultar(texto):
+            resultados[texto] = cliente.encode(texto)
+
+        hilos = [threading.Thread(target=consultar, args=(texto,)) for texto in textos]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        referencia = CodificadorHash()
+        for texto in textos:
+            self.assertEqual(resultados[texto].dtype, 'float32')
+            self.assertTrue((resultados[texto] == referencia.encode(texto)).all())
+        self.assertLess(modelo.llamadas, len(textos))
+
+        matriz = cliente.encode(textos[:3], batch_size=8)
+        self.assertEqual(matriz.shape, (3, 384))
+        self.assertTrue(cliente.disponible())
+
+    def test_socket_unix(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            url = f"unix://{os.path.join(directorio, 'embeddings.sock')}"
+            self._arrancar(url)
+            vector = ClienteEmbeddings(url).encode('orden ministerial')
+            self.assertEqual(vector.shape, (384,))
+
+
+class EmbeddingsOnnxTest(TestCase):
+    """
+    Backend ONNX int8 del modelo de embeddings: sus vectores deben coincidir
+    con los de PyTorch (similitud coseno >= 0.99).
+    """
+
+    def test_similitud_minima(self):
+        referencia = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+        self.assertAlmostEqual(similitud_minima(referencia, referencia * 3), 1.0, places=6)
+        self.assertAlmostEqual(similitud_minima(referencia, np.array([[1.0, 0.0], [1.0, 1.0]])), 2 ** -0.5, places=6)
+
+    @unittest.skipUnless(
+        all(importlib.util.find_spec(modulo) for modulo in ('onnxruntime', 'sentence_transformers', 'torch')),
+        "Requiere onnxruntime, torch y sentence-transformers"
+    )
+    def test_paridad_con_torch(self):
+        textos = CONSULTAS + [
+            'Resolución de la Dirección General de Tráfico sobre las restricciones a la circulación',
+            'Orden por la que se convocan pruebas selectivas para el ingreso en el Cuerpo de Gestión',
+        ]
+        with tempfile.TemporaryDirectory() as directorio:
+            exportar_onnx(directorio)
+            vectores_onnx = CodificadorONNX(directorio).encode(textos)
+        vectores_torch = cargar_modelo_local().encode(textos)
+
+        self.assertEqual(vectores_onnx.shape, vectores_torch.shape)
+        self.assertGreaterEqual(similitud_minima(vectores_torch, vectores_onnx), 0.99)
+
+
+class ColeccionQdrantTest(TestCase):
+    """
+    Esquema configurable de la colección (HNSW, cuantización, vectores en disco)
+    y medición del recall frente a la búsqueda exacta.
+    """
+
+    def test_memoria_vectores(self):
+        sin_cuantizar = memoria_vectores(2 ** 20, 384, {'cuantizacion': None})
+        self.assertEqual(sin_cuantizar['memoria.vectores_ram_mb'], 384 * 4)
+        self.assertEqual(sin_cuantizar['memoria.vectores_disco_mb'], 0)
+
+        int8_en_disco = memoria_vectores(2 ** 20, 384, {'cuantizacion': 'int8', 'vectores_en_disco': True})
+        self.assertEqual(int8_en_disco['memoria.vectores_ram_mb'], 384)
+        self.assertEqual(int8_en_disco['memoria.vectores_disco_mb'], 384 * 4)
+
+        binaria = memoria_vectores(2 ** 20, 384, {'cuantizacion': 'binaria', 'vectores_en_disco': True})
+        self.assertEqual(binaria['memoria.vectores_ram_mb'], 384 / 8)
+
+    @unittest.skipUnless(importlib.util.find_spec('qdrant_client'), "Requiere qdrant-client")
+    def test_recall_con_cuantizacion_int8(self):
+        from .utils_qdrant import QdrantBOE
+
+        for i, consulta in enumerate(CONSULTAS * 5):
+            DocumentoSimplificado.objects.create(
+                identificador=f'BOE-A-2025-{i:05d}', fecha_publicacion=datetime.date(2025, 3, 7),
+                titulo=f'{consulta} {i}', texto=f'{consulta} documento número {i}'
+            )
+        qdrant = QdrantBOE(':memory:', modelo=CodificadorHash(), config_coleccion={
+            'cuantizacion': 'int8', 'vectores_en_disco': True, 'hnsw_m': 8, 'hnsw_ef_construct': 64,
+        })
+        self.assertTrue(qdrant.crear_coleccion(recrear=True))
+        self.assertEqual(qdrant.indexar_documentos()['exitosos'], len(CONSULTAS) * 5)
+
+        exacta = qdrant.parametros_busqueda(exacta=True)
+        self.assertTrue(exacta.exact)
+        self.assertTrue(exacta.quantization.ignore)
+        self.assertTrue(qdrant.parametros_busqueda(hnsw_ef=64).quantization.rescore)
+
+        metricas = medir_recall(qdrant, muestra=10, k=5, valores_ef=[16, 64])
+        self.assertGreaterEqual(metricas['recall.ef_64.recall_at_5'], 0.9)
+        self.assertIn('recall.ef_16.p95_ms', metricas)
+        self.assertGreater(metricas['memoria.vectores_disco_mb'], 0)
+
+        ids = qdrant.buscar_ids_similares(CONSULTAS[0], limit=3, score_threshold=0.0, hnsw_ef=32)
+        self.assertEqual(len(ids), 3)
+
+
+class IndiceLocalTest(TestCase):
+    """
+    Índice vectorial local de respaldo: búsqueda por fuerza bruta con filtros,
+    persistencia en disco y uso desde QdrantBOE cuando Qdrant falla.
+    """
+
+    DEPARTAMENTOS = ['MINISTERIO DE HACIENDA', 'MINISTERIO DE SANIDAD', 'TRIBUNAL CONSTITUCIONAL']
+
+    def _datos(self, n, semilla=0):
+        rng = np.random.default_rng(semilla)
+        identificadores = [f'BOE-A-2025-{i:05d}' for i in range(n)]
+        vectores = rng.normal(size=(n, 384)).astype(np.float32)
+        fechas = [datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 60) for i in range(n)]
+        departamentos = [self.DEPARTAMENTOS[i % 3] for i in range(n)]
+        return identificadores, vectores, fechas, departamentos
+
+    def test_busqueda_y_filtros(self):
+        identificadores, vectores, fechas, departamentos = self._datos(300)
+        indice = IndiceLocal()
+        indice.anadir(identificadores, vectores, fechas, departamentos)
+        consulta = vectores[7] + 0.1
+
+        normalizados = vectores / np.linalg.norm(vectores, axis=1, keepdims=True)
+        esperados = np.argsort(-(normalizados @ (consulta / np.linalg.norm(consulta))))[:5]
+        resultados = indice.buscar(consulta, limite=5, umbral=-1)
+        self.assertEqual([identificador for identificador, _ in resultados], [identificadores[i] for i in esperados])
+        self.assertEqual(resultados[0][0], identificadores[7])
+        self.assertEqual(indice.buscar(consulta, limite=3, umbral=-1, offset=2), resultados[2:5])
+
+        filtros = {'departamento': 'MINISTERIO DE SANIDAD', 'fecha_desde': datetime.date(2025, 1, 10),
+                   'fecha_hasta': '2025-01-20'}
+        filtrados = indice.buscar(consulta, limite=50, umbral=-1, filtros=filtros)
+        self.assertTrue(filtrados)
+        for identificador, _ in filtrados:
+            i = identificadores.index(identificador)
+            self.assertEqual(departamentos[i], 'MINISTERIO DE SANIDAD')
+            self.assertTrue(datetime.date(2025, 1, 10) <= fechas[i] <= datetime.date(2025, 1, 20))
+        self.assertEqual(indice.buscar(consulta, filtros={'departamento': 'OTRO'}), [])
+        self.assertEqual([i for i, _ in indice.buscar(consulta, umbral=-1, permitidos={identificadores[3]})],
+                         [identificadores[3]])
+
+        # Actualizar y eliminar
+        indice.anadir([identificadores[0]], consulta[None, :], [fechas[0]], [departamentos[0]])
+        self.assertEqual(indice.buscar(consulta, limite=1)[0][0], identificadores[0])
+        indice.eliminar([identificadores[0]])
+        self.assertEqual(len(indice), 299)
+        self.assertEqual(indice.buscar(consulta, limite=1)[0][0], identificadores[7])
+
+    def test_persistencia_en_disco(self):
+        identificadores, vectores, fechas, departamentos = self._datos(1500)
+        with tempfile.TemporaryDirectory() as directorio:
+            escritor = IndiceLocal(directorio)
+            escritor.anadir(identificadores[:1000], vectores[:1000], fechas[:1000], departamentos[:1000])
+            lector = IndiceLocal(directorio)
+            self.assertEqual(len(lector), 1000)
+
+            # El lector ve las escrituras posteriores, incluida la ampliación de las matrices
+            escritor.anadir(identificadores[1000:], vectores[1000:], fechas[1000:], departamentos[1000:])
+            self.assertEqual(lector.buscar(vectores[1400], limite=1)[0][0], identificadores[1400])
+            self.assertEqual(len(lector), 1500)
+
+            escritor.vaciar()
+            self.assertEqual(lector.buscar(vectores[1400]), [])
+
+    @unittest.skipUnless(importlib.util.find_spec('qdrant_client'), "Requiere qdrant-client")
+    def test_respaldo_cuando_qdrant_falla(self):
+        from . import utils_qdrant
+        from .utils_qdrant import COLLECTION_NAME, QdrantBOE
+        self.addCleanup(utils_qdrant._caidas.clear)
+
+        for i, consulta in enumerate(CONSULTAS):
+            DocumentoSimplificado.objects.create(
+                identificador=f'BOE-A-2025-{i:05d}', fecha_publicacion=datetime.date(2025, 3, 7),
+                titulo=consulta, departamento=self.DEPARTAMENTOS[i % 3]
+            )
+        qdrant = QdrantBOE(':memory:', modelo=CodificadorHash(), indice_local=IndiceLocal())
+        qdrant.crear_coleccion(recrear=True)
+        qdrant.indexar_documentos()
+        self.assertEqual(len(qdrant.indice_local), len(CONSULTAS))
+        en_qdrant = qdrant.buscar_ids_similares(CONSULTAS[1], limit=3, score_threshold=0.1)
+
+        # Sin la colección, la búsqueda sigue funcionando con el índice local
+        qdrant.client.delete_collection(COLLECTION_NAME)
+        locales = qdrant.buscar_ids_similares(CONSULTAS[1], limit=3, score_threshold=0.1)
+        self.assertEqual([i for i, _ in locales], [i for i, _ in en_qdrant])
+        self.assertAlmostEqual(locales[0][1], en_qdrant[0][1], places=4)
+        self.assertTrue(qdrant.qdrant_caido())
+        self.assertEqual(qdrant.busqueda_hibrida(CONSULTAS[1])['tipo_busqueda'], 'hibrida')
+
+        filtrados = qdrant.buscar_ids_similares(CONSULTAS[1], score_threshold=0.0,
+                                                filtros={'departamento': self.DEPARTAMENTOS[0]})
+        self.assertTrue(all(int(i[-5:]) % 3 == 0 for i, _ in filtrados))
+
+
+TEXTO_CONSOLIDADO = """<response><data><texto>
+<bloque id="pr" tipo="preambulo">
+  <version id_norma="BOE-A-2020-1" fecha_publicacion="20200101"><p>Exposición de motivos.</p></version>
+</bloque>
+<bloque id="a1" tipo="precepto">
+  <version id_norma="BOE-A-2020-1" fecha_publicacion="20200101">
+    <p class="articulo">Artículo 1. Objeto.</p><p>Esta ley regula las ayudas al alquiler.</p>
+  </version>
+  <version id_norma="BOE-A-2022-7" fecha_publicacion="20220315">
+    <p class="articulo">Artículo 1. Objeto.</p><p>Esta ley regula las ayudas al alquiler y a la compra.</p>
+  </version>
+</bloque>
+<bloque id="a2" tipo="precepto">
+  <version id_norma="BOE-A-2020-1" fecha_publicacion="20200101">
+    <p class="articulo">Artículo 2. Plazo.</p><p>El plazo es de un mes.</p>
+  </version>
+  <version id_norma="BOE-A-2023-9" fecha_publicacion="20230601"></version>
+</bloque>
+<bloque id="da1" tipo="disposicion">
+  <version id_norma="BOE-A-2023-9" fecha_publicacion="20230601">
+    <p class="articulo">Disposición adicional primera. Informe.</p><p>El Gobierno informará cada año.</p>
+  </version>
+</bloque>
+</texto></data></response>"""
+
+
+class ComparadorLocalTest(TestCase):
+    """Versiones consolidadas y comparación por artículos sin red"""
+
+    def setUp(self):
+        self.root = ET.fromstring(TEXTO_CONSOLIDADO)
+
+    def test_texto_en_fecha(self):
+        self.assertEqual(fechas_versiones(self.root), ['20200101', '20220315', '20230601'])
+
+        original = texto_en_fecha(self.root, '20200101')
+        self.assertIn('ayudas al alquiler.', original)
+        self.assertNotIn('Disposición adicional', original)
+        # Entre dos versiones rige la última publicada
+        self.assertIn('y a la compra', texto_en_fecha(self.root, '20221231'))
+        vigente = texto_en_fecha(self.root, '20230601')
+        self.assertNotIn('Artículo 2', vigente)
+        self.assertIn('Disposición adicional primera', vigente)
+
+    def test_almacen(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            almacen = AlmacenVersiones(directorio)
+            self.assertIsNone(almacen.obtener('BOE-A-2020-1', '20200101'))
+            almacen.guardar('BOE-A-2020-1', '20200101', 'Artículo 1. Objeto. Ñandú')
+            self.assertEqual(almacen.obtener('BOE-A-2020-1', '20200101'), 'Artículo 1. Objeto. Ñandú')
+            self.assertEqual(almacen.fechas('BOE-A-2020-1'), [])
+            with self.assertRaises(ValueError):
+                almacen.obtener('../otra', '20200101')
+
+    def test_segmentar_articulos(self):
+        segmentos = segmentar_articulos(texto_en_fecha(self.root, '20230601'))
+        self.assertEqual(list(segmentos), ['Preámbulo', 'Artículo 1', 'Disposición adicional primera'])
+        self.assertTrue(segmentos['Artículo 1'].endswith('y a la compra.'))
+        # Los encabezados repetidos no se pisan
+        self.assertEqual(list(segmentar_articulos('Artículo 1. A\nArtículo 1. B')), ['Artículo 1', 'Artículo 1 (2)'])
+
+    def test_comparar_textos(self):
+        comparacion = comparar_textos(texto_en_fecha(self.root, '20200101'), texto_en_fecha(self.root, '20230601'))
+        self.assertEqual(comparacion['estadisticas'], {
+            'articulos_modificados': 1, 'articulos_anadidos': 1, 'articulos_eliminados': 1, 'total_cambios': 3,
+        })
+        cambios = {cambio['articulo']: cambio for cambio in comparacion['cambios']}
+        self.assertEqual([cambio['articulo'] for cambio in comparacion['cambios']],
+                         ['Artículo 1', 'Artículo 2', 'Disposición adicional primera'])
+        self.assertEqual(cambios['Artículo 1']['tipo_cambio'], 'modificado')
+        self.assertEqual(cambios['Artículo 1']['diferencias'],
+                         [{'tipo': 'reemplazar', 'original': 'alquiler.', 'nuevo': 'alquiler y a la compra.'}])
+        self.assertEqual(cambios['Artículo 2']['tipo_cambio'], 'eliminado')
+        self.assertEqual(cambios['Disposición adicional primera']['tipo_cambio'], 'añadido')
+
+        self.assertEqual(comparar_textos('Artículo 1. Igual', 'Artículo 1.  Igual')['cambios'], [])
+        self.assertEqual(diferencias_palabras('a b c', 'a c d'),
+                         [{'tipo': 'eliminar', 'original': 'b', 'nuevo': ''},
+                          {'tipo': 'insertar', 'original': '', 'nuevo': 'd'}])
+
+
+class SeccionesTest(TestCase):
+    """Segmentación del XML de un documento por artículos y lectura de una sola sección"""
+
+    XML = """<documento><metadatos><identificador>BOE-A-2024-300</identificador></metadatos>
+    <texto>
+      <p class="parrafo">Exposición de motivos de la ley.</p>
+      <p class="titulo_num">TÍTULO PRELIMINAR</p>
+      <p class="titulo_tit">Disposiciones generales</p>
+      <p class="articulo">Artículo 1. Objeto.</p>
+      <p class="parrafo">Esta ley regula las ayudas.</p>
+      <p class="titulo_num">TÍTULO I</p>
+      <p class="capitulo_num">CAPÍTULO I</p>
+      <p class="articulo">Artículo 2. Beneficiarios.</p>
+      <p class="parrafo">Podrán solicitarlas <em>las personas</em> residentes.</p>
+      <table><tr><td>Renta</td><td>Cuantía</td></tr></table>
+      <p class="articulo">Artículo 3 bis. Plazo.</p>
+      <p class="articulo">Disposición final primera. Entrada en vigor.</p>
+      <p class="parrafo">Al día siguiente.</p>
+      <p class="firma_rey">FELIPE R.</p>
+      <p class="firma_ministro">El Ministro</p>
+      <p class="anexo_num">ANEXO II</p>
+      <p class="anexo_tit">Modelo de solicitud</p>
+      <p>Artículo 1. Datos del solicitante.</p>
+    </texto></documento>"""
+
+    def test_segmentar_xml(self):
+        texto, secciones = segmentar_xml(ET.fromstring(self.XML).find('texto'))
+        self.assertEqual(
+            [(s['tipo'], s['clave'], s['ruta']) for s in secciones],
+            [
+                ('preambulo', 'Preámbulo', ''),
+                ('titulo', 'Título preliminar', ''),
+                ('articulo', 'Artículo 1', 'Título preliminar'),
+                ('titulo', 'Título I', ''),
+                ('capitulo', 'Capítulo I', 'Título I'),
+                ('articulo', 'Artículo 2', 'Título I > Capítulo I'),
+                ('articulo', 'Artículo 3 bis', 'Título I > Capítulo I'),
+                ('disposicion', 'Disposición final primera', ''),
+                ('firma', 'Firma', ''),
+                ('anexo', 'Anexo II', ''),
+                ('articulo', 'Artículo 1 (2)', 'Anexo II'),
+            ]
+        )
+        porclave = {s['clave']: s for s in secciones}
+        self.assertEqual(porclave['Título preliminar']['titulo'], 'TÍTULO PRELIMINAR Disposiciones generales')
+        fragmento = lambda clave: texto[porclave[clave]['inicio']:porclave[clave]['fin']]
+        self.assertEqual(fragmento('Artículo 2'),
+                         'Artículo 2. Beneficiarios.\nPodrán solicitarlas las personas residentes.\nRenta | Cuantía')
+        self.assertEqual(fragmento('Firma'), 'FELIPE R.\nEl Ministro')
+        # Los contenedores abarcan todo su contenido
+        self.assertTrue(fragmento('Título I').endswith('Artículo 3 bis. Plazo.'))
+        self.assertTrue(texto.endswith(fragmento('Anexo II')))
+
+    def test_guardar_y_leer_seccion(self):
+        DocumentoSimplificado.objects.create(
+            identificador='BOE-A-2024-300', fecha_publicacion=datetime.date(2024, 5, 1), titulo='Ley de ayudas'
+        )
+        texto, secciones = segmentar_xml(ET.fromstring(self.XML).find('texto'))
+        guardar_textos({'BOE-A-2024-300': texto})
+        self.assertEqual(guardar_secciones({'BOE-A-2024-300': secciones}), len(secciones))
+        # Volver a guardar sustituye la estructura en lugar de duplicarla
+        guardar_secciones({'BOE-A-2024-300': secciones})
+        self.assertEqual(SeccionDocumento.objects.filter(documento_id='BOE-A-2024-300').count(), len(secciones))
+
+        self.assertEqual(texto_seccion('BOE-A-2024-300', 'Artículo 1'), 'Artículo 1. Objeto.\nEsta ley regula las ayudas.')
+        self.assertIsNone(texto_seccion('BOE-A-2024-300', 'Artículo 9'))
+        self.assertEqual(
+            list(secciones_documento('BOE-A-2024-300', ['disposicion']).values_list('clave', flat=True)),
+            ['Disposición final primera']
+        )
+
+
+class TextosComprimidosTest(TestCase):
+    """
+    Los textos completos se guardan comprimidos fuera de la tabla de documentos
+    y se leen solo cuando hacen falta
+    """
+
+    def crear(self, identificador, texto=None):
+        return DocumentoSimplificado.objects.create(
+            identificador=identificador, fecha_publicacion=datetime.date(2024, 6, 1),
+            titulo=f'Documento {identificador}', texto=texto
+        )
+
+    def test_comprimir_y_descomprimir(self):
+        texto = 'Artículo 1. Objeto.\nEsta orden regula las subvenciones. ' * 50
+        formato, contenido = comprimir(texto)
+        self.assertLess(len(contenido), len(texto.encode('utf-8')) // 5)
+        self.assertEqual(descomprimir(formato, contenido), texto)
+        # Las filas en zlib se leen aunque zstandard esté instalado
+        self.assertEqual(descomprimir(TextoDocumento.ZLIB, zlib.compress(texto.encode('utf-8'))), texto)
+
+    def test_guardar_y_leer_con_el_documento(self):
+        self.crear('BOE-A-2024-400', 'Texto de la resolución')
+        self.crear('BOE-A-2024-401')
+        documento = DocumentoSimplificado.objects.get(pk='BOE-A-2024-400')
+        self.assertEqual(documento.longitud_texto, len('Texto de la resolución'))
+        with self.assertNumQueries(1):
+            self.assertEqual(documento.texto, 'Texto de la resolución')
+            self.assertEqual(documento.texto, 'Texto de la resolución')
+        # Sin texto no hay fila ni consulta
+        documento = DocumentoSimplificado.objects.get(pk='BOE-A-2024-401')
+        with self.assertNumQueries(0):
+            self.assertIsNone(documento.texto)
+
+        documento.texto = 'Texto nuevo'
+        documento.save()
+        self.assertEqual(cargar_textos(['BOE-A-2024-401']), {'BOE-A-2024-401': 'Texto nuevo'})
+        documento.texto = ''
+        documento.save()
+        self.assertFalse(TextoDocumento.objects.filter(documento_id='BOE-A-2024-401').exists())
+        self.assertIsNone(DocumentoSimplificado.objects.get(pk='BOE-A-2024-401').longitud_texto)
+
+    def test_guardar_en_bloque(self):
+        for i in range(3):
+            self.crear(f'BOE-A-2024-41{i}', f'Texto {i}')
+        guardados = guardar_textos({'BOE-A-2024-410': 'Texto sustituido', 'BOE-A-2024-411': None})
+        self.assertEqual(guardados, 1)
+        self.assertEqual(
+            cargar_textos(['BOE-A-2024-410', 'BOE-A-2024-411', 'BOE-A-2024-412']),
+            {'BOE-A-2024-410': 'Texto sustituido', 'BOE-A-2024-412': 'Texto 2'}
+        )
+        longitudes = dict(DocumentoSimplificado.objects.values_list('identificador', 'longitud_texto'))
+        self.assertEqual(longitudes['BOE-A-2024-410'], len('Texto sustituido'))
+        self.assertIsNone(longitudes['BOE-A-2024-411'])
+
+    def test_precargar_textos_en_una_consulta(self):
+        for i in range(5):
+            self.crear(f'BOE-A-2024-42{i}', f'Texto {i}' if i % 2 == 0 else None)
+        documentos = list(DocumentoSimplificado.objects.order_by('identificador'))
+        with self.assertNumQueries(1):
+            precargar_textos(documentos)
+            textos = [documento.texto for documento in documentos]
+        self.assertEqual(textos, ['Texto 0', None, 'Texto 2', None, 'Texto 4'])
+
+    def test_busqueda_en_el_cuerpo(self):
+        self.crear('BOE-A-2024-430', 'Esta orden regula las Subvenciones para la reforestación de montes.')
+        self.crear('BOE-A-2024-431', 'Esta orden regula los precios públicos.')
+        self.assertEqual(
+            TextoDocumento.objects.get(pk='BOE-A-2024-430').vocabulario,
+            ' esta las montes orden para reforestacion regula subvenciones '
+        )
+        self.assertEqual(vocabulario('De la a'), '')
+        # La palabra solo aparece en el cuerpo: ni en el título ni en las palabras clave
+        documentos = DocumentoSimplificado.objects.all()
+        encontrados = busqueda_multiple_campos(documentos, ['titulo', 'palabras_clave'], 'subvención', cuerpo=True)
+        self.assertEqual([documento.pk for documento in encontrados], ['BOE-A-2024-430'])
+        self.assertFalse(busqueda_multiple_campos(documentos, ['titulo', 'palabras_clave'], 'subvención').exists())
+        # Todas las palabras, por comienzo de palabra y sin acentos
+        self.assertEqual(list(documentos.filter(filtro_cuerpo('Reforestación montes')).values_list('pk', flat=True)),
+                         ['BOE-A-2024-430'])
+        self.assertFalse(documentos.filter(filtro_cuerpo('forestacion')).exists())
+        self.assertEqual(documentos.filter(filtro_cuerpo('orden regula')).count(), 2)
+        # Al sustituir el texto se sustituye también el vocabulario
+        guardar_textos({'BOE-A-2024-430': 'Texto sustituido'})
+        self.assertFalse(documentos.filter(filtro_cuerpo('subvenciones')).exists())
+
+    @unittest.skipUnless(importlib.util.find_spec('zstandard'), 'zstandard no está instalado')
+    def test_diccionario(self):
+        for i in range(40):
+            self.crear(
+                f'BOE-A-2024-5{i:02d}',
+                f'Resolución de {i} de junio de 2024, de la Dirección General de Tráfico, por la que se '
+                f'convocan ayudas. Primero. Objeto. Se convocan {i * 10} ayudas para el ejercicio.'
+            )
+        diccionario = entrenar_diccionario(tamano=4096)
+        self.assertEqual(diccionario.muestras, 40)
+        self.assertEqual(recomprimir_textos(), 40)
+        self.assertFalse(TextoDocumento.objects.exclude(diccionario=diccionario).exists())
+        self.assertIn('convocan 390 ayudas', cargar_textos(['BOE-A-2024-539'])['BOE-A-2024-539'])
+        self.assertEqual(DiccionarioTexto.objects.count(), 1)
+
+
+class PerfilesConsultaTest(LecturasMixin, TestCase):
+    """
+    Los listados (panel, sumario, búsqueda y notificaciones) leen solo las
+    columnas que muestran, sin las palabras clave ni los resúmenes
+    """
+    FECHA = datetime.date(2025, 3, 7)
+    GRANDE = 'subvención, ' * 2000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('perfiles', 'perfiles@example.com', 'clave')
+        cls.alerta = AlertaUsuario.objects.create(usuario=cls.usuario, nombre='Ayudas', palabras_clave='ayuda')
+        for i in range(12):
+            DocumentoSimplificado.objects.create(
+                identificador=f'BOE-A-2025-{i:05d}',
+                fecha_publicacion=cls.FECHA - datetime.timedelta(days=i % 2),
+                titulo=f'Resolución {i}',
+                departamento=[None, 'Ministerio de Sanidad', 'Ministerio de Hacienda'][i % 3],
+                palabras_clave=cls.GRANDE,
+            )
+            NotificacionAlerta.objects.create(
+                alerta=cls.alerta, documento=f'BOE-A-2025-{i:05d}', titulo_documento=f'Resolución {i}',
+                fecha_documento=cls.FECHA, estado='pendiente' if i % 3 else 'leida', resumen=cls.GRANDE,
+            )
+
+    def test_listado_documentos(self):
+        with medir_lecturas() as completo:
+            list(DocumentoSimplificado.objects.all())
+        self.assertGreater(completo.bytes, 12 * len(self.GRANDE))
+
+        with self.assertLecturas(consultas=1, max_bytes=12 * 250):
+            documentos = list(DocumentoSimplificado.objects.listado())
+            # Los campos de las plantillas están cargados: acceder a ellos no hace consultas
+            for documento in documentos:
+                [getattr(documento, campo) for campo in CAMPOS_LISTADO]
+
+    def test_sumario_agrupado_por_departamento(self):
+        self.assertEqual(DocumentoSimplificado.objects.ultima_fecha(), self.FECHA)
+        plantilla = Engine().from_string(
+            '{% regroup documentos by departamento as departamentos %}'
+            '{% for grupo in departamentos %}{{ grupo.grouper|default:"-" }}={{ grupo.list|length }};{% endfor %}'
+        )
+        with self.assertLecturas(consultas=1, max_bytes=6 * 250):
+            salida = plantilla.render(Context({'documentos': DocumentoSimplificado.objects.sumario(self.FECHA)}))
+        # Los documentos llegan ordenados por departamento, así que cada uno forma un solo grupo
+        self.assertEqual(sorted(salida.rstrip(';').split(';')),
+                         ['-=2', 'Ministerio de Hacienda=2', 'Ministerio de Sanidad=2'])
+
+    def test_listado_notificaciones(self):
+        notificaciones = NotificacionAlerta.objects.listado().filter(alerta__usuario=self.usuario)
+        with self.assertLecturas(consultas=1, max_bytes=12 * 250):
+            filas = [(n.alerta.nombre, n.titulo_documento, n.documento, n.estado) for n in notificaciones]
+        self.assertEqual(len(filas), 12)
+        self.assertEqual(filas[0][0], 'Ayudas')
+
+        with self.assertLecturas(consultas=1, max_bytes=100):
+            recuentos = NotificacionAlerta.objects.filter(alerta__usuario=self.usuario).recuentos()
+        self.assertEqual(recuentos, {'total': 12, 'pendientes': 8})
+
+
+class SumarioCacheTest(TestCase):
+    """
+    El sumario de cada fecha se construye una vez, agrupado por departamentos,
+    y se sirve desde la caché con validación por ETag
+    """
+    FECHA = datetime.date(2025, 3, 7)
+
+    @classmethod
+    def setUpTestData(cls):
+        for i, departamento in enumerate(['Ministerio de Sanidad', None, 'Ministerio de Hacienda', 'Ministerio de Sanidad']):
+            DocumentoSimplificado.objects.create(
+                identificador=f'BOE-A-2025-{i:05d}', fecha_publicacion=cls.FECHA, titulo=f'Orden {i}',
+                departamento=departamento, url_pdf=f'https://www.boe.es/{i}.pdf',
+            )
+        DocumentoSimplificado.objects.create(
+            identificador='BOE-A-2025-00099', fecha_publicacion=cls.FECHA - datetime.timedelta(days=1),
+            titulo='Orden anterior', departamento='Ministerio de Sanidad',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sumario_agrupado(self):
+        sumario = construir_sumario(self.FECHA)
+        datos = json.loads(sumario['json'])
+        self.assertEqual(sumario['total_documentos'], 4)
+        self.assertEqual(
+            sorted((departamento['nombre'] or '', departamento['total']) for departamento in datos['departamentos']),
+            [('', 1), ('Ministerio de Hacienda', 1), ('Ministerio de Sanidad', 2)]
+        )
+        self.assertEqual(datos['fecha'], '2025-03-07')
+        self.assertIn('Ministerio de Hacienda', sumario['html'])
+        self.assertIn('Sin departamento', sumario['html'])
+        self.assertNotIn('Orden anterior', sumario['html'])
+
+    def test_lectura_desde_cache(self):
+        self.assertEqual(fecha_sumario(datetime.date(2025, 3, 10)), self.FECHA)
+        obtener_sumario(self.FECHA)
+        # Solo se lee la generación de los datos
+        with self.assertNumQueries(1):
+            generacion = generacion_datos()
+            self.assertEqual(fecha_sumario(datetime.date(2025, 3, 10), generacion), self.FECHA)
+            self.assertEqual(obtener_sumario(self.FECHA, generacion)['total_documentos'], 4)
+
+    def test_ingesta_rehace_el_sumario(self):
+        anterior = obtener_sumario(self.FECHA)
+        DocumentoSimplificado.objects.create(
+            identificador='BOE-A-2025-00100', fecha_publicacion=self.FECHA + datetime.timedelta(days=1),
+            titulo='Orden nueva', departamento='Ministerio de Hacienda',
+        )
+        DocumentoSimplificado.objects.filter(identificador='BOE-A-2025-00000').update(titulo='Orden corregida')
+        nueva_generacion()
+        self.assertEqual(actualizar_sumarios([self.FECHA, self.FECHA + datetime.timedelta(days=1)]), 2)
+
+        self.assertNotEqual(obtener_sumario(self.FECHA)['etag'], anterior['etag'])
+        self.assertIn('Orden corregida', obtener_sumario(self.FECHA)['html'])
+        self.assertEqual(fecha_sumario(datetime.date(2025, 3, 10)), self.FECHA + datetime.timedelta(days=1))
+
+    def test_ingesta_en_otro_proceso(self):
+        anterior = obtener_sumario(self.FECHA)
+        DocumentoSimplificado.objects.create(
+            identificador='BOE-A-2025-00100', fecha_publicacion=self.FECHA, titulo='Orden de hoy',
+            departamento='Ministerio de Hacienda',
+        )
+        # La ingesta abre la generación y construye el sumario en su propia caché local
+        otra_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ingesta'}}
+        with override_settings(CACHES=otra_cache):
+            nueva_generacion()
+            actualizar_sumarios([self.FECHA])
+
+        # El proceso web no lee su instantánea anterior
+        sumario = obtener_sumario(self.FECHA)
+        self.assertEqual(sumario['total_documentos'], anterior['total_documentos'] + 1)
+        self.assertIn('Orden de hoy', sumario['html'])
+        self.assertGreater(sumario['generado'], anterior['generado'])
+
+    def test_comando_de_ingesta_construye_el_sumario(self):
+        fecha = self.FECHA + datetime.timedelta(days=1)
+        sumario_xml = (
+            '<response><status><code>200</code></status><data><sumario>'
+            '<metadatos><fecha_publicacion>20250308</fecha_publicacion></metadatos>'
+            '<diario><seccion><departamento><epigrafe><item>'
+            '<identificador>BOE-A-2025-00200</identificador><titulo>Orden del sábado</titulo>'
+            '</item></epigrafe></departamento></seccion></diario></sumario></data></response>'
+        )
+        generacion = generacion_datos()
+        with mock.patch('boe_analisis.management.commands.getNewInfo_enhanced.obtener_sumario_boe',
+                        return_value=sumario_xml):
+            call_command('getNewInfo_enhanced', start='2025-03-08', days=1)
+
+        self.assertGreater(generacion_datos(), generacion)
+        # El sumario ya está construido: la primera visita no lo genera
+        sumario = cache.get(clave_sumario(fecha, generacion_datos()))
+        self.assertIsNotNone(sumario)
+        self.assertIn('Orden del sábado', sumario['html'])
+
+    def test_respuesta_condicional(self):
+        sumario = obtener_sumario(self.FECHA)
+        crear = lambda: HttpResponse(sumario['json'], content_type='application/json')
+
+        respuesta = respuesta_sumario(RequestFactory().get('/'), sumario, crear)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('public', respuesta['Cache-Control'])
+        etag = respuesta['ETag']
+
+        respuesta = respuesta_sumario(RequestFactory().get('/', HTTP_IF_NONE_MATCH=etag), sumario, crear)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta['ETag'], etag)
+        respuesta = respuesta_sumario(
+            RequestFactory().get('/', HTTP_IF_MODIFIED_SINCE=respuesta['Last-Modified']), sumario, crear
+        )
+        self.assertEqual(respuesta.status_code, 304)
+
+        # La página de cada usuario es una variante privada con su propio ETag
+        respuesta = respuesta_sumario(RequestFactory().get('/', HTTP_IF_NONE_MATCH=etag), sumario, crear, 'u1')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('private', respuesta['Cache-Control'])
+        self.assertIn('Cookie', respuesta['Vary'])
+
+
+class RespuestasApiTest(TestCase):
+    """Validación condicional y compresión de las respuestas de la API (utils_http)"""
+
+    def setUp(self):
+        cache.clear()
+        self.llamadas = 0
+
+    def vista(self, request):
+        self.llamadas += 1
+        return respuesta_json({'documentos': [{'identificador': f'BOE-A-2025-{i:05d}'} for i in range(100)]})
+
+    def test_volcar_json(self):
+        datos = json.loads(volcar_json({
+            'fecha': datetime.date(2025, 3, 7), 'importe': Decimal('1.50'), 'titulo': 'Resolución'
+        }))
+        self.assertEqual(datos, {'fecha': '2025-03-07', 'importe': '1.50', 'titulo': 'Resolución'})
+
+    def test_304_hasta_la_siguiente_generacion(self):
+        vista = api_condicional(self.vista)
+        respuesta = vista(RequestFactory().get('/api/'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(json.loads(respuesta.content)['documentos']), 100)
+        etag = respuesta['ETag']
+
+        respuesta = vista(RequestFactory().get('/api/', HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(self.llamadas, 1)
+
+        self.assertGreater(nueva_generacion(), int(etag.strip('"')[1:]))
+        respuesta = vista(RequestFactory().get('/api/', HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(self.llamadas, 2)
+
+    def test_cachear_por_generacion(self):
+        vista = api_condicional(cachear=True)(self.vista)
+        primera = vista(RequestFactory().get('/api/?pagina=1'))
+        self.assertEqual(vista(RequestFactory().get('/api/?pagina=1')).content, primera.content)
+        self.assertEqual(self.llamadas, 1)
+        vista(RequestFactory().get('/api/?pagina=2'))
+        self.assertEqual(self.llamadas, 2)
+
+        nueva_generacion()
+        vista(RequestFactory().get('/api/?pagina=1'))
+        self.assertEqual(self.llamadas, 3)
+
+    def test_compresion(self):
+        vista = api_condicional(self.vista)
+        respuesta = vista(RequestFactory().get('/api/', HTTP_ACCEPT_ENCODING='gzip, deflate'))
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertTrue(respuesta['ETag'].startswith('W/'))
+        self.assertIn('Accept-Encoding', respuesta['Vary'])
+        self.assertEqual(len(json.loads(zlib.decompress(respuesta.content, 16 + zlib.MAX_WBITS))['documentos']), 100)
+
+        # Un ETag débil también vale para revalidar
+        respuesta = vista(RequestFactory().get('/api/', HTTP_IF_NONE_MATCH=respuesta['ETag']))
+        self.assertEqual(respuesta.status_code, 304)
+
+        # Sin Accept-Encoding, o con cuerpos pequeños, no se comprime
+        self.assertFalse(vista(RequestFactory().get('/api/?otra=1')).has_header('Content-Encoding'))
+        pequena = api_condicional(lambda request: respuesta_json({'success': True}))
+        respuesta = pequena(RequestFactory().get('/api/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertFalse(respuesta.has_header('Content-Encoding'))
+
+    def test_post_y_errores_sin_validacion(self):
+        vista = api_condicional(self.vista)
+        respuesta = vista(RequestFactory().post('/api/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertFalse(respuesta.has_header('ETag'))
+
+        error = api_condicional(lambda request: respuesta_json({'error': 'parámetro inválido'}, status=400))
+        respuesta = error(RequestFactory().get('/api/'))
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(respuesta.has_header('ETag'))
+
+    def test_generacion_estable(self):
+        generacion = generacion_datos()
+        self.assertEqual(generacion_datos(), generacion)
+        self.assertEqual(nueva_generacion(), generacion_datos())
+        self.assertGreater(nueva_generacion(), generacion)
+
+    def test_generacion_compartida_entre_procesos(self):
+        vista = api_condicional(self.vista)
+        etag = vista(RequestFactory().get('/api/'))['ETag']
+
+        # La ingesta corre en otro proceso, con su propia caché local
+        otra_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ingesta'}}
+        with override_settings(CACHES=otra_cache):
+            nueva_generacion()
+
+        respuesta = vista(RequestFactory().get('/api/', HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+        # Y tampoco depende de lo que haya en la caché del proceso web
+        cache.clear()
+        self.assertEqual(vista(RequestFactory().get('/api/', HTTP_IF_NONE_MATCH=respuesta['ETag'])).status_code, 304)
+
+    def test_recalculos_abren_generacion(self):
+        for comando in ('recalcular_cubo', 'recalcular_facetas'):
+            with self.subTest(comando=comando):
+                generacion = generacion_datos()
+                call_command(comando, stdout=io.StringIO())
+                self.assertGreater(generacion_datos(), generacion)
+
+
+class ExportacionTest(TestCase):
+    """Exportación masiva de documentos por trozos (utils_exportacion)"""
+
+    def setUp(self):
+        for i in range(5):
+            DocumentoSimplificado.objects.create(
+                identificador=f'BOE-A-2025-{i:05d}', fecha_publicacion=datetime.date(2025, 3, 3 + i),
+                titulo=f'Resolución {i}, "con comillas"', departamento='Ministerio de Hacienda',
+            )
+        guardar_textos({'BOE-A-2025-00001': 'Artículo 1. Objeto.', 'BOE-A-2025-00003': 'Artículo único.'})
+
+    def exportar(self, formato, **kwargs):
+        return b''.join(exportar_documentos(formato, lote=2, **kwargs))
+
+    def test_ndjson(self):
+        filas = [json.loads(linea) for linea in self.exportar('ndjson').splitlines()]
+        self.assertEqual([fila['identificador'] for fila in filas], [f'BOE-A-2025-{i:05d}' for i in range(5)])
+        self.assertEqual(list(filas[0]), list(CAMPOS_EXPORTACION))
+        self.assertEqual(filas[1]['fecha_publicacion'], '2025-03-04')
+        self.assertEqual(filas[1]['longitud_texto'], len('Artículo 1. Objeto.'))
+
+    def test_csv_con_texto(self):
+        filas = list(csv.DictReader(io.StringIO(self.exportar('csv', incluir_texto=True).decode('utf-8'))))
+        self.assertEqual(len(filas), 5)
+        self.assertEqual(filas[0]['titulo'], 'Resolución 0, "con comillas"')
+        self.assertEqual(filas[1]['texto'], 'Artículo 1. Objeto.')
+        self.assertEqual(filas[2]['texto'], '')
+
+    def test_lectura_por_lotes(self):
+        # Una consulta para los documentos y otra por lote con textos (el último lote no tiene)
+        with self.assertNumQueries(1 + 2):
+            trozos = list(exportar_documentos('ndjson', incluir_texto=True, lote=2))
+        self.assertEqual(len(trozos), 3)
+        self.assertEqual(json.loads(trozos[1].splitlines()[1])['texto'], 'Artículo único.')
+
+    def test_filtros(self):
+        filas = self.exportar('ndjson', desde=datetime.date(2025, 3, 4), hasta=datetime.date(2025, 3, 5)).splitlines()
+        self.assertEqual([json.loads(fila)['identificador'] for fila in filas], ['BOE-A-2025-00001', 'BOE-A-2025-00002'])
+
+        corte = timezone.now()
+        self.assertEqual(self.exportar('ndjson', cambiados_desde=corte), b'')
+        guardar_textos({'BOE-A-2025-00004': 'Texto nuevo.'})
+        documento = DocumentoSimplificado.objects.get(identificador='BOE-A-2025-00000')
+        documento.titulo = 'Resolución corregida'
+        documento.save()
+        filas = self.exportar('ndjson', cambiados_desde=corte).splitlines()
+        self.assertEqual([json.loads(fila)['identificador'] for fila in filas], ['BOE-A-2025-00000', 'BOE-A-2025-00004'])
+
+    def test_parametros(self):
+        self.assertEqual(interpretar_momento('2025-03-07', 'cambiados_desde').date(), datetime.date(2025, 3, 7))
+        with self.assertRaises(ValueError):
+            interpretar_momento('07/03/2025', 'cambiados_desde')
+        with self.assertRaises(ValueError):
+            exportar_documentos('xlsx')
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow no está instalado')
+    def test_parquet(self):
+        import pyarrow.parquet
+        tabla = pyarrow.parquet.read_table(io.BytesIO(self.exportar('parquet', incluir_texto=True)))
+        self.assertEqual(tabla.num_rows, 5)
+        self.assertEqual(pyarrow.parquet.ParquetFile(io.BytesIO(self.exportar('parquet'))).num_row_groups, 3)
+        self.assertEqual(tabla.column('texto').to_pylist()[1], 'Artículo 1. Objeto.')
+        self.assertEqual(tabla.column('fecha_publicacion').to_pylist()[0], datetime.date(2025, 3, 3))
+
+    def test_vista_y_comando(self):
+        from .views_api import api_exportar
+        respuesta = api_exportar(RequestFactory().get('/api/exportar/', {'formato': 'csv', 'desde': '2025-03-06'}))
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(b''.join(respuesta.streaming_content).splitlines()), 1 + 2)
+        self.assertEqual(api_exportar(RequestFactory().get('/api/exportar/', {'desde': 'ayer'})).status_code, 400)
+
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = os.path.join(directorio, 'documentos.ndjson')
+            call_command('exportar_documentos', '--salida', salida, '--hasta', '2025-03-04', stdout=io.StringIO())
+            with open(salida, 'rb') as fichero:
+                self.assertEqual(len(fichero.read().splitlines()), 2)
@@ -38,6 +38,10 @@ urlpatterns = [
     path('api/semantica/directa/', views_api.api_busqueda_semantica_directa, name='api_semantica_directa'),
     path('api/docs/', views.api_docs, name='api_docs'),  
     path('api/diagnostico/', views_api.api_diagnostico_qdrant, name='api_diagnostico'),
+    path('api/referencias/<str:identificador>/', views_api.api_referencias, name='api_referencias'),
+    path('api/secciones/<str:identificador>/', views_api.api_secciones, name='api_secciones'),
+    path('api/exportar/', views_api.api_exportar, name='api_exportar'),
+    path('metrics', views_api.metricas, name='metricas'),
     path('api/tavily/', views_api.api_tavily_search, name='api_tavily'),
     path('api/asistente/', views_api.api_asistente_mistral, name='api_asistente'),
     path('asistente-ia/', views.asistente_ia, name='asistente_ia'),
@@ -54,6 +58,7 @@ urlpatterns = [
     path('v1/legislaturas/materia/', views.top_materias),
     path('v1/years/', views.years),
     re_path(r'^v1/years/materia/(?P<materia>\d+)$', views.years),
+    path('v1/estadisticas/', views.estadisticas_cubo),
     path('boe_analisis/procesar_consulta_ia/', views.procesar_consulta_ia, name='procesar_consulta_ia'),
     path('procesar_consulta_ia/', views.procesar_consulta_ia, name='procesar_consulta_ia_alt'),
     path('test/', views.test_endpoint, name='test_endpoint'),
@@ -0,0 +1,177 @@
+"""
+Evaluación de alertas de usuario sobre documentos del BOE.
+Reúne el cálculo de coincidencias y relevancia que usan el comando
+procesar_alertas_enhanced (por lotes de documentos) y la cola de tareas
+(documento a documento, ver utils_tareas).
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models_alertas import AlertaUsuario, CategoriaAlerta, NotificacionAlerta
+from .models_simplified import DocumentoSimplificado
+
+
+def palabras_categorias() -> Dict[int, List[str]]:
+    """
+    Carga las palabras clave de todas las categorías de alertas.
+
+    Returns:
+        Dict[int, List[str]]: Identificador de categoría -> palabras clave en minúsculas
+    """
+    categorias = {}
+    for categoria_id, palabras in CategoriaAlerta.objects.exclude(palabras_clave__isnull=True).values_list('id', 'palabras_clave'):
+        palabras = [p.strip().lower() for p in palabras.split(',') if p.strip()]
+        if palabras:
+            categorias[categoria_id] = palabras
+    return categorias
+
+
+def palabras_alerta(alerta: AlertaUsuario, categorias: Optional[Dict[int, List[str]]] = None) -> List[str]:
+    """
+    Obtiene las palabras clave de una alerta, incluidas las de sus categorías si se indican.
+
+    Args:
+        alerta: Alerta del usuario
+        categorias: Resultado de palabras_categorias() (None para ignorar las categorías)
+
+    Returns:
+        List[str]: Palabras clave en minúsculas
+    """
+    palabras_clave = [palabra.strip().lower() for palabra in alerta.palabras_clave.split(',') if palabra.strip()]
+    if categorias is not None:
+        for categoria in alerta.categorias.all():
+            palabras_clave.extend(categorias.get(categoria.id, []))
+        # Eliminar duplicados
+        palabras_clave = list(set(palabras_clave))
+    return palabras_clave
+
+
+def departamentos_alerta(alerta: AlertaUsuario) -> List[str]:
+    """Departamentos (en minúsculas) a los que se limita una alerta; lista vacía si no se limita"""
+    if not alerta.departamentos:
+        return []
+    return [dep.strip().lower() for dep in alerta.departamentos.split(',') if dep.strip()]
+
+
+def documento_en_departamentos(documento: DocumentoSimplificado, departamentos: List[str]) -> bool:
+    """
+    Comprueba si un documento pertenece a alguno de los departamentos de una alerta,
+    con el mismo criterio que el filtro de base de datos (subcadena o código numérico).
+    """
+    if not departamentos:
+        return True
+    nombre = (documento.departamento or '').lower()
+    for dep in departamentos:
+        if dep in nombre or (dep.isdigit() and documento.codigo_departamento == dep):
+            return True
+    return False
+
+
+def preparar_texto_documento(documento: DocumentoSimplificado, terminos: Optional[Dict[str, List[str]]] = None) -> str:
+    """
+    Prepara el texto completo del documento para buscar coincidencias.
+    Las materias y palabras clave se leen de las tablas normalizadas (terminos).
+    """
+    terminos = terminos or {}
+    texto_completo = f"{documento.titulo.lower()} "
+
+    if documento.texto:
+        texto_completo += f"{documento.texto.lower()} "
+
+    if documento.departamento:
+        texto_completo += f"{documento.departamento.lower()} "
+
+    if terminos.get('materias'):
+        texto_completo += f"{', '.join(terminos['materias']).lower()} "
+
+    if terminos.get('palabras_clave'):
+        texto_completo += f"{', '.join(terminos['palabras_clave']).lower()} "
+
+    return texto_completo
+
+
+def calcular_coincidencias(texto_completo: str, palabras_clave: Iterable[str]) -> Tuple[int, Set[str]]:
+    """
+    Calcula las coincidencias de palabras clave en el texto
+    """
+    coincidencias = 0
+    palabras_encontradas = set()
+
+    for palabra in palabras_clave:
+        if len(palabra) < 3:  # Ignorar palabras muy cortas
+            continue
+
+        # Usar expresión regular para encontrar palabras completas
+        patron = r'\b' + re.escape(palabra) + r'\b'
+        if re.search(patron, texto_completo):
+            num_coincidencias = len(re.findall(patron, texto_completo))
+            coincidencias += num_coincidencias
+            palabras_encontradas.add(palabra)
+
+    return coincidencias, palabras_encontradas
+
+
+def calcular_relevancia(coincidencias: int, palabras_encontradas: Set[str], palabras_clave: List[str]) -> float:
+    """
+    Calcula la relevancia del documento para la alerta
+    """
+    # Fórmula mejorada: considera tanto el número de palabras clave distintas que coinciden
+    # como el número total de coincidencias
+    factor_palabras_distintas = len(palabras_encontradas) / len(palabras_clave)
+    factor_frecuencia = min(1.0, coincidencias / (len(palabras_clave) * 3))
+
+    # Combinar ambos factores (70% importancia a palabras distintas, 30% a frecuencia)
+    relevancia = (factor_palabras_distintas * 0.7) + (factor_frecuencia * 0.3)
+
+    return relevancia
+
+
+def crear_notificacion(alerta: AlertaUsuario, documento: DocumentoSimplificado, relevancia: float,
+                       palabras_encontradas: Set[str]) -> NotificacionAlerta:
+    """
+    Crea una notificación para la alerta y el documento
+    """
+    return NotificacionAlerta.objects.create(
+        alerta=alerta,
+        documento=documento.identificador,
+        titulo_documento=documento.titulo,
+        fecha_documento=documento.fecha_publicacion,
+        relevancia=relevancia,
+        estado='pendiente',
+        resumen=f"Palabras clave encontradas: {', '.join(palabras_encontradas)}"
+    )
+
+
+def evaluar_documento(documento: DocumentoSimplificado, terminos: Optional[Dict[str, List[str]]] = None,
+                      usar_categorias: bool = True) -> List[NotificacionAlerta]:
+    """
+    Evalúa todas las alertas activas sobre un documento y crea las notificaciones que correspondan.
+
+    Args:
+        documento: Documento a evaluar
+        terminos: Materias y palabras clave normalizadas del documento
+        usar_categorias: Incluir las palabras clave de las categorías de cada alerta
+
+    Returns:
+        List[NotificacionAlerta]: Notificaciones creadas
+    """
+    alertas = AlertaUsuario.objects.filter(activa=True).exclude(
+        notificaciones__documento=documento.identificador
+    ).prefetch_related('categorias')
+    categorias = palabras_categorias() if usar_categorias else None
+    texto_completo = preparar_texto_documento(documento, terminos)
+
+    notificaciones = []
+    for alerta in alertas:
+        palabras_clave = palabras_alerta(alerta, categorias)
+        if not palabras_clave or not documento_en_departamentos(documento, departamentos_alerta(alerta)):
+            continue
+
+        coincidencias, palabras_encontradas = calcular_coincidencias(texto_completo, palabras_clave)
+        if not coincidencias:
+            continue
+
+        relevancia = calcular_relevancia(coincidencias, palabras_encontradas, palabras_clave)
+        if relevancia >= alerta.umbral_relevancia:
+            notificaciones.append(crear_notificacion(alerta, documento, relevancia, palabras_encontradas))
+    return notificaciones
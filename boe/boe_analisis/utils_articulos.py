@@ -0,0 +1,258 @@
+"""
+Segmentación de los documentos del BOE por artículos.
+El elemento <texto> del XML se recorre una sola vez: cada párrafo pasa a ser
+una línea del texto guardado y los párrafos de encabezado (clases "titulo",
+"capitulo", "articulo", "anexo"...) abren una sección con su posición en ese
+texto. Las secciones se guardan como filas (SeccionDocumento), de modo que
+se puede localizar un artículo y trabajar solo con su fragmento del texto.
+"""
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+
+from .models_articulos import SeccionDocumento
+from .utils_diff import PATRON_ENCABEZADO, normalizar_encabezado
+from .utils_textos import cargar_textos
+
+logger = logging.getLogger(__name__)
+
+# Nivel de anidamiento de las secciones contenedoras; el resto son hojas
+NIVELES = {
+    SeccionDocumento.ANEXO: 0,
+    SeccionDocumento.TITULO: 1,
+    SeccionDocumento.CAPITULO: 2,
+    SeccionDocumento.SECCION: 3,
+}
+
+# Clase del párrafo en el XML del BOE -> (tipo de sección, ¿continúa el encabezado anterior?)
+CLASES_ENCABEZADO = {
+    'titulo': (SeccionDocumento.TITULO, False),
+    'titulo_num': (SeccionDocumento.TITULO, False),
+    'titulo_tit': (SeccionDocumento.TITULO, True),
+    'capitulo': (SeccionDocumento.CAPITULO, False),
+    'capitulo_num': (SeccionDocumento.CAPITULO, False),
+    'capitulo_tit': (SeccionDocumento.CAPITULO, True),
+    'seccion': (SeccionDocumento.SECCION, False),
+    'seccion_num': (SeccionDocumento.SECCION, False),
+    'seccion_tit': (SeccionDocumento.SECCION, True),
+    'articulo': (SeccionDocumento.ARTICULO, False),
+    'anexo': (SeccionDocumento.ANEXO, False),
+    'anexo_num': (SeccionDocumento.ANEXO, False),
+    'anexo_tit': (SeccionDocumento.ANEXO, True),
+}
+
+# Encabezados de títulos, capítulos y secciones en párrafos sin clase
+PATRON_DIVISION = re.compile(
+    r'^(t[íi]tulo|cap[íi]tulo|secci[óo]n)\s+([IVXLC]+\b|\d+\.?[ªº]?|preliminar|[úu]nic[oa])',
+    re.IGNORECASE
+)
+
+_TIPOS_DIVISION = {'t': SeccionDocumento.TITULO, 'c': SeccionDocumento.CAPITULO, 's': SeccionDocumento.SECCION}
+
+LONGITUD_CLAVE = 100
+LONGITUD_RUTA = 300
+
+
+def _lineas(elemento) -> Iterable[Tuple[str, str]]:
+    """Párrafos de un elemento como (clase, texto), con las tablas fila a fila"""
+    for hijo in elemento:
+        if hijo.tag == 'table':
+            for fila in hijo.iter('tr'):
+                celdas = [' '.join(''.join(celda.itertext()).split()) for celda in fila if celda.tag in ('td', 'th')]
+                if any(celdas):
+                    yield '', ' | '.join(celdas)
+        elif hijo.tag == 'p' or len(hijo) == 0:
+            yield hijo.get('class', ''), ' '.join(''.join(hijo.itertext()).split())
+        else:
+            # Bloques de cita, divisiones... se recorren párrafo a párrafo
+            if hijo.text and hijo.text.strip():
+                yield '', ' '.join(hijo.text.split())
+            yield from _lineas(hijo)
+        if hijo.tail and hijo.tail.strip():
+            yield '', ' '.join(hijo.tail.split())
+
+
+def _es_encabezado(linea: str, coincidencia) -> bool:
+    return linea[coincidencia.end():].lstrip()[:1] in ('', '.', ':', '-', '–')
+
+
+def _clasificar(clase: str, linea: str) -> Tuple[Optional[str], bool, str]:
+    """
+    Tipo de sección que abre un párrafo (None si no es un encabezado), si
+    continúa el encabezado anterior y la clave de la sección
+    """
+    if clase.startswith('firma'):
+        return SeccionDocumento.FIRMA, False, 'Firma'
+
+    if clase in CLASES_ENCABEZADO:
+        tipo, continua = CLASES_ENCABEZADO[clase]
+    elif not clase:
+        # Documentos sin marcado: el encabezado debe ocupar el párrafo o ir seguido de
+        # un punto ("Artículo 3. Definiciones."), no de texto ("Artículo 3 de la Ley...")
+        tipo, continua = None, False
+        articulo, division = PATRON_ENCABEZADO.match(linea), PATRON_DIVISION.match(linea)
+        if articulo and _es_encabezado(linea, articulo):
+            tipo = SeccionDocumento.ARTICULO
+        elif division and _es_encabezado(linea, division):
+            tipo = _TIPOS_DIVISION[division.group(1)[0].lower()]
+        if tipo is None:
+            return None, False, ''
+    else:
+        return None, False, ''
+    if continua:
+        return tipo, True, ''
+
+    coincidencia = PATRON_ENCABEZADO.match(linea)
+    if coincidencia and tipo in (SeccionDocumento.ARTICULO, SeccionDocumento.ANEXO):
+        clave = normalizar_encabezado(coincidencia.group(1))
+        if clave.startswith('Disposici'):
+            tipo = SeccionDocumento.DISPOSICION
+        elif clave.startswith('Anexo'):
+            tipo = SeccionDocumento.ANEXO
+    elif PATRON_DIVISION.match(linea):
+        clave = normalizar_encabezado(PATRON_DIVISION.match(linea).group(0))
+    else:
+        # Encabezado marcado pero con un formato desconocido: hasta el primer punto
+        clave = normalizar_encabezado(linea.split('.')[0]) or tipo
+    return tipo, False, clave[:LONGITUD_CLAVE]
+
+
+def segmentar_xml(elemento_texto) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Convierte el elemento <texto> de un documento del BOE en texto y secciones.
+
+    Args:
+        elemento_texto: Elemento <texto> del XML del documento
+
+    Returns:
+        Tuple: Texto (un párrafo por línea) y secciones en orden del documento, con
+            'orden', 'tipo', 'clave', 'titulo', 'ruta', 'inicio' y 'fin' (posiciones en el texto)
+    """
+    lineas, secciones = [], []
+    abiertas = []  # Contenedores abiertos, del más externo al más interno
+    hoja = None
+    claves = set()
+    posicion = 0
+
+    def cerrar(seccion, final):
+        seccion['fin'] = max(final - 1, seccion['inicio'])  # Sin el salto de línea final
+
+    for clase, linea in _lineas(elemento_texto):
+        if not linea:
+            continue
+        tipo, continua, clave = _clasificar(clase, linea)
+
+        if tipo and continua and secciones and secciones[-1]['tipo'] == tipo:
+            # Rúbrica del título, capítulo o anexo en el párrafo siguiente al número
+            secciones[-1]['titulo'] += f' {linea}'
+            tipo = None
+        elif tipo == SeccionDocumento.FIRMA and hoja and hoja['tipo'] == SeccionDocumento.FIRMA:
+            tipo = None
+
+        if tipo and not continua:
+            if hoja:
+                cerrar(hoja, posicion)
+                hoja = None
+            # Un contenedor cierra los de su nivel o inferiores; una disposición, los que
+            # no son anexos (sus disposiciones propias); la firma, todos
+            if tipo in NIVELES:
+                limite = NIVELES[tipo]
+            elif tipo == SeccionDocumento.DISPOSICION:
+                limite = 1
+            elif tipo == SeccionDocumento.FIRMA:
+                limite = 0
+            else:
+                limite = None
+            while limite is not None and abiertas and NIVELES[abiertas[-1]['tipo']] >= limite:
+                cerrar(abiertas.pop(), posicion)
+
+            repetida, n = clave, 2
+            while repetida in claves:
+                repetida, n = f'{clave} ({n})'[:LONGITUD_CLAVE], n + 1
+            claves.add(repetida)
+            seccion = {
+                'orden': len(secciones), 'tipo': tipo, 'clave': repetida, 'titulo': linea,
+                'ruta': ' > '.join(abierta['clave'] for abierta in abiertas)[:LONGITUD_RUTA],
+                'inicio': posicion, 'fin': None,
+            }
+            secciones.append(seccion)
+            if tipo in NIVELES:
+                abiertas.append(seccion)
+            else:
+                hoja = seccion
+        elif not secciones and not lineas:
+            secciones.append({
+                'orden': 0, 'tipo': SeccionDocumento.PREAMBULO, 'clave': 'Preámbulo', 'titulo': '',
+                'ruta': '', 'inicio': 0, 'fin': None,
+            })
+            hoja = secciones[0]
+            claves.add('Preámbulo')
+
+        lineas.append(linea)
+        posicion += len(linea) + 1
+
+    for seccion in secciones:
+        if seccion['fin'] is None:
+            cerrar(seccion, posicion)
+    return '\n'.join(lineas), secciones
+
+
+def guardar_secciones(secciones_por_documento: Dict[str, List[Dict[str, Any]]], lote: int = 1000) -> int:
+    """
+    Sustituye en bloque las secciones de los documentos cuyo texto se ha descargado.
+
+    Args:
+        secciones_por_documento: Secciones de segmentar_xml por identificador
+        lote: Filas por inserción
+
+    Returns:
+        int: Número de secciones guardadas
+    """
+    if not secciones_por_documento:
+        return 0
+    filas = [
+        SeccionDocumento(documento_id=identificador, **seccion)
+        for identificador, secciones in secciones_por_documento.items()
+        for seccion in secciones
+    ]
+    with transaction.atomic():
+        SeccionDocumento.objects.filter(documento_id__in=list(secciones_por_documento)).delete()
+        SeccionDocumento.objects.bulk_create(filas, batch_size=lote)
+    return len(filas)
+
+
+def secciones_documento(identificador: str, tipos: Optional[Iterable[str]] = None):
+    """
+    Estructura de un documento en orden.
+
+    Args:
+        identificador: Identificador del BOE del documento
+        tipos: Tipos de sección a incluir (todos por defecto)
+
+    Returns:
+        QuerySet: Secciones del documento
+    """
+    secciones = SeccionDocumento.objects.filter(documento_id=identificador).order_by('orden')
+    if tipos:
+        secciones = secciones.filter(tipo__in=list(tipos))
+    return secciones
+
+
+def texto_seccion(identificador: str, clave: str) -> Optional[str]:
+    """
+    Texto de una sección (por ejemplo, "Artículo 3").
+
+    Args:
+        identificador: Identificador del BOE del documento
+        clave: Clave de la sección
+
+    Returns:
+        str: Texto de la sección o None si el documento no la tiene
+    """
+    seccion = SeccionDocumento.objects.filter(documento_id=identificador, clave=clave).values('inicio', 'fin').first()
+    if seccion is None:
+        return None
+    texto = cargar_textos([identificador]).get(identificador)
+    return texto[seccion['inicio']:seccion['fin']] if texto is not None else None
@@ -0,0 +1,495 @@
+"""
+Suite de benchmarks reproducibles que se ejecuta sin conexión.
+Parte del sumario incluido en el repositorio (sumario_boe_20250307.xml) y de un
+corpus sintético escalado a partir de él, y mide la ingesta, la generación de
+embeddings, las búsquedas por palabras clave e híbrida y la evaluación de
+alertas. Los resultados se guardan en JSON y se comparan con una referencia.
+"""
+import copy
+import datetime
+import json
+import logging
+import platform
+import random
+import re
+import statistics
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from io import StringIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from .models_alertas import AlertaUsuario, NotificacionAlerta
+from .models_simplified import DocumentoSimplificado
+from .utils_textos import cargar_textos, guardar_textos_pendientes
+
+logger = logging.getLogger(__name__)
+
+# Sumario real incluido en el repositorio
+RUTA_SUMARIO = Path(__file__).resolve().parents[2] / 'sumario_boe_20250307.xml'
+FECHA_SUMARIO = datetime.date(2025, 3, 7)
+
+# Referencia con la que se comparan los resultados
+RUTA_REFERENCIA = Path(__file__).resolve().parent / 'benchmarks' / 'referencia.json'
+
+# Desviación relativa admitida respecto a la referencia antes de considerar una regresión
+TOLERANCIA = 0.20
+
+CONSULTAS = [
+    'recurso de inconstitucionalidad',
+    'subvenciones para entidades locales',
+    'oposiciones cuerpo de funcionarios',
+    'convenio colectivo',
+    'protección de datos personales',
+    'ayudas a la vivienda',
+    'medio ambiente y cambio climático',
+    'nombramientos de catedráticos de universidad',
+]
+
+
+class CodificadorHash:
+    """
+    Codificador determinista que sustituye al modelo de embeddings cuando se
+    trabaja sin conexión: bolsa de palabras con hashing y normalización L2.
+    Expone el mismo método encode que SentenceTransformer.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _vector(self, texto: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for palabra in re.findall(r'\w+', texto.lower()):
+            hash_palabra = zlib.crc32(palabra.encode('utf-8'))
+            vector[hash_palabra % self.dimension] += 1.0 if hash_palabra & 0x80000000 else -1.0
+        norma = np.linalg.norm(vector)
+        return vector / norma if norma else vector
+
+    def encode(self, textos, batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(textos, str):
+            return self._vector(textos)
+        return np.stack([self._vector(texto) for texto in textos])
+
+
+def generar_sumario_sintetico(escala: int = 1, semilla: int = 0, ruta: Path = RUTA_SUMARIO) -> bytes:
+    """
+    Genera un sumario sintético replicando los items del sumario real.
+    Cada copia recibe identificadores nuevos y títulos con las palabras barajadas.
+
+    Args:
+        escala: Número de copias de los items del sumario original
+        semilla: Semilla del generador aleatorio (resultados reproducibles)
+        ruta: Sumario XML de partida
+
+    Returns:
+        bytes: XML del sumario sintético
+    """
+    rng = random.Random(semilla)
+    arbol = ET.parse(ruta)
+    # Los items cuelgan de epígrafes o directamente de departamentos
+    padres = [elemento for elemento in arbol.getroot().iter() if elemento.find('item') is not None]
+    for padre in padres:
+        originales = list(padre.findall('item'))
+        for copia in range(1, escala):
+            for item in originales:
+                nuevo = copy.deepcopy(item)
+                identificador = nuevo.find('identificador')
+                # Mismo formato y longitud que los identificadores reales, con otro año
+                partes = identificador.text.split('-')
+                partes[2] = str(int(partes[2]) - copia)
+                identificador.text = '-'.join(partes)
+                titulo = nuevo.find('titulo')
+                palabras = titulo.text.split()
+                rng.shuffle(palabras)
+                titulo.text = ' '.join(palabras)
+                padre.append(nuevo)
+    return ET.tostring(arbol.getroot(), encoding='utf-8', xml_declaration=True)
+
+
+def generar_textos(semilla: int = 0, palabras_por_texto: int = 300):
+    """
+    Asigna a los documentos cargados un texto sintético construido con el
+    vocabulario de los títulos, para disponer de cuerpo en las búsquedas.
+
+    Args:
+        semilla: Semilla del generador aleatorio
+        palabras_por_texto: Longitud aproximada de cada texto
+    """
+    rng = random.Random(semilla)
+    documentos = list(DocumentoSimplificado.objects.order_by('identificador').only('identificador', 'titulo', 'longitud_texto'))
+    vocabulario = sorted({palabra for documento in documentos for palabra in documento.titulo.split()})
+    for documento in documentos:
+        documento.texto = documento.titulo + ' ' + ' '.join(rng.choices(vocabulario, k=palabras_por_texto))
+    DocumentoSimplificado.objects.bulk_update(documentos, ['longitud_texto'], batch_size=500)
+    guardar_textos_pendientes(documentos)
+
+
+def _latencias(tiempos: List[float]) -> Dict[str, float]:
+    """Media y percentiles 50 y 95 de una lista de duraciones, en milisegundos"""
+    ordenados = sorted(tiempos)
+    return {
+        'media_ms': statistics.fmean(ordenados) * 1000,
+        'p50_ms': ordenados[len(ordenados) // 2] * 1000,
+        'p95_ms': ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))] * 1000,
+    }
+
+
+def _cronometrar(funcion: Callable, repeticiones: int) -> List[float]:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def medir_ingesta(sumario_xml: bytes, fecha: datetime.date = FECHA_SUMARIO) -> Dict[str, float]:
+    """
+    Mide el parseo del sumario y su carga completa con el comando cargar_sumario_boe.
+
+    Args:
+        sumario_xml: XML del sumario
+        fecha: Fecha de publicación asignada a los documentos
+
+    Returns:
+        Dict[str, float]: Documentos por segundo en el parseo y en la ingesta
+    """
+    inicio = time.perf_counter()
+    total = sum(1 for _ in ET.fromstring(sumario_xml).iter('item'))
+    parseo = time.perf_counter() - inicio
+
+    with tempfile.NamedTemporaryFile(suffix='.xml') as archivo:
+        archivo.write(sumario_xml)
+        archivo.flush()
+        inicio = time.perf_counter()
+        call_command('cargar_sumario_boe', fecha=fecha.isoformat(), archivo=archivo.name, stdout=StringIO())
+        ingesta = time.perf_counter() - inicio
+
+    return {
+        'ingesta.documentos': total,
+        'ingesta.parseo_docs_por_segundo': total / parseo,
+        'ingesta.carga_docs_por_segundo': total / ingesta,
+    }
+
+
+def medir_embeddings(qdrant, textos: Sequence[str], tamano_lote: int = 32) -> Dict[str, float]:
+    """
+    Mide la generación de embeddings texto a texto (sin caché) y por lotes.
+
+    Args:
+        qdrant: Instancia de QdrantBOE
+        textos: Textos a codificar
+        tamano_lote: Tamaño de lote para la codificación por lotes
+
+    Returns:
+        Dict[str, float]: Textos por segundo en cada modo
+    """
+    qdrant._generar_embedding_cached.cache_clear()
+    inicio = time.perf_counter()
+    for texto in textos:
+        qdrant.generar_embedding(texto)
+    individual = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    qdrant.model.encode(list(textos), batch_size=tamano_lote)
+    lotes = time.perf_counter() - inicio
+
+    return {
+        'embeddings.individual_textos_por_segundo': len(textos) / individual,
+        'embeddings.lotes_textos_por_segundo': len(textos) / lotes,
+    }
+
+
+def medir_backends(textos: Sequence[str], directorio_onnx: str, repeticiones: int = 50,
+                   tamano_lote: int = 32) -> Dict[str, float]:
+    """
+    Compara los backends de inferencia del modelo de embeddings (PyTorch y ONNX
+    int8): latencia de una consulta, velocidad por lotes y paridad de los vectores.
+
+    Args:
+        textos: Textos a codificar
+        directorio_onnx: Directorio del modelo exportado con exportar_onnx
+        repeticiones: Consultas individuales medidas en cada backend
+        tamano_lote: Tamaño de lote para la codificación por lotes
+
+    Returns:
+        Dict[str, float]: Métricas de cada backend y similitud coseno mínima entre ambos
+    """
+    from .utils_embeddings import cargar_modelo_local, similitud_minima
+
+    textos = list(textos)
+    consultas = [f'{consulta} {n}' for n, consulta in enumerate(CONSULTAS * (repeticiones // len(CONSULTAS) + 1))]
+    metricas, vectores = {}, {}
+    for backend in ('torch', 'onnx'):
+        modelo = cargar_modelo_local(backend=backend, directorio_onnx=directorio_onnx)
+        modelo.encode(consultas[:tamano_lote], batch_size=tamano_lote)  # Calentamiento
+
+        pendientes = iter(consultas)
+        tiempos = _cronometrar(lambda: modelo.encode(next(pendientes)), repeticiones)
+        metricas.update({f'backend_{backend}.consulta_{clave}': valor for clave, valor in _latencias(tiempos).items()})
+
+        inicio = time.perf_counter()
+        vectores[backend] = modelo.encode(textos, batch_size=tamano_lote)
+        metricas[f'backend_{backend}.lotes_textos_por_segundo'] = len(textos) / (time.perf_counter() - inicio)
+
+    metricas['backend_onnx.similitud_coseno_minima'] = similitud_minima(vectores['torch'], vectores['onnx'])
+    return metricas
+
+
+def medir_busquedas(qdrant, repeticiones: int = 20, limite: int = 10) -> Dict[str, float]:
+    """
+    Indexa los documentos en Qdrant y mide las latencias de las búsquedas
+    por palabras clave e híbrida con un conjunto fijo de consultas.
+
+    Args:
+        qdrant: Instancia de QdrantBOE (servidor local o instancia en memoria)
+        repeticiones: Número de consultas medidas en cada tipo de búsqueda
+        limite: Número de resultados por consulta
+
+    Returns:
+        Dict[str, float]: Velocidad de indexación y latencias de cada búsqueda
+    """
+    qdrant.crear_coleccion(recrear=True)
+    inicio = time.perf_counter()
+    estadisticas = qdrant.indexar_documentos()
+    indexacion = time.perf_counter() - inicio
+
+    consultas = iter(CONSULTAS * (repeticiones // len(CONSULTAS) + 1))
+    palabras_clave = _cronometrar(lambda: qdrant.buscar_por_palabras_clave(next(consultas), limite=limite), repeticiones)
+
+    # Consultas nuevas en cada repetición para no medir la caché de embeddings
+    qdrant._generar_embedding_cached.cache_clear()
+    hibridas = iter(f'{consulta} {n}' for n, consulta in enumerate(CONSULTAS * (repeticiones // len(CONSULTAS) + 1)))
+    hibrida = _cronometrar(lambda: qdrant.busqueda_hibrida(next(hibridas), limite=limite), repeticiones)
+
+    metricas = {'indexacion.docs_por_segundo': estadisticas.get('exitosos', 0) / indexacion}
+    metricas.update({f'busqueda_palabras_clave.{clave}': valor for clave, valor in _latencias(palabras_clave).items()})
+    metricas.update({f'busqueda_hibrida.{clave}': valor for clave, valor in _latencias(hibrida).items()})
+    return metricas
+
+
+def memoria_vectores(puntos: int, dimension: int, config: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Estimación de la memoria que ocupan los vectores de la colección según su esquema
+    (sin contar el grafo HNSW ni el payload).
+
+    Args:
+        puntos: Número de puntos de la colección
+        dimension: Dimensión de los vectores
+        config: Esquema de la colección (ver utils_qdrant.CONFIG_COLECCION)
+
+    Returns:
+        Dict[str, float]: Megabytes de vectores en RAM y en disco
+    """
+    originales = puntos * dimension * 4
+    bytes_cuantizados = {'int8': 1, 'binaria': 1 / 8}.get(config.get('cuantizacion'), 0)
+    cuantizados = puntos * dimension * bytes_cuantizados
+    ram = 0 if config.get('vectores_en_disco') else originales
+    disco = originales if config.get('vectores_en_disco') else 0
+    if config.get('cuantizacion_en_ram', True):
+        ram += cuantizados
+    else:
+        disco += cuantizados
+    return {'memoria.vectores_ram_mb': ram / 2 ** 20, 'memoria.vectores_disco_mb': disco / 2 ** 20}
+
+
+def medir_recall(qdrant, muestra: int = 100, k: int = 10, valores_ef: Sequence[Optional[int]] = (None,)) -> Dict[str, float]:
+    """
+    Mide el recall@k y la latencia de la búsqueda aproximada (HNSW y, si está
+    configurada, cuantización) frente a la búsqueda exacta. Las consultas son
+    los vectores de una muestra de puntos de la propia colección.
+
+    Args:
+        qdrant: Instancia de QdrantBOE con la colección ya indexada
+        muestra: Número de consultas
+        k: Resultados por consulta
+        valores_ef: Valores de hnsw_ef a evaluar (None para el valor configurado)
+
+    Returns:
+        Dict[str, float]: Recall medio y latencias de cada hnsw_ef, y memoria estimada de los vectores
+    """
+    from .utils_qdrant import COLLECTION_NAME, VECTOR_SIZE
+
+    puntos, _ = qdrant.client.scroll(COLLECTION_NAME, limit=muestra, with_payload=False, with_vectors=True)
+    consultas = [punto.vector for punto in puntos]
+    if not consultas:
+        raise ValueError(f"La colección {COLLECTION_NAME} está vacía")
+
+    def buscar(vector, parametros):
+        return {hit.id for hit in qdrant.client.search(
+            collection_name=COLLECTION_NAME, query_vector=vector, limit=k,
+            with_payload=False, search_params=parametros,
+        )}
+
+    exactas = [buscar(vector, qdrant.parametros_busqueda(exacta=True)) for vector in consultas]
+
+    metricas = {}
+    for hnsw_ef in valores_ef:
+        parametros = qdrant.parametros_busqueda(hnsw_ef)
+        tiempos, aciertos = [], []
+        for vector, exacta in zip(consultas, exactas):
+            inicio = time.perf_counter()
+            aproximada = buscar(vector, parametros)
+            tiempos.append(time.perf_counter() - inicio)
+            aciertos.append(len(aproximada & exacta) / len(exacta) if exacta else 1.0)
+
+        prefijo = f'recall.ef_{hnsw_ef or "defecto"}'
+        metricas[f'{prefijo}.recall_at_{k}'] = statistics.fmean(aciertos)
+        metricas.update({f'{prefijo}.{clave}': valor for clave, valor in _latencias(tiempos).items()})
+
+    total = qdrant.client.count(COLLECTION_NAME, exact=True).count
+    metricas.update(memoria_vectores(total, VECTOR_SIZE, qdrant.config))
+    return metricas
+
+
+def medir_alertas(numeros_alertas: Sequence[int] = (1, 10, 50), palabras_por_alerta: int = 3,
+                  semilla: int = 0) -> Dict[str, float]:
+    """
+    Mide la evaluación de alertas (procesar_alertas_enhanced) frente al número de alertas activas.
+
+    Args:
+        numeros_alertas: Números de alertas con los que se repite la medición
+        palabras_por_alerta: Palabras clave de cada alerta
+        semilla: Semilla del generador aleatorio
+
+    Returns:
+        Dict[str, float]: Pares documento-alerta evaluados por segundo para cada número de alertas
+    """
+    rng = random.Random(semilla)
+    vocabulario = sorted({
+        palabra.lower() for titulo in DocumentoSimplificado.objects.values_list('titulo', flat=True)
+        for palabra in re.findall(r'\w{6,}', titulo)
+    })
+    documentos = DocumentoSimplificado.objects.count()
+    dias = (datetime.date.today() - DocumentoSimplificado.objects.order_by('fecha_publicacion')
+            .values_list('fecha_publicacion', flat=True).first()).days + 1
+    usuario, _ = User.objects.get_or_create(username='benchmark')
+
+    metricas = {}
+    for numero in numeros_alertas:
+        AlertaUsuario.objects.bulk_create([
+            AlertaUsuario(
+                usuario=usuario, nombre=f'Alerta {n}', umbral_relevancia=0,
+                palabras_clave=', '.join(rng.sample(vocabulario, palabras_por_alerta))
+            )
+            for n in range(numero)
+        ])
+        inicio = time.perf_counter()
+        call_command('procesar_alertas_enhanced', dias=dias, stdout=StringIO())
+        duracion = time.perf_counter() - inicio
+        metricas[f'alertas.{numero}_pares_por_segundo'] = documentos * numero / duracion
+
+        NotificacionAlerta.objects.filter(alerta__usuario=usuario).delete()
+        AlertaUsuario.objects.filter(usuario=usuario).delete()
+    return metricas
+
+
+def ejecutar_benchmarks(escala: int = 1, modelo: str = 'hash', qdrant_url: Optional[str] = None,
+                        numeros_alertas: Sequence[int] = (1, 10, 50), repeticiones: int = 20,
+                        semilla: int = 0, directorio_onnx: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Ejecuta la suite completa sobre la base de datos activa (debe estar vacía).
+
+    Args:
+        escala: Factor de escala del corpus sintético respecto al sumario real
+        modelo: 'hash' (codificador determinista sin conexión), 'real' (modelo de sentence-transformers)
+            u 'onnx' (modelo exportado a ONNX)
+        qdrant_url: URL de un Qdrant local; si es None se usa una instancia en memoria
+        numeros_alertas: Números de alertas para la medición de alertas
+        repeticiones: Consultas medidas en cada tipo de búsqueda
+        semilla: Semilla de los generadores aleatorios
+        directorio_onnx: Directorio del modelo ONNX; si se indica, se comparan también los backends
+
+    Returns:
+        Dict[str, Any]: 'metadatos' de la ejecución y 'metricas' planas (nombre -> valor)
+    """
+    from .utils_qdrant import VECTOR_SIZE, QdrantBOE
+
+    metricas = medir_ingesta(generar_sumario_sintetico(escala, semilla))
+    generar_textos(semilla)
+
+    if modelo == 'hash':
+        codificador = CodificadorHash(VECTOR_SIZE)
+    else:
+        from .utils_embeddings import cargar_modelo_local
+        codificador = cargar_modelo_local(backend='onnx' if modelo == 'onnx' else 'torch', directorio_onnx=directorio_onnx)
+    qdrant = QdrantBOE(url=qdrant_url or ':memory:', modelo=codificador)
+    identificadores = list(DocumentoSimplificado.objects.order_by('identificador').values_list('identificador', flat=True)[:500])
+    textos = cargar_textos(identificadores)
+    textos = [textos[identificador] for identificador in identificadores if identificador in textos]
+    metricas.update(medir_embeddings(qdrant, textos))
+    metricas.update(medir_busquedas(qdrant, repeticiones))
+    metricas.update(medir_alertas(numeros_alertas, semilla=semilla))
+    if directorio_onnx:
+        metricas.update(medir_backends(textos, directorio_onnx))
+
+    return {
+        'metadatos': {
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'escala': escala,
+            'modelo': modelo,
+            'qdrant': qdrant_url or ':memory:',
+            'semilla': semilla,
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+        },
+        'metricas': metricas,
+    }
+
+
+def comparar_con_referencia(resultados: Dict[str, Any], referencia: Dict[str, Any],
+                            tolerancia: float = TOLERANCIA) -> List[Dict[str, Any]]:
+    """
+    Compara las métricas con una referencia.
+    Las métricas '_por_segundo' empeoran al bajar y las '_ms' al subir.
+
+    Args:
+        resultados: Resultado de ejecutar_benchmarks()
+        referencia: Resultado guardado previamente como referencia
+        tolerancia: Desviación relativa admitida (0.2 = 20 %)
+
+    Returns:
+        List[Dict[str, Any]]: Una entrada por métrica comparable con 'metrica', 'referencia',
+            'actual', 'cambio' (relativo) y 'regresion'
+    """
+    comparacion = []
+    actuales = resultados['metricas']
+    for metrica, valor_referencia in sorted(referencia.get('metricas', {}).items()):
+        if metrica not in actuales or not valor_referencia:
+            continue
+        if metrica.endswith('_por_segundo'):
+            signo = -1
+        elif metrica.endswith('_ms'):
+            signo = 1
+        else:
+            continue
+        cambio = (actuales[metrica] - valor_referencia) / valor_referencia
+        comparacion.append({
+            'metrica': metrica,
+            'referencia': valor_referencia,
+            'actual': actuales[metrica],
+            'cambio': cambio,
+            'regresion': cambio * signo > tolerancia,
+        })
+    return comparacion
+
+
+def guardar_json(datos: Dict[str, Any], ruta: Path):
+    """Escribe un resultado de benchmark en JSON"""
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(json.dumps(datos, indent=2, ensure_ascii=False, sort_keys=True) + '\n', encoding='utf-8')
+
+
+def cargar_json(ruta: Path) -> Optional[Dict[str, Any]]:
+    """Lee un resultado de benchmark guardado (None si no existe)"""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return None
+    return json.loads(ruta.read_text(encoding='utf-8'))
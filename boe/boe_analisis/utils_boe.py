@@ -90,34 +90,186 @@ def obtener_texto_documento(url_xml, timeout=30):
     Returns:
         str: Texto del documento o None si hay error
     """
+    return obtener_documento_xml(url_xml, timeout)[0]
+
+def obtener_documento_xml(url_xml, timeout=30):
+    """
+    Obtiene el texto completo, las referencias a otras normas y la estructura
+    por artículos de un documento con una sola descarga de su XML
+    
+    Args:
+        url_xml: URL del documento XML
+        timeout: Tiempo máximo de espera para la petición
+        
+    Returns:
+        tuple: Texto del documento (o None), lista de referencias (ver extraer_referencias_xml)
+            y lista de secciones (ver utils_articulos.segmentar_xml)
+    """
     if not url_xml:
-        return None
+        return None, [], []
     
     try:
         session = requests.Session()
         response = session.get(url_xml, timeout=timeout)
         if response.status_code == 200:
             # Parsear el XML
-            root = ET.fromstring(response.text)
-            
-            # Extraer el texto del documento
-            texto_elementos = root.findall('.//texto')
-            if texto_elementos:
-                textos = []
-                for elem in texto_elementos:
-                    if elem.text:
-                        textos.append(elem.text)
-                return " ".join(textos)
-            
-            # Si no hay elementos de texto específicos, intentar obtener todo el contenido
-            contenido = root.find('.//documento/texto_consolidado')
-            if contenido is not None and contenido.text:
-                return contenido.text
+            root = ET.fromstring(response.content)
+            texto, secciones = texto_y_secciones_xml(root)
+            return texto, extraer_referencias_xml(root), secciones
         
-        return None
+        return None, [], []
     except Exception as e:
         logger.error(f"Error al obtener texto del documento: {str(e)}")
+        return None, [], []
+
+def texto_y_secciones_xml(root):
+    """
+    Texto de un documento a partir de su XML ya parseado, con un párrafo por
+    línea, y sus secciones (títulos, capítulos, artículos...) con su posición
+    
+    Args:
+        root: Raíz del XML del documento
+        
+    Returns:
+        tuple: Texto (o None) y lista de secciones
+    """
+    from .utils_articulos import segmentar_xml
+    
+    elemento = root.find('.//texto')
+    if elemento is not None and len(elemento):
+        texto, secciones = segmentar_xml(elemento)
+        if texto:
+            return texto, secciones
+    return _texto_xml(root), []
+
+def _texto_xml(root):
+    """Texto de un documento sin párrafos marcados a partir de su XML ya parseado"""
+    # Extraer el texto del documento
+    texto_elementos = root.findall('.//texto')
+    if texto_elementos:
+        textos = []
+        for elem in texto_elementos:
+            if elem.text and elem.text.strip():
+                textos.append(elem.text.strip())
+        if textos:
+            return " ".join(textos)
+    
+    # Si no hay elementos de texto específicos, intentar obtener todo el contenido
+    contenido = root.find('.//documento/texto_consolidado')
+    if contenido is not None and contenido.text:
+        return contenido.text
+    return None
+
+# Relación que expresa el término de una referencia del BOE ("MODIFICA", "SE DEROGA"...),
+# de más a menos específica; las que no coinciden se consideran citas
+RELACIONES_REFERENCIA = [
+    ('anula', re.compile(r'ANULA|NULIDAD|INCONSTITUCIONAL', re.IGNORECASE)),
+    ('deroga', re.compile(r'DEROGA|DEJA\s+SIN\s+EFECTO', re.IGNORECASE)),
+    ('corrige', re.compile(r'CORRIGE|CORRECCI[OÓ]N', re.IGNORECASE)),
+    ('modifica', re.compile(r'MODIFICA|A[ÑN]ADE|SUPRIME|NUEVA\s+REDACCI[OÓ]N|PRORROGA|SUSPENDE', re.IGNORECASE)),
+    ('desarrolla', re.compile(r'DESARROLLA|REGLAMENTA', re.IGNORECASE)),
+]
+
+def clasificar_referencia(palabra):
+    """
+    Clasifica el término de una referencia del BOE
+    
+    Args:
+        palabra: Término de la referencia (por ejemplo, "SE MODIFICA")
+        
+    Returns:
+        str: 'anula', 'deroga', 'corrige', 'modifica', 'desarrolla' o 'cita'
+    """
+    for relacion, patron in RELACIONES_REFERENCIA:
+        if palabra and patron.search(palabra):
+            return relacion
+    return 'cita'
+
+def extraer_referencias_xml(root, identificador=None):
+    """
+    Extrae las referencias a otras normas del apartado <analisis><referencias>
+    del XML de un documento. Cada referencia se orienta de la norma que actúa
+    a la afectada: las anteriores salen del documento y las posteriores llegan a él.
+    
+    Args:
+        root: Elemento raíz del XML del documento (ElementTree o lxml)
+        identificador: Identificador del documento (por defecto, el de sus metadatos)
+        
+    Returns:
+        list: Diccionarios con 'origen', 'destino', 'relacion', 'palabra', 'codigo_palabra' y 'texto'
+    """
+    if identificador is None:
+        identificador = root.findtext('.//metadatos/identificador')
+    if not identificador:
+        return []
+    
+    referencias = []
+    for apartado, elemento in (('anteriores', 'anterior'), ('posteriores', 'posterior')):
+        for referencia in root.findall(f'.//analisis/referencias/{apartado}/{elemento}'):
+            otra = (referencia.get('referencia') or '').strip()
+            if not otra or otra == identificador:
+                continue
+            palabra = referencia.find('palabra')
+            texto_palabra = (palabra.text or '').strip() if palabra is not None else ''
+            origen, destino = (identificador, otra) if elemento == 'anterior' else (otra, identificador)
+            referencias.append({
+                'origen': origen,
+                'destino': destino,
+                'relacion': clasificar_referencia(texto_palabra),
+                'palabra': texto_palabra[:100],
+                'codigo_palabra': (palabra.get('codigo') or '') if palabra is not None else '',
+                'texto': (referencia.findtext('texto') or '').strip(),
+            })
+    return referencias
+
+def _url_absoluta(url):
+    """Completa con el dominio del BOE las URLs relativas del sumario"""
+    if not url:
         return None
+    return url if url.startswith('http') else f"https://www.boe.es{url}"
+
+def extraer_items_sumario(sumario_xml, fecha=None):
+    """
+    Extrae los documentos de un sumario del BOE en una sola pasada por el árbol XML
+    
+    Args:
+        sumario_xml: Contenido XML del sumario (str o bytes)
+        fecha: Fecha de publicación por defecto si el sumario no la incluye
+        
+    Returns:
+        list: Diccionarios con identificador, titulo, url_pdf, url_xml, departamento,
+            codigo_departamento y fecha_publicacion de cada documento
+    """
+    root = ET.fromstring(sumario_xml)
+    
+    fecha_sumario = root.findtext('.//metadatos/fecha_publicacion')
+    if fecha_sumario:
+        fecha = datetime.strptime(fecha_sumario.strip(), '%Y%m%d').date()
+    
+    # Departamento de cada item, recorriendo cada departamento una sola vez
+    departamentos = {}
+    for departamento in root.iter('departamento'):
+        for item in departamento.iter('item'):
+            departamentos[id(item)] = (departamento.get('nombre') or "No especificado", departamento.get('codigo'))
+    
+    items = []
+    for item in root.iter('item'):
+        identificador = item.findtext('identificador')
+        titulo = item.findtext('titulo')
+        if not identificador or not titulo:
+            continue
+        
+        departamento, codigo = departamentos.get(id(item), ("No especificado", None))
+        items.append({
+            'identificador': identificador.strip(),
+            'titulo': titulo,
+            'url_pdf': _url_absoluta(item.findtext('url_pdf')),
+            'url_xml': _url_absoluta(item.findtext('url_xml')),
+            'departamento': departamento,
+            'codigo_departamento': codigo or extraer_codigo_departamento(departamento),
+            'fecha_publicacion': fecha,
+        })
+    return items
 
 def extraer_codigo_departamento(departamento):
     """
@@ -151,6 +303,196 @@ def extraer_codigo_departamento(departamento):
     
     return None
 
+# Rangos normativos reconocibles al inicio del título, de más a menos específico
+RANGOS = [
+    'Ley Orgánica',
+    'Real Decreto-ley',
+    'Real Decreto Legislativo',
+    'Real Decreto',
+    'Decreto-ley',
+    'Decreto Legislativo',
+    'Decreto',
+    'Ley',
+    'Orden',
+    'Resolución',
+    'Acuerdo',
+    'Instrucción',
+    'Circular',
+    'Corrección de errores',
+    'Anuncio',
+    'Edicto',
+]
+PATRON_RANGO = re.compile(r'^\s*(' + '|'.join(re.escape(rango) for rango in RANGOS) + r')\b', re.IGNORECASE)
+
+def extraer_rango(titulo):
+    """
+    Extrae el rango normativo a partir del título del documento
+    
+    Args:
+        titulo: Título del documento (por ejemplo, "Ley 3/2025, de 6 de marzo, ...")
+        
+    Returns:
+        str: Rango normalizado (por ejemplo, "Ley") o None si no se reconoce
+    """
+    if not titulo:
+        return None
+    
+    match = PATRON_RANGO.match(titulo)
+    if not match:
+        return None
+    
+    encontrado = match.group(1).lower()
+    for rango in RANGOS:
+        if rango.lower() == encontrado:
+            return rango
+    return None
+
+# Términos legales que siempre se buscan como palabras clave
+TERMINOS_LEGALES = [
+    'ley', 'real decreto', 'decreto', 'orden', 'resolución', 'acuerdo',
+    'convenio', 'contrato', 'subvención', 'ayuda', 'beca', 'concurso',
+    'oposición', 'licitación', 'adjudicación', 'nombramiento'
+]
+
+# Referencias a leyes y decretos (por ejemplo, "real decreto 12/2024")
+PATRON_REFERENCIA = r'(?:real\s+)?decreto\s+\d+/\d+|ley\s+\d+/\d+'
+
+# Extractores ya compilados, por versión del conjunto de categorías
+_extractores = {}
+MAX_EXTRACTORES = 8
+
+
+def _patron_trie(terminos):
+    """
+    Expresión regular equivalente a la alternativa de los términos, factorizada
+    como un árbol de prefijos: en cada posición solo se sigue la rama del
+    carácter leído, en lugar de probar los términos uno a uno.
+    """
+    arbol = {}
+    for termino in terminos:
+        nodo = arbol
+        for caracter in termino:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[''] = {}
+
+    def expresion(nodo):
+        # Las ramas más largas primero: a igualdad de inicio gana el término más largo
+        ramas = [re.escape(caracter) + expresion(hijo) for caracter, hijo in sorted(nodo.items()) if caracter]
+        if not ramas:
+            return ''
+        opcional = '' in nodo
+        if len(ramas) == 1 and not opcional:
+            return ramas[0]
+        return '(?:' + '|'.join(ramas) + ')' + ('?' if opcional else '')
+
+    return expresion(arbol)
+
+
+def version_categorias(categorias_alertas):
+    """
+    Versión de un conjunto de categorías: cambia si cambia cualquier palabra clave
+    
+    Args:
+        categorias_alertas: Diccionario con categorías y sus palabras clave
+        
+    Returns:
+        tuple: Clave inmutable con el contenido de las categorías
+    """
+    return tuple(sorted((categoria, tuple(palabras)) for categoria, palabras in (categorias_alertas or {}).items()))
+
+
+class ExtractorPalabrasClave:
+    """
+    Extractor de palabras clave con el vocabulario precompilado.
+    Las palabras de las categorías, los términos legales y las referencias a
+    normas forman una sola expresión que recorre cada texto una vez. Las
+    coincidencias respetan los límites de palabra ("ley" no coincide con
+    "leyenda") y pueden solaparse ("real decreto" incluye "decreto").
+    """
+    
+    def __init__(self, categorias_alertas=None):
+        """
+        Args:
+            categorias_alertas: Diccionario con categorías y sus palabras clave
+        """
+        self.version = version_categorias(categorias_alertas)
+        terminos = set(TERMINOS_LEGALES)
+        for palabras in (categorias_alertas or {}).values():
+            terminos.update(palabra for palabra in palabras if palabra and len(palabra) > 3)
+        self.terminos = frozenset(terminos)
+        
+        # A igualdad de posición gana el término más largo; los más cortos que
+        # contiene se añaden después con _subterminos. La búsqueda anticipada
+        # hace que se pruebe en cada inicio de palabra y las coincidencias se solapen.
+        self.patron = re.compile(
+            rf'(?<!\w)(?=(?:(?P<referencia>{PATRON_REFERENCIA})|(?P<termino>{_patron_trie(self.terminos)}))(?!\w))'
+        )
+        self._contenidos = {}
+    
+    def _subterminos(self, coincidencia):
+        """Términos del vocabulario contenidos en una coincidencia, incluida ella misma si es un término"""
+        if coincidencia not in self._contenidos:
+            inicios = [m.start() for m in re.finditer(r'(?<!\w)\w', coincidencia)]
+            finales = [m.end() for m in re.finditer(r'\w(?!\w)', coincidencia)]
+            self._contenidos[coincidencia] = {
+                coincidencia[inicio:final] for inicio in inicios for final in finales
+                if final > inicio and coincidencia[inicio:final] in self.terminos
+            }
+        return self._contenidos[coincidencia]
+    
+    def extraer(self, titulo, texto=''):
+        """
+        Extrae las palabras clave de un documento
+        
+        Args:
+            titulo: Título del documento
+            texto: Texto del documento
+            
+        Returns:
+            list: Lista de palabras clave extraídas
+        """
+        texto_completo = f"{titulo} {texto}".lower() if texto else (titulo or '').lower()
+        palabras_clave = set()
+        for match in self.patron.finditer(texto_completo):
+            if match.group('referencia'):
+                palabras_clave.add(match.group('referencia'))
+                palabras_clave.update(self._subterminos(match.group('referencia')))
+            else:
+                palabras_clave.update(self._subterminos(match.group('termino')))
+        return list(palabras_clave)
+    
+    def extraer_lote(self, documentos):
+        """
+        Extrae las palabras clave de varios documentos
+        
+        Args:
+            documentos: Iterable de pares (título, texto)
+            
+        Returns:
+            list: Lista de palabras clave de cada documento, en el mismo orden
+        """
+        return [self.extraer(titulo, texto) for titulo, texto in documentos]
+
+
+def obtener_extractor(categorias_alertas=None):
+    """
+    Obtiene el extractor compilado para un conjunto de categorías.
+    Se reutiliza mientras las categorías no cambien.
+    
+    Args:
+        categorias_alertas: Diccionario con categorías y sus palabras clave
+        
+    Returns:
+        ExtractorPalabrasClave: Extractor para esas categorías
+    """
+    version = version_categorias(categorias_alertas)
+    extractor = _extractores.get(version)
+    if extractor is None:
+        if len(_extractores) >= MAX_EXTRACTORES:
+            _extractores.clear()
+        extractor = _extractores[version] = ExtractorPalabrasClave(categorias_alertas)
+    return extractor
+
 def extraer_palabras_clave(titulo, texto, categorias_alertas=None):
     """
     Extrae palabras clave del título y texto del documento
@@ -164,33 +506,4 @@ def extraer_palabras_clave(titulo, texto, categorias_alertas=None):
     Returns:
         list: Lista de palabras clave extraídas
     """
-    palabras_clave = set()
-    texto_completo = f"{titulo} {texto}".lower() if texto else titulo.lower()
-    
-    # Buscar coincidencias con palabras clave de categorías
-    if categorias_alertas:
-        for categoria, palabras in categorias_alertas.items():
-            for palabra in palabras:
-                if palabra and len(palabra) > 3 and palabra in texto_completo:
-                    palabras_clave.add(palabra)
-    
-    # Extraer términos legales comunes
-    terminos_legales = [
-        'ley', 'real decreto', 'decreto', 'orden', 'resolución', 'acuerdo',
-        'convenio', 'contrato', 'subvención', 'ayuda', 'beca', 'concurso',
-        'oposición', 'licitación', 'adjudicación', 'nombramiento'
-    ]
-    
-    for termino in terminos_legales:
-        if termino in texto_completo:
-            palabras_clave.add(termino)
-    
-    # Extraer referencias a leyes y decretos
-    referencias = re.findall(r'ley\s+\d+/\d+', texto_completo)
-    referencias.extend(re.findall(r'real\s+decreto\s+\d+/\d+', texto_completo))
-    referencias.extend(re.findall(r'decreto\s+\d+/\d+', texto_completo))
-    
-    for ref in referencias:
-        palabras_clave.add(ref)
-    
-    return list(palabras_clave)
+    return obtener_extractor(categorias_alertas).extraer(titulo, texto)
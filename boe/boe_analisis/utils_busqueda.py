@@ -3,7 +3,11 @@ Utilidades para mejorar la búsqueda de documentos
 """
 import re
 from django.db.models import Q
-import Levenshtein
+
+try:
+    import Levenshtein
+except ImportError:  # Sin Levenshtein no se hace la búsqueda aproximada
+    Levenshtein = None
 
 def normalizar_texto(texto):
     """
@@ -78,7 +82,7 @@ def busqueda_tolerante(queryset, campo, texto):
     resultados = queryset.filter(consulta)
     
     # Si aún no hay resultados, usamos Levenshtein para búsqueda aproximada
-    if not resultados.exists() and len(texto_normalizado) > 3:
+    if Levenshtein is not None and not resultados.exists() and len(texto_normalizado) > 3:
         # Obtener todos los documentos para comparación (esto puede ser costoso en bases de datos grandes)
         # En una base de datos grande, deberías limitar esto a un subconjunto relevante
         todos_documentos = queryset.all()
@@ -121,7 +125,42 @@ def busqueda_tolerante(queryset, campo, texto):
     
     return resultados
 
-def busqueda_multiple_campos(queryset, campos, texto):
+def vocabulario(texto):
+    """
+    Palabras distintas de un texto, normalizadas y separadas por espacios, con
+    un espacio delante de cada una para poder buscar por comienzo de palabra
+    (ver filtro_cuerpo)
+    
+    Args:
+        texto (str): Texto del documento
+        
+    Returns:
+        str: Vocabulario del texto ('' si no tiene palabras de más de 2 caracteres)
+    """
+    palabras = sorted({palabra for palabra in normalizar_texto(texto).split() if len(palabra) > 2})
+    return f" {' '.join(palabras)} " if palabras else ""
+
+def filtro_cuerpo(texto, prefijo='texto_comprimido__'):
+    """
+    Condición que busca en el cuerpo de los documentos todas las palabras de un
+    texto (por comienzo de palabra, sin acentos ni mayúsculas)
+    
+    Args:
+        texto (str): Texto a buscar
+        prefijo (str): Ruta hasta TextoDocumento desde el modelo que se filtra
+        
+    Returns:
+        Q: Condición sobre TextoDocumento.vocabulario
+    """
+    palabras = [palabra for palabra in normalizar_texto(texto).split() if len(palabra) > 2]
+    if not palabras:
+        return Q(pk__in=[])
+    consulta = Q()
+    for palabra in palabras:
+        consulta &= Q(**{f"{prefijo}vocabulario__contains": f" {palabra}"})
+    return consulta
+
+def busqueda_multiple_campos(queryset, campos, texto, cuerpo=False):
     """
     Realiza una búsqueda en múltiples campos
     
@@ -129,6 +168,7 @@ def busqueda_multiple_campos(queryset, campos, texto):
         queryset: QuerySet de Django a filtrar
         campos (list): Lista de nombres de campos donde buscar
         texto (str): Texto a buscar
+        cuerpo (bool): Buscar también en el cuerpo de los documentos
         
     Returns:
         QuerySet: Resultados filtrados
@@ -144,6 +184,8 @@ def busqueda_multiple_campos(queryset, campos, texto):
     consulta_exacta = Q()
     for campo in campos:
         consulta_exacta |= Q(**{f"{campo}__icontains": texto})
+    if cuerpo:
+        consulta_exacta |= filtro_cuerpo(texto)
     
     resultados_exactos = queryset.filter(consulta_exacta)
     
@@ -156,11 +198,13 @@ def busqueda_multiple_campos(queryset, campos, texto):
         if len(palabra) > 2:  # Solo consideramos palabras con más de 2 caracteres
             for campo in campos:
                 consulta |= Q(**{f"{campo}__icontains": palabra})
+            if cuerpo:
+                consulta |= filtro_cuerpo(palabra)
     
     resultados = queryset.filter(consulta)
     
-    # Si aún no hay resultados, usar Levenshtein para cada campo
-    if not resultados.exists() and len(texto_normalizado) > 3:
+    # Si aún no hay resultados, usar Levenshtein para cada campo (no en el cuerpo)
+    if Levenshtein is not None and not resultados.exists() and len(texto_normalizado) > 3:
         ids_similares = set()
         
         for campo in campos:
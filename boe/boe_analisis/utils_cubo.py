@@ -0,0 +1,318 @@
+"""
+Utilidades para mantener y consultar el cubo de estadísticas de documentos
+(fecha × departamento × rango × materia × legislatura).
+Las estadísticas por legislatura, mes o año se resuelven con agrupaciones
+sobre el cubo en la base de datos, sin recorrer la tabla de documentos.
+"""
+import datetime
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Greatest, TruncMonth, TruncYear
+
+from .models import Legislatura
+from .models_cubo import CuboDocumentos
+from .models_facetas import FacetaMateria
+from .models_simplified import DocumentoSimplificado
+from .utils_boe import extraer_rango
+from .utils_facetas import LONGITUD_NOMBRE, obtener_ids, separar_valores
+
+logger = logging.getLogger(__name__)
+
+# Segundos que cada proceso reutiliza los rangos de las legislaturas. Guardar
+# o borrar una legislatura los invalida en el proceso que la modifica; en el
+# resto caducan pasado este tiempo.
+TTL_LEGISLATURAS = getattr(settings, 'CUBO_TTL_LEGISLATURAS', 300)
+
+_legislaturas: Dict[str, Any] = {}
+
+# Agrupaciones disponibles: nombre -> campo o expresión sobre el cubo
+AGRUPACIONES = {
+    'dia': 'fecha',
+    'mes': TruncMonth('fecha'),
+    'anio': TruncYear('fecha'),
+    'legislatura': 'legislatura',
+    'departamento': 'departamento',
+    'rango': 'rango',
+}
+
+
+def _fecha(valor) -> datetime.date:
+    """Normaliza la fecha de publicación (date, datetime o texto YYYY-MM-DD)"""
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        return datetime.date.fromisoformat(valor[:10])
+    return valor
+
+
+def _cargar_legislaturas() -> Tuple[Tuple[datetime.date, Optional[datetime.date], int], ...]:
+    """Rangos de fechas de las legislaturas, de la más reciente a la más antigua"""
+    ahora = time.monotonic()
+    if _legislaturas.get('caduca', 0) <= ahora:
+        _legislaturas['rangos'] = tuple(Legislatura.objects.order_by('-inicio').values_list('inicio', 'fin', 'id'))
+        _legislaturas['caduca'] = ahora + TTL_LEGISLATURAS
+    return _legislaturas['rangos']
+
+
+def invalidar_legislaturas():
+    """Descarta los rangos de las legislaturas leídos por este proceso"""
+    _legislaturas.clear()
+
+
+def reasignar_legislaturas() -> int:
+    """
+    Vuelve a asignar a cada celda del cubo la legislatura de su fecha, después
+    de crear, modificar o borrar una legislatura.
+
+    Returns:
+        int: Número de celdas actualizadas
+    """
+    invalidar_legislaturas()
+    actualizadas = 0
+    dentro = Q()
+    with transaction.atomic():
+        # De la más antigua a la más reciente: si dos se solapan gana la más reciente,
+        # como en legislatura_para_fecha
+        for inicio, fin, legislatura_id in reversed(_cargar_legislaturas()):
+            rango = Q(fecha__gte=inicio) if fin is None else Q(fecha__gte=inicio, fecha__lte=fin)
+            dentro |= rango
+            actualizadas += CuboDocumentos.objects.filter(rango).exclude(legislatura_id=legislatura_id).update(
+                legislatura_id=legislatura_id
+            )
+        actualizadas += CuboDocumentos.objects.exclude(dentro).filter(legislatura__isnull=False).update(
+            legislatura=None
+        )
+    return actualizadas
+
+
+def legislatura_para_fecha(fecha) -> Optional[int]:
+    """
+    Obtiene la legislatura vigente en una fecha.
+
+    Args:
+        fecha: Fecha de publicación
+
+    Returns:
+        Optional[int]: Identificador de la legislatura o None si no hay ninguna
+    """
+    fecha = _fecha(fecha)
+    for inicio, fin, legislatura_id in _cargar_legislaturas():
+        if inicio <= fecha and (fin is None or fecha <= fin):
+            return legislatura_id
+    return None
+
+
+def estado_cubo(documento: DocumentoSimplificado) -> Tuple[datetime.date, str, str, Tuple[str, ...]]:
+    """
+    Obtiene las dimensiones del cubo de un documento.
+    Se llama antes de modificarlo para poder calcular después el cambio.
+
+    Args:
+        documento: Documento a inspeccionar
+
+    Returns:
+        Tuple: Fecha, departamento, rango y materias del documento
+    """
+    return (
+        _fecha(documento.fecha_publicacion),
+        (documento.departamento or '')[:LONGITUD_NOMBRE],
+        extraer_rango(documento.titulo) or '',
+        tuple(separar_valores(documento.materias)),
+    )
+
+
+def _contribucion(estado) -> Counter:
+    """Celdas del cubo a las que suma un documento: la fila sin materia y una por materia"""
+    fecha, departamento, rango, materias = estado
+    celdas = Counter({(fecha, departamento, rango, None): 1})
+    for materia in materias:
+        celdas[(fecha, departamento, rango, materia)] += 1
+    return celdas
+
+
+def _clave_celda(fecha, departamento, rango, materia_id) -> Dict[str, Any]:
+    # Dimensiones únicas de una celda (la legislatura depende de la fecha)
+    return {'fecha': fecha, 'departamento': departamento, 'rango': rango, 'materia_id': materia_id}
+
+
+def _filtro_celda(fecha, departamento, rango, materia_id) -> Dict[str, Any]:
+    return dict(_clave_celda(fecha, departamento, rango, materia_id), legislatura_id=legislatura_para_fecha(fecha))
+
+
+def actualizar_cubo(documento: DocumentoSimplificado, anterior: Optional[Tuple] = None):
+    """
+    Aplica al cubo el cambio de un documento ya guardado.
+
+    Args:
+        documento: Documento recién creado o actualizado
+        anterior: Resultado de estado_cubo() antes de la modificación (None si el documento es nuevo)
+    """
+    nuevo = estado_cubo(documento)
+    if anterior == nuevo:
+        return
+
+    deltas = _contribucion(nuevo)
+    if anterior:
+        deltas.subtract(_contribucion(anterior))
+
+    with transaction.atomic():
+        ids_materias = obtener_ids(FacetaMateria, {materia for (_, _, _, materia) in deltas if materia})
+        for (fecha, departamento, rango, materia), delta in deltas.items():
+            if not delta:
+                continue
+            clave = _clave_celda(fecha, departamento, rango, ids_materias[materia] if materia else None)
+            celdas = CuboDocumentos.objects.filter(**clave)
+            if delta > 0:
+                if not celdas.update(total=F('total') + delta):
+                    try:
+                        with transaction.atomic():
+                            CuboDocumentos.objects.create(
+                                total=delta, legislatura_id=legislatura_para_fecha(fecha), **clave
+                            )
+                    except IntegrityError:
+                        # Otro proceso ha creado la celda entre la actualización y la inserción
+                        celdas.update(total=F('total') + delta)
+            else:
+                celdas.update(total=Greatest(F('total') + delta, 0))
+
+
+def recalcular_cubo(lote: int = 2000) -> int:
+    """
+    Reconstruye por completo el cubo a partir de los documentos.
+
+    Args:
+        lote: Número de documentos leídos por consulta
+
+    Returns:
+        int: Número de celdas del cubo
+    """
+    invalidar_legislaturas()
+
+    celdas = Counter()
+    documentos = DocumentoSimplificado.objects.order_by().only(
+        'identificador', 'fecha_publicacion', 'departamento', 'titulo', 'materias'
+    )
+    for documento in documentos.iterator(chunk_size=lote):
+        celdas.update(_contribucion(estado_cubo(documento)))
+
+    ids_materias = obtener_ids(FacetaMateria, {materia for (_, _, _, materia) in celdas if materia})
+
+    with transaction.atomic():
+        CuboDocumentos.objects.all().delete()
+        CuboDocumentos.objects.bulk_create(
+            [
+                CuboDocumentos(
+                    total=total,
+                    **_filtro_celda(fecha, departamento, rango, ids_materias[materia] if materia else None)
+                )
+                for (fecha, departamento, rango, materia), total in celdas.items()
+            ],
+            batch_size=1000
+        )
+
+    logger.info(f"Cubo recalculado: {len(celdas)} celdas")
+    return len(celdas)
+
+
+def _celdas(materia: Optional[int] = None, rango: Optional[str] = None, departamento: Optional[str] = None,
+            legislatura: Optional[int] = None, desde=None, hasta=None):
+    """Celdas del cubo filtradas; sin materia se usan las filas de totales de documentos"""
+    if materia:
+        celdas = CuboDocumentos.objects.filter(materia_id=materia)
+    else:
+        celdas = CuboDocumentos.objects.filter(materia__isnull=True)
+    return _filtrar(celdas, rango, departamento, legislatura, desde, hasta)
+
+
+def _filtrar(celdas, rango: Optional[str] = None, departamento: Optional[str] = None,
+             legislatura: Optional[int] = None, desde=None, hasta=None):
+    if rango:
+        celdas = celdas.filter(rango=rango)
+    if departamento:
+        celdas = celdas.filter(departamento=departamento)
+    if legislatura:
+        celdas = celdas.filter(legislatura_id=legislatura)
+    if desde:
+        celdas = celdas.filter(fecha__gte=desde)
+    if hasta:
+        celdas = celdas.filter(fecha__lte=hasta)
+    return celdas.order_by()
+
+
+def totales_por_legislatura(materia: Optional[int] = None, rango: Optional[str] = None,
+                            dias: Optional[int] = None) -> Dict[int, int]:
+    """
+    Número de documentos por legislatura en una sola consulta.
+
+    Args:
+        materia: Identificador de FacetaMateria (opcional)
+        rango: Rango normativo (opcional)
+        dias: Si se indica, solo cuenta los primeros días de cada legislatura
+
+    Returns:
+        Dict[int, int]: Identificador de legislatura -> número de documentos
+    """
+    celdas = _celdas(materia=materia, rango=rango).filter(legislatura__isnull=False)
+    if dias is not None:
+        celdas = celdas.filter(fecha__lte=F('legislatura__inicio') + datetime.timedelta(days=dias))
+    return dict(celdas.values_list('legislatura').annotate(suma=Sum('total')))
+
+
+def agregar_cubo(agrupar: Sequence[str] = ('anio',), **filtros) -> List[Dict[str, Any]]:
+    """
+    Agrega el cubo en la base de datos por las dimensiones indicadas.
+
+    Args:
+        agrupar: Nombres de AGRUPACIONES (dia, mes, anio, legislatura, departamento, rango)
+        **filtros: materia, rango, departamento, legislatura, desde y/o hasta
+
+    Returns:
+        List[Dict[str, Any]]: Una fila por combinación con las dimensiones y 'total'
+
+    Raises:
+        ValueError: Si alguna agrupación no existe
+    """
+    desconocidas = [nombre for nombre in agrupar if nombre not in AGRUPACIONES]
+    if desconocidas:
+        raise ValueError(f"Agrupación no soportada: {', '.join(desconocidas)}")
+
+    celdas = _celdas(**filtros)
+    anotaciones = {nombre: AGRUPACIONES[nombre] for nombre in agrupar if not isinstance(AGRUPACIONES[nombre], str)}
+    if anotaciones:
+        celdas = celdas.annotate(**anotaciones)
+
+    columnas = [AGRUPACIONES[nombre] if isinstance(AGRUPACIONES[nombre], str) else nombre for nombre in agrupar]
+    filas = celdas.values(*columnas).annotate(suma=Sum('total')).order_by(*columnas)
+
+    resultado = []
+    for fila in filas:
+        datos = {nombre: fila[columna] for nombre, columna in zip(agrupar, columnas)}
+        datos['total'] = fila['suma']
+        resultado.append(datos)
+    return resultado
+
+
+def materias_principales(limite: int = 10, **filtros) -> List[Dict[str, Any]]:
+    """
+    Materias con más documentos, agregadas en el cubo.
+
+    Args:
+        limite: Número de materias
+        **filtros: rango, departamento, legislatura, desde y/o hasta
+
+    Returns:
+        List[Dict[str, Any]]: 'id' (de FacetaMateria, el mismo que acepta el filtro
+        materia), 'nombre' y 'total' de cada materia, de mayor a menor
+    """
+    celdas = _filtrar(CuboDocumentos.objects.filter(materia__isnull=False), **filtros)
+    filas = (
+        celdas.values('materia_id', 'materia__nombre')
+        .annotate(suma=Sum('total')).filter(suma__gt=0).order_by('-suma', 'materia__nombre')[:limite]
+    )
+    return [{'id': fila['materia_id'], 'nombre': fila['materia__nombre'], 'total': fila['suma']} for fila in filas]
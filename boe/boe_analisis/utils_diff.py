@@ -0,0 +1,188 @@
+"""
+Comparación local de versiones de normas por artículos.
+El texto se divide por sus encabezados ("Artículo 3", "Disposición adicional
+primera", "Anexo II"...), los artículos se emparejan por encabezado y dentro
+de cada artículo modificado se calcula la diferencia palabra a palabra con
+difflib. El resultado sigue el esquema JSON del comparador ('resumen',
+'estadisticas' y 'cambios').
+"""
+import difflib
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+# Encabezados que abren una nueva división del texto, al inicio de una línea
+PATRON_ENCABEZADO = re.compile(
+    r'^\s*('
+    r'art[íi]culo\s+(?:\d+|[úu]nico)(?:\s+(?:bis|ter|quater|quinquies|sexies|septies|octies|nonies|decies))?'
+    r'|disposici[óo]n\s+(?:adicional|transitoria|derogatoria|final)(?:\s+(?!de\b|del\b|la\b)[a-záéíóúñ]+|\s+\d+)?'
+    r'|anexo(?:\s+[IVXLC]+\b|\s+\d+)?'
+    r')',
+    re.IGNORECASE | re.MULTILINE
+)
+
+PREAMBULO = 'Preámbulo'
+
+_PALABRAS = re.compile(r'\S+')
+
+_ROMANO = re.compile(r'^[IVXLC]+$', re.IGNORECASE)
+
+
+def normalizar_encabezado(encabezado: str) -> str:
+    """
+    Forma canónica de un encabezado: "ARTÍCULO  3" -> "Artículo 3", "ANEXO II" -> "Anexo II".
+
+    Args:
+        encabezado: Encabezado tal como aparece en el texto
+
+    Returns:
+        str: Encabezado con la primera letra en mayúscula y los números romanos en mayúsculas
+    """
+    palabras = [
+        palabra.upper() if i and _ROMANO.match(palabra) else palabra.lower()
+        for i, palabra in enumerate(encabezado.split())
+    ]
+    encabezado = ' '.join(palabras)
+    return encabezado[:1].upper() + encabezado[1:]
+
+
+def segmentar_articulos(texto: str) -> 'OrderedDict[str, str]':
+    """
+    Divide un texto normativo por artículos, disposiciones y anexos.
+
+    Args:
+        texto: Texto de la norma (un párrafo por línea)
+
+    Returns:
+        OrderedDict[str, str]: Texto de cada división por encabezado normalizado
+            ("Artículo 3"), en el orden del documento. El texto anterior al primer
+            encabezado se devuelve como 'Preámbulo'.
+    """
+    segmentos = OrderedDict()
+    coincidencias = list(PATRON_ENCABEZADO.finditer(texto or ''))
+    inicio_primero = coincidencias[0].start() if coincidencias else len(texto or '')
+    if (texto or '')[:inicio_primero].strip():
+        segmentos[PREAMBULO] = texto[:inicio_primero].strip()
+
+    for i, coincidencia in enumerate(coincidencias):
+        final = coincidencias[i + 1].start() if i + 1 < len(coincidencias) else len(texto)
+        clave = normalizar_encabezado(coincidencia.group(1))
+        # Encabezados repetidos (por ejemplo, artículos de un anexo) se numeran
+        repetida, n = clave, 2
+        while repetida in segmentos:
+            repetida, n = f'{clave} ({n})', n + 1
+        segmentos[repetida] = texto[coincidencia.start():final].strip()
+    return segmentos
+
+
+def _comparar_palabras(original: str, nuevo: str) -> Tuple[List[Dict[str, str]], float]:
+    palabras_a = _PALABRAS.findall(original)
+    palabras_b = _PALABRAS.findall(nuevo)
+    operaciones = []
+    comparador = difflib.SequenceMatcher(None, palabras_a, palabras_b, autojunk=False)
+    nombres = {'delete': 'eliminar', 'insert': 'insertar', 'replace': 'reemplazar'}
+    for operacion, i1, i2, j1, j2 in comparador.get_opcodes():
+        if operacion == 'equal':
+            continue
+        operaciones.append({
+            'tipo': nombres[operacion],
+            'original': ' '.join(palabras_a[i1:i2]),
+            'nuevo': ' '.join(palabras_b[j1:j2]),
+        })
+    return operaciones, comparador.ratio()
+
+
+def diferencias_palabras(original: str, nuevo: str) -> List[Dict[str, str]]:
+    """
+    Diferencias palabra a palabra entre dos textos.
+
+    Args:
+        original: Texto original
+        nuevo: Texto nuevo
+
+    Returns:
+        List[Dict[str, str]]: Operaciones 'eliminar', 'insertar' o 'reemplazar' con el
+            texto 'original' y 'nuevo' afectado
+    """
+    return _comparar_palabras(original, nuevo)[0]
+
+
+def _importancia(similitud: float) -> str:
+    if similitud < 0.5:
+        return 'alta'
+    if similitud < 0.9:
+        return 'media'
+    return 'baja'
+
+
+def comparar_textos(texto_original: str, texto_nuevo: str) -> Dict[str, Any]:
+    """
+    Compara dos versiones de una norma por artículos.
+
+    Args:
+        texto_original: Texto de la versión original
+        texto_nuevo: Texto de la versión nueva
+
+    Returns:
+        Dict[str, Any]: 'resumen', 'estadisticas' (artículos modificados, añadidos,
+            eliminados y total de cambios) y 'cambios' (uno por artículo afectado, con
+            'articulo', 'texto_original', 'texto_nuevo', 'tipo_cambio', 'importancia',
+            'descripcion' y 'diferencias')
+    """
+    originales = segmentar_articulos(texto_original)
+    nuevos = segmentar_articulos(texto_nuevo)
+
+    # Orden de salida: el del texto nuevo, con los eliminados tras su predecesor original
+    orden = list(nuevos)
+    for posicion, clave in enumerate(originales):
+        if clave not in nuevos:
+            anteriores = [c for c in list(originales)[:posicion] if c in orden]
+            orden.insert(orden.index(anteriores[-1]) + 1 if anteriores else 0, clave)
+
+    cambios = []
+    for clave in orden:
+        original, nuevo = originales.get(clave), nuevos.get(clave)
+        if original == nuevo:
+            continue
+        if original is None:
+            cambios.append({
+                'articulo': clave, 'texto_original': '', 'texto_nuevo': nuevo, 'tipo_cambio': 'añadido',
+                'importancia': 'alta', 'descripcion': f"Se añade {clave.lower()}",
+                'diferencias': [{'tipo': 'insertar', 'original': '', 'nuevo': nuevo}],
+            })
+        elif nuevo is None:
+            cambios.append({
+                'articulo': clave, 'texto_original': original, 'texto_nuevo': '', 'tipo_cambio': 'eliminado',
+                'importancia': 'alta', 'descripcion': f"Se suprime {clave.lower()}",
+                'diferencias': [{'tipo': 'eliminar', 'original': original, 'nuevo': ''}],
+            })
+        else:
+            diferencias, similitud = _comparar_palabras(original, nuevo)
+            if not diferencias:
+                # Solo cambian espacios o saltos de línea
+                continue
+            palabras = sum(max(len(d['original'].split()), len(d['nuevo'].split())) for d in diferencias)
+            cambios.append({
+                'articulo': clave, 'texto_original': original, 'texto_nuevo': nuevo, 'tipo_cambio': 'modificado',
+                'importancia': _importancia(similitud),
+                'descripcion': f"{len(diferencias)} fragmentos modificados ({palabras} palabras, "
+                               f"similitud {similitud:.0%})",
+                'diferencias': diferencias,
+            })
+
+    estadisticas = {
+        'articulos_modificados': sum(1 for cambio in cambios if cambio['tipo_cambio'] == 'modificado'),
+        'articulos_anadidos': sum(1 for cambio in cambios if cambio['tipo_cambio'] == 'añadido'),
+        'articulos_eliminados': sum(1 for cambio in cambios if cambio['tipo_cambio'] == 'eliminado'),
+        'total_cambios': len(cambios),
+    }
+    if cambios:
+        resumen = (
+            f"{estadisticas['articulos_modificados']} artículos modificados, "
+            f"{estadisticas['articulos_anadidos']} añadidos y {estadisticas['articulos_eliminados']} eliminados. "
+            f"Afectados: {', '.join(cambio['articulo'] for cambio in cambios[:10])}"
+            + ('...' if len(cambios) > 10 else '.')
+        )
+    else:
+        resumen = "No hay diferencias entre las dos versiones."
+    return {'resumen': resumen, 'estadisticas': estadisticas, 'cambios': cambios}
@@ -0,0 +1,500 @@
+"""
+Servicio local de embeddings compartido por todos los procesos.
+Un único proceso (comando servidor_embeddings) carga el modelo y atiende
+peticiones por HTTP o por un socket Unix; las peticiones concurrentes se
+agrupan en microlotes durante unos milisegundos antes de pasar por el modelo.
+Los procesos web, los scripts de sincronización y los agentes usan
+ClienteEmbeddings, que expone el mismo método encode que SentenceTransformer.
+El modelo local se ejecuta con PyTorch (sentence-transformers) o, exportado
+a ONNX y cuantizado a int8, con onnxruntime (más rápido en CPU).
+Este módulo no depende de Django.
+"""
+import http.client
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Sequence, Union
+from urllib.parse import urlparse
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Modelo de embedding
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Variable de entorno con la dirección del servidor (http://host:puerto o unix:///ruta/al/socket)
+VARIABLE_URL = "EMBEDDINGS_URL"
+
+URL_POR_DEFECTO = "http://127.0.0.1:8765"
+
+# Motor de inferencia del modelo local ('torch' u 'onnx') y directorio del modelo exportado
+VARIABLE_BACKEND = "EMBEDDINGS_BACKEND"
+VARIABLE_DIRECTORIO_ONNX = "EMBEDDINGS_ONNX_DIR"
+BACKENDS = ('torch', 'onnx')
+
+# Archivos del modelo exportado (ver exportar_onnx)
+ARCHIVO_ONNX = "modelo.onnx"
+ARCHIVO_ONNX_CUANTIZADO = "modelo_int8.onnx"
+
+# Longitud máxima de secuencia de all-MiniLM-L6-v2 en sentence-transformers
+LONGITUD_MAXIMA = 256
+
+
+class AgrupadorLotes:
+    """
+    Agrupa las peticiones concurrentes en microlotes: el primer texto que llega
+    espera como mucho 'espera' segundos a que lleguen otros, hasta 'lote_maximo'
+    textos, y todos se codifican en una sola llamada al modelo.
+    """
+
+    def __init__(self, modelo, lote_maximo: int = 64, espera: float = 0.005, tamano_lote: int = 32):
+        """
+        Args:
+            modelo: Modelo con método encode (SentenceTransformer o compatible)
+            lote_maximo: Textos máximos por llamada al modelo
+            espera: Segundos máximos que se espera para completar un lote
+            tamano_lote: Tamaño de lote interno del modelo
+        """
+        self.modelo = modelo
+        self.lote_maximo = lote_maximo
+        self.espera = espera
+        self.tamano_lote = tamano_lote
+        self.lotes = 0
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, name='embeddings-lotes', daemon=True)
+        self._hilo.start()
+
+    def codificar(self, textos: List[str]) -> Future:
+        """
+        Encola textos para codificarlos en el siguiente microlote.
+
+        Returns:
+            Future: Se resuelve con una matriz float32 (un vector por texto)
+        """
+        futuro = Future()
+        self._cola.put((textos, futuro))
+        return futuro
+
+    def detener(self):
+        """Termina el hilo de procesamiento cuando acabe el lote en curso"""
+        self._cola.put(None)
+        self._hilo.join()
+
+    def _bucle(self):
+        while True:
+            peticion = self._cola.get()
+            if peticion is None:
+                return
+
+            pendientes = [peticion]
+            total = len(peticion[0])
+            limite = time.monotonic() + self.espera
+            while total < self.lote_maximo:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    siguiente = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    # Procesar lo recogido y terminar en la siguiente vuelta
+                    self._cola.put(None)
+                    break
+                pendientes.append(siguiente)
+                total += len(siguiente[0])
+
+            self._procesar(pendientes)
+
+    def _procesar(self, pendientes):
+        textos = [texto for textos_peticion, _ in pendientes for texto in textos_peticion]
+        try:
+            vectores = np.asarray(self.modelo.encode(textos, batch_size=self.tamano_lote), dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Error al codificar un lote de {len(textos)} textos: {str(e)}")
+            for _, futuro in pendientes:
+                futuro.set_exception(e)
+            return
+
+        self.lotes += 1
+        inicio = 0
+        for textos_peticion, futuro in pendientes:
+            futuro.set_result(vectores[inicio:inicio + len(textos_peticion)])
+            inicio += len(textos_peticion)
+
+
+class _ManejadorEmbeddings(BaseHTTPRequestHandler):
+    """
+    POST /embeddings con {"textos": [...]} devuelve los vectores como float32
+    little-endian (cabeceras X-Filas y X-Dimension). GET /salud comprueba el servicio.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path != '/salud':
+            self._responder(404, b'{"error": "No encontrado"}', 'application/json')
+            return
+        cuerpo = json.dumps({'estado': 'ok', 'lotes': self.server.agrupador.lotes}).encode('utf-8')
+        self._responder(200, cuerpo, 'application/json')
+
+    def do_POST(self):
+        if self.path != '/embeddings':
+            self._responder(404, b'{"error": "No encontrado"}', 'application/json')
+            return
+        try:
+            datos = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            textos = datos['textos']
+            if not isinstance(textos, list) or not all(isinstance(texto, str) for texto in textos):
+                raise ValueError("'textos' debe ser una lista de cadenas")
+        except (ValueError, KeyError, TypeError) as e:
+            self._responder(400, json.dumps({'error': str(e)}).encode('utf-8'), 'application/json')
+            return
+
+        try:
+            vectores = self.server.agrupador.codificar(textos).result() if textos else np.empty((0, 0), np.float32)
+        except Exception as e:
+            self._responder(500, json.dumps({'error': str(e)}).encode('utf-8'), 'application/json')
+            return
+
+        self._responder(200, vectores.astype('<f4', copy=False).tobytes(), 'application/octet-stream', {
+            'X-Filas': str(vectores.shape[0]),
+            'X-Dimension': str(vectores.shape[1]),
+        })
+
+    def _responder(self, estado: int, cuerpo: bytes, tipo: str, cabeceras: Optional[dict] = None):
+        self.send_response(estado)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def address_string(self):
+        # En un socket Unix la dirección del cliente es una cadena vacía
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, formato, *args):
+        logger.debug(formato % args)
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _ServidorHTTPUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def crear_servidor(modelo, url: str = URL_POR_DEFECTO, lote_maximo: int = 64, espera: float = 0.005,
+                   tamano_lote: int = 32):
+    """
+    Crea el servidor de embeddings (sin arrancarlo: llamar a serve_forever()).
+
+    Args:
+        modelo: Modelo con método encode
+        url: http://host:puerto o unix:///ruta/al/socket
+        lote_maximo: Textos máximos por microlote
+        espera: Segundos máximos de espera para completar un microlote
+        tamano_lote: Tamaño de lote interno del modelo
+
+    Returns:
+        Servidor con el atributo agrupador (AgrupadorLotes)
+    """
+    direccion = urlparse(url)
+    if direccion.scheme == 'unix':
+        # Eliminar el socket de una ejecución anterior
+        if os.path.exists(direccion.path):
+            os.unlink(direccion.path)
+        servidor = _ServidorHTTPUnix(direccion.path, _ManejadorEmbeddings)
+    elif direccion.scheme == 'http':
+        servidor = _ServidorHTTP((direccion.hostname or '127.0.0.1', direccion.port or 80), _ManejadorEmbeddings)
+    else:
+        raise ValueError(f"Dirección no soportada para el servidor de embeddings: {url}")
+
+    servidor.agrupador = AgrupadorLotes(modelo, lote_maximo, espera, tamano_lote)
+    return servidor
+
+
+class _ConexionUnix(http.client.HTTPConnection):
+    """Conexión HTTP sobre un socket Unix"""
+
+    def __init__(self, ruta: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.ruta = ruta
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.ruta)
+
+
+class ClienteEmbeddings:
+    """
+    Cliente del servidor de embeddings con la misma interfaz encode que
+    SentenceTransformer. Mantiene una conexión persistente por hilo.
+    """
+
+    def __init__(self, url: str = URL_POR_DEFECTO, timeout: float = 30):
+        """
+        Args:
+            url: http://host:puerto o unix:///ruta/al/socket
+            timeout: Tiempo máximo de cada petición en segundos
+        """
+        self.url = url
+        self.timeout = timeout
+        self._direccion = urlparse(url)
+        if self._direccion.scheme not in ('http', 'unix'):
+            raise ValueError(f"Dirección no soportada para el servidor de embeddings: {url}")
+        self._local = threading.local()
+
+    def _conexion(self) -> http.client.HTTPConnection:
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            if self._direccion.scheme == 'unix':
+                conexion = _ConexionUnix(self._direccion.path, self.timeout)
+            else:
+                conexion = http.client.HTTPConnection(self._direccion.hostname, self._direccion.port or 80,
+                                                      timeout=self.timeout)
+            self._local.conexion = conexion
+        return conexion
+
+    def _peticion(self, metodo: str, ruta: str, cuerpo: Optional[bytes] = None) -> http.client.HTTPResponse:
+        # Una conexión persistente puede haberla cerrado el servidor: se reintenta una vez
+        for intento in range(2):
+            conexion = self._conexion()
+            try:
+                conexion.request(metodo, ruta, body=cuerpo, headers={'Content-Type': 'application/json'})
+                return conexion.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                conexion.close()
+                self._local.conexion = None
+                if intento:
+                    raise
+
+    def encode(self, textos: Union[str, Sequence[str]], batch_size: Optional[int] = None, **kwargs) -> np.ndarray:
+        """
+        Genera los embeddings de uno o varios textos en el servidor.
+        El tamaño de lote lo decide el servidor; el parámetro se acepta por compatibilidad.
+
+        Args:
+            textos: Texto o lista de textos
+
+        Returns:
+            np.ndarray: Vector float32 (un texto) o matriz con un vector por texto
+        """
+        unico = isinstance(textos, str)
+        lista = [textos] if unico else list(textos)
+
+        respuesta = self._peticion('POST', '/embeddings', json.dumps({'textos': lista}).encode('utf-8'))
+        datos = respuesta.read()
+        if respuesta.status != 200:
+            raise RuntimeError(f"Error del servidor de embeddings ({respuesta.status}): {datos[:200]!r}")
+
+        filas = int(respuesta.getheader('X-Filas'))
+        dimension = int(respuesta.getheader('X-Dimension'))
+        vectores = np.frombuffer(datos, dtype='<f4').reshape(filas, dimension)
+        return vectores[0] if unico else vectores
+
+    def disponible(self) -> bool:
+        """Comprueba si el servidor responde"""
+        try:
+            respuesta = self._peticion('GET', '/salud')
+            respuesta.read()
+            return respuesta.status == 200
+        except OSError:
+            return False
+
+
+class CodificadorONNX:
+    """
+    Modelo de embeddings exportado a ONNX y ejecutado con onnxruntime.
+    Reproduce el pooling de sentence-transformers (media de los tokens y
+    normalización L2) y expone el mismo método encode.
+    """
+
+    def __init__(self, directorio: str, hilos: Optional[int] = None, longitud_maxima: int = LONGITUD_MAXIMA):
+        """
+        Args:
+            directorio: Directorio creado por exportar_onnx (modelo y tokenizador)
+            hilos: Hilos de onnxruntime por inferencia (por defecto, los núcleos disponibles)
+            longitud_maxima: Tokens máximos por texto
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        ruta = os.path.join(directorio, ARCHIVO_ONNX_CUANTIZADO)
+        if not os.path.exists(ruta):
+            ruta = os.path.join(directorio, ARCHIVO_ONNX)
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No hay un modelo ONNX en {directorio}; genéralo con el comando exportar_onnx")
+
+        opciones = onnxruntime.SessionOptions()
+        opciones.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if hilos:
+            opciones.intra_op_num_threads = hilos
+
+        self.ruta = ruta
+        self.longitud_maxima = longitud_maxima
+        self.tokenizador = AutoTokenizer.from_pretrained(directorio)
+        self.sesion = onnxruntime.InferenceSession(ruta, opciones, providers=['CPUExecutionProvider'])
+        self._entradas = {entrada.name for entrada in self.sesion.get_inputs()}
+
+    def _codificar_lote(self, textos: List[str]) -> np.ndarray:
+        tokens = self.tokenizador(textos, padding=True, truncation=True, max_length=self.longitud_maxima,
+                                  return_tensors='np')
+        entradas = {nombre: valores.astype(np.int64) for nombre, valores in tokens.items() if nombre in self._entradas}
+        estados = self.sesion.run(None, entradas)[0]
+
+        mascara = tokens['attention_mask'][..., None].astype(np.float32)
+        vectores = (estados * mascara).sum(axis=1) / np.clip(mascara.sum(axis=1), 1e-9, None)
+        vectores /= np.clip(np.linalg.norm(vectores, axis=1, keepdims=True), 1e-12, None)
+        return vectores.astype(np.float32)
+
+    def encode(self, textos: Union[str, Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        Genera los embeddings de uno o varios textos.
+
+        Args:
+            textos: Texto o lista de textos
+            batch_size: Textos por inferencia
+
+        Returns:
+            np.ndarray: Vector float32 (un texto) o matriz con un vector por texto
+        """
+        unico = isinstance(textos, str)
+        lista = [textos] if unico else list(textos)
+        if not lista:
+            return np.empty((0, 0), np.float32)
+
+        # Los textos de longitud parecida van en el mismo lote para reducir el relleno
+        orden = sorted(range(len(lista)), key=lambda i: len(lista[i]))
+        vectores = np.concatenate([
+            self._codificar_lote([lista[i] for i in orden[inicio:inicio + batch_size]])
+            for inicio in range(0, len(orden), batch_size)
+        ])
+        resultado = np.empty_like(vectores)
+        resultado[orden] = vectores
+        return resultado[0] if unico else resultado
+
+
+def exportar_onnx(directorio: str, nombre: str = MODEL_NAME, cuantizar: bool = True) -> str:
+    """
+    Exporta el modelo de embeddings a ONNX junto con su tokenizador y, si se
+    indica, genera una versión cuantizada a int8 (cuantización dinámica).
+    Requiere torch, transformers y onnxruntime.
+
+    Args:
+        directorio: Directorio de destino
+        nombre: Modelo de Hugging Face a exportar
+        cuantizar: Generar también el modelo cuantizado
+
+    Returns:
+        str: Ruta del modelo que usará CodificadorONNX
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(directorio, exist_ok=True)
+    tokenizador = AutoTokenizer.from_pretrained(nombre)
+    modelo = AutoModel.from_pretrained(nombre).eval()
+
+    ejemplo = tokenizador(['Real Decreto por el que se regula'], return_tensors='pt')
+    nombres_entradas = ['input_ids', 'attention_mask', 'token_type_ids']
+    ejes = {entrada: {0: 'lote', 1: 'tokens'} for entrada in nombres_entradas}
+    ejes['last_hidden_state'] = {0: 'lote', 1: 'tokens'}
+
+    ruta = os.path.join(directorio, ARCHIVO_ONNX)
+    with torch.no_grad():
+        torch.onnx.export(
+            modelo,
+            tuple(ejemplo[entrada] for entrada in nombres_entradas),
+            ruta,
+            input_names=nombres_entradas,
+            output_names=['last_hidden_state'],
+            dynamic_axes=ejes,
+            opset_version=14,
+        )
+    tokenizador.save_pretrained(directorio)
+
+    if not cuantizar:
+        return ruta
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    ruta_cuantizado = os.path.join(directorio, ARCHIVO_ONNX_CUANTIZADO)
+    quantize_dynamic(ruta, ruta_cuantizado, weight_type=QuantType.QInt8)
+    return ruta_cuantizado
+
+
+def similitud_minima(referencia: np.ndarray, candidato: np.ndarray) -> float:
+    """
+    Similitud coseno mínima entre los vectores de dos codificadores para los mismos textos.
+
+    Args:
+        referencia: Matriz de embeddings de referencia
+        candidato: Matriz de embeddings a comparar (mismo orden)
+
+    Returns:
+        float: Menor similitud coseno fila a fila
+    """
+    referencia = np.atleast_2d(referencia).astype(np.float64)
+    candidato = np.atleast_2d(candidato).astype(np.float64)
+    productos = (referencia * candidato).sum(axis=1)
+    normas = np.linalg.norm(referencia, axis=1) * np.linalg.norm(candidato, axis=1)
+    return float((productos / np.clip(normas, 1e-12, None)).min())
+
+
+def cargar_modelo_local(nombre: str = MODEL_NAME, backend: str = 'torch', directorio_onnx: Optional[str] = None):
+    """
+    Carga el modelo de embeddings en el proceso actual.
+
+    Args:
+        nombre: Modelo de sentence-transformers (backend 'torch')
+        backend: 'torch' (sentence-transformers) u 'onnx' (onnxruntime)
+        directorio_onnx: Directorio del modelo exportado (backend 'onnx')
+
+    Returns:
+        Objeto con método encode
+    """
+    if backend == 'onnx':
+        if not directorio_onnx:
+            raise ValueError(f"El backend 'onnx' necesita el directorio del modelo exportado ({VARIABLE_DIRECTORIO_ONNX})")
+        return CodificadorONNX(directorio_onnx)
+    if backend != 'torch':
+        raise ValueError(f"Backend de embeddings desconocido: {backend}")
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(nombre)
+
+
+def obtener_modelo_embeddings(url: Optional[str] = None, backend: Optional[str] = None,
+                              directorio_onnx: Optional[str] = None):
+    """
+    Devuelve el codificador de embeddings del proceso: el cliente del servidor
+    compartido si hay una dirección configurada (argumento o EMBEDDINGS_URL) y,
+    si no, el modelo cargado localmente con el backend configurado.
+
+    Args:
+        url: Dirección del servidor de embeddings (opcional)
+        backend: 'torch' u 'onnx' (por defecto, EMBEDDINGS_BACKEND o 'torch')
+        directorio_onnx: Directorio del modelo ONNX (por defecto, EMBEDDINGS_ONNX_DIR)
+
+    Returns:
+        Objeto con método encode
+    """
+    url = url or os.environ.get(VARIABLE_URL)
+    if url:
+        logger.info(f"Usando el servidor de embeddings en {url}")
+        return ClienteEmbeddings(url)
+    return cargar_modelo_local(
+        backend=backend or os.environ.get(VARIABLE_BACKEND, 'torch'),
+        directorio_onnx=directorio_onnx or os.environ.get(VARIABLE_DIRECTORIO_ONNX),
+    )
@@ -0,0 +1,359 @@
+"""
+Enriquecimiento de metadatos de los documentos existentes (departamento
+normalizado, código de departamento, palabras clave y materias).
+Los documentos se leen por lotes y cada lote pasa por tres etapas solapadas:
+descarga de textos en un pool de hilos, extracción de metadatos (CPU) en un
+pool de procesos y escritura con bulk_update junto con las facetas y el cubo.
+"""
+import logging
+import multiprocessing
+import re
+from collections import Counter, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.db import connections, transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from .models_alertas import CategoriaAlerta
+from .models_simplified import DocumentoSimplificado
+from .utils_articulos import guardar_secciones
+from .utils_boe import extraer_codigo_departamento, extraer_palabras_clave, obtener_documento_xml
+from .utils_cubo import actualizar_cubo, estado_cubo
+from .utils_facetas import actualizar_facetas, estado_facetas
+from .utils_http import nueva_generacion
+from .utils_referencias import guardar_referencias
+from .utils_textos import guardar_textos_pendientes, precargar_textos
+
+logger = logging.getLogger(__name__)
+
+# Patrones de nombres de departamento y su forma normalizada (gana el primero que aparezca)
+MAPA_DEPARTAMENTOS = {
+    r'ministerio\s+de\s+hacienda': 'Ministerio de Hacienda',
+    r'ministerio\s+de\s+cultura': 'Ministerio de Cultura',
+    r'ministerio\s+de\s+educaci[oó]n': 'Ministerio de Educación',
+    r'ministerio\s+de\s+trabajo': 'Ministerio de Trabajo',
+    r'ministerio\s+de\s+justicia': 'Ministerio de Justicia',
+    r'ministerio\s+de\s+sanidad': 'Ministerio de Sanidad',
+    r'ministerio\s+de\s+interior': 'Ministerio del Interior',
+    r'ministerio\s+de\s+defensa': 'Ministerio de Defensa',
+    r'ministerio\s+de\s+econom[ií]a': 'Ministerio de Economía',
+    r'ministerio\s+de\s+industria': 'Ministerio de Industria',
+    r'ministerio\s+de\s+ciencia': 'Ministerio de Ciencia',
+    r'ministerio\s+de\s+agricultura': 'Ministerio de Agricultura',
+    r'ministerio\s+de\s+transporte': 'Ministerio de Transportes',
+    r'ministerio\s+de\s+asuntos\s+exteriores': 'Ministerio de Asuntos Exteriores',
+    r'ministerio\s+de\s+transici[oó]n\s+ecol[oó]gica': 'Ministerio de Transición Ecológica',
+    r'ministerio\s+de\s+igualdad': 'Ministerio de Igualdad',
+    r'ministerio\s+de\s+inclusi[oó]n': 'Ministerio de Inclusión',
+    r'ministerio\s+de\s+universidades': 'Ministerio de Universidades',
+    r'ministerio\s+de\s+consumo': 'Ministerio de Consumo',
+    r'ministerio\s+de\s+derechos\s+sociales': 'Ministerio de Derechos Sociales',
+    r'ministerio\s+de\s+pol[ií]tica\s+territorial': 'Ministerio de Política Territorial',
+    r'banco\s+de\s+espa[ñn]a': 'Banco de España',
+    r'universidad': 'Universidades',
+    r'cortes\s+generales': 'Cortes Generales',
+    r'tribunal\s+constitucional': 'Tribunal Constitucional',
+    r'tribunal\s+supremo': 'Tribunal Supremo',
+    r'tribunal\s+de\s+cuentas': 'Tribunal de Cuentas',
+    r'consejo\s+general\s+del\s+poder\s+judicial': 'Consejo General del Poder Judicial',
+    r'junta\s+electoral\s+central': 'Junta Electoral Central',
+    r'comisi[oó]n\s+nacional': 'Comisión Nacional',
+}
+
+# Una sola expresión para todos los patrones. Cada alternativa es una búsqueda
+# anticipada anclada al inicio, de modo que se prueban en el orden del mapa
+# (como el antiguo bucle de re.search) y no gana la coincidencia más a la izquierda.
+_NORMALIZACIONES = list(MAPA_DEPARTAMENTOS.values())
+_PATRON_DEPARTAMENTOS = re.compile(
+    '|'.join(f'(?=.*?(?P<d{i}>{patron}))' for i, patron in enumerate(MAPA_DEPARTAMENTOS)),
+    re.DOTALL
+)
+
+# Campos que lee la etapa de extracción
+CAMPOS_EXTRACCION = ['identificador', 'titulo', 'texto', 'departamento', 'codigo_departamento', 'palabras_clave', 'materias']
+
+# Lotes que puede haber en cada etapa a la vez
+LOTES_EN_VUELO = 2
+
+# Categorías de alertas de los procesos de extracción (se envían una vez al crearlos)
+_categorias_proceso: Optional[Dict[str, List[str]]] = None
+
+
+def normalizar_departamento(departamento: Optional[str]) -> Optional[str]:
+    """
+    Normaliza el nombre del departamento para evitar duplicados.
+
+    Args:
+        departamento: Nombre tal como aparece en el BOE
+
+    Returns:
+        Optional[str]: Nombre normalizado, o el original si no coincide con ningún patrón
+    """
+    if not departamento:
+        return None
+    coincidencia = _PATRON_DEPARTAMENTOS.match(departamento.lower())
+    if coincidencia:
+        return _NORMALIZACIONES[int(coincidencia.lastgroup[1:])]
+    return departamento
+
+
+def cargar_categorias_alertas() -> Dict[str, List[str]]:
+    """Palabras clave de cada categoría de alertas, en minúsculas"""
+    categorias = {}
+    for categoria in CategoriaAlerta.objects.exclude(palabras_clave__isnull=True).exclude(palabras_clave=''):
+        categorias[categoria.nombre] = [p.strip().lower() for p in categoria.palabras_clave.split(',')]
+    return categorias
+
+
+def calcular_cambios(fila: Dict[str, Any], categorias: Dict[str, List[str]], forzar: bool = False) -> Dict[str, str]:
+    """
+    Calcula los metadatos nuevos de un documento. No accede a la base de datos,
+    por lo que puede ejecutarse en otro proceso.
+
+    Args:
+        fila: Valores de CAMPOS_EXTRACCION del documento
+        categorias: Palabras clave por categoría de alertas
+        forzar: Recalcular también los campos que ya tienen valor
+
+    Returns:
+        Dict[str, str]: Campos que cambian y su nuevo valor
+    """
+    cambios = {}
+
+    departamento = fila['departamento']
+    if departamento:
+        normalizado = normalizar_departamento(departamento)
+        if normalizado != departamento:
+            cambios['departamento'] = departamento = normalizado
+
+    if (not fila['codigo_departamento'] or forzar) and departamento:
+        codigo = extraer_codigo_departamento(departamento)
+        if codigo and codigo != fila['codigo_departamento']:
+            cambios['codigo_departamento'] = codigo
+
+    palabras_clave = fila['palabras_clave']
+    if not palabras_clave or forzar:
+        extraidas = extraer_palabras_clave(fila['titulo'], fila['texto'] or '', categorias)
+        if extraidas:
+            # Orden estable para no reescribir documentos que no han cambiado
+            palabras_clave = ", ".join(sorted(extraidas))
+            if palabras_clave != fila['palabras_clave']:
+                cambios['palabras_clave'] = palabras_clave
+
+    # Mientras no haya materias oficiales se usan las palabras clave
+    if (not fila['materias'] or forzar) and palabras_clave and palabras_clave != fila['materias']:
+        cambios['materias'] = palabras_clave
+
+    return cambios
+
+
+def _iniciar_proceso(categorias: Dict[str, List[str]]):
+    global _categorias_proceso
+    _categorias_proceso = categorias
+
+
+def _calcular_lote(filas: List[Dict[str, Any]], forzar: bool,
+                   categorias: Optional[Dict[str, List[str]]] = None) -> List[Tuple[str, Dict[str, str], Optional[str]]]:
+    """Extracción de un lote: (identificador, cambios, error) por documento"""
+    categorias = _categorias_proceso if categorias is None else categorias
+    resultados = []
+    for fila in filas:
+        try:
+            resultados.append((fila['identificador'], calcular_cambios(fila, categorias, forzar), None))
+        except Exception as e:
+            resultados.append((fila['identificador'], {}, str(e)))
+    return resultados
+
+
+def documentos_pendientes(forzar: bool = False) -> QuerySet:
+    """Documentos a enriquecer: todos o solo los que no tienen palabras clave o materias"""
+    if forzar:
+        return DocumentoSimplificado.objects.all()
+    return DocumentoSimplificado.objects.filter(
+        Q(palabras_clave__isnull=True) | Q(palabras_clave='') | Q(materias__isnull=True) | Q(materias='')
+    )
+
+
+class EnriquecedorMetadatos:
+    """
+    Recorre los documentos por lotes y actualiza sus metadatos.
+    """
+
+    def __init__(self, forzar: bool = False, actualizar_texto: bool = False, procesos: int = 1,
+                 descargas: int = 8, tamano_lote: int = 500, timeout: int = 30,
+                 categorias: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            forzar: Recalcular también los campos que ya tienen valor
+            actualizar_texto: Descargar el texto completo de los documentos que no lo tengan
+            procesos: Procesos de extracción (1 la ejecuta en el proceso actual)
+            descargas: Descargas de textos simultáneas
+            tamano_lote: Documentos por lote
+            timeout: Tiempo máximo de cada descarga en segundos
+            categorias: Palabras clave por categoría (por defecto, las de CategoriaAlerta)
+        """
+        self.forzar = forzar
+        self.actualizar_texto = actualizar_texto
+        self.procesos = max(1, procesos)
+        self.descargas = max(1, descargas)
+        self.tamano_lote = tamano_lote
+        self.timeout = timeout
+        self.categorias = cargar_categorias_alertas() if categorias is None else categorias
+        self.recuentos = Counter()
+
+    def ejecutar(self, documentos: Optional[QuerySet] = None, limite: Optional[int] = None) -> Counter:
+        """
+        Enriquece los documentos.
+
+        Args:
+            documentos: Documentos a procesar (por defecto, documentos_pendientes())
+            limite: Número máximo de documentos
+
+        Returns:
+            Counter: Recuentos de 'procesados', 'actualizados', 'textos', 'referencias', 'secciones' y 'errores'
+        """
+        documentos = documentos_pendientes(self.forzar) if documentos is None else documentos
+        self.recuentos = Counter()
+        descargando, calculando = deque(), deque()
+
+        # El pool de procesos se crea antes que los hilos de descarga para no hacer fork con hilos activos
+        with self._pool() as cpu, ThreadPoolExecutor(self.descargas, thread_name_prefix='enriquecimiento') as red:
+            for lote in self._lotes(documentos, limite):
+                descargando.append(self._descargar(red, lote))
+                while len(descargando) > LOTES_EN_VUELO:
+                    calculando.append(self._calcular(cpu, *descargando.popleft()))
+                while len(calculando) > LOTES_EN_VUELO:
+                    self._escribir(*calculando.popleft())
+
+            while descargando:
+                calculando.append(self._calcular(cpu, *descargando.popleft()))
+            while calculando:
+                self._escribir(*calculando.popleft())
+
+        if self.recuentos['actualizados']:
+            nueva_generacion()
+        return self.recuentos
+
+    def _pool(self) -> Executor:
+        if self.procesos == 1:
+            return ThreadPoolExecutor(1, thread_name_prefix='extraccion')
+        # Los procesos hijos no deben heredar las conexiones abiertas del padre
+        connections.close_all()
+        pool = ProcessPoolExecutor(
+            self.procesos,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_iniciar_proceso,
+            initargs=(self.categorias,)
+        )
+        # Arrancar ya los procesos (con fork se crean todos en el primer envío)
+        pool.submit(int).result()
+        return pool
+
+    def _lotes(self, documentos: QuerySet, limite: Optional[int]) -> Iterator[List[DocumentoSimplificado]]:
+        """Lee los documentos por lotes ordenados por clave primaria"""
+        ultimo, leidos = None, 0
+        while limite is None or leidos < limite:
+            consulta = documentos.order_by('pk')
+            if ultimo is not None:
+                consulta = consulta.filter(pk__gt=ultimo)
+            tamano = self.tamano_lote if limite is None else min(self.tamano_lote, limite - leidos)
+            lote = list(consulta[:tamano])
+            if not lote:
+                return
+            ultimo = lote[-1].pk
+            leidos += len(lote)
+            yield lote
+
+    def _descargar(self, red: Executor, lote: List[DocumentoSimplificado]) -> Tuple[List[DocumentoSimplificado], Dict[str, Future]]:
+        """Etapa de red: lanza la descarga de los textos (y referencias) que faltan"""
+        textos = {}
+        if self.actualizar_texto:
+            for documento in lote:
+                if (not documento.longitud_texto or self.forzar) and documento.url_xml:
+                    textos[documento.identificador] = red.submit(obtener_documento_xml, documento.url_xml, self.timeout)
+        return lote, textos
+
+    def _calcular(self, cpu: Executor, lote: List[DocumentoSimplificado],
+                  textos: Dict[str, Future]) -> Tuple[List[DocumentoSimplificado], Future]:
+        """Etapa de CPU: espera los textos del lote y lanza la extracción"""
+        # Textos ya guardados, en una consulta por lote
+        precargar_textos(lote)
+        for documento in lote:
+            documento._cambios = []
+            documento._referencias = []
+            documento._secciones = []
+            if documento.identificador not in textos:
+                continue
+            try:
+                texto, documento._referencias, documento._secciones = textos[documento.identificador].result()
+            except Exception as e:
+                logger.error(f"Error al descargar el texto de {documento.identificador}: {str(e)}")
+                continue
+            if texto and texto != documento.texto:
+                documento._texto_nuevo = texto
+                documento._cambios.append('texto')
+                self.recuentos['textos'] += 1
+
+        filas = []
+        for documento in lote:
+            fila = {campo: getattr(documento, campo) for campo in CAMPOS_EXTRACCION}
+            if 'texto' in documento._cambios:
+                fila['texto'] = documento._texto_nuevo
+            filas.append(fila)
+        categorias = self.categorias if self.procesos == 1 else None
+        return lote, cpu.submit(_calcular_lote, filas, self.forzar, categorias)
+
+    def _escribir(self, lote: List[DocumentoSimplificado], futuro: Future):
+        """Etapa de escritura: aplica los cambios del lote con bulk_update y actualiza facetas, cubo, referencias y artículos"""
+        resultados = {identificador: (cambios, error) for identificador, cambios, error in futuro.result()}
+        modificados, anteriores, campos = [], {}, set()
+
+        for documento in lote:
+            cambios, error = resultados[documento.identificador]
+            self.recuentos['procesados'] += 1
+            if error:
+                self.recuentos['errores'] += 1
+                logger.error(f"Error al procesar documento {documento.identificador}: {error}")
+                continue
+            if not cambios and not documento._cambios:
+                continue
+
+            anteriores[documento.identificador] = (estado_facetas(documento), estado_cubo(documento))
+            if 'texto' in documento._cambios:
+                documento.texto = documento._texto_nuevo
+            for campo, valor in cambios.items():
+                setattr(documento, campo, valor)
+            documento._cambios.extend(cambios)
+            campos.update(documento._cambios)
+            modificados.append(documento)
+
+        referencias = [referencia for documento in lote for referencia in documento._referencias]
+        if not modificados and not referencias:
+            return
+        with transaction.atomic():
+            if modificados:
+                # El texto se guarda aparte; en la tabla de documentos solo cambia su longitud
+                columnas = sorted('longitud_texto' if campo == 'texto' else campo for campo in campos)
+                ahora = timezone.now()
+                for documento in modificados:
+                    documento.actualizado = ahora
+                DocumentoSimplificado.objects.bulk_update(
+                    modificados, columnas + ['actualizado'], batch_size=self.tamano_lote
+                )
+                guardar_textos_pendientes(modificados)
+            self.recuentos['referencias'] += guardar_referencias(referencias)
+            self.recuentos['secciones'] += guardar_secciones({
+                documento.identificador: documento._secciones for documento in modificados if 'texto' in documento._cambios
+            })
+            for documento in modificados:
+                facetas, cubo = anteriores[documento.identificador]
+                if {'departamento', 'materias', 'palabras_clave'} & set(documento._cambios):
+                    actualizar_facetas(documento, facetas)
+                if {'departamento', 'materias'} & set(documento._cambios):
+                    actualizar_cubo(documento, cubo)
+
+        self.recuentos['actualizados'] += len(modificados)
+        logger.info(f"Lote escrito: {len(modificados)} de {len(lote)} documentos actualizados "
+                    f"(campos: {', '.join(sorted(campos))})")
@@ -0,0 +1,176 @@
+"""
+Servicio de estadísticas del panel de alertas.
+Calcula todas las series del panel con agregaciones condicionales y guarda
+el resultado en caché por usuario. La caché se invalida cuando cambian las
+notificaciones o las alertas del usuario (ver las señales en models_alertas).
+"""
+import datetime
+import random
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models_alertas import AlertaUsuario, CategoriaAlerta, NotificacionAlerta
+
+# Tiempo máximo en caché: la serie de tendencia depende del día actual
+TIMEOUT_ESTADISTICAS = 60 * 60
+
+# Días que abarca la serie de tendencia
+DIAS_TENDENCIA = 30
+
+COLORES_ESTADO = {
+    'pendiente': '#ffc107',  # Amarillo
+    'leida': '#28a745',  # Verde
+    'archivada': '#6c757d',  # Gris
+}
+COLOR_POR_DEFECTO = '#007bff'  # Azul
+
+
+def clave_estadisticas(usuario_id: int) -> str:
+    """Clave de caché de las estadísticas de un usuario"""
+    return f"estadisticas_alertas:{usuario_id}"
+
+
+def invalidar_estadisticas(usuario_id: Optional[int]):
+    """
+    Elimina de la caché las estadísticas de un usuario.
+
+    Args:
+        usuario_id: Identificador del usuario (se ignora si es None)
+    """
+    if usuario_id is not None:
+        cache.delete(clave_estadisticas(usuario_id))
+
+
+def obtener_estadisticas(usuario) -> Dict[str, Any]:
+    """
+    Obtiene las estadísticas del panel de un usuario, desde la caché si es posible.
+
+    Args:
+        usuario: Usuario autenticado
+
+    Returns:
+        Dict[str, Any]: Contexto con todas las series del panel de estadísticas
+    """
+    clave = clave_estadisticas(usuario.pk)
+    estadisticas = cache.get(clave)
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas(usuario)
+        cache.set(clave, estadisticas, TIMEOUT_ESTADISTICAS)
+    return estadisticas
+
+
+def calcular_estadisticas(usuario) -> Dict[str, Any]:
+    """
+    Calcula las estadísticas del panel de un usuario.
+    Las notificaciones se agregan en dos consultas (recuentos condicionales y
+    tendencia por día); las alertas y las categorías en una consulta cada una.
+
+    Args:
+        usuario: Usuario autenticado
+
+    Returns:
+        Dict[str, Any]: Contexto con todas las series del panel de estadísticas
+    """
+    notificaciones = NotificacionAlerta.objects.filter(alerta__usuario=usuario).order_by()
+
+    # 1. Totales, estados y relevancia en una sola consulta
+    estados = [estado for estado, _ in NotificacionAlerta.ESTADO_CHOICES]
+    agregados = notificaciones.aggregate(
+        total=Count('id'),
+        relevancia_alta=Count('id', filter=Q(relevancia__gte=75)),
+        relevancia_media=Count('id', filter=Q(relevancia__gte=50, relevancia__lt=75)),
+        relevancia_baja=Count('id', filter=Q(relevancia__lt=50)),
+        **{f'estado_{estado}': Count('id', filter=Q(estado=estado)) for estado in estados}
+    )
+
+    estados_labels = []
+    estados_data = []
+    estados_colors = []
+    for estado in estados:
+        total = agregados[f'estado_{estado}']
+        if total:
+            estados_labels.append(estado.capitalize())
+            estados_data.append(total)
+            estados_colors.append(COLORES_ESTADO.get(estado, COLOR_POR_DEFECTO))
+
+    # 2. Tendencia de notificaciones en el tiempo (últimos 30 días)
+    fecha_fin = timezone.now()
+    fecha_inicio = fecha_fin - datetime.timedelta(days=DIAS_TENDENCIA)
+
+    fechas = {}
+    fecha_actual = fecha_inicio.date()
+    while fecha_actual <= fecha_fin.date():
+        fechas[fecha_actual.strftime('%Y-%m-%d')] = 0
+        fecha_actual += datetime.timedelta(days=1)
+
+    por_fecha = (
+        notificaciones.filter(fecha_notificacion__gte=fecha_inicio, fecha_notificacion__lte=fecha_fin)
+        .annotate(fecha=TruncDate('fecha_notificacion'))
+        .values_list('fecha').annotate(total=Count('id'))
+    )
+    for fecha, total in por_fecha:
+        fechas[fecha.strftime('%Y-%m-%d')] = total
+
+    # 3. Alertas del usuario con su número de notificaciones y sus palabras clave
+    alertas = list(
+        AlertaUsuario.objects.filter(usuario=usuario).order_by()
+        .annotate(total_notificaciones=Count('notificaciones'))
+        .values_list('nombre', 'palabras_clave', 'total_notificaciones')
+    )
+
+    alertas_con_notificaciones = sorted(
+        ((nombre, total) for nombre, _, total in alertas if total),
+        key=lambda item: item[1], reverse=True
+    )
+
+    palabras_clave = Counter()
+    for _, palabras, _ in alertas:
+        for palabra in (palabras or '').split(','):
+            palabra = palabra.strip().lower()
+            if palabra:
+                palabras_clave[palabra] += 1
+    palabras_clave_ordenadas = palabras_clave.most_common(10)
+
+    # 4. Categorías más utilizadas, con su color
+    categorias = list(
+        CategoriaAlerta.objects.filter(alertas__usuario=usuario)
+        .values_list('nombre', 'color').annotate(total=Count('alertas')).order_by('-total')
+    )
+
+    return {
+        'total_alertas': len(alertas),
+        'total_notificaciones': agregados['total'],
+
+        # Datos para gráfico de estados
+        'estados_labels': estados_labels,
+        'estados_data': estados_data,
+        'estados_colors': estados_colors,
+
+        # Datos para gráfico de alertas (color aleatorio para cada alerta)
+        'alertas_labels': [nombre for nombre, _ in alertas_con_notificaciones],
+        'alertas_data': [total for _, total in alertas_con_notificaciones],
+        'alertas_colors': ["#{:06x}".format(random.randint(0, 0xFFFFFF)) for _ in alertas_con_notificaciones],
+
+        # Datos para gráfico de relevancia
+        'relevancia_labels': ['Alta', 'Media', 'Baja'],
+        'relevancia_data': [agregados['relevancia_alta'], agregados['relevancia_media'], agregados['relevancia_baja']],
+        'relevancia_colors': ['#28a745', '#ffc107', '#6c757d'],  # Verde, Amarillo, Gris
+
+        # Datos para gráfico de tendencia
+        'tendencia_labels': list(fechas.keys()),
+        'tendencia_data': list(fechas.values()),
+
+        # Datos para nube de palabras clave
+        'palabras_labels': [palabra for palabra, _ in palabras_clave_ordenadas],
+        'palabras_data': [total for _, total in palabras_clave_ordenadas],
+
+        # Datos para gráfico de categorías
+        'categorias_labels': [nombre for nombre, _, _ in categorias],
+        'categorias_data': [total for _, _, total in categorias],
+        'categorias_colors': [color or COLOR_POR_DEFECTO for _, color, _ in categorias],
+    }
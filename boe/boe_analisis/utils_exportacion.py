@@ -0,0 +1,305 @@
+"""
+Exportación masiva de los documentos en NDJSON, CSV o Parquet.
+Los documentos se leen en orden de identificador con un cursor del lado del
+servidor (QuerySet.iterator) y cada formato produce el resultado por trozos,
+de modo que la memoria no depende del tamaño de la exportación: la vista lo
+envía con StreamingHttpResponse y el comando exportar_documentos lo escribe
+en un fichero. Con cambiados_desde solo se exportan los documentos
+modificados desde una fecha (ver DocumentoSimplificado.actualizado), lo que
+permite mantener una réplica con exportaciones incrementales.
+"""
+import csv
+import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models_simplified import DocumentoSimplificado
+from .utils_http import volcar_json
+from .utils_textos import cargar_textos
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Sin pyarrow no se puede exportar en Parquet
+    pyarrow = None
+
+# Columnas exportadas, en orden (el texto, opcional, va al final)
+CAMPOS_EXPORTACION = (
+    'identificador',
+    'fecha_publicacion',
+    'titulo',
+    'departamento',
+    'codigo_departamento',
+    'materias',
+    'palabras_clave',
+    'url_pdf',
+    'url_xml',
+    'vigente',
+    'longitud_texto',
+    'actualizado',
+)
+
+# Formato -> (tipo MIME, extensión)
+FORMATOS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Filas leídas del cursor por viaje; también es el tamaño de los grupos de filas de Parquet
+TAMANO_LOTE = 2000
+
+
+def interpretar_fecha(valor: Optional[str], nombre: str) -> Optional[datetime.date]:
+    """
+    Convierte un parámetro AAAA-MM-DD en fecha.
+
+    Args:
+        valor: Valor del parámetro (None o vacío si no se ha indicado)
+        nombre: Nombre del parámetro, para el mensaje de error
+
+    Returns:
+        datetime.date: Fecha o None
+
+    Raises:
+        ValueError: Si el valor no es una fecha válida
+    """
+    if not valor:
+        return None
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValueError(f"Formato de fecha inválido para {nombre} (debe ser YYYY-MM-DD)")
+    return fecha
+
+
+def interpretar_momento(valor: Optional[str], nombre: str) -> Optional[datetime.datetime]:
+    """
+    Convierte un parámetro AAAA-MM-DD o una fecha y hora ISO 8601 en un
+    instante. Sin zona horaria se entiende la zona horaria actual.
+
+    Args:
+        valor: Valor del parámetro (None o vacío si no se ha indicado)
+        nombre: Nombre del parámetro, para el mensaje de error
+
+    Returns:
+        datetime.datetime: Instante o None
+
+    Raises:
+        ValueError: Si el valor no es una fecha ni una fecha y hora válidas
+    """
+    if not valor:
+        return None
+    try:
+        momento = parse_datetime(valor)
+    except ValueError:
+        momento = None
+    if momento is None:
+        fecha = parse_date(valor) if len(valor) == 10 else None
+        if fecha is None:
+            raise ValueError(f"Formato inválido para {nombre} (debe ser YYYY-MM-DD o una fecha y hora ISO 8601)")
+        momento = datetime.datetime.combine(fecha, datetime.time.min)
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def documentos_exportacion(desde: Optional[datetime.date] = None, hasta: Optional[datetime.date] = None,
+                           cambiados_desde: Optional[datetime.datetime] = None):
+    """
+    Documentos a exportar, en orden de identificador.
+
+    Args:
+        desde: Fecha de publicación mínima
+        hasta: Fecha de publicación máxima
+        cambiados_desde: Solo los documentos modificados desde este instante
+
+    Returns:
+        QuerySet: Filas (tuplas con CAMPOS_EXPORTACION)
+    """
+    documentos = DocumentoSimplificado.objects.all()
+    if desde:
+        documentos = documentos.filter(fecha_publicacion__gte=desde)
+    if hasta:
+        documentos = documentos.filter(fecha_publicacion__lte=hasta)
+    if cambiados_desde:
+        documentos = documentos.filter(actualizado__gte=cambiados_desde)
+    return documentos.order_by('identificador').values_list(*CAMPOS_EXPORTACION)
+
+
+def lotes_exportacion(documentos, incluir_texto: bool = False,
+                      lote: int = TAMANO_LOTE) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Recorre las filas con un cursor del lado del servidor, en lotes.
+
+    Args:
+        documentos: Filas de documentos_exportacion
+        incluir_texto: Añadir a cada fila el texto completo (una consulta por lote)
+        lote: Filas por lote
+
+    Yields:
+        List[Tuple]: Lote de filas, con el texto como última columna si se ha pedido
+    """
+    pendientes = []
+    for fila in documentos.iterator(chunk_size=lote):
+        pendientes.append(fila)
+        if len(pendientes) >= lote:
+            yield _con_textos(pendientes) if incluir_texto else pendientes
+            pendientes = []
+    if pendientes:
+        yield _con_textos(pendientes) if incluir_texto else pendientes
+
+
+def _con_textos(filas: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
+    indice_longitud = CAMPOS_EXPORTACION.index('longitud_texto')
+    textos = cargar_textos(fila[0] for fila in filas if fila[indice_longitud])
+    return [fila + (textos.get(fila[0]),) for fila in filas]
+
+
+def _columnas(incluir_texto: bool) -> Sequence[str]:
+    return CAMPOS_EXPORTACION + ('texto',) if incluir_texto else CAMPOS_EXPORTACION
+
+
+def _ndjson(lotes: Iterable[List[Tuple]], columnas: Sequence[str]) -> Iterator[bytes]:
+    for filas in lotes:
+        yield b''.join(volcar_json(dict(zip(columnas, fila))) + b'\n' for fila in filas)
+
+
+class _Eco:
+    """Destino de csv.writer que devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def _csv(lotes: Iterable[List[Tuple]], columnas: Sequence[str]) -> Iterator[bytes]:
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(columnas).encode('utf-8')
+    for filas in lotes:
+        yield ''.join(
+            escritor.writerow([valor.isoformat() if hasattr(valor, 'isoformat') else valor for valor in fila])
+            for fila in filas
+        ).encode('utf-8')
+
+
+class _Tubo:
+    """
+    Fichero de solo escritura para pyarrow: acumula lo escrito hasta que se
+    recoge, de modo que cada grupo de filas de Parquet se envía al generarse.
+    """
+
+    def __init__(self):
+        self.partes = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self.partes.append(datos)
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def recoger(self) -> bytes:
+        datos, self.partes = b''.join(self.partes), []
+        return datos
+
+
+def _esquema_parquet(incluir_texto: bool):
+    campos = [
+        ('identificador', pyarrow.string()),
+        ('fecha_publicacion', pyarrow.date32()),
+        ('titulo', pyarrow.string()),
+        ('departamento', pyarrow.string()),
+        ('codigo_departamento', pyarrow.string()),
+        ('materias', pyarrow.string()),
+        ('palabras_clave', pyarrow.string()),
+        ('url_pdf', pyarrow.string()),
+        ('url_xml', pyarrow.string()),
+        ('vigente', pyarrow.bool_()),
+        ('longitud_texto', pyarrow.int64()),
+        ('actualizado', pyarrow.timestamp('us', tz='UTC')),
+    ]
+    if incluir_texto:
+        campos.append(('texto', pyarrow.string()))
+    return pyarrow.schema(campos)
+
+
+def _parquet(lotes: Iterable[List[Tuple]], columnas: Sequence[str]) -> Iterator[bytes]:
+    esquema = _esquema_parquet('texto' in columnas)
+    tubo = _Tubo()
+    with pyarrow.parquet.ParquetWriter(tubo, esquema, compression='zstd') as escritor:
+        for filas in lotes:
+            # Un grupo de filas por lote: la memoria no crece con el número de lotes
+            escritor.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(list(columna), type=esquema.field(i).type) for i, columna in enumerate(zip(*filas))],
+                schema=esquema
+            ))
+            yield tubo.recoger()
+    # Pie del fichero con los metadatos de los grupos de filas
+    yield tubo.recoger()
+
+
+_ESCRITORES = {'ndjson': _ndjson, 'csv': _csv, 'parquet': _parquet}
+
+
+def exportar_documentos(formato: str, desde: Optional[datetime.date] = None, hasta: Optional[datetime.date] = None,
+                        cambiados_desde: Optional[datetime.datetime] = None, incluir_texto: bool = False,
+                        lote: int = TAMANO_LOTE) -> Iterator[bytes]:
+    """
+    Exporta los documentos por trozos en el formato indicado.
+
+    Args:
+        formato: 'ndjson', 'csv' o 'parquet'
+        desde: Fecha de publicación mínima
+        hasta: Fecha de publicación máxima
+        cambiados_desde: Solo los documentos modificados desde este instante
+        incluir_texto: Incluir el texto completo de cada documento
+        lote: Filas leídas por viaje a la base de datos
+
+    Returns:
+        Iterator[bytes]: Trozos del fichero exportado
+
+    Raises:
+        ValueError: Si el formato no existe o no está disponible
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato} (disponibles: {', '.join(FORMATOS)})")
+    if formato == 'parquet' and pyarrow is None:
+        raise ValueError("Hace falta el paquete pyarrow para exportar en Parquet")
+    lotes = lotes_exportacion(documentos_exportacion(desde, hasta, cambiados_desde), incluir_texto, lote)
+    return _ESCRITORES[formato](lotes, _columnas(incluir_texto))
+
+
+def parametros_exportacion(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Interpreta los parámetros de una exportación (de la petición o del comando).
+
+    Args:
+        parametros: 'formato', 'desde', 'hasta', 'cambiados_desde' y 'texto', como texto
+
+    Returns:
+        Dict[str, Any]: Argumentos de exportar_documentos
+
+    Raises:
+        ValueError: Si algún parámetro no es válido
+    """
+    return {
+        'formato': parametros.get('formato') or 'ndjson',
+        'desde': interpretar_fecha(parametros.get('desde'), 'desde'),
+        'hasta': interpretar_fecha(parametros.get('hasta'), 'hasta'),
+        'cambiados_desde': interpretar_momento(parametros.get('cambiados_desde'), 'cambiados_desde'),
+        'incluir_texto': str(parametros.get('texto', '')).lower() in ('1', 'true', 'si', 'sí'),
+    }
@@ -0,0 +1,312 @@
+"""
+Utilidades para mantener y consultar las facetas de departamentos y materias
+y el almacenamiento normalizado de materias y palabras clave.
+Las tablas se actualizan de forma incremental al ingerir documentos, de modo
+que los filtros usan índices en lugar de buscar subcadenas en campos CSV.
+"""
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models_facetas import (
+    DocumentoMateria, DocumentoPalabraClave, FacetaDepartamento, FacetaMateria, PalabraClave
+)
+from .models_simplified import DocumentoSimplificado
+
+logger = logging.getLogger(__name__)
+
+# Longitud máxima de los nombres en las tablas de facetas
+LONGITUD_NOMBRE = 200
+
+
+def separar_valores(texto: Optional[str]) -> List[str]:
+    """
+    Divide un campo de texto separado por comas en valores únicos.
+
+    Args:
+        texto: Texto separado por comas (por ejemplo, DocumentoSimplificado.materias)
+
+    Returns:
+        List[str]: Valores sin espacios sobrantes, sin vacíos y sin duplicados, en su orden original
+    """
+    if not texto:
+        return []
+
+    valores = []
+    vistos = set()
+    for valor in texto.split(','):
+        valor = valor.strip()[:LONGITUD_NOMBRE]
+        if valor and valor not in vistos:
+            vistos.add(valor)
+            valores.append(valor)
+    return valores
+
+
+def estado_facetas(documento: DocumentoSimplificado) -> Tuple[Optional[str], List[str]]:
+    """
+    Obtiene los valores de faceta de un documento.
+    Se llama antes de modificarlo para poder calcular después el cambio.
+
+    Args:
+        documento: Documento a inspeccionar
+
+    Returns:
+        Tuple[Optional[str], List[str]]: Departamento y lista de materias
+    """
+    departamento = documento.departamento[:LONGITUD_NOMBRE] if documento.departamento else None
+    return departamento, separar_valores(documento.materias)
+
+
+def actualizar_facetas(documento: DocumentoSimplificado, anterior: Optional[Tuple[Optional[str], List[str]]] = None):
+    """
+    Aplica a las tablas de facetas y de términos normalizados el cambio de un documento ya guardado.
+
+    Args:
+        documento: Documento recién creado o actualizado
+        anterior: Resultado de estado_facetas() antes de la modificación (None si el documento es nuevo)
+    """
+    departamento_nuevo, _ = estado_facetas(documento)
+    departamento_anterior = anterior[0] if anterior else None
+
+    deltas_departamentos = Counter()
+    if departamento_anterior != departamento_nuevo:
+        if departamento_anterior:
+            deltas_departamentos[departamento_anterior] -= 1
+        if departamento_nuevo:
+            deltas_departamentos[departamento_nuevo] += 1
+
+    with transaction.atomic():
+        # Los recuentos de materias salen de las diferencias en la tabla de relaciones
+        materias_nuevas, materias_quitadas = sincronizar_terminos(documento)
+        deltas_materias = Counter(materias_nuevas)
+        deltas_materias.subtract(materias_quitadas)
+
+        _aplicar_deltas(FacetaDepartamento, deltas_departamentos)
+        _aplicar_deltas(FacetaMateria, deltas_materias)
+
+
+def obtener_ids(modelo, nombres: Iterable[str]) -> Dict[str, int]:
+    """Obtiene (creándolos si no existen) los ids de un vocabulario por nombre"""
+    nombres = set(nombres)
+    if not nombres:
+        return {}
+    existentes = dict(modelo.objects.filter(nombre__in=nombres).values_list('nombre', 'id'))
+    nuevos = nombres - set(existentes)
+    if nuevos:
+        modelo.objects.bulk_create([modelo(nombre=nombre) for nombre in nuevos], ignore_conflicts=True)
+        existentes.update(modelo.objects.filter(nombre__in=nuevos).values_list('nombre', 'id'))
+    return existentes
+
+
+def _sincronizar_enlaces(modelo_enlace, campo: str, documento: DocumentoSimplificado,
+                         vocabulario: Dict[str, int]) -> Tuple[Set[str], Set[str]]:
+    """Ajusta las filas de una tabla de relaciones al vocabulario deseado de un documento"""
+    actuales = dict(
+        modelo_enlace.objects.filter(documento=documento)
+        .values_list(f'{campo}__nombre', f'{campo}_id')
+    )
+    nuevos_enlaces = set(vocabulario) - set(actuales)
+    enlaces_quitados = set(actuales) - set(vocabulario)
+
+    if enlaces_quitados:
+        modelo_enlace.objects.filter(
+            documento=documento, **{f'{campo}_id__in': [actuales[nombre] for nombre in enlaces_quitados]}
+        ).delete()
+    if nuevos_enlaces:
+        modelo_enlace.objects.bulk_create(
+            [modelo_enlace(documento=documento, **{f'{campo}_id': vocabulario[nombre]}) for nombre in nuevos_enlaces],
+            ignore_conflicts=True
+        )
+    return nuevos_enlaces, enlaces_quitados
+
+
+def sincronizar_terminos(documento: DocumentoSimplificado) -> Tuple[Set[str], Set[str]]:
+    """
+    Ajusta las tablas normalizadas de materias y palabras clave a los campos de texto del documento.
+
+    Args:
+        documento: Documento ya guardado
+
+    Returns:
+        Tuple[Set[str], Set[str]]: Materias añadidas y eliminadas
+    """
+    materias = obtener_ids(FacetaMateria, separar_valores(documento.materias))
+    palabras = obtener_ids(PalabraClave, separar_valores(documento.palabras_clave))
+
+    _sincronizar_enlaces(DocumentoPalabraClave, 'palabra', documento, palabras)
+    return _sincronizar_enlaces(DocumentoMateria, 'materia', documento, materias)
+
+
+def terminos_documentos(documentos) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Obtiene las materias y palabras clave normalizadas de varios documentos en dos consultas.
+
+    Args:
+        documentos: QuerySet de DocumentoSimplificado o lista de identificadores
+
+    Returns:
+        Dict[str, Dict[str, List[str]]]: Por identificador, listas 'materias' y 'palabras_clave'
+    """
+    if isinstance(documentos, QuerySet):
+        filtro = {'documento__in': documentos.order_by().values('identificador')}
+    else:
+        filtro = {'documento_id__in': list(documentos)}
+
+    terminos = {}
+    for identificador, nombre in DocumentoMateria.objects.filter(**filtro).values_list('documento_id', 'materia__nombre'):
+        terminos.setdefault(identificador, {'materias': [], 'palabras_clave': []})['materias'].append(nombre)
+    for identificador, nombre in DocumentoPalabraClave.objects.filter(**filtro).values_list('documento_id', 'palabra__nombre'):
+        terminos.setdefault(identificador, {'materias': [], 'palabras_clave': []})['palabras_clave'].append(nombre)
+    return terminos
+
+
+def _aplicar_deltas(modelo, deltas: Dict[str, int]):
+    """Suma (o resta) los deltas a los contadores de una tabla de facetas"""
+    for nombre, delta in deltas.items():
+        if delta > 0:
+            modelo.objects.get_or_create(nombre=nombre)
+            modelo.objects.filter(nombre=nombre).update(total_documentos=F('total_documentos') + delta)
+        elif delta < 0:
+            modelo.objects.filter(nombre=nombre).update(
+                total_documentos=Greatest(F('total_documentos') + delta, 0)
+            )
+
+
+def contar_materias(queryset: QuerySet) -> Counter:
+    """
+    Cuenta las materias de un QuerySet de documentos agrupando en la base de datos
+    sobre la tabla de relaciones normalizada.
+
+    Args:
+        queryset: QuerySet de DocumentoSimplificado
+
+    Returns:
+        Counter: Número de documentos por materia
+    """
+    filas = (
+        DocumentoMateria.objects.filter(documento__in=queryset.order_by().values('identificador'))
+        .order_by().values_list('materia__nombre').annotate(total=Count('documento'))
+    )
+    return Counter(dict(filas))
+
+
+def reconstruir_terminos(lote: int = 1000) -> int:
+    """
+    Reconstruye las tablas normalizadas de materias y palabras clave a partir
+    de los campos de texto de todos los documentos.
+
+    Args:
+        lote: Número de documentos procesados por transacción
+
+    Returns:
+        int: Número de documentos procesados
+    """
+    procesados = 0
+    documentos = DocumentoSimplificado.objects.order_by().only('identificador', 'materias', 'palabras_clave')
+    for documento in documentos.iterator(chunk_size=lote):
+        with transaction.atomic():
+            sincronizar_terminos(documento)
+        procesados += 1
+    logger.info(f"Términos normalizados reconstruidos para {procesados} documentos")
+    return procesados
+
+
+def recalcular_facetas() -> Dict[str, int]:
+    """
+    Recalcula por completo los recuentos de las tablas de facetas.
+    Los departamentos se agrupan sobre los documentos y las materias sobre la tabla de relaciones.
+
+    Returns:
+        Dict[str, int]: Número de departamentos y materias distintos
+    """
+    departamentos = Counter()
+    filas = (
+        DocumentoSimplificado.objects.exclude(departamento__isnull=True).exclude(departamento='')
+        .order_by().values_list('departamento').annotate(total=Count('identificador'))
+    )
+    for departamento, total in filas:
+        departamentos[departamento[:LONGITUD_NOMBRE]] += total
+
+    totales_materias = (
+        DocumentoMateria.objects.filter(materia=OuterRef('pk'))
+        .order_by().values('materia').annotate(total=Count('documento')).values('total')
+    )
+
+    with transaction.atomic():
+        FacetaDepartamento.objects.all().delete()
+        FacetaDepartamento.objects.bulk_create(
+            [FacetaDepartamento(nombre=nombre, total_documentos=total) for nombre, total in departamentos.items()],
+            batch_size=1000
+        )
+        # Las materias no se borran: son el vocabulario al que apunta DocumentoMateria
+        FacetaMateria.objects.update(total_documentos=Coalesce(Subquery(totales_materias), 0))
+
+    materias = FacetaMateria.objects.filter(total_documentos__gt=0).count()
+    logger.info(f"Facetas recalculadas: {len(departamentos)} departamentos, {materias} materias")
+    return {'departamentos': len(departamentos), 'materias': materias}
+
+
+def opciones_filtros() -> Tuple[QuerySet, QuerySet]:
+    """
+    Obtiene los valores disponibles para los desplegables de filtros.
+
+    Returns:
+        Tuple[QuerySet, QuerySet]: Departamentos y materias con al menos un documento, por orden alfabético
+    """
+    departamentos = FacetaDepartamento.objects.filter(total_documentos__gt=0).order_by('nombre')
+    materias = FacetaMateria.objects.filter(total_documentos__gt=0).order_by('nombre')
+    return departamentos, materias
+
+
+def _formatear(contador: Counter, limite: int) -> List[Dict[str, Any]]:
+    return [{'nombre': nombre, 'total': total} for nombre, total in contador.most_common(limite)]
+
+
+def contar_facetas(resultados: Optional[Iterable] = None, limite: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Calcula los recuentos de facetas de un conjunto de resultados.
+
+    Args:
+        resultados: None para todo el corpus (se leen las tablas precalculadas),
+            un QuerySet de documentos (se agrupa en la base de datos) o
+            una lista de documentos ya cargados (por ejemplo, una página de resultados semánticos)
+        limite: Número máximo de valores por faceta
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: Listas de {'nombre', 'total'} para departamentos y materias
+    """
+    if resultados is None:
+        return {
+            'departamentos': [
+                {'nombre': f.nombre, 'total': f.total_documentos}
+                for f in FacetaDepartamento.objects.filter(total_documentos__gt=0).order_by('-total_documentos')[:limite]
+            ],
+            'materias': [
+                {'nombre': f.nombre, 'total': f.total_documentos}
+                for f in FacetaMateria.objects.filter(total_documentos__gt=0).order_by('-total_documentos')[:limite]
+            ],
+        }
+
+    if isinstance(resultados, QuerySet):
+        departamentos = Counter(dict(
+            resultados.exclude(departamento__isnull=True).exclude(departamento='')
+            .order_by().values_list('departamento').annotate(total=Count('identificador'))
+        ))
+        materias = contar_materias(resultados)
+    else:
+        departamentos = Counter()
+        materias = Counter()
+        for documento in resultados:
+            departamento, materias_documento = estado_facetas(documento)
+            if departamento:
+                departamentos[departamento] += 1
+            materias.update(materias_documento)
+
+    return {
+        'departamentos': _formatear(departamentos, limite),
+        'materias': _formatear(materias, limite),
+    }
@@ -0,0 +1,230 @@
+"""
+Respuestas HTTP de la API: JSON rápido, validación condicional y compresión.
+Los datos públicos solo cambian cuando se ingieren o enriquecen documentos,
+así que cada cambio abre una nueva "generación" de los datos, guardada en la
+base de datos para que la vean todos los procesos (GeneracionDatos). El ETag
+y el Last-Modified de las respuestas se derivan de ella y los clientes que ya
+tienen la respuesta reciben un 304 sin que la vista se ejecute. Las
+respuestas grandes se comprimen con brotli o gzip según Accept-Encoding y el
+JSON se serializa con orjson si está instalado.
+"""
+import functools
+import hashlib
+import json
+import re
+import time
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.text import compress_string
+
+from .models_generacion import GeneracionDatos
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa el módulo json de la biblioteca estándar
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Sin brotli solo se comprime con gzip
+    brotli = None
+
+# Por debajo de este tamaño (bytes) comprimir no compensa
+TAMANO_MINIMO_COMPRESION = getattr(settings, 'API_TAMANO_MINIMO_COMPRESION', 1024)
+
+NIVEL_BROTLI = 5
+
+# Tiempo en caché de las respuestas de las vistas con cachear=True. La clave incluye la
+# generación, así que cualquier caché (también la local de cada proceso) se invalida al abrir otra
+TIMEOUT_RESPUESTAS = 24 * 60 * 60
+
+_ACEPTA_BROTLI = re.compile(r'\bbr\b')
+_ACEPTA_GZIP = re.compile(r'\bgzip\b')
+
+_codificador = DjangoJSONEncoder()
+
+
+def volcar_json(datos: Any) -> bytes:
+    """
+    Serializa datos a JSON (UTF-8), con orjson si está disponible.
+    Fechas, decimales y UUID se convierten como en DjangoJSONEncoder.
+
+    Args:
+        datos: Datos a serializar
+
+    Returns:
+        bytes: JSON codificado en UTF-8
+    """
+    if orjson is not None:
+        return orjson.dumps(datos, default=_codificador.default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8')
+
+
+def generacion_datos() -> int:
+    """
+    Generación actual de los datos públicos: marca de tiempo (en segundos) del
+    último cambio. Se lee de la base de datos, compartida por todos los procesos.
+
+    Returns:
+        int: Generación, utilizable como Last-Modified
+    """
+    generacion = GeneracionDatos.objects.filter(pk=1).values_list('generacion', flat=True).first()
+    if generacion is None:
+        generacion = GeneracionDatos.objects.get_or_create(pk=1, defaults={'generacion': int(time.time())})[0].generacion
+    return generacion
+
+
+def nueva_generacion() -> int:
+    """
+    Abre una nueva generación de los datos. Se llama al terminar una ingesta,
+    un enriquecimiento o un lote de tareas que modifica documentos.
+
+    Returns:
+        int: Nueva generación
+    """
+    ahora = int(time.time())
+    # La actualización es atómica aunque varios procesos abran una generación a la vez
+    if not GeneracionDatos.objects.filter(pk=1).update(generacion=Greatest(Value(ahora), F('generacion') + 1)):
+        GeneracionDatos.objects.get_or_create(pk=1, defaults={'generacion': ahora})
+    return generacion_datos()
+
+
+def comprimir_respuesta(request, respuesta: HttpResponse) -> HttpResponse:
+    """
+    Comprime el cuerpo de una respuesta con brotli o gzip si el cliente lo acepta
+    y merece la pena. El ETag pasa a ser débil, como hace GZipMiddleware.
+
+    Args:
+        request: Petición
+        respuesta: Respuesta sin comprimir
+
+    Returns:
+        HttpResponse: La misma respuesta, comprimida si procede
+    """
+    if respuesta.streaming or respuesta.has_header('Content-Encoding') or respuesta.status_code != 200:
+        return respuesta
+    patch_vary_headers(respuesta, ('Accept-Encoding',))
+    if len(respuesta.content) < TAMANO_MINIMO_COMPRESION:
+        return respuesta
+
+    acepta = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if brotli is not None and _ACEPTA_BROTLI.search(acepta):
+        contenido, codificacion = brotli.compress(respuesta.content, quality=NIVEL_BROTLI), 'br'
+    elif _ACEPTA_GZIP.search(acepta):
+        contenido, codificacion = compress_string(respuesta.content), 'gzip'
+    else:
+        return respuesta
+    if len(contenido) >= len(respuesta.content):
+        return respuesta
+
+    respuesta.content = contenido
+    respuesta['Content-Length'] = str(len(contenido))
+    respuesta['Content-Encoding'] = codificacion
+    etag = respuesta.get('ETag')
+    if etag and etag.startswith('"'):
+        respuesta['ETag'] = 'W/' + etag
+    return respuesta
+
+
+def respuesta_json(datos: Any, status: int = 200) -> HttpResponse:
+    """
+    Respuesta JSON serializada con volcar_json. Las vistas decoradas con
+    api_condicional la devuelven comprimida si procede.
+
+    Args:
+        datos: Datos a devolver (cualquier tipo serializable, no solo diccionarios)
+        status: Código de estado
+
+    Returns:
+        HttpResponse: Respuesta application/json
+    """
+    return HttpResponse(volcar_json(datos), content_type='application/json', status=status)
+
+
+def respuesta_condicional(request, etag: str, ultima_modificacion: int, crear: Callable[[], HttpResponse],
+                          privada: bool = False) -> HttpResponse:
+    """
+    Responde con validación condicional: 304 si el cliente ya tiene la versión
+    indicada por etag/ultima_modificacion y, si no, la respuesta de crear().
+
+    Args:
+        request: Petición
+        etag: ETag de la versión actual (sin comillas)
+        ultima_modificacion: Marca de tiempo de la versión actual (segundos)
+        crear: Construye la respuesta completa
+        privada: La respuesta depende del usuario (Cache-Control private y Vary: Cookie)
+
+    Returns:
+        HttpResponse: Respuesta 304 o completa, con ETag, Last-Modified y Cache-Control
+    """
+    etag = quote_etag(etag)
+    respuesta = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if respuesta is None:
+        respuesta = crear()
+        if respuesta.status_code != 200:
+            return respuesta
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(ultima_modificacion)
+    # Siempre se revalida: los datos cambian con la siguiente ingesta sin aviso
+    patch_cache_control(respuesta, max_age=0, must_revalidate=True)
+    if privada:
+        patch_cache_control(respuesta, private=True)
+        patch_vary_headers(respuesta, ('Cookie',))
+    else:
+        patch_cache_control(respuesta, public=True)
+    return comprimir_respuesta(request, respuesta)
+
+
+def api_condicional(vista: Optional[Callable] = None, *, cachear: bool = False):
+    """
+    Decorador para vistas de la API cuyos datos solo cambian con la generación:
+    las peticiones GET y HEAD se validan con un ETag de la generación actual
+    (304 sin ejecutar la vista) y las respuestas se comprimen.
+
+        @api_condicional
+        def api_referencias(request, identificador): ...
+
+        @api_condicional(cachear=True)
+        def estadisticas_cubo(request): ...
+
+    Args:
+        vista: Vista decorada
+        cachear: Guardar además en caché el cuerpo de las respuestas por URL y
+            generación, de modo que cada respuesta se construye una vez por ingesta
+    """
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return comprimir_respuesta(request, vista(request, *args, **kwargs))
+
+            generacion = generacion_datos()
+
+            def crear():
+                if not cachear:
+                    return vista(request, *args, **kwargs)
+                ruta = hashlib.sha256(request.get_full_path().encode('utf-8')).hexdigest()[:32]
+                clave = f"respuesta_api:{generacion}:{ruta}"
+                guardada = cache.get(clave)
+                if guardada is not None:
+                    contenido, tipo = guardada
+                    return HttpResponse(contenido, content_type=tipo)
+                respuesta = vista(request, *args, **kwargs)
+                if respuesta.status_code == 200 and not respuesta.streaming:
+                    cache.set(clave, (respuesta.content, respuesta['Content-Type']), TIMEOUT_RESPUESTAS)
+                return respuesta
+
+            return respuesta_condicional(request, f"g{generacion}", generacion, crear)
+        return envoltura
+
+    if vista is not None:
+        return decorador(vista)
+    return decorador
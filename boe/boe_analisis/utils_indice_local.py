@@ -0,0 +1,326 @@
+"""
+Índice vectorial local de respaldo para cuando Qdrant no está disponible.
+Guarda los mismos embeddings que la colección de Qdrant en matrices NumPy
+mapeadas en memoria (un archivo .npy por campo) y resuelve las búsquedas por
+fuerza bruta (producto matricial y top-k parcial). Los filtros por
+departamento se resuelven con máscaras precalculadas y los de fecha con
+comparaciones vectorizadas.
+QdrantBOE lo mantiene sincronizado al indexar y lo consulta si Qdrant falla;
+sin directorio funciona solo en memoria (útil en pruebas).
+Este módulo no depende de Django.
+"""
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Campos del índice: nombre -> (tipo NumPy, valor de las filas vacías)
+CAMPOS = {
+    'identificadores': ('<U32', ''),
+    'fechas': (np.int32, 0),            # Día ordinal de la fecha de publicación
+    'departamentos': (np.int32, -1),    # Código en la lista de nombres de departamento
+    'activos': (np.bool_, False),
+}
+
+ARCHIVO_METADATOS = 'indice.json'
+ARCHIVO_BLOQUEO = 'indice.lock'
+
+CAPACIDAD_INICIAL = 1024
+
+
+def _normalizar(vectores: np.ndarray) -> np.ndarray:
+    vectores = np.asarray(vectores, dtype=np.float32)
+    normas = np.linalg.norm(vectores, axis=-1, keepdims=True)
+    return vectores / np.clip(normas, 1e-12, None)
+
+
+def _ordinal(fecha) -> int:
+    if isinstance(fecha, str):
+        fecha = datetime.date.fromisoformat(fecha[:10])
+    return fecha.toordinal()
+
+
+class IndiceLocal:
+    """
+    Índice vectorial por fuerza bruta sobre matrices float32 normalizadas.
+    La similitud es el coseno, como en la colección de Qdrant.
+    """
+
+    def __init__(self, directorio: Optional[str] = None, dimension: int = 384):
+        """
+        Args:
+            directorio: Directorio de los archivos del índice (None para un índice solo en memoria)
+            dimension: Dimensión de los vectores
+        """
+        self.directorio = directorio
+        self.dimension = dimension
+        self._hilos = threading.RLock()
+        self._version = None
+        self.nombres_departamentos: List[str] = []
+
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        if directorio and os.path.exists(self._ruta(ARCHIVO_METADATOS)):
+            self._cargar()
+        else:
+            self._inicializar()
+
+    def __len__(self) -> int:
+        return int(self.activos[:self.filas].sum())
+
+    # Almacenamiento
+
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, nombre)
+
+    def _crear_array(self, nombre: str, forma: Tuple[int, ...], tipo, vacio) -> np.ndarray:
+        if not self.directorio:
+            return np.full(forma, vacio, dtype=tipo)
+        array = np.lib.format.open_memmap(self._ruta(f'{nombre}.npy.tmp'), mode='w+', dtype=tipo, shape=forma)
+        array[:] = vacio
+        return array
+
+    def _inicializar(self):
+        self.filas = 0
+        self.capacidad = 0
+        self.vectores = np.zeros((0, self.dimension), np.float32)
+        for nombre, (tipo, _) in CAMPOS.items():
+            setattr(self, nombre, np.zeros(0, tipo))
+        self._indexar_posiciones()
+
+    def _cargar(self):
+        with open(self._ruta(ARCHIVO_METADATOS), encoding='utf-8') as f:
+            metadatos = json.load(f)
+        self.filas = metadatos['filas']
+        self.dimension = metadatos['dimension']
+        self.nombres_departamentos = metadatos['departamentos']
+        self._version = metadatos['version']
+        if not os.path.exists(self._ruta('vectores.npy')):
+            # Índice vaciado: todavía no tiene matrices
+            self._inicializar()
+            return
+        self.vectores = np.load(self._ruta('vectores.npy'), mmap_mode='r+')
+        for nombre in CAMPOS:
+            setattr(self, nombre, np.load(self._ruta(f'{nombre}.npy'), mmap_mode='r+'))
+        self.capacidad = self.vectores.shape[0]
+        self._indexar_posiciones()
+
+    def _indexar_posiciones(self):
+        self.posiciones: Dict[str, int] = {
+            identificador: fila for fila, identificador in enumerate(self.identificadores[:self.filas].tolist())
+        }
+        self._codigos = {nombre: codigo for codigo, nombre in enumerate(self.nombres_departamentos)}
+        self._mascaras_departamento: Dict[int, np.ndarray] = {}
+
+    def _recargar_si_cambia(self):
+        """Vuelve a abrir el índice si otro proceso lo ha modificado"""
+        if not self.directorio or not os.path.exists(self._ruta(ARCHIVO_METADATOS)):
+            return
+        with open(self._ruta(ARCHIVO_METADATOS), encoding='utf-8') as f:
+            version = json.load(f)['version']
+        if version != self._version:
+            self._cargar()
+
+    def _ampliar(self, necesarias: int):
+        """Duplica la capacidad de las matrices hasta tener al menos 'necesarias' filas"""
+        if necesarias <= self.capacidad:
+            return
+        capacidad = max(necesarias, self.capacidad * 2, CAPACIDAD_INICIAL)
+        nuevos = {'vectores': self._crear_array('vectores', (capacidad, self.dimension), np.float32, 0)}
+        nuevos['vectores'][:self.filas] = self.vectores[:self.filas]
+        for nombre, (tipo, vacio) in CAMPOS.items():
+            nuevos[nombre] = self._crear_array(nombre, (capacidad,), tipo, vacio)
+            nuevos[nombre][:self.filas] = getattr(self, nombre)[:self.filas]
+
+        if self.directorio:
+            # Sustituir los archivos de forma atómica y volver a mapearlos
+            for nombre, array in nuevos.items():
+                array.flush()
+                os.replace(self._ruta(f'{nombre}.npy.tmp'), self._ruta(f'{nombre}.npy'))
+            nuevos = {nombre: np.load(self._ruta(f'{nombre}.npy'), mmap_mode='r+') for nombre in nuevos}
+        for nombre, array in nuevos.items():
+            setattr(self, nombre, array)
+        self.capacidad = capacidad
+
+    def _guardar(self):
+        """Vuelca las matrices a disco y publica una nueva versión de los metadatos"""
+        if not self.directorio:
+            return
+        for array in [self.vectores, *(getattr(self, nombre) for nombre in CAMPOS)]:
+            # Tras vaciar() las matrices vacías están en memoria
+            if isinstance(array, np.memmap):
+                array.flush()
+        # Versión única (no un contador): un índice reconstruido no repite versiones anteriores
+        self._version = time.time_ns()
+        temporal = self._ruta(f'{ARCHIVO_METADATOS}.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({
+                'filas': self.filas,
+                'dimension': self.dimension,
+                'departamentos': self.nombres_departamentos,
+                'version': self._version,
+            }, f)
+        os.replace(temporal, self._ruta(ARCHIVO_METADATOS))
+
+    @contextmanager
+    def _escritura(self):
+        """Bloqueo de escritura entre hilos y, si hay directorio, entre procesos"""
+        with self._hilos:
+            if not self.directorio or fcntl is None:
+                yield
+                return
+            with open(self._ruta(ARCHIVO_BLOQUEO), 'w') as bloqueo:
+                fcntl.flock(bloqueo, fcntl.LOCK_EX)
+                try:
+                    self._recargar_si_cambia()
+                    yield
+                finally:
+                    fcntl.flock(bloqueo, fcntl.LOCK_UN)
+
+    # Escritura
+
+    def anadir(self, identificadores: Sequence[str], vectores: np.ndarray, fechas: Sequence,
+               departamentos: Sequence[str]):
+        """
+        Inserta o actualiza documentos en el índice.
+
+        Args:
+            identificadores: Identificadores de los documentos
+            vectores: Matriz de embeddings (una fila por documento)
+            fechas: Fechas de publicación (date o cadena ISO)
+            departamentos: Nombres de departamento
+        """
+        if not len(identificadores):
+            return
+        vectores = _normalizar(np.atleast_2d(vectores))
+        with self._escritura():
+            nuevos = sum(1 for identificador in dict.fromkeys(identificadores) if identificador not in self.posiciones)
+            self._ampliar(self.filas + nuevos)
+
+            for identificador, vector, fecha, departamento in zip(identificadores, vectores, fechas, departamentos):
+                fila = self.posiciones.get(identificador)
+                if fila is None:
+                    fila = self.filas
+                    self.filas += 1
+                    self.posiciones[identificador] = fila
+                departamento = departamento or ''
+                if departamento not in self._codigos:
+                    self._codigos[departamento] = len(self.nombres_departamentos)
+                    self.nombres_departamentos.append(departamento)
+
+                self.vectores[fila] = vector
+                self.identificadores[fila] = identificador
+                self.fechas[fila] = _ordinal(fecha)
+                self.departamentos[fila] = self._codigos[departamento]
+                self.activos[fila] = True
+
+            self._mascaras_departamento.clear()
+            self._guardar()
+
+    def eliminar(self, identificadores: Iterable[str]):
+        """Marca documentos como eliminados (sus filas se reutilizan si se vuelven a añadir)"""
+        with self._escritura():
+            for identificador in identificadores:
+                fila = self.posiciones.get(identificador)
+                if fila is not None:
+                    self.activos[fila] = False
+            self._mascaras_departamento.clear()
+            self._guardar()
+
+    def vaciar(self):
+        """Elimina todos los documentos del índice y sus archivos"""
+        with self._escritura():
+            if self.directorio:
+                for nombre in ['vectores', *CAMPOS]:
+                    if os.path.exists(self._ruta(f'{nombre}.npy')):
+                        os.remove(self._ruta(f'{nombre}.npy'))
+            self.nombres_departamentos = []
+            self._inicializar()
+            self._guardar()
+
+    # Búsqueda
+
+    def _mascara(self, filtros: Optional[Dict]) -> np.ndarray:
+        mascara = np.array(self.activos[:self.filas], dtype=bool)
+        if not filtros:
+            return mascara
+
+        if filtros.get('departamento'):
+            codigo = self._codigos.get(filtros['departamento'])
+            if codigo is None:
+                return np.zeros(self.filas, dtype=bool)
+            if codigo not in self._mascaras_departamento:
+                self._mascaras_departamento[codigo] = self.departamentos[:self.filas] == codigo
+            mascara &= self._mascaras_departamento[codigo]
+
+        if filtros.get('fecha_desde'):
+            mascara &= self.fechas[:self.filas] >= _ordinal(filtros['fecha_desde'])
+        if filtros.get('fecha_hasta'):
+            mascara &= self.fechas[:self.filas] <= _ordinal(filtros['fecha_hasta'])
+        return mascara
+
+    def buscar(self, vector: np.ndarray, limite: int = 10, umbral: float = 0.0,
+               filtros: Optional[Dict] = None, offset: int = 0,
+               permitidos: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Busca los documentos más similares a un vector.
+
+        Args:
+            vector: Embedding de la consulta
+            limite: Número máximo de resultados
+            umbral: Similitud mínima (coseno)
+            filtros: departamento, fecha_desde y/o fecha_hasta, como en QdrantBOE
+            offset: Número de resultados del ranking a saltar
+            permitidos: Restringir la búsqueda a estos identificadores (opcional)
+
+        Returns:
+            List[Tuple[str, float]]: Pares (identificador, score) ordenados por similitud
+        """
+        # Solo la recarga y las máscaras necesitan el bloqueo; el cálculo se hace fuera
+        with self._hilos:
+            self._recargar_si_cambia()
+            mascara = self._mascara(filtros)
+            total, vectores, identificadores = self.filas, self.vectores, self.identificadores
+
+        if permitidos is not None:
+            mascara &= np.isin(identificadores[:total], list(permitidos))
+        filas = np.flatnonzero(mascara)
+        if not len(filas):
+            return []
+
+        matriz = vectores[:total] if len(filas) == total else vectores[filas]
+        puntuaciones = matriz @ _normalizar(vector)
+
+        k = min(offset + limite, len(filas))
+        mejores = np.argpartition(-puntuaciones, k - 1)[:k]
+        mejores = mejores[np.argsort(-puntuaciones[mejores], kind='stable')]
+        return [
+            (str(identificadores[filas[posicion]]), float(puntuaciones[posicion]))
+            for posicion in mejores[offset:]
+            if puntuaciones[posicion] >= umbral
+        ]
+
+
+_indices: Dict[str, IndiceLocal] = {}
+_bloqueo_indices = threading.Lock()
+
+
+def obtener_indice_local(directorio: str, dimension: int = 384) -> IndiceLocal:
+    """Índice local del proceso para un directorio (se abre una sola vez)"""
+    with _bloqueo_indices:
+        if directorio not in _indices:
+            _indices[directorio] = IndiceLocal(directorio, dimension)
+        return _indices[directorio]
@@ -0,0 +1,372 @@
+"""
+Pipeline asíncrono de ingesta de sumarios del BOE.
+Cada etapa (descarga del sumario, parseo, descarga de textos, escritura en la
+base de datos, generación de embeddings y subida a Qdrant) tiene su propia
+concurrencia y se comunica con la siguiente mediante una cola acotada, de
+modo que la red, la CPU y la base de datos trabajan en paralelo y una etapa
+lenta frena a las anteriores en lugar de acumular memoria.
+El trabajo bloqueante (peticiones HTTP, ORM, modelo, cliente de Qdrant) se
+ejecuta en pools de hilos dedicados a cada tipo de recurso.
+"""
+import asyncio
+import datetime
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models_simplified import DocumentoSimplificado
+from .utils_articulos import guardar_secciones
+from .utils_boe import extraer_items_sumario, obtener_documento_xml, obtener_sumario_boe
+from .utils_cubo import actualizar_cubo, estado_cubo
+from .utils_facetas import actualizar_facetas, estado_facetas, terminos_documentos
+from .utils_http import nueva_generacion
+from .utils_referencias import guardar_referencias
+from .utils_sumario import actualizar_sumarios
+from .utils_tareas import encolar_documentos
+from .utils_textos import guardar_textos_pendientes, precargar_textos
+
+logger = logging.getLogger(__name__)
+
+# Marca de fin de flujo que cada etapa envía a la siguiente
+FIN = object()
+
+# Campos que la ingesta actualiza en los documentos existentes
+# (el texto se guarda aparte, en la tabla solo cambia su longitud)
+CAMPOS_ACTUALIZABLES = ['titulo', 'url_pdf', 'url_xml', 'departamento', 'codigo_departamento', 'longitud_texto']
+
+
+def guardar_lote(items: List[Dict[str, Any]]) -> Tuple[List[DocumentoSimplificado], Dict[str, Dict[str, List[str]]], Counter]:
+    """
+    Crea o actualiza un lote de documentos en una transacción y mantiene las
+    facetas y el cubo de estadísticas.
+
+    Args:
+        items: Documentos extraídos del sumario (ver utils_boe.extraer_items_sumario),
+            con 'texto', 'referencias' y 'secciones' opcionales
+
+    Returns:
+        Tuple: Documentos guardados, sus términos normalizados y recuentos de 'creados',
+            'actualizados', 'referencias' y 'secciones'
+    """
+    recuentos = Counter()
+    # Un identificador repetido en el lote se guarda una sola vez (prevalece el último)
+    items = list({item['identificador']: item for item in items}.values())
+    with transaction.atomic():
+        existentes = DocumentoSimplificado.objects.in_bulk([item['identificador'] for item in items])
+        nuevos, actualizados, anteriores = [], [], {}
+        ahora = timezone.now()
+
+        for item in items:
+            documento = existentes.get(item['identificador'])
+            if documento is None:
+                nuevos.append(DocumentoSimplificado(
+                    identificador=item['identificador'],
+                    fecha_publicacion=item['fecha_publicacion'],
+                    titulo=item['titulo'],
+                    texto=item.get('texto'),
+                    url_pdf=item['url_pdf'],
+                    url_xml=item['url_xml'],
+                    departamento=item['departamento'],
+                    codigo_departamento=item['codigo_departamento'],
+                ))
+                continue
+
+            anteriores[documento.identificador] = (estado_facetas(documento), estado_cubo(documento))
+            cambiado = False
+            for campo in CAMPOS_ACTUALIZABLES:
+                if campo != 'longitud_texto' and getattr(documento, campo) != item[campo]:
+                    setattr(documento, campo, item[campo])
+                    cambiado = True
+            # El texto ya descargado se conserva si esta vez no se ha pedido
+            if item.get('texto'):
+                documento.texto = item['texto']
+                cambiado = True
+            # bulk_update no aplica auto_now: solo los documentos modificados cambian de fecha
+            if cambiado:
+                documento.actualizado = ahora
+            actualizados.append(documento)
+
+        DocumentoSimplificado.objects.bulk_create(nuevos, batch_size=500)
+        if actualizados:
+            DocumentoSimplificado.objects.bulk_update(
+                actualizados, CAMPOS_ACTUALIZABLES + ['actualizado'], batch_size=500
+            )
+        guardar_textos_pendientes(nuevos + actualizados)
+
+        # Grafo de referencias y estructura por artículos extraídos del XML de los documentos descargados
+        recuentos['referencias'] = guardar_referencias(
+            referencia for item in items for referencia in item.get('referencias', [])
+        )
+        recuentos['secciones'] = guardar_secciones(
+            {item['identificador']: item.get('secciones', []) for item in items if item.get('texto')}
+        )
+
+        for documento in nuevos:
+            actualizar_facetas(documento)
+            actualizar_cubo(documento)
+        for documento in actualizados:
+            facetas, cubo = anteriores[documento.identificador]
+            actualizar_facetas(documento, facetas)
+            actualizar_cubo(documento, cubo)
+
+    recuentos['creados'] = len(nuevos)
+    recuentos['actualizados'] = len(actualizados)
+    documentos = nuevos + actualizados
+    return documentos, terminos_documentos([documento.identificador for documento in documentos]), recuentos
+
+
+def identificadores_con_texto(identificadores: Iterable[str]) -> set:
+    """Identificadores que ya tienen el texto completo guardado (no hace falta descargarlo)"""
+    return set(
+        DocumentoSimplificado.objects.filter(identificador__in=list(identificadores), longitud_texto__isnull=False)
+        .values_list('identificador', flat=True)
+    )
+
+
+class PipelineIngesta:
+    """
+    Pipeline de ingesta por etapas con colas acotadas.
+
+    sumarios -> parseo -> textos -> base de datos -> embeddings -> Qdrant
+    """
+
+    def __init__(self, qdrant=None, con_texto: bool = False, descargas_sumario: int = 2,
+                 descargas_texto: int = 8, lote_bd: int = 200, lote_embeddings: int = 32,
+                 subidas: int = 2, tamano_cola: int = 256, espera_lote: float = 0.5,
+                 timeout: int = 60, archivo: Optional[str] = None, encolar: bool = False):
+        """
+        Args:
+            qdrant: Instancia de QdrantBOE (None para no indexar)
+            con_texto: Descargar el texto completo de los documentos que no lo tengan
+            descargas_sumario: Sumarios descargados en paralelo
+            descargas_texto: Textos descargados en paralelo
+            lote_bd: Documentos por transacción de escritura
+            lote_embeddings: Textos por llamada al modelo de embeddings
+            subidas: Lotes subidos a Qdrant en paralelo
+            tamano_cola: Capacidad de cada cola entre etapas
+            espera_lote: Segundos que un lote incompleto espera antes de procesarse
+            timeout: Tiempo máximo de cada petición HTTP
+            archivo: Leer el sumario de un archivo local en lugar de la API (una sola fecha)
+            encolar: Encolar las tareas posteriores de cada documento (texto, alertas y,
+                si no se indexa aquí, embeddings) para el comando boe_worker
+        """
+        self.qdrant = qdrant
+        self.con_texto = con_texto
+        self.descargas_sumario = descargas_sumario
+        self.descargas_texto = descargas_texto
+        self.lote_bd = lote_bd
+        self.lote_embeddings = lote_embeddings
+        self.subidas = subidas
+        self.tamano_cola = tamano_cola
+        self.espera_lote = espera_lote
+        self.timeout = timeout
+        self.archivo = archivo
+        self.encolar = encolar
+        self.estadisticas = Counter()
+
+    def ejecutar(self, fechas: List[datetime.date]) -> Counter:
+        """
+        Ejecuta el pipeline completo para una lista de fechas.
+
+        Args:
+            fechas: Fechas de los sumarios a ingerir
+
+        Returns:
+            Counter: Estadísticas (sumarios, documentos, creados, actualizados, textos, indexados, encoladas, errores)
+        """
+        return asyncio.run(self._ejecutar(fechas))
+
+    async def _ejecutar(self, fechas: List[datetime.date]) -> Counter:
+        self._red = ThreadPoolExecutor(self.descargas_sumario + self.descargas_texto, 'ingesta-red')
+        self._cpu = ThreadPoolExecutor(1, 'ingesta-parseo')
+        # Un único hilo para la base de datos: una conexión y escrituras serializadas
+        self._bd = ThreadPoolExecutor(1, 'ingesta-bd')
+        self._modelo = ThreadPoolExecutor(1, 'ingesta-embeddings')
+        self._qdrant = ThreadPoolExecutor(self.subidas, 'ingesta-qdrant')
+
+        # Fechas de publicación escritas, para rehacer sus sumarios al terminar
+        self._fechas_escritas = set()
+
+        cola_fechas = asyncio.Queue()
+        for fecha in fechas:
+            cola_fechas.put_nowait(fecha)
+        # Los sumarios completos ocupan mucho: solo se retienen los que se están parseando
+        cola_sumarios = asyncio.Queue(self.descargas_sumario)
+        cola_items, cola_bd, cola_embeddings, cola_puntos = (asyncio.Queue(self.tamano_cola) for _ in range(4))
+
+        etapas = [
+            self._etapa(self.descargas_sumario, cola_fechas, cola_sumarios, self._descargar_sumario, 1),
+            self._etapa(1, cola_sumarios, cola_items, self._parsear, self.descargas_texto),
+            self._etapa(self.descargas_texto, cola_items, cola_bd, self._descargar_texto, 1),
+            self._etapa_lotes(cola_bd, cola_embeddings, self.lote_bd, self._escribir, 1),
+        ]
+        if self.qdrant is not None:
+            etapas += [
+                self._etapa_lotes(cola_embeddings, cola_puntos, self.lote_embeddings, self._codificar, self.subidas),
+                self._etapa(self.subidas, cola_puntos, None, self._subir, 0),
+            ]
+        else:
+            etapas.append(self._descartar(cola_embeddings))
+
+        for _ in range(self.descargas_sumario):
+            cola_fechas.put_nowait(FIN)
+
+        tareas = [asyncio.ensure_future(etapa) for etapa in etapas]
+        try:
+            await asyncio.gather(*tareas)
+            if self._fechas_escritas:
+                # Invalida los ETag, los sumarios y las respuestas en caché de la API en todos los procesos
+                await self._en(self._bd, nueva_generacion)
+                await self._actualizar_sumarios()
+        except BaseException:
+            for tarea in tareas:
+                tarea.cancel()
+            raise
+        finally:
+            # Cerrar la conexión a la base de datos abierta en el hilo de escritura
+            await asyncio.get_running_loop().run_in_executor(self._bd, connections.close_all)
+            for pool in (self._red, self._cpu, self._bd, self._modelo, self._qdrant):
+                pool.shutdown(wait=False)
+
+        return self.estadisticas
+
+    async def _etapa(self, trabajadores: int, entrada: asyncio.Queue, salida: Optional[asyncio.Queue],
+                     procesar: Callable, consumidores: int):
+        """
+        Ejecuta una etapa con varios trabajadores concurrentes. Cada elemento
+        procesado puede producir varios elementos para la siguiente etapa.
+        Al terminar envía una marca de fin por cada consumidor de la salida.
+        """
+        async def trabajador():
+            while True:
+                elemento = await entrada.get()
+                if elemento is FIN:
+                    return
+                try:
+                    resultados = await procesar(elemento)
+                except Exception as e:
+                    self.estadisticas['errores'] += 1
+                    logger.error(f"Error en la etapa {procesar.__name__}: {str(e)}")
+                    continue
+                if salida is not None:
+                    for resultado in resultados or []:
+                        await salida.put(resultado)
+
+        await asyncio.gather(*(trabajador() for _ in range(trabajadores)))
+        if salida is not None:
+            for _ in range(consumidores):
+                await salida.put(FIN)
+
+    async def _etapa_lotes(self, entrada: asyncio.Queue, salida: asyncio.Queue, tamano: int,
+                           procesar: Callable, consumidores: int):
+        """
+        Agrupa los elementos de la entrada en lotes de hasta 'tamano' elementos
+        (o los que haya tras 'espera_lote' segundos sin recibir más) y los procesa en serie.
+        """
+        lote = []
+        terminado = False
+        while not terminado:
+            vencido = False
+            try:
+                elemento = await asyncio.wait_for(entrada.get(), timeout=self.espera_lote if lote else None)
+                if elemento is FIN:
+                    terminado = True
+                else:
+                    lote.append(elemento)
+            except asyncio.TimeoutError:
+                vencido = True
+
+            if lote and (terminado or vencido or len(lote) >= tamano):
+                try:
+                    resultados = await procesar(lote)
+                except Exception as e:
+                    self.estadisticas['errores'] += len(lote)
+                    logger.error(f"Error en la etapa {procesar.__name__}: {str(e)}")
+                    resultados = []
+                lote = []
+                for resultado in resultados or []:
+                    await salida.put(resultado)
+
+        for _ in range(consumidores):
+            await salida.put(FIN)
+
+    async def _descartar(self, entrada: asyncio.Queue):
+        """Consume la salida de la base de datos cuando no se indexa en Qdrant"""
+        while await entrada.get() is not FIN:
+            pass
+
+    async def _en(self, pool: ThreadPoolExecutor, funcion: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(pool, funcion, *args)
+
+    # Etapas
+
+    async def _descargar_sumario(self, fecha: datetime.date):
+        if self.archivo:
+            with open(self.archivo, 'rb') as f:
+                sumario_xml = f.read()
+        else:
+            sumario_xml = await self._en(self._red, obtener_sumario_boe, fecha, self.timeout)
+        if not sumario_xml:
+            logger.warning(f"No se pudo obtener el sumario del BOE para la fecha {fecha}")
+            return []
+        self.estadisticas['sumarios'] += 1
+        return [(fecha, sumario_xml)]
+
+    async def _parsear(self, sumario: Tuple[datetime.date, Any]):
+        fecha, sumario_xml = sumario
+        items = await self._en(self._cpu, extraer_items_sumario, sumario_xml, fecha)
+        self.estadisticas['documentos'] += len(items)
+        if self.con_texto and items:
+            con_texto = await self._en(self._bd, identificadores_con_texto, [item['identificador'] for item in items])
+            for item in items:
+                item['tiene_texto'] = item['identificador'] in con_texto
+        return items
+
+    async def _descargar_texto(self, item: Dict[str, Any]):
+        if self.con_texto and not item.get('tiene_texto') and item['url_xml']:
+            item['texto'], item['referencias'], item['secciones'] = await self._en(
+                self._red, obtener_documento_xml, item['url_xml'], self.timeout
+            )
+            if item['texto']:
+                self.estadisticas['textos'] += 1
+        return [item]
+
+    async def _escribir(self, items: List[Dict[str, Any]]):
+        documentos, terminos, recuentos = await self._en(self._bd, guardar_lote, items)
+        self.estadisticas.update(recuentos)
+        self._fechas_escritas.update(documento.fecha_publicacion for documento in documentos)
+        if self.encolar and documentos:
+            self.estadisticas['encoladas'] += await self._en(
+                self._bd, encolar_documentos, documentos, self.qdrant is None
+            )
+        return [(documento, terminos.get(documento.identificador, {})) for documento in documentos]
+
+    async def _codificar(self, lote: List[Tuple[DocumentoSimplificado, Dict[str, List[str]]]]):
+        # Los textos que no se acaban de descargar se leen del almacén en una consulta
+        await self._en(self._bd, precargar_textos, [documento for documento, _ in lote])
+        textos = [self.qdrant.texto_para_embedding(documento) for documento, _ in lote]
+        embeddings = await self._en(self._modelo, self.qdrant.generar_embeddings, textos, self.lote_embeddings)
+        puntos = [
+            self.qdrant.construir_punto(documento, embedding, terminos)
+            for (documento, terminos), embedding in zip(lote, embeddings)
+        ]
+        return [puntos]
+
+    async def _actualizar_sumarios(self):
+        # Un fallo al construir los sumarios no invalida la ingesta: la vista los construye al leerlos
+        try:
+            self.estadisticas['sumarios_cache'] = await self._en(
+                self._bd, actualizar_sumarios, self._fechas_escritas
+            )
+        except Exception as e:
+            self.estadisticas['errores'] += 1
+            logger.error(f"Error al actualizar los sumarios en caché: {str(e)}")
+
+    async def _subir(self, puntos):
+        await self._en(self._qdrant, self.qdrant.subir_puntos, puntos)
+        self.estadisticas['indexados'] += len(puntos)
+        return []
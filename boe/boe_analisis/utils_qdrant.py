@@ -6,7 +6,8 @@ indexar documentos del BOE y realizar búsquedas semánticas.
 
 import os
 import logging
-from typing import List, Dict, Any, Optional, Union
+import time
+from typing import List, Dict, Any, Optional, Tuple, Union
 import numpy as np
 import uuid
 from django.conf import settings
@@ -15,9 +16,14 @@ from functools import lru_cache
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
 
 from boe_analisis.models_simplified import DocumentoSimplificado
+from boe_analisis.utils_boe import extraer_rango
+from boe_analisis.utils_busqueda import filtro_cuerpo
+from boe_analisis.utils_embeddings import MODEL_NAME, obtener_modelo_embeddings
+from boe_analisis.utils_indice_local import IndiceLocal, obtener_indice_local
+from boe_analisis.utils_textos import precargar_textos
+from boe_analisis.utils_trazas import medir, tramo
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -29,35 +35,77 @@ COLLECTION_NAME = "boe_documentos"
 # Dimensión de los vectores (depende del modelo de embedding)
 VECTOR_SIZE = 384  # para all-MiniLM-L6-v2
 
-# Modelo de embedding
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Esquema de la colección; se puede ajustar con settings.QDRANT_COLECCION
+CONFIG_COLECCION = {
+    'cuantizacion': None,           # None, 'int8' (escalar) o 'binaria'
+    'cuantil': 0.99,                # Cuantil para acotar los valores en la cuantización int8
+    'cuantizacion_en_ram': True,    # Mantener siempre en memoria los vectores cuantizados
+    'vectores_en_disco': False,     # Guardar los vectores originales en disco (memmap)
+    'hnsw_m': 16,                   # Enlaces por nodo del grafo HNSW
+    'hnsw_ef_construct': 100,       # Candidatos explorados al construir el grafo
+    'hnsw_en_disco': False,         # Guardar el grafo HNSW en disco
+    'hnsw_ef': None,                # Candidatos explorados por búsqueda (None: valor del servidor)
+    'reordenar': True,              # Reordenar con los vectores originales tras buscar con los cuantizados
+    'sobremuestreo': 2.0,           # Candidatos cuantizados por resultado que se reordenan
+}
+
+# Segundos durante los que, tras un fallo de Qdrant, las búsquedas van directamente al índice local
+ESPERA_TRAS_CAIDA = 30
+
+# URL de Qdrant -> instante hasta el que se considera caído
+_caidas: Dict[str, float] = {}
 
 class QdrantBOE:
     """
     Clase para gestionar la integración con Qdrant para el sistema de alertas del BOE.
     """
     
-    def __init__(self, url: str = "http://localhost:6333", api_key: Optional[str] = None):
+    @medir('qdrant.inicializacion')
+    def __init__(self, url: str = "http://localhost:6333", api_key: Optional[str] = None, modelo=None,
+                 config_coleccion: Optional[Dict[str, Any]] = None, indice_local: Optional[IndiceLocal] = None):
         """
         Inicializa la conexión con Qdrant.
         
         Args:
-            url: URL del servidor Qdrant
+            url: URL del servidor Qdrant (":memory:" para una instancia local en memoria)
             api_key: Clave API para autenticación (opcional)
+            modelo: Modelo de embedding ya cargado, con método encode (opcional; por defecto
+                el servidor de embeddings si EMBEDDINGS_URL está definida o el modelo local
+                con el backend de settings.EMBEDDINGS_BACKEND: 'torch' u 'onnx')
+            config_coleccion: Esquema de la colección y parámetros de búsqueda (ver CONFIG_COLECCION);
+                por defecto, settings.QDRANT_COLECCION
+            indice_local: Índice vectorial local que se mantiene sincronizado y se consulta si
+                Qdrant falla; por defecto, el del directorio settings.INDICE_LOCAL_DIR (si está definido)
         """
         self.url = url
         self.api_key = api_key or os.environ.get("QDRANT_API_KEY")
+        if config_coleccion is None:
+            config_coleccion = getattr(settings, "QDRANT_COLECCION", {})
+        self.config = {**CONFIG_COLECCION, **config_coleccion}
+        if indice_local is None and getattr(settings, "INDICE_LOCAL_DIR", None):
+            indice_local = obtener_indice_local(settings.INDICE_LOCAL_DIR, VECTOR_SIZE)
+        self.indice_local = indice_local
         
         # Inicializar cliente de Qdrant
-        self.client = QdrantClient(url=url, api_key=self.api_key)
+        if url == ":memory:":
+            self.client = QdrantClient(location=url)
+        else:
+            self.client = QdrantClient(url=url, api_key=self.api_key)
         
         # Inicializar modelo de embedding
-        try:
-            self.model = SentenceTransformer(MODEL_NAME)
-            logger.info(f"Modelo de embedding inicializado: {MODEL_NAME}")
-        except Exception as e:
-            logger.error(f"Error al inicializar modelo de embedding: {str(e)}")
-            self.model = None
+        if modelo is not None:
+            self.model = modelo
+        else:
+            try:
+                backend = getattr(settings, "EMBEDDINGS_BACKEND", None)
+                self.model = obtener_modelo_embeddings(
+                    backend=backend,
+                    directorio_onnx=getattr(settings, "EMBEDDINGS_ONNX_DIR", None),
+                )
+                logger.info(f"Modelo de embedding inicializado: {MODEL_NAME} ({backend or 'por defecto'})")
+            except Exception as e:
+                logger.error(f"Error al inicializar modelo de embedding: {str(e)}")
+                self.model = None
         
         logger.info(f"Inicializado cliente Qdrant en {url}")
         
@@ -84,10 +132,20 @@ class QdrantBOE:
                     logger.info(f"La colección {COLLECTION_NAME} ya existe")
                     return True
             
-            # Crear la colección
+            # Crear la colección con el esquema configurado
             self.client.create_collection(
                 collection_name=COLLECTION_NAME,
-                vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE),
+                vectors_config=VectorParams(
+                    size=VECTOR_SIZE,
+                    distance=Distance.COSINE,
+                    on_disk=self.config['vectores_en_disco'],
+                ),
+                hnsw_config=models.HnswConfigDiff(
+                    m=self.config['hnsw_m'],
+                    ef_construct=self.config['hnsw_ef_construct'],
+                    on_disk=self.config['hnsw_en_disco'],
+                ),
+                quantization_config=self._config_cuantizacion(),
             )
             
             # Crear índices para búsqueda por filtros
@@ -103,6 +161,12 @@ class QdrantBOE:
                 field_schema="keyword",
             )
             
+            self.client.create_payload_index(
+                collection_name=COLLECTION_NAME,
+                field_name="lista_materias",
+                field_schema="keyword",
+            )
+            
             logger.info(f"Colección {COLLECTION_NAME} creada exitosamente")
             return True
             
@@ -110,6 +174,61 @@ class QdrantBOE:
             logger.error(f"Error al crear colección: {str(e)}")
             return False
     
+    def _config_cuantizacion(self):
+        """
+        Configuración de cuantización de la colección según self.config['cuantizacion'].
+        
+        Returns:
+            Configuración de Qdrant o None si los vectores no se cuantizan
+        """
+        tipo = self.config['cuantizacion']
+        if not tipo:
+            return None
+        if tipo == 'int8':
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=self.config['cuantil'],
+                    always_ram=self.config['cuantizacion_en_ram'],
+                )
+            )
+        if tipo == 'binaria':
+            if not hasattr(models, 'BinaryQuantization'):
+                raise ValueError("La cuantización binaria requiere qdrant-client >= 1.7")
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=self.config['cuantizacion_en_ram'])
+            )
+        raise ValueError(f"Tipo de cuantización desconocido: {tipo}")
+    
+    def parametros_busqueda(self, hnsw_ef: Optional[int] = None, exacta: bool = False) -> Optional[models.SearchParams]:
+        """
+        Parámetros de búsqueda de una consulta: precisión del recorrido HNSW,
+        búsqueda exacta y uso de los vectores cuantizados.
+        
+        Args:
+            hnsw_ef: Candidatos explorados en el grafo (por defecto, self.config['hnsw_ef'])
+            exacta: Búsqueda exhaustiva con los vectores originales (sin HNSW ni cuantización)
+            
+        Returns:
+            Optional[models.SearchParams]: Parámetros o None para usar los del servidor
+        """
+        cuantizacion = None
+        if self.config['cuantizacion']:
+            if exacta:
+                cuantizacion = models.QuantizationSearchParams(ignore=True)
+            else:
+                cuantizacion = models.QuantizationSearchParams(
+                    ignore=False,
+                    rescore=self.config['reordenar'],
+                    oversampling=self.config['sobremuestreo'],
+                )
+        
+        hnsw_ef = hnsw_ef or self.config['hnsw_ef']
+        if not (hnsw_ef or exacta or cuantizacion):
+            return None
+        return models.SearchParams(hnsw_ef=hnsw_ef, exact=exacta, quantization=cuantizacion)
+    
+    @medir('qdrant.embedding')
     def generar_embedding(self, texto: str) -> np.ndarray:
         """
         Genera un embedding para el texto proporcionado.
@@ -144,54 +263,112 @@ class QdrantBOE:
             logger.error(f"Error al generar embedding: {str(e)}")
             raise
     
-    def indexar_documento(self, documento: DocumentoSimplificado) -> bool:
+    @medir('qdrant.embeddings_lote')
+    def generar_embeddings(self, textos: List[str], tamano_lote: int = 32) -> np.ndarray:
+        """
+        Genera los embeddings de varios textos en una sola llamada al modelo.
+        
+        Args:
+            textos: Textos para generar embeddings
+            tamano_lote: Tamaño de lote interno del modelo
+            
+        Returns:
+            np.ndarray: Matriz con un vector de embedding por texto
+        """
+        if not self.model:
+            raise Exception("Modelo de embedding no inicializado")
+        return self.model.encode(textos, batch_size=tamano_lote)
+    
+    @staticmethod
+    def texto_para_embedding(documento: DocumentoSimplificado) -> str:
+        """Texto del que se genera el embedding de un documento (título + texto)"""
+        return f"{documento.titulo} {documento.texto if documento.texto else ''}"
+    
+    @staticmethod
+    def construir_punto(documento: DocumentoSimplificado, embedding: np.ndarray,
+                        terminos: Optional[Dict[str, List[str]]] = None) -> PointStruct:
+        """
+        Construye el punto de Qdrant de un documento.
+        
+        Args:
+            documento: Documento a indexar
+            embedding: Vector de embedding del documento
+            terminos: Materias y palabras clave normalizadas del documento
+                (si no se indican, se leen de las tablas normalizadas)
+            
+        Returns:
+            PointStruct: Punto con el vector y el payload de metadatos
+        """
+        # Generar un UUID basado en el identificador del documento
+        # Esto es necesario porque Qdrant solo acepta enteros o UUIDs como IDs
+        punto_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, documento.identificador))
+        
+        # Materias y palabras clave desde las tablas normalizadas
+        if terminos is None:
+            from .utils_facetas import terminos_documentos
+            terminos = terminos_documentos([documento.identificador]).get(documento.identificador, {})
+        materias = terminos.get('materias', [])
+        palabras_clave = terminos.get('palabras_clave', [])
+        
+        # Preparar payload con metadatos
+        payload = {
+            "identificador": documento.identificador,
+            "titulo": documento.titulo,
+            "texto": documento.texto,  
+            "fecha_publicacion": documento.fecha_publicacion.isoformat(),
+            "departamento": documento.departamento or "",
+            "codigo_departamento": documento.codigo_departamento or "",
+            "materias": ", ".join(materias),
+            "palabras_clave": ", ".join(palabras_clave),
+            "lista_materias": materias,
+            "lista_palabras_clave": palabras_clave,
+            "url_pdf": documento.url_pdf or "",
+            "url_xml": documento.url_xml or "",
+            "vigente": documento.vigente,  
+            "longitud_texto": documento.longitud_texto or 0,
+        }
+        
+        vector = embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
+        return PointStruct(id=punto_id, vector=vector, payload=payload)
+    
+    def subir_puntos(self, puntos: List[PointStruct]):
+        """
+        Inserta o actualiza un lote de puntos en la colección.
+        
+        Args:
+            puntos: Puntos construidos con construir_punto
+        """
+        # El índice local se actualiza primero: sigue al día aunque Qdrant falle
+        if self.indice_local is not None:
+            with tramo('indice_local.upsert'):
+                self.indice_local.anadir(
+                    [punto.payload['identificador'] for punto in puntos],
+                    np.array([punto.vector for punto in puntos], dtype=np.float32),
+                    [punto.payload['fecha_publicacion'] for punto in puntos],
+                    [punto.payload['departamento'] for punto in puntos],
+                )
+        with tramo('qdrant.upsert'):
+            self.client.upsert(collection_name=COLLECTION_NAME, points=puntos)
+    
+    @medir('qdrant.indexar_documento')
+    def indexar_documento(self, documento: DocumentoSimplificado, terminos: Optional[Dict[str, List[str]]] = None) -> bool:
         """
         Indexa un documento en Qdrant.
         
         Args:
             documento: Documento a indexar
+            terminos: Materias y palabras clave normalizadas del documento
+                (si no se indican, se leen de las tablas normalizadas)
             
         Returns:
             bool: True si la operación fue exitosa
         """
         try:
-            # Preparar el texto para el embedding (título + texto)
-            texto_completo = f"{documento.titulo} {documento.texto if documento.texto else ''}"
-            
-            # Generar embedding
-            embedding = self.generar_embedding(texto_completo)
-            
-            # Generar un UUID basado en el identificador del documento
-            # Esto es necesario porque Qdrant solo acepta enteros o UUIDs como IDs
-            punto_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, documento.identificador))
-            
-            # Preparar payload con metadatos
-            payload = {
-                "identificador": documento.identificador,
-                "titulo": documento.titulo,
-                "texto": documento.texto,  
-                "fecha_publicacion": documento.fecha_publicacion.isoformat(),
-                "departamento": documento.departamento or "",
-                "codigo_departamento": documento.codigo_departamento or "",
-                "materias": documento.materias or "",
-                "palabras_clave": documento.palabras_clave or "",
-                "url_pdf": documento.url_pdf or "",
-                "url_xml": documento.url_xml or "",
-                "vigente": documento.vigente,  
-                "longitud_texto": len(documento.texto) if documento.texto else 0,  
-            }
+            # Generar embedding del título + texto
+            embedding = self.generar_embedding(self.texto_para_embedding(documento))
             
             # Indexar en Qdrant
-            self.client.upsert(
-                collection_name=COLLECTION_NAME,
-                points=[
-                    PointStruct(
-                        id=punto_id,
-                        vector=embedding.tolist(),
-                        payload=payload
-                    )
-                ]
-            )
+            self.subir_puntos([self.construir_punto(documento, embedding, terminos)])
             
             logger.info(f"Documento {documento.identificador} indexado exitosamente")
             return True
@@ -226,9 +403,13 @@ class QdrantBOE:
                 "fallidos": 0
             }
             
-            # Indexar cada documento
-            for documento in query:
-                if self.indexar_documento(documento):
+            # Materias y palabras clave normalizadas de todos los documentos, en dos consultas
+            from .utils_facetas import terminos_documentos
+            terminos = terminos_documentos([documento.identificador for documento in query])
+            
+            # Indexar cada documento (los textos se leen del almacén en una consulta)
+            for documento in precargar_textos(query):
+                if self.indexar_documento(documento, terminos.get(documento.identificador, {})):
                     stats["exitosos"] += 1
                 else:
                     stats["fallidos"] += 1
@@ -244,12 +425,15 @@ class QdrantBOE:
             logger.error(f"Error al indexar documentos: {str(e)}")
             return {"total": 0, "exitosos": 0, "fallidos": 0, "error": str(e)}
     
+    @medir('qdrant.buscar_similares')
     def buscar_similares(
         self, 
         texto: str, 
         limit: int = 10, 
         score_threshold: float = 0.3,
-        filtros: Optional[Dict[str, Any]] = None
+        filtros: Optional[Dict[str, Any]] = None,
+        hnsw_ef: Optional[int] = None,
+        exacta: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Busca documentos similares al texto proporcionado.
@@ -259,6 +443,8 @@ class QdrantBOE:
             limit: Número máximo de resultados
             score_threshold: Umbral mínimo de similitud (0-1)
             filtros: Filtros adicionales para la búsqueda
+            hnsw_ef: Candidatos explorados en el grafo HNSW (más precisión, más latencia)
+            exacta: Búsqueda exhaustiva sin índice aproximado
             
         Returns:
             List[Dict[str, Any]]: Lista de documentos similares
@@ -286,41 +472,18 @@ class QdrantBOE:
                 "with_payload": True,
             }
             
+            parametros = self.parametros_busqueda(hnsw_ef, exacta)
+            if parametros:
+                search_params["search_params"] = parametros
+            
             # Añadir filtros si existen
-            if filtros:
-                conditions = []
-                
-                if "departamento" in filtros and filtros["departamento"]:
-                    conditions.append(
-                        models.FieldCondition(
-                            key="departamento",
-                            match={"value": filtros["departamento"]}
-                        )
-                    )
-                
-                if "fecha_desde" in filtros and filtros["fecha_desde"]:
-                    conditions.append(
-                        models.FieldCondition(
-                            key="fecha_publicacion",
-                            range={"gte": filtros["fecha_desde"].isoformat()}
-                        )
-                    )
-                
-                if "fecha_hasta" in filtros and filtros["fecha_hasta"]:
-                    conditions.append(
-                        models.FieldCondition(
-                            key="fecha_publicacion",
-                            range={"lte": filtros["fecha_hasta"].isoformat()}
-                        )
-                    )
-                
-                if conditions:
-                    search_params["filter"] = models.Filter(
-                        must=conditions
-                    )
+            filtro = self._construir_filtro(filtros)
+            if filtro:
+                search_params["filter"] = filtro
             
             # Realizar búsqueda
-            search_result = self.client.search(**search_params)
+            with tramo('qdrant.search'):
+                search_result = self.client.search(**search_params)
             
             # Formatear resultados
             resultados = []
@@ -336,6 +499,186 @@ class QdrantBOE:
             logger.error(f"Error al buscar documentos similares: {str(e)}")
             return []
 
+    @medir('qdrant.buscar_ids_similares')
+    def buscar_ids_similares(
+        self,
+        texto: str,
+        limit: int = 10,
+        score_threshold: float = 0.3,
+        filtros: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        hnsw_ef: Optional[int] = None,
+        exacta: bool = False
+    ) -> List[Tuple[str, float]]:
+        """
+        Busca documentos similares y devuelve solo sus identificadores y puntuaciones.
+        No transfiere el payload completo (texto incluido): los documentos se
+        hidratan después desde la base de datos con utils_resultados.hidratar_resultados.
+        
+        Args:
+            texto: Texto para buscar documentos similares
+            limit: Número máximo de resultados
+            score_threshold: Umbral mínimo de similitud (0-1)
+            filtros: Filtros adicionales para la búsqueda
+            offset: Número de resultados del ranking a saltar (paginación)
+            hnsw_ef: Candidatos explorados en el grafo HNSW (más precisión, más latencia)
+            exacta: Búsqueda exhaustiva sin índice aproximado
+            
+        Returns:
+            List[Tuple[str, float]]: Pares (identificador, score) ordenados por similitud
+        """
+        try:
+            texto_procesado = self._preprocesar_consulta(texto)
+            query_vector = self.generar_embedding(texto_procesado)
+            
+            search_params = {
+                "collection_name": COLLECTION_NAME,
+                "query_vector": query_vector.tolist(),
+                "limit": limit,
+                "score_threshold": score_threshold,
+                "with_payload": ["identificador"],
+            }
+            
+            if offset:
+                search_params["offset"] = offset
+            
+            parametros = self.parametros_busqueda(hnsw_ef, exacta)
+            if parametros:
+                search_params["search_params"] = parametros
+            
+            filtro = self._construir_filtro(filtros)
+            if filtro:
+                search_params["filter"] = filtro
+            
+            if self.indice_local is not None and self.qdrant_caido():
+                return self.buscar_ids_locales(query_vector, limit, score_threshold, filtros, offset)
+            
+            try:
+                with tramo('qdrant.search'):
+                    search_result = self.client.search(**search_params)
+            except Exception as e:
+                if self.indice_local is None:
+                    raise
+                logger.warning(f"Qdrant no disponible, se usa el índice local: {str(e)}")
+                self.marcar_caida()
+                return self.buscar_ids_locales(query_vector, limit, score_threshold, filtros, offset)
+            
+            return [
+                (hit.payload.get("identificador"), hit.score)
+                for hit in search_result
+                if hit.payload and hit.payload.get("identificador")
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error al buscar identificadores similares: {str(e)}")
+            return []
+
+    def buscar_ids_locales(
+        self,
+        query_vector: np.ndarray,
+        limit: int = 10,
+        score_threshold: float = 0.3,
+        filtros: Optional[Dict[str, Any]] = None,
+        offset: int = 0
+    ) -> List[Tuple[str, float]]:
+        """
+        Busca en el índice local los documentos más similares a un vector,
+        con los mismos filtros que la búsqueda en Qdrant.
+        
+        Args:
+            query_vector: Embedding de la consulta
+            limit: Número máximo de resultados
+            score_threshold: Umbral mínimo de similitud (0-1)
+            filtros: Diccionario con departamento, materia, fecha_desde y/o fecha_hasta
+            offset: Número de resultados del ranking a saltar (paginación)
+            
+        Returns:
+            List[Tuple[str, float]]: Pares (identificador, score) ordenados por similitud
+        """
+        permitidos = None
+        if filtros and filtros.get("materia"):
+            # Las materias no se guardan en el índice local: se resuelven con las tablas normalizadas
+            from .models_facetas import DocumentoMateria
+            permitidos = set(DocumentoMateria.objects.filter(
+                materia__nombre=filtros["materia"]
+            ).values_list('documento_id', flat=True))
+        
+        with tramo('indice_local.search'):
+            return self.indice_local.buscar(query_vector, limit, score_threshold, filtros, offset, permitidos)
+    
+    def qdrant_caido(self) -> bool:
+        """Indica si Qdrant ha fallado hace menos de ESPERA_TRAS_CAIDA segundos"""
+        return _caidas.get(self.url, 0) > time.monotonic()
+    
+    def marcar_caida(self):
+        """Registra un fallo de Qdrant: las búsquedas usarán el índice local durante un tiempo"""
+        _caidas[self.url] = time.monotonic() + ESPERA_TRAS_CAIDA
+    
+    def busqueda_semantica_disponible(self, estado: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Indica si se pueden hacer búsquedas semánticas: la colección de Qdrant
+        tiene documentos o hay un índice local con documentos.
+        
+        Args:
+            estado: Resultado de verificar_estado (si ya se ha obtenido)
+        """
+        if self.indice_local is not None and len(self.indice_local):
+            return True
+        estado = estado or self.verificar_estado()
+        return bool(estado.get('coleccion_existe') and estado.get('total_documentos', 0))
+    
+    def _construir_filtro(self, filtros: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+        """
+        Construye el filtro de Qdrant a partir de los filtros de búsqueda.
+        
+        Args:
+            filtros: Diccionario con departamento, materia, fecha_desde y/o fecha_hasta
+            
+        Returns:
+            Optional[models.Filter]: Filtro de Qdrant o None si no hay condiciones
+        """
+        if not filtros:
+            return None
+        
+        conditions = []
+        
+        if "departamento" in filtros and filtros["departamento"]:
+            conditions.append(
+                models.FieldCondition(
+                    key="departamento",
+                    match={"value": filtros["departamento"]}
+                )
+            )
+        
+        if "materia" in filtros and filtros["materia"]:
+            conditions.append(
+                models.FieldCondition(
+                    key="lista_materias",
+                    match={"value": filtros["materia"]}
+                )
+            )
+        
+        if "fecha_desde" in filtros and filtros["fecha_desde"]:
+            conditions.append(
+                models.FieldCondition(
+                    key="fecha_publicacion",
+                    range={"gte": filtros["fecha_desde"].isoformat()}
+                )
+            )
+        
+        if "fecha_hasta" in filtros and filtros["fecha_hasta"]:
+            conditions.append(
+                models.FieldCondition(
+                    key="fecha_publicacion",
+                    range={"lte": filtros["fecha_hasta"].isoformat()}
+                )
+            )
+        
+        if not conditions:
+            return None
+        
+        return models.Filter(must=conditions)
+
     def _preprocesar_consulta(self, texto: str) -> str:
         """
         Preprocesa una consulta para mejorar los resultados de búsqueda.
@@ -392,6 +735,7 @@ class QdrantBOE:
         logger.info(f"Consulta sin procesar: '{texto}'")
         return texto
 
+    @medir('qdrant.buscar_por_palabras_clave')
     def buscar_por_palabras_clave(self, texto: str, limite: int = 10, filtros: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Realiza una búsqueda por palabras clave en la base de datos.
@@ -415,7 +759,7 @@ class QdrantBOE:
             query = Q()
             for palabra in palabras:
                 if len(palabra) > 2:  # Ignorar palabras muy cortas
-                    query |= Q(titulo__icontains=palabra) | Q(texto__icontains=palabra)
+                    query |= Q(titulo__icontains=palabra) | Q(palabras_clave__icontains=palabra) | filtro_cuerpo(palabra)
             
             # Aplicar filtros adicionales si existen
             if filtros:
@@ -423,13 +767,13 @@ class QdrantBOE:
                     query &= Q(departamento__icontains=filtros['departamento'])
                 
                 if 'fecha_desde' in filtros and filtros['fecha_desde']:
-                    query &= Q(fecha__gte=filtros['fecha_desde'])
+                    query &= Q(fecha_publicacion__gte=filtros['fecha_desde'])
                 
                 if 'fecha_hasta' in filtros and filtros['fecha_hasta']:
-                    query &= Q(fecha__lte=filtros['fecha_hasta'])
+                    query &= Q(fecha_publicacion__lte=filtros['fecha_hasta'])
             
             # Ejecutar la consulta
-            resultados = DocumentoSimplificado.objects.filter(query).order_by('-fecha')[:limite]
+            resultados = DocumentoSimplificado.objects.filter(query).order_by('-fecha_publicacion')[:limite]
             
             # Formatear resultados
             resultados_formateados = []
@@ -437,9 +781,9 @@ class QdrantBOE:
                 resultados_formateados.append({
                     'id': doc.identificador,
                     'titulo': doc.titulo,
-                    'fecha': doc.fecha.strftime('%Y-%m-%d') if doc.fecha else None,
+                    'fecha': doc.fecha_publicacion.strftime('%Y-%m-%d') if doc.fecha_publicacion else None,
                     'departamento': doc.departamento,
-                    'rango': doc.rango,
+                    'rango': extraer_rango(doc.titulo),
                     'score': 1.0,  # Score fijo para resultados de palabras clave
                     'origen': 'palabras_clave'
                 })
@@ -452,7 +796,9 @@ class QdrantBOE:
             logger.error(traceback.format_exc())
             return []
     
-    def busqueda_hibrida(self, texto: str, limite: int = 10, score_threshold: float = 0.1, filtros: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    @medir('qdrant.busqueda_hibrida')
+    def busqueda_hibrida(self, texto: str, limite: int = 10, score_threshold: float = 0.1, filtros: Optional[Dict[str, Any]] = None,
+                         hnsw_ef: Optional[int] = None, exacta: bool = False) -> Dict[str, Any]:
         """
         Realiza una búsqueda híbrida combinando resultados de búsqueda semántica y por palabras clave.
         
@@ -461,6 +807,8 @@ class QdrantBOE:
             limite: Número máximo de resultados
             score_threshold: Umbral mínimo de similitud para resultados semánticos
             filtros: Filtros adicionales para la búsqueda
+            hnsw_ef: Candidatos explorados en el grafo HNSW en la búsqueda semántica
+            exacta: Búsqueda semántica exhaustiva sin índice aproximado
             
         Returns:
             Dict[str, Any]: Resultados combinados de ambas búsquedas
@@ -482,24 +830,34 @@ class QdrantBOE:
             try:
                 logger.info(f"Intentando búsqueda semántica para: '{texto}'")
                 # Verificar estado de Qdrant antes de buscar
-                estado = self.verificar_estado()
-                if not estado.get('coleccion_existe') or estado.get('total_documentos', 0) == 0:
-                    logger.error(f"Qdrant no está listo: {estado}")
-                    raise Exception(f"Qdrant no está listo: {estado}")
+                if not self.busqueda_semantica_disponible():
+                    raise Exception(f"Qdrant no está listo: {self.verificar_estado()}")
                 
-                resultados_semanticos = self.buscar_similares(
-                    texto, 
-                    limit=limite, 
-                    score_threshold=score_threshold, 
-                    filtros=filtros
+                ids_semanticos = self.buscar_ids_similares(
+                    texto,
+                    limit=limite,
+                    score_threshold=score_threshold,
+                    filtros=filtros,
+                    hnsw_ef=hnsw_ef,
+                    exacta=exacta
                 )
-                
-                # Añadir resultados semánticos que no estén ya incluidos
+
+                # Hidratar en una sola consulta solo los resultados que no estén ya incluidos
+                from .utils_resultados import hidratar_resultados
+                resultados_semanticos = hidratar_resultados(
+                    [(doc_id, score) for doc_id, score in ids_semanticos if doc_id not in ids_vistos]
+                )
+
                 for doc in resultados_semanticos:
-                    if doc['id'] not in ids_vistos:
-                        ids_vistos.add(doc['id'])
-                        doc['origen'] = 'semantica'
-                        resultados_combinados.append(doc)
+                    ids_vistos.add(doc.identificador)
+                    resultados_combinados.append({
+                        'id': doc.identificador,
+                        'titulo': doc.titulo,
+                        'fecha': doc.fecha_publicacion.strftime('%Y-%m-%d'),
+                        'departamento': doc.departamento,
+                        'score': doc.score,
+                        'origen': 'semantica'
+                    })
                 
                 tipo_busqueda = 'hibrida'
                 logger.info(f"Búsqueda híbrida exitosa: {len(resultados_keywords)} por palabras clave + {len(resultados_semanticos)} semánticos")
@@ -569,6 +927,9 @@ class QdrantBOE:
             # Generar UUID a partir del identificador
             punto_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, identificador))
             
+            if self.indice_local is not None:
+                self.indice_local.eliminar([identificador])
+            
             self.client.delete(
                 collection_name=COLLECTION_NAME,
                 points_selector=models.PointIdsList(
@@ -604,6 +965,7 @@ class QdrantBOE:
             logger.error(f"Error al obtener estadísticas: {str(e)}")
             return {"error": str(e)}
 
+    @medir('qdrant.verificar_estado')
     def verificar_estado(self) -> Dict[str, Any]:
         """
         Verifica el estado de la conexión con Qdrant y de la colección.
@@ -634,6 +996,7 @@ class QdrantBOE:
                 "estado_conexion": "ok",
                 "url_qdrant": self.url,
                 "coleccion_existe": coleccion_existe,
+                "total_documentos": (info_coleccion or {}).get("puntos_indexados") or 0,
                 "nombre_coleccion": COLLECTION_NAME,
                 "info_coleccion": info_coleccion,
                 "todas_colecciones": collection_names
@@ -643,6 +1006,7 @@ class QdrantBOE:
             logger.error(f"Error al verificar estado de Qdrant: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
+            self.marcar_caida()
             return {
                 "estado_conexion": "error",
                 "error": str(e),
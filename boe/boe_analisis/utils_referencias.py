@@ -0,0 +1,172 @@
+"""
+Grafo de referencias entre normas del BOE (modificaciones, derogaciones,
+correcciones...). Las aristas se guardan en bloque durante la ingesta a partir
+del XML de cada documento (ver utils_boe.extraer_referencias_xml) y se
+consultan por nivel, con una consulta por nivel del recorrido.
+"""
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.db.models import QuerySet
+
+from .models_referencias import ReferenciaNorma
+from .models_simplified import DocumentoSimplificado
+
+logger = logging.getLogger(__name__)
+
+# Relaciones que cambian el contenido o la vigencia de la norma afectada
+RELACIONES_CAMBIO = (ReferenciaNorma.MODIFICA, ReferenciaNorma.DEROGA, ReferenciaNorma.ANULA, ReferenciaNorma.CORRIGE)
+
+# Profundidad máxima por defecto de las cadenas de modificaciones
+PROFUNDIDAD_MAXIMA = 10
+
+_PATRON_IDENTIFICADOR = re.compile(r'^[A-Z]+-[A-Z]+-(\d{4})-(\d+)$')
+
+
+def guardar_referencias(referencias: Iterable[Dict[str, Any]], lote: int = 1000) -> int:
+    """
+    Guarda en bloque las aristas del grafo. Las que ya existen se ignoran
+    (cada referencia aparece en el XML de las dos normas).
+
+    Args:
+        referencias: Diccionarios de utils_boe.extraer_referencias_xml
+        lote: Filas por inserción
+
+    Returns:
+        int: Número de referencias distintas recibidas
+    """
+    unicas = {}
+    for referencia in referencias:
+        unicas.setdefault((referencia['origen'], referencia['destino'], referencia['relacion']), referencia)
+    if not unicas:
+        return 0
+    ReferenciaNorma.objects.bulk_create(
+        [ReferenciaNorma(**referencia) for referencia in unicas.values()],
+        batch_size=lote,
+        ignore_conflicts=True
+    )
+    return len(unicas)
+
+
+def normas_que_afectan(identificador: str, relaciones: Optional[Sequence[str]] = RELACIONES_CAMBIO) -> QuerySet:
+    """
+    Normas que modifican, derogan, anulan o corrigen una norma.
+
+    Args:
+        identificador: Identificador del BOE de la norma afectada
+        relaciones: Relaciones a incluir (None para todas)
+
+    Returns:
+        QuerySet: Aristas que llegan a la norma
+    """
+    aristas = ReferenciaNorma.objects.filter(destino=identificador)
+    if relaciones:
+        aristas = aristas.filter(relacion__in=relaciones)
+    return aristas
+
+
+def normas_afectadas(identificador: str, relaciones: Optional[Sequence[str]] = RELACIONES_CAMBIO) -> QuerySet:
+    """
+    Normas sobre las que actúa un documento.
+
+    Args:
+        identificador: Identificador del BOE del documento
+        relaciones: Relaciones a incluir (None para todas)
+
+    Returns:
+        QuerySet: Aristas que salen del documento
+    """
+    aristas = ReferenciaNorma.objects.filter(origen=identificador)
+    if relaciones:
+        aristas = aristas.filter(relacion__in=relaciones)
+    return aristas
+
+
+def clave_identificador(identificador: str):
+    """Clave de orden cronológico aproximado a partir del identificador (año y número)"""
+    coincidencia = _PATRON_IDENTIFICADOR.match(identificador or '')
+    if not coincidencia:
+        return (9999, 0, identificador or '')
+    return (int(coincidencia.group(1)), int(coincidencia.group(2)), identificador)
+
+
+def _datos_documentos(identificadores: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    return {
+        fila['identificador']: fila
+        for fila in DocumentoSimplificado.objects.filter(identificador__in=set(identificadores))
+        .values('identificador', 'titulo', 'fecha_publicacion')
+    }
+
+
+def cadena_modificaciones(identificador: str, relaciones: Sequence[str] = RELACIONES_CAMBIO,
+                          max_profundidad: int = PROFUNDIDAD_MAXIMA) -> List[Dict[str, Any]]:
+    """
+    Cadena transitiva de cambios de una norma: las normas que la modifican,
+    las que modifican a estas, etc. Se hace una consulta por nivel.
+
+    Args:
+        identificador: Identificador del BOE de la norma
+        relaciones: Relaciones que se siguen
+        max_profundidad: Número máximo de niveles
+
+    Returns:
+        List[Dict[str, Any]]: Aristas con 'origen', 'destino', 'relacion', 'palabra', 'nivel',
+            'titulo' y 'fecha_publicacion' del origen (None si no está cargado), en orden de nivel y fecha
+    """
+    visitados = {identificador}
+    frontera = [identificador]
+    cadena = []
+    for nivel in range(1, max_profundidad + 1):
+        aristas = list(
+            ReferenciaNorma.objects.filter(destino__in=frontera, relacion__in=relaciones)
+            .values('origen', 'destino', 'relacion', 'palabra')
+        )
+        frontera = []
+        for arista in aristas:
+            arista['nivel'] = nivel
+            cadena.append(arista)
+            if arista['origen'] not in visitados:
+                visitados.add(arista['origen'])
+                frontera.append(arista['origen'])
+        if not frontera:
+            break
+
+    datos = _datos_documentos(arista['origen'] for arista in cadena)
+    for arista in cadena:
+        documento = datos.get(arista['origen'], {})
+        arista['titulo'] = documento.get('titulo')
+        arista['fecha_publicacion'] = documento.get('fecha_publicacion')
+    cadena.sort(key=lambda arista: (arista['nivel'], clave_identificador(arista['origen']), arista['relacion']))
+    return cadena
+
+
+def historial_versiones(identificador: str) -> List[Dict[str, Any]]:
+    """
+    Versiones de una norma según el grafo: la original y una por cada norma
+    que la cambia directamente, en orden cronológico.
+
+    Args:
+        identificador: Identificador del BOE de la norma
+
+    Returns:
+        List[Dict[str, Any]]: Versiones con 'identificador', 'relacion', 'titulo' y 'fecha_publicacion'
+            (vacía si el grafo no tiene cambios de la norma)
+    """
+    cambios = {}
+    for arista in normas_que_afectan(identificador).values('origen', 'relacion'):
+        # Si una norma modifica y deroga a la vez, prevalece la derogación
+        if arista['origen'] not in cambios or arista['relacion'] != ReferenciaNorma.MODIFICA:
+            cambios[arista['origen']] = arista['relacion']
+    if not cambios:
+        return []
+
+    datos = _datos_documentos([identificador, *cambios])
+    versiones = [{'identificador': identificador, 'relacion': None}]
+    versiones.extend({'identificador': origen, 'relacion': relacion} for origen, relacion in cambios.items())
+    for version in versiones:
+        documento = datos.get(version['identificador'], {})
+        version['titulo'] = documento.get('titulo')
+        version['fecha_publicacion'] = documento.get('fecha_publicacion')
+    versiones[1:] = sorted(versiones[1:], key=lambda version: clave_identificador(version['identificador']))
+    return versiones
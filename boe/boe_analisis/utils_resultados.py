@@ -0,0 +1,82 @@
+"""
+Utilidades para hidratar resultados de búsqueda semántica.
+Convierte la lista ordenada (identificador, score) devuelta por Qdrant en
+documentos de la base de datos con una única consulta, preservando el ranking.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .models_simplified import CAMPOS_LISTADO, DocumentoSimplificado
+
+logger = logging.getLogger(__name__)
+
+
+def hidratar_resultados(
+    resultados: Iterable[Tuple[str, float]],
+    campos: Sequence[str] = CAMPOS_LISTADO,
+    queryset=None
+) -> List[DocumentoSimplificado]:
+    """
+    Obtiene los documentos de una lista ordenada de resultados en una sola consulta.
+
+    Args:
+        resultados: Pares (identificador, score) en el orden del ranking
+        campos: Columnas a cargar con .only()
+        queryset: QuerySet base opcional (por ejemplo, con filtros adicionales)
+
+    Returns:
+        List[DocumentoSimplificado]: Documentos en el orden del ranking, con el atributo ``score``.
+        Los identificadores que no existen en la base de datos se omiten.
+    """
+    # Eliminar duplicados conservando la primera (mejor) posición
+    scores = {}
+    for identificador, score in resultados:
+        if identificador and identificador not in scores:
+            scores[identificador] = score
+
+    if not scores:
+        return []
+
+    if queryset is None:
+        queryset = DocumentoSimplificado.objects.all()
+
+    documentos = queryset.only(*campos).in_bulk(list(scores))
+
+    hidratados = []
+    for identificador, score in scores.items():
+        documento = documentos.get(identificador)
+        if documento is None:
+            logger.warning(f"Documento {identificador} presente en Qdrant pero no en la base de datos")
+            continue
+        documento.score = score
+        hidratados.append(documento)
+
+    return hidratados
+
+
+def serializar_documento(documento: DocumentoSimplificado, score: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Convierte un documento hidratado en un diccionario listo para JSON.
+
+    Args:
+        documento: Documento cargado con CAMPOS_LISTADO
+        score: Puntuación a incluir (por defecto, documento.score si existe)
+
+    Returns:
+        Dict[str, Any]: Representación del documento
+    """
+    if score is None:
+        score = getattr(documento, 'score', 0)
+
+    return {
+        'identificador': documento.identificador,
+        'titulo': documento.titulo,
+        'fecha_publicacion': documento.fecha_publicacion.strftime('%Y-%m-%d'),
+        'departamento': documento.departamento,
+        'codigo_departamento': documento.codigo_departamento,
+        'materias': documento.materias,
+        'url_pdf': documento.url_pdf,
+        'url_xml': documento.url_xml,
+        'vigente': documento.vigente,
+        'score': score,
+    }
@@ -0,0 +1,173 @@
+"""
+Instantáneas diarias del sumario del BOE.
+El sumario de una fecha es igual para todos los visitantes hasta la siguiente
+ingesta, así que se construye una sola vez por fecha de publicación y
+generación de los datos (ver utils_http.generacion_datos) y se guarda en
+caché ya agrupado por departamentos, como fragmento HTML renderizado y como
+JSON. La generación vive en la base de datos y forma parte de la clave: al
+terminar una ingesta en otro proceso, los procesos web dejan de leer la
+instantánea anterior aunque cada uno tenga su propia caché. La vista responde
+con ETag y Last-Modified, de modo que los navegadores revalidan con un 304.
+"""
+import datetime
+import hashlib
+import json
+import logging
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from .models_simplified import DocumentoSimplificado
+from .utils_http import generacion_datos, respuesta_condicional
+
+logger = logging.getLogger(__name__)
+
+# Una instantánea dura como mucho un día (una ingesta abre antes otra generación)
+TIMEOUT_SUMARIO = 24 * 60 * 60
+
+PLANTILLA_FRAGMENTO = 'boe_analisis/documentos/sumario_departamentos.html'
+
+# Campos de cada documento en el JSON del sumario
+CAMPOS_SUMARIO = ('identificador', 'titulo', 'materias', 'url_pdf', 'url_xml')
+
+
+def clave_sumario(fecha: datetime.date, generacion: int) -> str:
+    """Clave de caché de la instantánea del sumario de una fecha en una generación de los datos"""
+    return f"sumario_boe:{generacion}:{fecha.isoformat()}"
+
+
+def clave_ultima_fecha(generacion: int) -> str:
+    """Clave de caché de la fecha del último sumario en una generación de los datos"""
+    return f"sumario_boe:{generacion}:ultima_fecha"
+
+
+def construir_sumario(fecha: datetime.date, generacion: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Construye la instantánea del sumario de una fecha y la guarda en caché.
+
+    Args:
+        fecha: Fecha de publicación
+        generacion: Generación de los datos (por defecto, la actual)
+
+    Returns:
+        Dict[str, Any]: 'fecha', 'total_documentos', 'html' (fragmento agrupado por
+            departamentos), 'json' (mismo contenido serializado), 'etag' y 'generado'
+    """
+    if generacion is None:
+        generacion = generacion_datos()
+    documentos = DocumentoSimplificado.objects.sumario(fecha).values('departamento', *CAMPOS_SUMARIO)
+    # La consulta ya viene ordenada por departamento: cada uno es un solo grupo
+    departamentos = []
+    for nombre, grupo in groupby(documentos, key=itemgetter('departamento')):
+        grupo = [{campo: documento[campo] for campo in CAMPOS_SUMARIO} for documento in grupo]
+        departamentos.append({'nombre': nombre, 'total': len(grupo), 'documentos': grupo})
+
+    datos = {
+        'fecha': fecha.isoformat(),
+        'total_documentos': sum(departamento['total'] for departamento in departamentos),
+        'departamentos': departamentos,
+    }
+    contenido = json.dumps(datos, ensure_ascii=False)
+    instantanea = {
+        'fecha': fecha,
+        'total_documentos': datos['total_documentos'],
+        'html': render_to_string(PLANTILLA_FRAGMENTO, {'fecha': fecha, 'departamentos': departamentos}),
+        'json': contenido,
+        'etag': hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:32],
+        # La generación es la marca de tiempo del último cambio: igual en todos los procesos
+        'generado': datetime.datetime.fromtimestamp(generacion, tz=datetime.timezone.utc),
+    }
+    cache.set(clave_sumario(fecha, generacion), instantanea, TIMEOUT_SUMARIO)
+    return instantanea
+
+
+def obtener_sumario(fecha: datetime.date, generacion: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Instantánea del sumario de una fecha, desde la caché si es posible.
+
+    Args:
+        fecha: Fecha de publicación
+        generacion: Generación de los datos (por defecto, la actual)
+
+    Returns:
+        Dict[str, Any]: Instantánea (ver construir_sumario)
+    """
+    if generacion is None:
+        generacion = generacion_datos()
+    instantanea = cache.get(clave_sumario(fecha, generacion))
+    if instantanea is None:
+        instantanea = construir_sumario(fecha, generacion)
+    return instantanea
+
+
+def fecha_sumario(hoy: datetime.date, generacion: Optional[int] = None) -> datetime.date:
+    """
+    Fecha del sumario que se muestra: la última con documentos publicados
+    (hoy si todavía no hay ninguno).
+
+    Args:
+        hoy: Fecha actual
+        generacion: Generación de los datos (por defecto, la actual)
+
+    Returns:
+        datetime.date: Fecha del sumario
+    """
+    if generacion is None:
+        generacion = generacion_datos()
+    fecha = cache.get(clave_ultima_fecha(generacion))
+    if fecha is None:
+        fecha = DocumentoSimplificado.objects.ultima_fecha()
+        if fecha is None:
+            return hoy
+        cache.set(clave_ultima_fecha(generacion), fecha, TIMEOUT_SUMARIO)
+    return fecha
+
+
+def actualizar_sumarios(fechas: Iterable[datetime.date]) -> int:
+    """
+    Construye de antemano las instantáneas de las fechas ingeridas en la
+    generación actual. Se llama al terminar cada ingesta, después de abrir la
+    nueva generación con nueva_generacion; con una caché compartida los
+    procesos web ya las encuentran hechas.
+
+    Args:
+        fechas: Fechas de publicación con documentos nuevos o modificados
+
+    Returns:
+        int: Número de instantáneas construidas
+    """
+    fechas = sorted(set(fechas))
+    generacion = generacion_datos()
+    for fecha in fechas:
+        instantanea = construir_sumario(fecha, generacion)
+        logger.info(f"Sumario del {fecha} en caché: {instantanea['total_documentos']} documentos")
+    return len(fechas)
+
+
+def respuesta_sumario(request, instantanea: Dict[str, Any], crear: Callable[[], HttpResponse],
+                      variante: Optional[str] = None) -> HttpResponse:
+    """
+    Responde a una petición del sumario con validación condicional: 304 si el
+    cliente ya tiene la instantánea y, si no, la respuesta de crear().
+
+    Args:
+        request: Petición
+        instantanea: Instantánea del sumario
+        crear: Construye la respuesta completa
+        variante: Distingue representaciones de la misma instantánea (por ejemplo,
+            la página de cada usuario); las respuestas con variante son privadas
+
+    Returns:
+        HttpResponse: Respuesta 304 o completa, con ETag, Last-Modified y Cache-Control
+    """
+    return respuesta_condicional(
+        request,
+        f"{instantanea['etag']}-{variante}" if variante else instantanea['etag'],
+        int(instantanea['generado'].timestamp()),
+        crear,
+        privada=bool(variante)
+    )
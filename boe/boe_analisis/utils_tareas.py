@@ -0,0 +1,374 @@
+"""
+Cola de tareas persistente: encolado, reclamación con arrendamiento,
+reintentos con espera exponencial y tareas muertas.
+En PostgreSQL las tareas se reclaman con SELECT ... FOR UPDATE SKIP LOCKED;
+en bases de datos sin SKIP LOCKED (SQLite) con actualizaciones condicionales
+atómicas fila a fila. Los manejadores de cada tipo de tarea se registran con
+el decorador manejador().
+"""
+import datetime
+import logging
+import os
+import socket
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models_tareas import Tarea
+from .utils_http import nueva_generacion
+
+logger = logging.getLogger(__name__)
+
+# Duración por defecto del arrendamiento de una tarea reclamada
+DURACION_ARRENDAMIENTO = 300
+
+# Espera antes de reintentar: BASE * 2^(intentos - 1), con un máximo
+ESPERA_REINTENTO_BASE = 30
+ESPERA_REINTENTO_MAXIMA = 6 * 60 * 60
+
+# Tipo de tarea -> función que la procesa a partir de la referencia
+MANEJADORES: Dict[str, Callable[[str], None]] = {}
+
+
+def manejador(tipo: str) -> Callable:
+    """
+    Registra la función que procesa un tipo de tarea.
+    La función recibe la referencia de la tarea; si lanza una excepción, la tarea se reintenta.
+
+    Args:
+        tipo: Tipo de tarea
+    """
+    def decorador(funcion):
+        MANEJADORES[tipo] = funcion
+        return funcion
+    return decorador
+
+
+def nombre_trabajador() -> str:
+    """Nombre único del trabajador actual (máquina y proceso)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def encolar(tipo: str, referencias: Iterable[str], prioridad: int = 0, retraso: int = 0,
+            max_intentos: int = 5) -> int:
+    """
+    Encola una tarea por referencia. Las referencias que ya tienen una tarea
+    activa del mismo tipo (pendiente o en curso) se ignoran.
+
+    Args:
+        tipo: Tipo de tarea (debe tener un manejador registrado)
+        referencias: Identificadores de los objetos a procesar
+        prioridad: Prioridad (menor valor, antes se procesa)
+        retraso: Segundos hasta que la tarea esté disponible
+        max_intentos: Intentos antes de marcarla como muerta
+
+    Returns:
+        int: Número de referencias recibidas
+    """
+    disponible_en = timezone.now() + datetime.timedelta(seconds=retraso)
+    tareas = [
+        Tarea(tipo=tipo, referencia=referencia, prioridad=prioridad,
+              disponible_en=disponible_en, max_intentos=max_intentos)
+        for referencia in dict.fromkeys(referencias)
+    ]
+    Tarea.objects.bulk_create(tareas, batch_size=500, ignore_conflicts=True)
+    return len(tareas)
+
+
+def _disponibles(ahora: datetime.datetime) -> Q:
+    """Tareas que se pueden reclamar: pendientes ya disponibles o en curso con el arrendamiento vencido"""
+    return Q(estado=Tarea.PENDIENTE, disponible_en__lte=ahora) | Q(estado=Tarea.EN_CURSO, bloqueada_hasta__lt=ahora)
+
+
+def reclamar(trabajador: str, tipos: Optional[Sequence[str]] = None, limite: int = 10,
+             duracion: int = DURACION_ARRENDAMIENTO) -> List[Tarea]:
+    """
+    Reclama hasta 'limite' tareas disponibles para un trabajador.
+
+    Args:
+        trabajador: Nombre del trabajador que las reclama
+        tipos: Tipos de tarea que acepta (None para todos)
+        limite: Número máximo de tareas
+        duracion: Segundos de arrendamiento; pasado ese tiempo otro trabajador puede reclamarlas
+
+    Returns:
+        List[Tarea]: Tareas reclamadas, con el intento ya contabilizado
+    """
+    ahora = timezone.now()
+    candidatas = Tarea.objects.filter(_disponibles(ahora))
+    if tipos:
+        candidatas = candidatas.filter(tipo__in=tipos)
+    candidatas = candidatas.order_by('prioridad', 'disponible_en', 'id')
+
+    cambios = {
+        'estado': Tarea.EN_CURSO,
+        'trabajador': trabajador,
+        'bloqueada_hasta': ahora + datetime.timedelta(seconds=duracion),
+        'intentos': F('intentos') + 1,
+        'fecha_modificacion': ahora,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(candidatas.select_for_update(skip_locked=True).values_list('id', flat=True)[:limite])
+            Tarea.objects.filter(id__in=ids).update(**cambios)
+    else:
+        # Sin SKIP LOCKED: cada fila se reclama con un UPDATE condicional, que solo
+        # afecta a la fila si sigue disponible (otro trabajador no la ha reclamado antes)
+        ids = []
+        for tarea_id in candidatas.values_list('id', flat=True)[:limite * 2]:
+            if Tarea.objects.filter(_disponibles(ahora), id=tarea_id).update(**cambios):
+                ids.append(tarea_id)
+                if len(ids) >= limite:
+                    break
+
+    return list(Tarea.objects.filter(id__in=ids).order_by('prioridad', 'disponible_en', 'id'))
+
+
+def completar(tarea: Tarea) -> bool:
+    """
+    Marca una tarea como completada si el trabajador aún conserva su arrendamiento.
+
+    Returns:
+        bool: False si la tarea la ha reclamado otro trabajador entretanto
+    """
+    return bool(Tarea.objects.filter(id=tarea.id, estado=Tarea.EN_CURSO, trabajador=tarea.trabajador).update(
+        estado=Tarea.COMPLETADA, bloqueada_hasta=None, error='', fecha_modificacion=timezone.now()
+    ))
+
+
+def fallar(tarea: Tarea, error: str) -> str:
+    """
+    Registra el fallo de una tarea: se reprograma con espera exponencial o,
+    si ha agotado los intentos, queda como muerta.
+
+    Args:
+        tarea: Tarea reclamada
+        error: Descripción del error
+
+    Returns:
+        str: Nuevo estado de la tarea
+    """
+    ahora = timezone.now()
+    if tarea.intentos >= tarea.max_intentos:
+        estado = Tarea.MUERTA
+        disponible_en = tarea.disponible_en
+    else:
+        estado = Tarea.PENDIENTE
+        espera = min(ESPERA_REINTENTO_BASE * 2 ** max(tarea.intentos - 1, 0), ESPERA_REINTENTO_MAXIMA)
+        disponible_en = ahora + datetime.timedelta(seconds=espera)
+
+    Tarea.objects.filter(id=tarea.id, estado=Tarea.EN_CURSO, trabajador=tarea.trabajador).update(
+        estado=estado, disponible_en=disponible_en, bloqueada_hasta=None,
+        error=error[:5000], fecha_modificacion=ahora
+    )
+    return estado
+
+
+def ejecutar_tarea(tarea: Tarea) -> str:
+    """
+    Ejecuta una tarea reclamada con su manejador y registra el resultado.
+
+    Returns:
+        str: Estado final de la tarea
+    """
+    funcion = MANEJADORES.get(tarea.tipo)
+    if funcion is None:
+        return fallar(tarea, f"No hay manejador para el tipo de tarea '{tarea.tipo}'")
+    if tarea.intentos > tarea.max_intentos:
+        # El arrendamiento venció repetidamente (el trabajador murió a mitad de la tarea)
+        return fallar(tarea, tarea.error or "Arrendamiento vencido en todos los intentos")
+
+    try:
+        funcion(tarea.referencia)
+    except Exception as e:
+        logger.warning(f"Error en la tarea {tarea} (intento {tarea.intentos}): {str(e)}")
+        return fallar(tarea, f"{type(e).__name__}: {str(e)}")
+
+    completar(tarea)
+    return Tarea.COMPLETADA
+
+
+def procesar_lote(trabajador: str, tipos: Optional[Sequence[str]] = None, limite: int = 10,
+                  duracion: int = DURACION_ARRENDAMIENTO) -> int:
+    """
+    Reclama y ejecuta un lote de tareas.
+
+    Returns:
+        int: Número de tareas procesadas (0 si no había trabajo)
+    """
+    tareas = reclamar(trabajador, tipos, limite, duracion)
+    modificados = 0
+    for tarea in tareas:
+        if ejecutar_tarea(tarea) == Tarea.COMPLETADA and tarea.tipo != TAREA_ALERTAS:
+            modificados += 1
+    # Textos, resúmenes e índices nuevos cambian las respuestas de la API
+    if modificados:
+        nueva_generacion()
+    return len(tareas)
+
+
+def ejecutar_trabajador(tipos: Optional[Sequence[str]] = None, limite: int = 10,
+                        duracion: int = DURACION_ARRENDAMIENTO, espera: float = 5.0,
+                        hasta_vaciar: bool = False, trabajador: Optional[str] = None) -> int:
+    """
+    Bucle de un trabajador: procesa lotes mientras haya tareas y espera cuando la cola está vacía.
+
+    Args:
+        tipos: Tipos de tarea que procesa (None para todos)
+        limite: Tareas reclamadas por lote
+        duracion: Segundos de arrendamiento
+        espera: Segundos de espera cuando no hay tareas
+        hasta_vaciar: Terminar en cuanto la cola esté vacía
+        trabajador: Nombre del trabajador (por defecto, máquina y proceso)
+
+    Returns:
+        int: Número total de tareas procesadas
+    """
+    trabajador = trabajador or nombre_trabajador()
+    total = 0
+    while True:
+        procesadas = procesar_lote(trabajador, tipos, limite, duracion)
+        total += procesadas
+        if not procesadas:
+            if hasta_vaciar:
+                return total
+            time.sleep(espera)
+
+
+def purgar_completadas(dias: int = 7) -> int:
+    """
+    Elimina las tareas completadas hace más de 'dias' días.
+
+    Returns:
+        int: Número de tareas eliminadas
+    """
+    limite = timezone.now() - datetime.timedelta(days=dias)
+    eliminadas, _ = Tarea.objects.filter(estado=Tarea.COMPLETADA, fecha_modificacion__lt=limite).delete()
+    return eliminadas
+
+
+def reactivar_muertas(tipo: Optional[str] = None) -> int:
+    """
+    Vuelve a poner en cola las tareas muertas, con los intentos a cero.
+
+    Returns:
+        int: Número de tareas reactivadas
+    """
+    muertas = Tarea.objects.filter(estado=Tarea.MUERTA)
+    if tipo:
+        muertas = muertas.filter(tipo=tipo)
+    reactivadas = 0
+    for tarea in muertas:
+        # Se omiten las que ya tienen otra tarea activa del mismo tipo y referencia
+        if Tarea.objects.filter(estado__in=[Tarea.PENDIENTE, Tarea.EN_CURSO], tipo=tarea.tipo,
+                                referencia=tarea.referencia).exists():
+            continue
+        reactivadas += Tarea.objects.filter(id=tarea.id, estado=Tarea.MUERTA).update(
+            estado=Tarea.PENDIENTE, intentos=0, disponible_en=timezone.now(), error=''
+        )
+    return reactivadas
+
+
+# Manejadores de las tareas por documento
+
+TAREA_TEXTO = 'texto'
+TAREA_EMBEDDING = 'embedding'
+TAREA_ALERTAS = 'alertas'
+TAREA_RESUMEN = 'resumen'
+
+
+@lru_cache(maxsize=1)
+def _qdrant():
+    """Cliente de Qdrant del proceso (el modelo de embeddings se carga una sola vez)"""
+    from .utils_qdrant import get_qdrant_client
+    return get_qdrant_client()
+
+
+def encolar_documentos(documentos: Iterable, indexar: bool = True) -> int:
+    """
+    Encola el procesamiento de documentos recién ingeridos: los que no tienen
+    texto, su descarga (que a su vez encola el resto); los demás, la evaluación
+    de alertas y, si se indica, la indexación en Qdrant.
+
+    Args:
+        documentos: Documentos guardados (DocumentoSimplificado)
+        indexar: Encolar también la indexación de los documentos que ya tienen texto
+
+    Returns:
+        int: Número de tareas encoladas
+    """
+    sin_texto, con_texto = [], []
+    for documento in documentos:
+        (con_texto if documento.longitud_texto else sin_texto).append(documento.identificador)
+
+    encoladas = encolar(TAREA_TEXTO, sin_texto) + encolar(TAREA_ALERTAS, con_texto)
+    if indexar:
+        encoladas += encolar(TAREA_EMBEDDING, con_texto)
+    return encoladas
+
+
+@manejador(TAREA_TEXTO)
+def descargar_texto(identificador: str):
+    """Descarga el texto completo, las referencias y los artículos de un documento y encola su indexación y sus alertas"""
+    from .models_simplified import DocumentoSimplificado
+    from .utils_articulos import guardar_secciones
+    from .utils_boe import obtener_documento_xml
+    from .utils_referencias import guardar_referencias
+    from .utils_textos import guardar_textos
+
+    documento = DocumentoSimplificado.objects.only('identificador', 'url_xml', 'longitud_texto').get(identificador=identificador)
+    if not documento.longitud_texto:
+        texto, referencias, secciones = obtener_documento_xml(documento.url_xml)
+        if not texto:
+            raise ValueError(f"No se pudo obtener el texto de {documento.url_xml}")
+        with transaction.atomic():
+            guardar_textos({identificador: texto})
+            guardar_secciones({identificador: secciones})
+        guardar_referencias(referencias)
+
+    encolar(TAREA_EMBEDDING, [identificador])
+    encolar(TAREA_ALERTAS, [identificador])
+
+
+@manejador(TAREA_EMBEDDING)
+def indexar_embedding(identificador: str):
+    """Genera el embedding de un documento y lo indexa en Qdrant"""
+    from .models_simplified import DocumentoSimplificado
+
+    documento = DocumentoSimplificado.objects.get(identificador=identificador)
+    if not _qdrant().indexar_documento(documento):
+        raise RuntimeError(f"No se pudo indexar {identificador} en Qdrant")
+
+
+@manejador(TAREA_ALERTAS)
+def evaluar_alertas(identificador: str):
+    """Evalúa las alertas activas sobre un documento"""
+    from .models_simplified import DocumentoSimplificado
+    from .utils_alertas import evaluar_documento
+    from .utils_facetas import terminos_documentos
+
+    documento = DocumentoSimplificado.objects.get(identificador=identificador)
+    with transaction.atomic():
+        evaluar_documento(documento, terminos_documentos([identificador]).get(identificador))
+
+
+@manejador(TAREA_RESUMEN)
+def resumir_notificacion(notificacion_id: str):
+    """Genera con IA el resumen de una notificación"""
+    from .models_alertas import NotificacionAlerta
+    from .models_simplified import DocumentoSimplificado
+    from .services_ia import ServicioIA
+
+    notificacion = NotificacionAlerta.objects.get(id=int(notificacion_id))
+    documento = DocumentoSimplificado.objects.get(identificador=notificacion.documento)
+    texto_completo = f"{documento.titulo}\n\n{documento.texto}"
+
+    resumen = ServicioIA.resumir_documento(texto_completo)
+    if not resumen:
+        raise RuntimeError(f"El servicio de IA no devolvió un resumen para {notificacion.documento}")
+    NotificacionAlerta.objects.filter(id=notificacion.id).update(resumen=resumen)
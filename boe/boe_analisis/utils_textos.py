@@ -0,0 +1,250 @@
+"""
+Almacén comprimido de los textos completos de los documentos.
+Los textos viven fuera de la tabla de documentos (TextoDocumento), de modo
+que los listados, el sumario y los recorridos por lotes no los leen. Se
+comprimen con zstd y, si se ha entrenado, con un diccionario de textos del
+BOE, que mejora mucho la compresión de los textos cortos. Si zstandard no
+está instalado se usa zlib, y cada fila guarda su formato para poder leerla
+con cualquiera de los dos.
+"""
+import logging
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models_simplified import DocumentoSimplificado
+from .models_textos import DiccionarioTexto, TextoDocumento
+from .utils_busqueda import vocabulario
+
+try:
+    import zstandard
+except ImportError:  # Sin zstandard los textos nuevos se comprimen con zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Nivel de compresión de zstd: los textos se escriben una vez y se leen muchas
+NIVEL_ZSTD = getattr(settings, 'TEXTOS_NIVEL_ZSTD', 10)
+
+NIVEL_ZLIB = 6
+
+# Tamaño por defecto de los diccionarios entrenados (bytes)
+TAMANO_DICCIONARIO = 112640
+
+
+@lru_cache(maxsize=8)
+def _datos_diccionario(diccionario_id: int) -> bytes:
+    # Los diccionarios no cambian una vez creados
+    return bytes(DiccionarioTexto.objects.values_list('datos', flat=True).get(pk=diccionario_id))
+
+
+def diccionario_activo() -> Optional[int]:
+    """Identificador del diccionario con el que se comprimen los textos nuevos (None si no hay)"""
+    if zstandard is None:
+        return None
+    return DiccionarioTexto.objects.order_by('-pk').values_list('pk', flat=True).first()
+
+
+def comprimir(texto: str, diccionario_id: Optional[int] = None) -> Tuple[str, bytes]:
+    """
+    Comprime un texto.
+
+    Args:
+        texto: Texto a comprimir
+        diccionario_id: Diccionario de zstd que se usa (ninguno por defecto)
+
+    Returns:
+        Tuple[str, bytes]: Formato ('zstd' o 'zlib') y contenido comprimido
+    """
+    datos = texto.encode('utf-8')
+    if zstandard is None:
+        return TextoDocumento.ZLIB, zlib.compress(datos, NIVEL_ZLIB)
+    if diccionario_id:
+        diccionario = zstandard.ZstdCompressionDict(_datos_diccionario(diccionario_id))
+        compresor = zstandard.ZstdCompressor(level=NIVEL_ZSTD, dict_data=diccionario)
+    else:
+        compresor = zstandard.ZstdCompressor(level=NIVEL_ZSTD)
+    return TextoDocumento.ZSTD, compresor.compress(datos)
+
+
+def descomprimir(formato: str, contenido: bytes, diccionario_id: Optional[int] = None) -> str:
+    """
+    Descomprime un texto guardado con comprimir().
+
+    Args:
+        formato: 'zstd' o 'zlib'
+        contenido: Contenido comprimido
+        diccionario_id: Diccionario con el que se comprimió
+
+    Returns:
+        str: Texto original
+    """
+    contenido = bytes(contenido)
+    if formato == TextoDocumento.ZLIB:
+        return zlib.decompress(contenido).decode('utf-8')
+    if zstandard is None:
+        raise RuntimeError("Hace falta el paquete zstandard para leer textos comprimidos con zstd")
+    if diccionario_id:
+        diccionario = zstandard.ZstdCompressionDict(_datos_diccionario(diccionario_id))
+        descompresor = zstandard.ZstdDecompressor(dict_data=diccionario)
+    else:
+        descompresor = zstandard.ZstdDecompressor()
+    return descompresor.decompress(contenido).decode('utf-8')
+
+
+def guardar_textos(textos: Dict[str, Optional[str]], actualizar_longitud: bool = True, lote: int = 200) -> int:
+    """
+    Guarda en bloque los textos de varios documentos, sustituyendo los que hubiera.
+    Un texto vacío o None borra el texto guardado.
+
+    Args:
+        textos: Texto por identificador
+        actualizar_longitud: Actualizar también DocumentoSimplificado.longitud_texto
+            (no hace falta si el documento ya se ha guardado con el texto asignado)
+        lote: Filas por inserción
+
+    Returns:
+        int: Número de textos guardados
+    """
+    if not textos:
+        return 0
+    diccionario_id = diccionario_activo()
+    filas = []
+    for identificador, texto in textos.items():
+        if texto:
+            formato, contenido = comprimir(texto, diccionario_id)
+            filas.append(TextoDocumento(
+                documento_id=identificador, formato=formato, contenido=contenido,
+                diccionario_id=diccionario_id if formato == TextoDocumento.ZSTD else None,
+                vocabulario=vocabulario(texto)
+            ))
+    vacios = [identificador for identificador, texto in textos.items() if not texto]
+
+    with transaction.atomic():
+        if vacios:
+            TextoDocumento.objects.filter(documento_id__in=vacios).delete()
+        TextoDocumento.objects.bulk_create(
+            filas, batch_size=lote, update_conflicts=True,
+            unique_fields=['documento'], update_fields=['formato', 'diccionario', 'contenido', 'vocabulario']
+        )
+        if actualizar_longitud:
+            ahora = timezone.now()
+            DocumentoSimplificado.objects.bulk_update(
+                [
+                    DocumentoSimplificado(
+                        identificador=identificador, longitud_texto=len(texto) if texto else None, actualizado=ahora
+                    )
+                    for identificador, texto in textos.items()
+                ],
+                ['longitud_texto', 'actualizado'], batch_size=lote
+            )
+    return len(filas)
+
+
+def guardar_textos_pendientes(documentos: Iterable[DocumentoSimplificado]) -> int:
+    """
+    Guarda los textos asignados a documentos que se han escrito con
+    bulk_create o bulk_update (que no pasan por DocumentoSimplificado.save).
+
+    Args:
+        documentos: Documentos ya guardados, con longitud_texto incluida en la escritura
+
+    Returns:
+        int: Número de textos guardados
+    """
+    textos = {
+        documento.pk: documento._texto for documento in documentos
+        if documento.__dict__.pop('_texto_pendiente', False)
+    }
+    return guardar_textos(textos, actualizar_longitud=False)
+
+
+def cargar_textos(identificadores: Iterable[str]) -> Dict[str, str]:
+    """
+    Textos de varios documentos en una consulta.
+
+    Args:
+        identificadores: Identificadores de los documentos
+
+    Returns:
+        Dict[str, str]: Texto por identificador (solo los que tienen texto)
+    """
+    filas = TextoDocumento.objects.filter(documento_id__in=list(identificadores)).values_list(
+        'documento_id', 'formato', 'contenido', 'diccionario_id'
+    )
+    return {
+        identificador: descomprimir(formato, contenido, diccionario_id)
+        for identificador, formato, contenido, diccionario_id in filas
+    }
+
+
+def precargar_textos(documentos: Iterable[DocumentoSimplificado]) -> List[DocumentoSimplificado]:
+    """
+    Carga en una consulta los textos de un lote de documentos, para que
+    recorrerlos no haga una consulta por documento al leer .texto.
+
+    Args:
+        documentos: Documentos del lote
+
+    Returns:
+        List[DocumentoSimplificado]: Los mismos documentos
+    """
+    documentos = list(documentos)
+    pendientes = [documento for documento in documentos if '_texto' not in documento.__dict__]
+    textos = cargar_textos(documento.pk for documento in pendientes if documento.longitud_texto)
+    for documento in pendientes:
+        documento.__dict__['_texto'] = textos.get(documento.pk)
+    return documentos
+
+
+def entrenar_diccionario(muestras: int = 2000, tamano: int = TAMANO_DICCIONARIO) -> DiccionarioTexto:
+    """
+    Entrena un diccionario de zstd con los textos más recientes y lo deja activo.
+
+    Args:
+        muestras: Número de textos de la muestra
+        tamano: Tamaño del diccionario en bytes
+
+    Returns:
+        DiccionarioTexto: Diccionario creado
+    """
+    if zstandard is None:
+        raise RuntimeError("Hace falta el paquete zstandard para entrenar diccionarios")
+    identificadores = list(
+        DocumentoSimplificado.objects.filter(longitud_texto__isnull=False)
+        .order_by('-fecha_publicacion').values_list('identificador', flat=True)[:muestras]
+    )
+    textos = [texto.encode('utf-8') for texto in cargar_textos(identificadores).values()]
+    if len(textos) < 10:
+        raise ValueError(f"Hacen falta al menos 10 textos para entrenar un diccionario ({len(textos)} disponibles)")
+    datos = zstandard.train_dictionary(tamano, textos, level=NIVEL_ZSTD)
+    return DiccionarioTexto.objects.create(datos=datos.as_bytes(), muestras=len(textos))
+
+
+def recomprimir_textos(lote: int = 500) -> int:
+    """
+    Vuelve a comprimir con el diccionario activo los textos que no lo usan.
+
+    Args:
+        lote: Textos por lote
+
+    Returns:
+        int: Número de textos recomprimidos
+    """
+    diccionario_id = diccionario_activo()
+    if diccionario_id is None:
+        return 0
+    total, ultimo = 0, ''
+    while True:
+        identificadores = list(
+            TextoDocumento.objects.filter(documento_id__gt=ultimo).exclude(diccionario_id=diccionario_id)
+            .order_by('documento_id').values_list('documento_id', flat=True)[:lote]
+        )
+        if not identificadores:
+            return total
+        total += guardar_textos(cargar_textos(identificadores), actualizar_longitud=False)
+        ultimo = identificadores[-1]
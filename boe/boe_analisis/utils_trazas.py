@@ -0,0 +1,249 @@
+"""
+Trazas ligeras de latencia por tramos.
+Cada tramo (embedding, búsqueda en Qdrant, llamada a un proveedor de IA,
+hidratación ORM, serialización JSON...) se mide con el gestor de contexto
+tramo() o con el decorador medir(). Las duraciones se acumulan en histogramas
+del proceso, expuestos en formato de texto de Prometheus, y en la traza de la
+petición en curso, que el middleware añade a la cabecera Server-Timing.
+"""
+import bisect
+import contextvars
+import functools
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Límites (en segundos) de los cubos de los histogramas de duración
+CUBOS_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Límites de los cubos del histograma de consultas ORM por petición
+CUBOS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histograma:
+    """
+    Histograma acumulado por etiqueta con la semántica de Prometheus
+    (cubos acumulativos, suma y número de observaciones).
+    """
+
+    def __init__(self, nombre: str, descripcion: str, etiqueta: str, cubos: Sequence[float]):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiqueta = etiqueta
+        self.cubos = tuple(cubos)
+        self._series: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor_etiqueta: str, valor: float):
+        """Registra una observación para un valor de la etiqueta"""
+        indice = bisect.bisect_left(self.cubos, valor)
+        with self._lock:
+            serie = self._series.get(valor_etiqueta)
+            if serie is None:
+                # [recuentos por cubo (+Inf al final), suma]
+                serie = self._series[valor_etiqueta] = [[0] * (len(self.cubos) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def reiniciar(self):
+        with self._lock:
+            self._series.clear()
+
+    def exportar(self) -> List[str]:
+        """Líneas del histograma en formato de texto de Prometheus"""
+        lineas = [
+            f"# HELP {self.nombre} {self.descripcion}",
+            f"# TYPE {self.nombre} histogram",
+        ]
+        with self._lock:
+            series = sorted((clave, list(recuentos), suma) for clave, (recuentos, suma) in self._series.items())
+
+        for clave, recuentos, suma in series:
+            etiqueta = f'{self.etiqueta}="{_escapar(clave)}"'
+            acumulado = 0
+            for limite, recuento in zip(self.cubos, recuentos):
+                acumulado += recuento
+                lineas.append(f'{self.nombre}_bucket{{{etiqueta},le="{limite:g}"}} {acumulado}')
+            acumulado += recuentos[-1]
+            lineas.append(f'{self.nombre}_bucket{{{etiqueta},le="+Inf"}} {acumulado}')
+            lineas.append(f'{self.nombre}_sum{{{etiqueta}}} {suma:.6f}')
+            lineas.append(f'{self.nombre}_count{{{etiqueta}}} {acumulado}')
+        return lineas
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+DURACION_TRAMOS = Histograma(
+    'boe_tramo_duracion_segundos', 'Duración de cada tramo instrumentado', 'tramo', CUBOS_DURACION
+)
+DURACION_PETICIONES = Histograma(
+    'boe_peticion_duracion_segundos', 'Duración total de las peticiones por vista', 'vista', CUBOS_DURACION
+)
+CONSULTAS_PETICIONES = Histograma(
+    'boe_peticion_consultas_orm', 'Número de consultas ORM por petición y vista', 'vista', CUBOS_CONSULTAS
+)
+DURACION_CONSULTAS = Histograma(
+    'boe_peticion_duracion_orm_segundos', 'Tiempo total en consultas ORM por petición y vista', 'vista',
+    CUBOS_DURACION
+)
+
+HISTOGRAMAS = (DURACION_TRAMOS, DURACION_PETICIONES, CONSULTAS_PETICIONES, DURACION_CONSULTAS)
+
+
+class Traza:
+    """
+    Tramos medidos durante una petición: nombre -> (segundos acumulados, llamadas).
+    También acumula las consultas ORM ejecutadas y su duración.
+    """
+
+    def __init__(self):
+        self.tramos: Dict[str, List] = {}
+        self.consultas = 0
+        self.duracion_consultas = 0.0
+
+    def anotar(self, nombre: str, duracion: float):
+        tramo = self.tramos.setdefault(nombre, [0.0, 0])
+        tramo[0] += duracion
+        tramo[1] += 1
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """
+        Valor de la cabecera Server-Timing con un elemento por tramo (en milisegundos).
+
+        Args:
+            total: Duración total de la petición en segundos (opcional)
+
+        Returns:
+            str: Cabecera Server-Timing
+        """
+        elementos = []
+        for nombre, (duracion, llamadas) in self.tramos.items():
+            descripcion = f';desc="{llamadas} llamadas"' if llamadas > 1 else ''
+            elementos.append(f'{_nombre_token(nombre)};dur={duracion * 1000:.1f}{descripcion}')
+        elementos.append(f'orm;dur={self.duracion_consultas * 1000:.1f};desc="{self.consultas} consultas"')
+        if total is not None:
+            elementos.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(elementos)
+
+
+def _nombre_token(nombre: str) -> str:
+    """Convierte el nombre de un tramo en un token válido para Server-Timing"""
+    return re.sub(r'[^A-Za-z0-9!#$%&\'*+\-.^_`|~]', '_', nombre)
+
+
+_traza_actual: contextvars.ContextVar[Optional[Traza]] = contextvars.ContextVar('traza_actual', default=None)
+
+
+def traza_actual() -> Optional[Traza]:
+    """Traza de la petición en curso (None fuera de una petición instrumentada)"""
+    return _traza_actual.get()
+
+
+@contextmanager
+def iniciar_traza():
+    """
+    Abre una traza para la petición en curso y la cierra al salir.
+
+    Yields:
+        Traza: Traza en la que se anotan los tramos de la petición
+    """
+    traza = Traza()
+    token = _traza_actual.set(traza)
+    try:
+        yield traza
+    finally:
+        _traza_actual.reset(token)
+
+
+def registrar(nombre: str, duracion: float):
+    """
+    Anota la duración de un tramo en el histograma y en la traza en curso.
+
+    Args:
+        nombre: Nombre del tramo (por ejemplo, 'qdrant.busqueda')
+        duracion: Duración en segundos
+    """
+    DURACION_TRAMOS.observar(nombre, duracion)
+    traza = _traza_actual.get()
+    if traza is not None:
+        traza.anotar(nombre, duracion)
+
+
+@contextmanager
+def tramo(nombre: str):
+    """
+    Mide la duración de un bloque de código.
+
+    Args:
+        nombre: Nombre del tramo
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nombre, time.perf_counter() - inicio)
+
+
+def medir(nombre: Optional[str] = None) -> Callable:
+    """
+    Decorador que mide cada llamada a una función como un tramo.
+
+    Args:
+        nombre: Nombre del tramo (por defecto, el nombre cualificado de la función)
+
+    Returns:
+        Callable: Decorador
+    """
+    def decorador(funcion):
+        nombre_tramo = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                registrar(nombre_tramo, time.perf_counter() - inicio)
+        return envoltura
+    return decorador
+
+
+class ContadorConsultas:
+    """
+    Envoltura de ejecución de la conexión (connection.execute_wrapper) que cuenta
+    las consultas ORM y su duración en la traza en curso, sin necesidad de DEBUG.
+    """
+
+    def __init__(self, traza: Traza):
+        self.traza = traza
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.traza.consultas += 1
+            self.traza.duracion_consultas += time.perf_counter() - inicio
+
+
+def exportar_metricas() -> str:
+    """
+    Todas las métricas en formato de texto de Prometheus.
+
+    Returns:
+        str: Cuerpo para el endpoint /metrics
+    """
+    lineas = []
+    for histograma in HISTOGRAMAS:
+        lineas.extend(histograma.exportar())
+    return '\n'.join(lineas) + '\n'
+
+
+def reiniciar_metricas():
+    """Vacía todos los histogramas (útil en pruebas)"""
+    for histograma in HISTOGRAMAS:
+        histograma.reiniciar()
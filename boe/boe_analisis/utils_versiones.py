@@ -0,0 +1,187 @@
+"""
+Almacén local de versiones consolidadas de las normas del BOE.
+El texto consolidado se descarga una vez de la API de datos abiertos (que
+versiona cada bloque de la norma) y se guarda comprimido en disco un texto
+por (identificador, fecha de versión), de modo que el comparador trabaja sin
+red ni modelos de lenguaje.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+URL_TEXTO_CONSOLIDADO = 'https://www.boe.es/datosabiertos/api/legislacion-consolidada/id/{}/texto'
+
+# Segundos tras los que se vuelve a consultar si una norma tiene versiones nuevas
+REFRESCO_VERSIONES = 24 * 3600
+
+ARCHIVO_INDICE = 'versiones.json'
+
+_PATRON_IDENTIFICADOR = re.compile(r'^[A-Za-z0-9-]+$')
+
+
+def fechas_versiones(root) -> List[str]:
+    """
+    Fechas (AAAAMMDD) de todas las versiones de un texto consolidado.
+
+    Args:
+        root: XML del texto consolidado
+
+    Returns:
+        List[str]: Fechas de publicación distintas, de la más antigua a la más reciente
+    """
+    return sorted({
+        version.get('fecha_publicacion') for version in root.iter('version') if version.get('fecha_publicacion')
+    })
+
+
+def texto_en_fecha(root, fecha: str) -> str:
+    """
+    Reconstruye el texto de una norma en una fecha: de cada bloque se toma la
+    última versión publicada hasta esa fecha.
+
+    Args:
+        root: XML del texto consolidado
+        fecha: Fecha de la versión (AAAAMMDD)
+
+    Returns:
+        str: Texto con un párrafo por línea
+    """
+    lineas = []
+    for bloque in root.iter('bloque'):
+        vigente = None
+        for version in bloque.findall('version'):
+            publicada = version.get('fecha_publicacion') or ''
+            if publicada <= fecha and (vigente is None or publicada >= vigente.get('fecha_publicacion', '')):
+                vigente = version
+        if vigente is None:
+            continue
+        for parrafo in vigente.iter('p'):
+            texto = ' '.join(''.join(parrafo.itertext()).split())
+            if texto:
+                lineas.append(texto)
+    return '\n'.join(lineas)
+
+
+def descargar_texto_consolidado(identificador: str, timeout: int = 30):
+    """
+    Descarga el texto consolidado de una norma.
+
+    Args:
+        identificador: Identificador del BOE (por ejemplo, BOE-A-2015-10565)
+        timeout: Tiempo máximo de espera para la petición
+
+    Returns:
+        Element: Raíz del XML o None si la norma no tiene texto consolidado
+    """
+    respuesta = requests.get(
+        URL_TEXTO_CONSOLIDADO.format(identificador),
+        headers={'Accept': 'application/xml'},
+        timeout=timeout
+    )
+    if respuesta.status_code != 200:
+        logger.warning(f"No hay texto consolidado de {identificador} (HTTP {respuesta.status_code})")
+        return None
+    return ET.fromstring(respuesta.content)
+
+
+class AlmacenVersiones:
+    """
+    Textos consolidados por versión, comprimidos con gzip en
+    <directorio>/<identificador>/<fecha>.txt.gz, con un índice de fechas por norma.
+    """
+
+    def __init__(self, directorio: Optional[str] = None):
+        """
+        Args:
+            directorio: Directorio del almacén (por defecto, settings.VERSIONES_DIR
+                o un subdirectorio del directorio temporal)
+        """
+        self.directorio = directorio or getattr(settings, 'VERSIONES_DIR', None) \
+            or os.path.join(tempfile.gettempdir(), 'boe_versiones')
+
+    def _carpeta(self, identificador: str) -> str:
+        if not _PATRON_IDENTIFICADOR.match(identificador or ''):
+            raise ValueError(f"Identificador no válido: {identificador!r}")
+        return os.path.join(self.directorio, identificador)
+
+    def _escribir(self, ruta: str, contenido: bytes):
+        """Escritura atómica: otro proceso nunca lee un archivo a medias"""
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f'{ruta}.{os.getpid()}.tmp'
+        with open(temporal, 'wb') as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+
+    def guardar(self, identificador: str, fecha: str, texto: str):
+        """Guarda comprimido el texto de una versión"""
+        ruta = os.path.join(self._carpeta(identificador), f'{fecha}.txt.gz')
+        self._escribir(ruta, gzip.compress(texto.encode('utf-8'), compresslevel=6))
+
+    def obtener(self, identificador: str, fecha: str) -> Optional[str]:
+        """Texto de una versión guardada, o None si no está en el almacén"""
+        ruta = os.path.join(self._carpeta(identificador), f'{fecha}.txt.gz')
+        try:
+            with gzip.open(ruta, 'rb') as f:
+                return f.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def _indice(self, identificador: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self._carpeta(identificador), ARCHIVO_INDICE), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def fechas(self, identificador: str) -> List[str]:
+        """Fechas de las versiones guardadas de una norma"""
+        indice = self._indice(identificador)
+        return indice['fechas'] if indice else []
+
+    def cargar_norma(self, identificador: str, timeout: int = 30, forzar: bool = False) -> List[str]:
+        """
+        Descarga el texto consolidado de una norma y guarda todas sus versiones.
+        No vuelve a descargarlo si se consultó hace menos de REFRESCO_VERSIONES segundos.
+
+        Args:
+            identificador: Identificador del BOE
+            timeout: Tiempo máximo de espera para la petición
+            forzar: Descargar aunque el índice sea reciente
+
+        Returns:
+            List[str]: Fechas de las versiones disponibles (vacía si no hay texto consolidado)
+        """
+        indice = self._indice(identificador)
+        if indice and not forzar and time.time() - indice['consultado'] < REFRESCO_VERSIONES:
+            return indice['fechas']
+
+        try:
+            root = descargar_texto_consolidado(identificador, timeout)
+        except (requests.RequestException, ET.ParseError) as e:
+            logger.error(f"Error al descargar el texto consolidado de {identificador}: {str(e)}")
+            # Sin red se sigue trabajando con lo que ya está guardado
+            return indice['fechas'] if indice else []
+        if root is None:
+            return indice['fechas'] if indice else []
+
+        fechas = fechas_versiones(root)
+        for fecha in fechas:
+            # Las versiones ya publicadas no cambian: solo se guardan las nuevas
+            if not indice or fecha not in indice['fechas']:
+                self.guardar(identificador, fecha, texto_en_fecha(root, fecha))
+        self._escribir(
+            os.path.join(self._carpeta(identificador), ARCHIVO_INDICE),
+            json.dumps({'fechas': fechas, 'consultado': time.time()}).encode('utf-8')
+        )
+        return fechas
@@ -2,12 +2,12 @@
 from django.shortcuts import render, redirect
 from django.http import HttpResponse, JsonResponse
 from boe_analisis.models import *
-from django.db.models import Count
 import datetime
-from django.views.decorators.cache import cache_page
 from django.core.cache import cache
 from .import_os import planning_agent, summarization_agent, workflow
 from django.views.decorators.csrf import csrf_exempt
+from .utils_cubo import agregar_cubo, materias_principales, totales_por_legislatura
+from .utils_http import api_condicional, respuesta_json
 import json
 
 def index(request):
@@ -44,99 +44,84 @@ def api_info(request):
         }
     })
 
-@cache_page(60 * 60 * 24)
-def leyes_legislatura(request):
-    """Devuelve estadísticas de leyes por legislatura"""
-    legislaturas = Legislatura.objects.all()
+def _datos_legislaturas(totales):
+    """Combina los totales del cubo con los datos de cada legislatura"""
     data = []
-    for legislatura in legislaturas:
-        leyes = Documento.objects.filter(legislatura=legislatura).count()
+    for legislatura in Legislatura.objects.select_related('partido').order_by('inicio'):
         data.append({
-            'legislatura': legislatura.nombre_legislatura,
-            'leyes': leyes,
+            'legislatura': str(legislatura),
+            'leyes': totales.get(legislatura.id, 0),
             'inicio': legislatura.inicio.strftime('%Y-%m-%d'),
-            'final': legislatura.final.strftime('%Y-%m-%d') if legislatura.final else None,
+            'final': legislatura.fin.strftime('%Y-%m-%d') if legislatura.fin else None,
             'presidente': legislatura.presidente,
             'partido': legislatura.partido.nombre if legislatura.partido else None
         })
-    return JsonResponse(data, safe=False)
+    return data
+
+@api_condicional(cachear=True)
+def leyes_legislatura(request):
+    """Devuelve estadísticas de leyes por legislatura"""
+    totales = totales_por_legislatura(rango=request.GET.get('rango'))
+    return respuesta_json(_datos_legislaturas(totales))
 
-@cache_page(60 * 60 * 24)
+@api_condicional(cachear=True)
 def leyes_meses_legislatura(request, meses=None):
     """Devuelve estadísticas de leyes por meses en una legislatura"""
-    legislaturas = Legislatura.objects.all()
-    data = []
-    for legislatura in legislaturas:
-        if meses:
-            fecha_inicio = legislatura.inicio
-            fecha_fin = fecha_inicio + datetime.timedelta(days=int(meses)*30)
-            leyes = Documento.objects.filter(legislatura=legislatura, fecha_publicacion__range=(fecha_inicio, fecha_fin)).count()
-        else:
-            leyes = Documento.objects.filter(legislatura=legislatura).count()
-        
-        data.append({
-            'legislatura': legislatura.nombre_legislatura,
-            'leyes': leyes,
-            'inicio': legislatura.inicio.strftime('%Y-%m-%d'),
-            'final': legislatura.final.strftime('%Y-%m-%d') if legislatura.final else None,
-            'presidente': legislatura.presidente,
-            'partido': legislatura.partido.nombre if legislatura.partido else None
-        })
-    return JsonResponse(data, safe=False)
+    dias = int(meses) * 30 if meses else None
+    totales = totales_por_legislatura(rango=request.GET.get('rango'), dias=dias)
+    return respuesta_json(_datos_legislaturas(totales))
 
+@api_condicional(cachear=True)
 def materias_legislatura(request, materias=None):
-    """Devuelve estadísticas de materias por legislatura"""
-    legislaturas = Legislatura.objects.all()
-    data = []
-    for legislatura in legislaturas:
-        if materias:
-            materia = Materia.objects.get(codigo=materias)
-            leyes = Documento.objects.filter(legislatura=legislatura, materias=materia).count()
-        else:
-            leyes = Documento.objects.filter(legislatura=legislatura).count()
-        
-        data.append({
-            'legislatura': legislatura.nombre_legislatura,
-            'leyes': leyes,
-            'inicio': legislatura.inicio.strftime('%Y-%m-%d'),
-            'final': legislatura.final.strftime('%Y-%m-%d') if legislatura.final else None,
-            'presidente': legislatura.presidente,
-            'partido': legislatura.partido.nombre if legislatura.partido else None
-        })
-    return JsonResponse(data, safe=False)
+    """Devuelve estadísticas de materias por legislatura (materias es el id de la materia)"""
+    totales = totales_por_legislatura(materia=materias, rango=request.GET.get('rango'))
+    return respuesta_json(_datos_legislaturas(totales))
 
+@api_condicional(cachear=True)
 def top_materias(request):
-    """Devuelve las 10 materias con más documentos"""
-    materias = Materia.objects.annotate(num_docs=Count('documento')).order_by('-num_docs')[:10]
+    """
+    Devuelve las 10 materias con más documentos (codigo es el id de la materia
+    que aceptan v1/legislaturas/materia/<id> y los demás filtros por materia)
+    """
     data = []
-    for materia in materias:
+    for materia in materias_principales(10, rango=request.GET.get('rango')):
         data.append({
-            'materia': materia.titulo,
-            'codigo': materia.codigo,
-            'documentos': materia.num_docs
+            'materia': materia['nombre'],
+            'codigo': materia['id'],
+            'documentos': materia['total']
         })
-    return JsonResponse(data, safe=False)
+    return respuesta_json(data)
 
+@api_condicional(cachear=True)
 def years(request, materia=None):
-    """Devuelve los años con documentos"""
-    if materia:
-        materia = Materia.objects.get(id=materia)
-        documentos = Documento.objects.filter(materias=materia)
-    else:
-        documentos = Documento.objects.all()
-    
-    years = documentos.dates('fecha_publicacion', 'year')
-    data = []
-    for year in years:
-        if materia:
-            count = documentos.filter(fecha_publicacion__year=year.year, materias=materia).count()
-        else:
-            count = documentos.filter(fecha_publicacion__year=year.year).count()
-        data.append({
-            'year': year.year,
-            'count': count
-        })
-    return JsonResponse(data, safe=False)
+    """Devuelve los años con documentos (materia es el id de la materia)"""
+    filas = agregar_cubo(['anio'], materia=materia, rango=request.GET.get('rango'))
+    data = [{'year': fila['anio'].year, 'count': fila['total']} for fila in filas if fila['total']]
+    return respuesta_json(data)
+
+@api_condicional(cachear=True)
+def estadisticas_cubo(request):
+    """
+    Devuelve el número de documentos agregado por las dimensiones indicadas.
+    Parámetros: agrupar (dia, mes, anio, legislatura, departamento, rango; separados por comas),
+    materia, departamento, rango, legislatura, desde y hasta (YYYY-MM-DD).
+    """
+    agrupar = [nombre.strip() for nombre in request.GET.get('agrupar', 'anio').split(',') if nombre.strip()]
+    filtros = {}
+    try:
+        for parametro in ('desde', 'hasta'):
+            if request.GET.get(parametro):
+                filtros[parametro] = datetime.datetime.strptime(request.GET[parametro], '%Y-%m-%d').date()
+        for parametro in ('materia', 'legislatura'):
+            if request.GET.get(parametro):
+                filtros[parametro] = int(request.GET[parametro])
+        for parametro in ('departamento', 'rango'):
+            if request.GET.get(parametro):
+                filtros[parametro] = request.GET[parametro]
+        filas = agregar_cubo(agrupar, **filtros)
+    except ValueError as e:
+        return respuesta_json({'error': str(e)}, status=400)
+    return respuesta_json(filas)
 
 def api_docs(request):
     """Vista que muestra la documentación de la API de búsqueda semántica"""
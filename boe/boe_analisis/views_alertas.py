@@ -6,11 +6,11 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Count, Q
 from django.http import JsonResponse
-from django.utils import timezone
 
 from .forms import RegistroUsuarioForm, PerfilUsuarioForm, AlertaUsuarioForm
 from .models_alertas import PerfilUsuario, AlertaUsuario, NotificacionAlerta, CategoriaAlerta
 from .models_simplified import DocumentoSimplificado
+from .utils_estadisticas import obtener_estadisticas
 
 def registro(request):
     """
@@ -36,25 +36,26 @@ def dashboard(request):
     """
     Dashboard principal del usuario
     """
-    # Obtener alertas del usuario
-    alertas = AlertaUsuario.objects.filter(usuario=request.user)
+    # Obtener alertas del usuario con su número de notificaciones
+    alertas = list(
+        AlertaUsuario.objects.filter(usuario=request.user)
+        .annotate(total_notificaciones=Count('notificaciones'))
+    )
     
     # Obtener notificaciones pendientes
-    notificaciones_pendientes = NotificacionAlerta.objects.filter(
+    notificaciones_pendientes = NotificacionAlerta.objects.listado().filter(
         alerta__usuario=request.user,
         estado='pendiente'
     ).order_by('-fecha_notificacion')[:5]
     
-    # Obtener estadísticas
-    total_alertas = alertas.count()
-    total_notificaciones = NotificacionAlerta.objects.filter(alerta__usuario=request.user).count()
-    notificaciones_no_leidas = NotificacionAlerta.objects.filter(
-        alerta__usuario=request.user,
-        estado='pendiente'
-    ).count()
+    # Obtener estadísticas (los dos recuentos de notificaciones en una consulta)
+    total_alertas = len(alertas)
+    recuentos = NotificacionAlerta.objects.filter(alerta__usuario=request.user).recuentos()
+    total_notificaciones = recuentos['total']
+    notificaciones_no_leidas = recuentos['pendientes']
     
     # Obtener documentos recientes del BOE
-    documentos_recientes = DocumentoSimplificado.objects.all().order_by('-fecha_publicacion')[:5]
+    documentos_recientes = DocumentoSimplificado.objects.listado().order_by('-fecha_publicacion')[:5]
     
     return render(request, 'boe_analisis/dashboard.html', {
         'alertas': alertas,
@@ -184,8 +185,8 @@ def listar_notificaciones(request):
     estado = request.GET.get('estado', None)
     alerta_id = request.GET.get('alerta', None)
     
-    # Filtrar notificaciones
-    notificaciones = NotificacionAlerta.objects.filter(alerta__usuario=request.user)
+    # Filtrar notificaciones (sin cargar el resumen de cada una)
+    notificaciones = NotificacionAlerta.objects.listado().filter(alerta__usuario=request.user)
     
     if estado:
         notificaciones = notificaciones.filter(estado=estado)
@@ -283,175 +284,7 @@ def estadisticas(request):
     """
     Vista para mostrar estadísticas de alertas y notificaciones
     """
-    # Obtener alertas del usuario
-    alertas = AlertaUsuario.objects.filter(usuario=request.user)
-    
-    # Estadísticas generales
-    total_alertas = alertas.count()
-    total_notificaciones = NotificacionAlerta.objects.filter(alerta__usuario=request.user).count()
-    
-    # Notificaciones por estado
-    notificaciones_por_estado = NotificacionAlerta.objects.filter(
-        alerta__usuario=request.user
-    ).values('estado').annotate(total=Count('id'))
-    
-    # Convertir a formato para gráficos
-    estados_labels = []
-    estados_data = []
-    estados_colors = []
-    
-    for item in notificaciones_por_estado:
-        estados_labels.append(item['estado'].capitalize())
-        estados_data.append(item['total'])
-        if item['estado'] == 'pendiente':
-            estados_colors.append('#ffc107')  # Amarillo
-        elif item['estado'] == 'leida':
-            estados_colors.append('#28a745')  # Verde
-        elif item['estado'] == 'archivada':
-            estados_colors.append('#6c757d')  # Gris
-        else:
-            estados_colors.append('#007bff')  # Azul
-    
-    # Notificaciones por alerta
-    notificaciones_por_alerta = NotificacionAlerta.objects.filter(
-        alerta__usuario=request.user
-    ).values('alerta__nombre').annotate(total=Count('id')).order_by('-total')
-    
-    # Convertir a formato para gráficos
-    alertas_labels = []
-    alertas_data = []
-    alertas_colors = []
-    
-    # Generar colores aleatorios para cada alerta
-    import random
-    
-    for i, item in enumerate(notificaciones_por_alerta):
-        alertas_labels.append(item['alerta__nombre'])
-        alertas_data.append(item['total'])
-        # Generar color aleatorio en formato hexadecimal
-        color = "#{:06x}".format(random.randint(0, 0xFFFFFF))
-        alertas_colors.append(color)
-    
-    # Notificaciones por relevancia
-    relevancia_data = [
-        NotificacionAlerta.objects.filter(alerta__usuario=request.user, relevancia__gte=75).count(),
-        NotificacionAlerta.objects.filter(alerta__usuario=request.user, relevancia__gte=50, relevancia__lt=75).count(),
-        NotificacionAlerta.objects.filter(alerta__usuario=request.user, relevancia__lt=50).count()
-    ]
-    
-    relevancia_labels = ['Alta', 'Media', 'Baja']
-    relevancia_colors = ['#28a745', '#ffc107', '#6c757d']  # Verde, Amarillo, Gris
-    
-    # Tendencia de notificaciones en el tiempo (últimos 30 días)
-    from datetime import timedelta
-    
-    fecha_inicio = timezone.now() - timedelta(days=30)
-    fecha_fin = timezone.now()
-    
-    # Crear un diccionario con todas las fechas en el rango
-    import datetime
-    
-    fechas = {}
-    fecha_actual = fecha_inicio.date()
-    while fecha_actual <= fecha_fin.date():
-        fechas[fecha_actual.strftime('%Y-%m-%d')] = 0
-        fecha_actual += datetime.timedelta(days=1)
-    
-    # Obtener conteo de notificaciones por fecha
-    notificaciones_por_fecha = NotificacionAlerta.objects.filter(
-        alerta__usuario=request.user,
-        fecha_notificacion__gte=fecha_inicio,
-        fecha_notificacion__lte=fecha_fin
-    ).extra({
-        'fecha': "date(fecha_notificacion)"
-    }).values('fecha').annotate(total=Count('id'))
-    
-    # Actualizar el diccionario con los conteos reales
-    for item in notificaciones_por_fecha:
-        # Verificar si fecha es un objeto datetime o una cadena
-        if hasattr(item['fecha'], 'strftime'):
-            fecha_str = item['fecha'].strftime('%Y-%m-%d')
-        else:
-            # Si es una cadena, usarla directamente
-            fecha_str = item['fecha']
-        fechas[fecha_str] = item['total']
-    
-    # Convertir a listas para el gráfico
-    tendencia_labels = list(fechas.keys())
-    tendencia_data = list(fechas.values())
-    
-    # Palabras clave más frecuentes
-    palabras_clave = {}
-    
-    for alerta in alertas:
-        for palabra in alerta.palabras_clave.split(','):
-            palabra = palabra.strip().lower()
-            if palabra:
-                if palabra in palabras_clave:
-                    palabras_clave[palabra] += 1
-                else:
-                    palabras_clave[palabra] = 1
-    
-    # Ordenar por frecuencia y tomar las 10 más comunes
-    palabras_clave_ordenadas = sorted(palabras_clave.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    # Convertir a listas para el gráfico
-    palabras_labels = [item[0] for item in palabras_clave_ordenadas]
-    palabras_data = [item[1] for item in palabras_clave_ordenadas]
-    
-    # Categorías más utilizadas
-    categorias_por_alerta = AlertaUsuario.objects.filter(
-        usuario=request.user
-    ).values('categorias__nombre').annotate(total=Count('id')).order_by('-total')
-    
-    # Convertir a formato para gráficos
-    categorias_labels = []
-    categorias_data = []
-    categorias_colors = []
-    
-    for item in categorias_por_alerta:
-        if item['categorias__nombre']:  # Ignorar None
-            categorias_labels.append(item['categorias__nombre'])
-            categorias_data.append(item['total'])
-            # Obtener color de la categoría
-            try:
-                categoria = CategoriaAlerta.objects.get(nombre=item['categorias__nombre'])
-                categorias_colors.append(categoria.color)
-            except:
-                # Color por defecto si no se encuentra la categoría
-                categorias_colors.append('#007bff')
-    
-    context = {
-        'total_alertas': total_alertas,
-        'total_notificaciones': total_notificaciones,
-        
-        # Datos para gráfico de estados
-        'estados_labels': estados_labels,
-        'estados_data': estados_data,
-        'estados_colors': estados_colors,
-        
-        # Datos para gráfico de alertas
-        'alertas_labels': alertas_labels,
-        'alertas_data': alertas_data,
-        'alertas_colors': alertas_colors,
-        
-        # Datos para gráfico de relevancia
-        'relevancia_labels': relevancia_labels,
-        'relevancia_data': relevancia_data,
-        'relevancia_colors': relevancia_colors,
-        
-        # Datos para gráfico de tendencia
-        'tendencia_labels': tendencia_labels,
-        'tendencia_data': tendencia_data,
-        
-        # Datos para nube de palabras clave
-        'palabras_labels': palabras_labels,
-        'palabras_data': palabras_data,
-        
-        # Datos para gráfico de categorías
-        'categorias_labels': categorias_labels,
-        'categorias_data': categorias_data,
-        'categorias_colors': categorias_colors,
-    }
+    # Todas las series se calculan con agregaciones condicionales y se guardan en caché por usuario
+    context = obtener_estadisticas(request.user)
     
     return render(request, 'boe_analisis/alertas/estadisticas.html', context)
@@ -3,7 +3,7 @@ API para búsqueda semántica de documentos del BOE.
 Permite a las IAs y otros sistemas realizar búsquedas por similitud conceptual.
 """
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
 import datetime
@@ -16,6 +16,15 @@ from django.db.models import Q
 
 from .utils_qdrant import QdrantBOE
 from .models_simplified import DocumentoSimplificado
+from .utils_articulos import secciones_documento, texto_seccion
+from .utils_busqueda import filtro_cuerpo
+from .utils_exportacion import FORMATOS, exportar_documentos, parametros_exportacion
+from .utils_facetas import contar_facetas
+from .utils_http import api_condicional, respuesta_json
+from .utils_referencias import PROFUNDIDAD_MAXIMA, cadena_modificaciones, normas_afectadas, normas_que_afectan
+from .utils_resultados import hidratar_resultados, serializar_documento
+from .utils_textos import precargar_textos
+from .utils_trazas import exportar_metricas, medir, tramo
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -57,6 +66,7 @@ def api_diagnostico_qdrant(request):
         }, status=500)
 
 @csrf_exempt
+@api_condicional
 def api_busqueda_semantica_directa(request):
     """
     API para realizar búsquedas semánticas directas en documentos del BOE.
@@ -69,6 +79,8 @@ def api_busqueda_semantica_directa(request):
     - departamento: Filtrar por departamento (opcional)
     - fecha_desde: Filtrar por fecha desde (opcional, formato YYYY-MM-DD)
     - fecha_hasta: Filtrar por fecha hasta (opcional, formato YYYY-MM-DD)
+    - hnsw_ef: Candidatos explorados en el índice HNSW (opcional, más precisión a cambio de latencia)
+    - exacta: Búsqueda vectorial exhaustiva sin índice aproximado (opcional)
     """
     if request.method != 'POST':
         return JsonResponse({
@@ -82,6 +94,8 @@ def api_busqueda_semantica_directa(request):
         query = data.get('q', '')
         limite = int(data.get('limite', 10))
         umbral = float(data.get('umbral', 0.3))
+        hnsw_ef = int(data['hnsw_ef']) if data.get('hnsw_ef') else None
+        exacta = bool(data.get('exacta', False))
         
         # Validar parámetros
         if not query:
@@ -119,31 +133,44 @@ def api_busqueda_semantica_directa(request):
         qdrant_client = QdrantBOE()
         
         # Verificar estado de Qdrant
+        # Con Qdrant caído se busca en el índice local, si lo hay
         estado = qdrant_client.verificar_estado()
-        if not estado.get('coleccion_existe') or estado.get('total_documentos', 0) == 0:
+        if not qdrant_client.busqueda_semantica_disponible(estado):
             return JsonResponse({
                 'success': False,
                 'error': f'Qdrant no está listo: {estado}'
             }, status=500)
         
         # Forzar búsqueda semántica sin fallback
-        resultados = qdrant_client.buscar_similares(
+        resultados_qdrant = qdrant_client.buscar_ids_similares(
             texto=query,
             limit=limite,
             score_threshold=umbral,
-            filtros=filtros
+            filtros=filtros,
+            hnsw_ef=hnsw_ef,
+            exacta=exacta
         )
         
-        tiempo_total = time.time() - inicio
+        # Hidratar los resultados en una sola consulta, preservando el orden de Qdrant
+        with tramo('orm.hidratacion'):
+            documentos = hidratar_resultados(resultados_qdrant)
         
-        return JsonResponse({
-            'success': True,
-            'total': len(resultados),
-            'resultados': resultados,
-            'consulta': query,
-            'tiempo_procesamiento': tiempo_total,
-            'umbral': umbral
-        })
+        with tramo('orm.facetas'):
+            facetas = contar_facetas(documentos)
+        
+        with tramo('json.serializacion'):
+            resultados = [serializar_documento(doc) for doc in documentos]
+            tiempo_total = time.time() - inicio
+            
+            return respuesta_json({
+                'success': True,
+                'total': len(resultados),
+                'resultados': resultados,
+                'facetas': facetas,
+                'consulta': query,
+                'tiempo_procesamiento': tiempo_total,
+                'umbral': umbral
+            })
         
     except json.JSONDecodeError:
         return JsonResponse({
@@ -161,6 +188,7 @@ def api_busqueda_semantica_directa(request):
         }, status=500)
 
 @csrf_exempt
+@api_condicional
 def api_busqueda_semantica(request):
     """
     API para realizar búsquedas semánticas en documentos del BOE.
@@ -172,6 +200,8 @@ def api_busqueda_semantica(request):
     - departamento: Filtrar por departamento (opcional)
     - fecha_desde: Filtrar por fecha desde (opcional, formato YYYY-MM-DD)
     - fecha_hasta: Filtrar por fecha hasta (opcional, formato YYYY-MM-DD)
+    - hnsw_ef: Candidatos explorados en el índice HNSW (opcional, más precisión a cambio de latencia)
+    - exacta: Búsqueda vectorial exhaustiva sin índice aproximado (opcional)
     """
     if request.method != 'POST':
         return JsonResponse({
@@ -185,6 +215,8 @@ def api_busqueda_semantica(request):
         query = data.get('q', '')
         limite = int(data.get('limite', 10))
         umbral = float(data.get('umbral', 0.1))  # Bajamos el umbral predeterminado a 0.1
+        hnsw_ef = int(data['hnsw_ef']) if data.get('hnsw_ef') else None
+        exacta = bool(data.get('exacta', False))
         
         # Validar parámetros
         if not query:
@@ -219,7 +251,8 @@ def api_busqueda_semantica(request):
         
         # Realizar búsqueda híbrida (semántica + palabras clave)
         qdrant_client = QdrantBOE()
-        resultados = qdrant_client.busqueda_hibrida(query, limite=limite, score_threshold=umbral, filtros=filtros)
+        resultados = qdrant_client.busqueda_hibrida(query, limite=limite, score_threshold=umbral, filtros=filtros,
+                                                    hnsw_ef=hnsw_ef, exacta=exacta)
         
         # Añadir información sobre la consulta procesada
         resultados['consulta'] = query
@@ -235,7 +268,7 @@ def api_busqueda_semantica(request):
                 'tiempo_procesamiento': time.time() - time.time()  # Placeholder para tiempo de procesamiento
             }
         
-        return JsonResponse({
+        return respuesta_json({
             'success': True,
             **resultados
         })
@@ -376,6 +409,7 @@ def api_asistente_mistral(request):
 
 # Funciones auxiliares para Tavily y Mistral
 
+@medir('tavily.busqueda')
 def buscar_con_tavily(query: str, limite: int = 5, include_domains: List[str] = None) -> List[Dict[str, Any]]:
     """
     Realiza una búsqueda en la base de datos local, simulando la funcionalidad de Tavily.
@@ -398,20 +432,21 @@ def buscar_con_tavily(query: str, limite: int = 5, include_domains: List[str] =
         # Dividir la consulta en palabras clave
         palabras_clave = query.lower().split()
         
-        # Filtrar documentos que contengan al menos una de las palabras clave
-        # en el título, texto o departamento
+        # Filtrar documentos que contengan todas las palabras clave en el título,
+        # el texto (a través de su vocabulario, ver filtro_cuerpo) o el departamento
         resultados_db = DocumentoSimplificado.objects.all()
         
         for palabra in palabras_clave:
             if len(palabra) > 3:  # Ignorar palabras muy cortas
                 resultados_db = resultados_db.filter(
                     Q(titulo__icontains=palabra) | 
-                    Q(texto__icontains=palabra) | 
+                    Q(palabras_clave__icontains=palabra) | 
+                    filtro_cuerpo(palabra) |
                     Q(departamento__icontains=palabra)
                 )
         
-        # Limitar resultados
-        resultados_db = resultados_db[:limite]
+        # Limitar resultados (con sus textos en una consulta)
+        resultados_db = precargar_textos(resultados_db[:limite])
         
         # Formatear resultados como si vinieran de Tavily
         resultados_formateados = []
@@ -524,6 +559,7 @@ def preparar_contexto_mistral(query: str, resultados: List[Dict[str, Any]], cont
     
     return mensajes
 
+@medir('ia.mistral_asistente')
 def generar_respuesta_mistral(contexto: List[Dict[str, str]]) -> str:
     """
     Genera una respuesta usando Mistral AI.
@@ -578,3 +614,119 @@ def generar_respuesta_mistral(contexto: List[Dict[str, str]]) -> str:
         import traceback
         logger.error(traceback.format_exc())
         return f"Lo siento, no pude generar una respuesta. Error: {str(e)}"
+
+
+@api_condicional(cachear=True)
+def api_referencias(request, identificador):
+    """
+    API del grafo de referencias de una norma: qué normas la modifican, derogan,
+    anulan o corrigen, a cuáles afecta y la cadena transitiva de modificaciones.
+    
+    Parámetros GET:
+    - profundidad: Niveles máximos de la cadena (por defecto 10)
+    """
+    if request.method != 'GET':
+        return JsonResponse({
+            'success': False,
+            'error': 'Método no permitido'
+        }, status=405)
+    
+    try:
+        profundidad = min(int(request.GET.get('profundidad', PROFUNDIDAD_MAXIMA)), PROFUNDIDAD_MAXIMA)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'El parámetro profundidad debe ser un número entero'
+        }, status=400)
+    
+    campos = ('origen', 'destino', 'relacion', 'palabra')
+    cadena = cadena_modificaciones(identificador, max_profundidad=max(profundidad, 1))
+    
+    # respuesta_json serializa las fechas de la cadena en formato ISO
+    return respuesta_json({
+        'success': True,
+        'identificador': identificador,
+        'afectada_por': list(normas_que_afectan(identificador).values(*campos)),
+        'afecta_a': list(normas_afectadas(identificador).values(*campos)),
+        'cadena': cadena,
+    })
+
+@api_condicional
+def api_secciones(request, identificador):
+    """
+    API de la estructura de un documento: títulos, capítulos, artículos,
+    disposiciones y anexos con su posición en el texto.
+    
+    Parámetros GET:
+    - tipo: Tipos de sección separados por comas (por ejemplo, articulo,disposicion)
+    - clave: Devuelve solo el texto de esa sección (por ejemplo, "Artículo 3")
+    """
+    if request.method != 'GET':
+        return JsonResponse({
+            'success': False,
+            'error': 'Método no permitido'
+        }, status=405)
+    
+    clave = request.GET.get('clave')
+    if clave:
+        texto = texto_seccion(identificador, clave)
+        if texto is None:
+            return JsonResponse({
+                'success': False,
+                'error': f"El documento {identificador} no tiene la sección {clave}"
+            }, status=404)
+        return respuesta_json({
+            'success': True,
+            'identificador': identificador,
+            'clave': clave,
+            'texto': texto,
+        })
+    
+    tipos = [tipo for tipo in request.GET.get('tipo', '').split(',') if tipo]
+    secciones = secciones_documento(identificador, tipos).values(
+        'orden', 'tipo', 'clave', 'titulo', 'ruta', 'inicio', 'fin'
+    )
+    return respuesta_json({
+        'success': True,
+        'identificador': identificador,
+        'secciones': list(secciones),
+    })
+
+def api_exportar(request):
+    """
+    API de exportación masiva de documentos. La respuesta se envía por trozos
+    a medida que se leen los documentos, sea cual sea el tamaño de la exportación.
+    
+    Parámetros GET:
+    - formato: ndjson (por defecto), csv o parquet
+    - desde: Fecha de publicación mínima (YYYY-MM-DD)
+    - hasta: Fecha de publicación máxima (YYYY-MM-DD)
+    - cambiados_desde: Solo los documentos modificados desde esa fecha (YYYY-MM-DD o ISO 8601)
+    - texto: 1 para incluir el texto completo
+    """
+    if request.method != 'GET':
+        return JsonResponse({
+            'success': False,
+            'error': 'Método no permitido'
+        }, status=405)
+    
+    try:
+        parametros = parametros_exportacion(request.GET)
+        trozos = exportar_documentos(**parametros)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    tipo, extension = FORMATOS[parametros['formato']]
+    respuesta = StreamingHttpResponse(trozos, content_type=tipo)
+    respuesta['Content-Disposition'] = f'attachment; filename="documentos_boe.{extension}"'
+    return respuesta
+
+def metricas(request):
+    """
+    Expone los histogramas de latencia (tramos, peticiones y consultas ORM)
+    en formato de texto de Prometheus.
+    """
+    return HttpResponse(exportar_metricas(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,5 +1,8 @@
 """
-Vistas para el comparador de versiones de documentos del BOE usando Cohere
+Vistas para el comparador de versiones de documentos del BOE.
+Las versiones y la comparación salen del texto consolidado del BOE guardado
+localmente (utils_versiones, utils_diff); Cohere solo se usa para la búsqueda
+por texto libre y como último recurso para listar versiones.
 """
 
 import os
@@ -12,6 +15,10 @@ from django.core.cache import cache
 import cohere
 from dotenv import load_dotenv
 
+from .utils_diff import comparar_textos
+from .utils_referencias import historial_versiones
+from .utils_versiones import AlmacenVersiones
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -91,6 +98,96 @@ def buscar_documento(request):
     
     return JsonResponse({'error': 'Método no permitido'}, status=405)
 
+def _fecha_legible(fecha):
+    """AAAAMMDD -> DD/MM/YYYY"""
+    return f"{fecha[6:8]}/{fecha[4:6]}/{fecha[:4]}"
+
+def versiones_desde_consolidado(referencia, almacen=None):
+    """
+    Construye la lista de versiones del comparador a partir del texto consolidado
+    (una por cada fecha en la que cambió algún bloque de la norma)
+    """
+    fechas = (almacen or AlmacenVersiones()).cargar_norma(referencia)
+    if not fechas:
+        return []
+    
+    versiones = [{
+        'id': 'original',
+        'descripcion': f"Versión original ({_fecha_legible(fechas[0])})",
+        'fecha': _fecha_legible(fechas[0]),
+        'version': fechas[0]
+    }]
+    for i, fecha in enumerate(fechas[1:-1], 1):
+        versiones.append({
+            'id': f'v{i}',
+            'descripcion': f"Modificación ({_fecha_legible(fecha)})",
+            'fecha': _fecha_legible(fecha),
+            'version': fecha
+        })
+    versiones.append({
+        'id': 'vigente',
+        'descripcion': f"Versión vigente ({_fecha_legible(fechas[-1])})",
+        'fecha': _fecha_legible(fechas[-1]),
+        'version': fechas[-1]
+    })
+    return versiones
+
+def resolver_version(version, fechas):
+    """
+    Fecha (AAAAMMDD) de una versión del comparador: 'original', 'vigente', 'vN'
+    o directamente una fecha. Devuelve None si no existe.
+    """
+    if not fechas:
+        return None
+    if version == 'original':
+        return fechas[0]
+    if version == 'vigente':
+        return fechas[-1]
+    if version.startswith('v') and version[1:].isdigit():
+        indice = int(version[1:])
+        return fechas[indice] if indice < len(fechas) else None
+    if len(version) == 8 and version.isdigit():
+        # Una fecha cualquiera: la última versión publicada hasta ese día
+        anteriores = [fecha for fecha in fechas if fecha <= version]
+        return anteriores[-1] if anteriores else None
+    return None
+
+# Descripción de cada tipo de cambio en la lista de versiones
+PARTICIPIOS = {'modifica': 'Modificada', 'deroga': 'Derogada', 'anula': 'Anulada', 'corrige': 'Corregida'}
+
+def versiones_desde_referencias(referencia):
+    """
+    Construye la lista de versiones del comparador a partir del grafo de referencias
+    (la original, una por cada norma que la cambia y la vigente)
+    """
+    historial = historial_versiones(referencia)
+    if not historial:
+        return []
+    
+    def fecha(version):
+        return version['fecha_publicacion'].strftime('%d/%m/%Y') if version['fecha_publicacion'] else ''
+    
+    original = historial[0]
+    versiones = [{
+        'id': 'original',
+        'descripcion': f"Versión original ({fecha(original) or original['identificador']})",
+        'fecha': fecha(original)
+    }]
+    for i, version in enumerate(historial[1:], 1):
+        versiones.append({
+            'id': f'v{i}',
+            'descripcion': f"{PARTICIPIOS.get(version['relacion'], 'Modificada')} por {version['identificador']}"
+                           + (f" ({fecha(version)})" if fecha(version) else ''),
+            'fecha': fecha(version),
+            'referencia': version['identificador']
+        })
+    versiones.append({
+        'id': 'vigente',
+        'descripcion': f"Versión vigente ({fecha(historial[-1]) or historial[-1]['identificador']})",
+        'fecha': fecha(historial[-1])
+    })
+    return versiones
+
 @csrf_exempt
 def obtener_versiones(request):
     """
@@ -104,6 +201,16 @@ def obtener_versiones(request):
             if not referencia:
                 return JsonResponse({'error': 'Referencia no proporcionada'}, status=400)
             
+            # Las fechas del texto consolidado son las versiones reales de la norma
+            versiones = versiones_desde_consolidado(referencia)
+            if versiones:
+                return JsonResponse({'versiones': versiones, 'fuente': 'consolidado'})
+            
+            # Si el grafo de referencias conoce los cambios de la norma, no hace falta consultar a Cohere
+            versiones = versiones_desde_referencias(referencia)
+            if versiones:
+                return JsonResponse({'versiones': versiones, 'fuente': 'referencias'})
+            
             # Verificar si tenemos las versiones en caché
             cache_key = f"boe_versiones_{referencia}"
             versiones_cache = cache.get(cache_key)
@@ -170,7 +277,8 @@ def obtener_versiones(request):
 @csrf_exempt
 def comparar_versiones(request):
     """
-    Compara dos versiones de un documento del BOE utilizando Cohere
+    Compara dos versiones de un documento del BOE artículo por artículo,
+    con los textos consolidados guardados localmente
     """
     if request.method == 'POST':
         try:
@@ -182,119 +290,38 @@ def comparar_versiones(request):
             if not referencia:
                 return JsonResponse({'error': 'Referencia no proporcionada'}, status=400)
             
-            # Verificar si tenemos la comparación en caché
-            cache_key = f"boe_comparacion_{referencia}_{version_original}_{version_comparar}"
-            comparacion_cache = cache.get(cache_key)
+            almacen = AlmacenVersiones()
+            fechas = almacen.cargar_norma(referencia)
+            fecha_original = resolver_version(version_original, fechas)
+            fecha_comparar = resolver_version(version_comparar, fechas)
+            if not fecha_original or not fecha_comparar:
+                return JsonResponse({
+                    'error': f"No hay texto consolidado de {referencia} para las versiones solicitadas",
+                    'tipo': 'texto_no_disponible'
+                }, status=404)
             
-            if comparacion_cache:
-                return JsonResponse(comparacion_cache)
+            # Las versiones publicadas no cambian: la comparación se guarda por fechas
+            cache_key = f"boe_diff_{referencia}_{fecha_original}_{fecha_comparar}"
+            comparacion = cache.get(cache_key)
             
-            # Si no está en caché, consultar a Cohere
-            try:
-                co = cohere.Client(COHERE_API_KEY)
-                
-                # Construir prompt para Cohere
-                prompt = f"""
-                Actúa como un experto en derecho español y análisis de legislación. Necesito que compares las versiones {version_original} y {version_comparar} del documento del BOE con referencia {referencia}.
-                
-                Analiza detalladamente las diferencias entre ambas versiones y proporciona:
-                1. Un resumen ejecutivo de los cambios principales, destacando su impacto legal
-                2. Una lista completa de artículos modificados, añadidos o eliminados
-                3. Para cada artículo modificado, muestra el texto original y el texto nuevo, resaltando los cambios específicos
-                
-                Es crucial que identifiques:
-                - Cambios en definiciones legales
-                - Modificaciones en plazos o términos
-                - Alteraciones en procedimientos administrativos
-                - Cambios en sanciones o penalizaciones
-                
-                Formatea la respuesta en JSON con la siguiente estructura:
-                {{
-                    "resumen": "Texto con resumen ejecutivo de cambios",
-                    "estadisticas": {{
-                        "articulos_modificados": número,
-                        "articulos_anadidos": número,
-                        "articulos_eliminados": número,
-                        "total_cambios": número
-                    }},
-                    "cambios": [
-                        {{
-                            "articulo": "Número y título del artículo",
-                            "texto_original": "Texto en versión original",
-                            "texto_nuevo": "Texto en versión nueva",
-                            "tipo_cambio": "modificado/añadido/eliminado",
-                            "importancia": "alta/media/baja",
-                            "descripcion": "Breve descripción del cambio y su impacto"
-                        }}
-                    ]
-                }}
-                """
-                
-                # Usar el modelo command-r para mejor comprensión de textos legales
-                response = co.chat(
-                    message=prompt,
-                    model="command-r",
-                    temperature=0.2,
-                    max_tokens=4000
-                )
-                
-                # Procesar respuesta para extraer la comparación
-                texto_respuesta = response.text
-                
-                # Intentar extraer JSON de la respuesta
-                import re
-                json_match = re.search(r'```json\n(.*?)\n```', texto_respuesta, re.DOTALL)
-                
-                if json_match:
-                    comparacion_json = json.loads(json_match.group(1))
-                else:
-                    # Si no se encuentra JSON con formato de código, buscar cualquier JSON válido
-                    json_match = re.search(r'({[\s\S]*})', texto_respuesta)
-                    if json_match:
-                        try:
-                            comparacion_json = json.loads(json_match.group(1))
-                        except:
-                            # Si no se puede parsear, intentar con la respuesta completa
-                            try:
-                                comparacion_json = json.loads(texto_respuesta)
-                            except:
-                                # Si todo falla, crear una estructura básica
-                                comparacion_json = {
-                                    "resumen": "No se pudo generar un resumen estructurado de los cambios. Por favor, intenta nuevamente.",
-                                    "estadisticas": {
-                                        "articulos_modificados": 0,
-                                        "articulos_anadidos": 0,
-                                        "articulos_eliminados": 0,
-                                        "total_cambios": 0
-                                    },
-                                    "cambios": [],
-                                    "error_procesamiento": True
-                                }
-                    else:
-                        # Si no se encuentra ningún JSON, crear estructura básica
-                        comparacion_json = {
-                            "resumen": texto_respuesta[:500] + "...",  # Incluir parte de la respuesta como resumen
-                            "estadisticas": {
-                                "articulos_modificados": 0,
-                                "articulos_anadidos": 0,
-                                "articulos_eliminados": 0,
-                                "total_cambios": 0
-                            },
-                            "cambios": [],
-                            "respuesta_completa": texto_respuesta,
-                            "error_procesamiento": True
-                        }
-                
-                # Guardar en caché
-                cache.set(cache_key, comparacion_json, 86400)  # 24 horas
-                
-                return JsonResponse(comparacion_json)
-                
-            except Exception as e:
-                return JsonResponse({
-                    'error': f"Error al comunicarse con Cohere: {str(e)}",
-                    'tipo': 'api_error'
-                }, status=500)
+            if comparacion is None:
+                texto_original = almacen.obtener(referencia, fecha_original)
+                texto_comparar = almacen.obtener(referencia, fecha_comparar)
+                if texto_original is None or texto_comparar is None:
+                    return JsonResponse({
+                        'error': f"No hay texto consolidado de {referencia} para las versiones solicitadas",
+                        'tipo': 'texto_no_disponible'
+                    }, status=404)
+                comparacion = comparar_textos(texto_original, texto_comparar)
+                cache.set(cache_key, comparacion, 86400)  # 24 horas
+            
+            return JsonResponse({
+                **comparacion,
+                'version_original': version_original,
+                'version_comparar': version_comparar,
+                'fecha_original': _fecha_legible(fecha_original),
+                'fecha_comparar': _fecha_legible(fecha_comparar)
+            })
             
         except Exception as e:
             return JsonResponse({
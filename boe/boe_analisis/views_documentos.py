@@ -3,49 +3,44 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.db.models import Q
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 import datetime
 
 from .models_simplified import DocumentoSimplificado
+from .paginator import KeysetPaginator, PaginadorSemantico
 from .services_ia import ServicioIA
-from .utils_busqueda import busqueda_multiple_campos, normalizar_texto
+from .utils_busqueda import busqueda_multiple_campos
+from .utils_facetas import contar_facetas, opciones_filtros
+from .utils_http import generacion_datos
 from .utils_qdrant import QdrantBOE  # Importamos la clase QdrantBOE
+from .utils_sumario import fecha_sumario, obtener_sumario, respuesta_sumario
 
 def sumario_hoy(request):
     """
     Vista para mostrar el sumario del BOE del día actual.
-    Solo se descarga una vez al día.
+    El sumario agrupado se construye una vez por fecha al terminar la ingesta
+    (ver utils_sumario); aquí solo se lee de la caché. Con ?formato=json
+    devuelve el mismo sumario en JSON.
     """
-    # Obtener la fecha actual
-    hoy = timezone.now().date()
-    
-    # Buscar documentos publicados hoy
-    documentos = DocumentoSimplificado.objects.filter(fecha_publicacion=hoy)
-    
-    # Si no hay documentos para hoy, buscar la última fecha con documentos
-    if not documentos.exists():
-        ultima_fecha = DocumentoSimplificado.objects.order_by('-fecha_publicacion').first()
-        if ultima_fecha:
-            documentos = DocumentoSimplificado.objects.filter(
-                fecha_publicacion=ultima_fecha.fecha_publicacion
-            )
-    
-    # Agrupar documentos por departamento
-    departamentos = {}
-    for doc in documentos:
-        if doc.departamento not in departamentos:
-            departamentos[doc.departamento] = []
-        departamentos[doc.departamento].append(doc)
-    
-    # Ordenar departamentos alfabéticamente
-    departamentos_ordenados = dict(sorted(departamentos.items()))
-    
-    return render(request, 'boe_analisis/documentos/sumario_hoy.html', {
-        'documentos': documentos,
-        'departamentos': departamentos_ordenados,
-        'fecha': documentos.first().fecha_publicacion if documentos.exists() else hoy,
-    })
+    # Último sumario publicado (el de hoy si ya se ha ingerido) en la generación actual de los datos
+    generacion = generacion_datos()
+    sumario = obtener_sumario(fecha_sumario(timezone.now().date(), generacion), generacion)
+    
+    if request.GET.get('formato') == 'json':
+        return respuesta_sumario(
+            request, sumario,
+            lambda: HttpResponse(sumario['json'], content_type='application/json; charset=utf-8')
+        )
+    
+    # La página incluye la barra del usuario: la variante distingue a cada uno
+    return respuesta_sumario(
+        request, sumario,
+        lambda: render(request, 'boe_analisis/documentos/sumario_hoy.html', {
+            'sumario': sumario,
+            'fecha': sumario['fecha'],
+        }),
+        variante=f"u{request.user.pk or 0}"
+    )
 
 def busqueda_avanzada(request):
     """
@@ -61,8 +56,9 @@ def busqueda_avanzada(request):
     fecha_hasta = request.GET.get('fecha_hasta', '')
     busqueda_semantica = request.GET.get('semantica', '') == 'on'  # Nuevo parámetro para búsqueda semántica
     
-    # Iniciar queryset con todos los documentos
-    documentos = DocumentoSimplificado.objects.all()
+    # Iniciar queryset con todos los documentos (solo las columnas del listado)
+    documentos = DocumentoSimplificado.objects.listado()
+    paginador = None
     
     # Aplicar filtros si se proporcionan
     if query:
@@ -74,6 +70,9 @@ def busqueda_avanzada(request):
                 if departamento:
                     filtros['departamento'] = departamento
                 
+                if materias:
+                    filtros['materia'] = materias
+                
                 if fecha_desde:
                     try:
                         filtros['fecha_desde'] = datetime.datetime.strptime(fecha_desde, '%Y-%m-%d').date()
@@ -86,52 +85,41 @@ def busqueda_avanzada(request):
                     except ValueError:
                         pass
                 
-                # Realizar búsqueda semántica
+                # Realizar búsqueda semántica: Qdrant aplica el offset de cada página
+                # y los documentos de la página se hidratan en una sola consulta
                 qdrant_client = QdrantBOE()
-                resultados_qdrant = qdrant_client.buscar_similares(query, limit=100, score_threshold=0.3, filtros=filtros)
-                
-                # Obtener IDs de documentos encontrados
-                ids_documentos = [resultado.get('identificador') for resultado in resultados_qdrant]
-                
-                # Filtrar documentos por los IDs encontrados
-                if ids_documentos:
-                    documentos = documentos.filter(identificador__in=ids_documentos)
-                    
-                    # Ordenar según el score de similitud (necesitamos preservar el orden de Qdrant)
-                    # Creamos un diccionario para mapear ID -> score
-                    scores = {resultado.get('identificador'): resultado.get('score') for resultado in resultados_qdrant}
-                    
-                    # Añadimos el score como atributo a cada documento
-                    for doc in documentos:
-                        doc.score = scores.get(doc.identificador, 0)
-                    
-                    # Ordenamos la lista manualmente
-                    documentos = sorted(list(documentos), key=lambda x: x.score, reverse=True)
-                else:
-                    documentos = DocumentoSimplificado.objects.none()  # No se encontraron resultados
+                paginador = PaginadorSemantico(
+                    lambda limit, offset: qdrant_client.buscar_ids_similares(
+                        query, limit=limit, score_threshold=0.3, filtros=filtros, offset=offset
+                    ),
+                    per_page=20
+                )
             except Exception as e:
                 print(f"Error en búsqueda semántica: {str(e)}")
                 # Si falla la búsqueda semántica, volvemos a la búsqueda normal
                 documentos = busqueda_multiple_campos(
                     documentos, 
-                    ['titulo', 'texto', 'identificador', 'departamento', 'materias'], 
-                    query
+                    ['titulo', 'palabras_clave', 'identificador', 'departamento', 'materias'], 
+                    query,
+                    cuerpo=True
                 )
         else:
             # Usar búsqueda tolerante en múltiples campos (método tradicional)
             documentos = busqueda_multiple_campos(
                 documentos, 
-                ['titulo', 'texto', 'identificador', 'departamento', 'materias'], 
-                query
+                ['titulo', 'palabras_clave', 'identificador', 'departamento', 'materias'], 
+                query,
+                cuerpo=True
             )
     
     # Si no estamos usando búsqueda semántica, aplicamos los filtros adicionales
-    if not busqueda_semantica or not query:
+    if paginador is None:
         if departamento:
             documentos = documentos.filter(departamento__icontains=departamento)
         
         if materias:
-            documentos = documentos.filter(materias__icontains=materias)
+            # Coincidencia exacta sobre la tabla normalizada (usa índice, sin falsos positivos por subcadenas)
+            documentos = documentos.filter(enlaces_materias__materia__nombre=materias)
         
         if fecha_desde:
             try:
@@ -147,52 +135,23 @@ def busqueda_avanzada(request):
             except ValueError:
                 pass
         
-        # Ordenar por fecha de publicación (más recientes primero)
-        if isinstance(documentos, list):
-            # Ya está ordenado por score
-            pass
-        else:
-            documentos = documentos.order_by('-fecha_publicacion')
-    
-    # Obtener lista única de departamentos y materias para los filtros
-    todos_departamentos = list(DocumentoSimplificado.objects.exclude(departamento__isnull=True).exclude(departamento='').values_list('departamento', flat=True).distinct())
+        # Paginación por cursor sobre (fecha_publicacion, identificador), más recientes primero
+        paginador = KeysetPaginator(documentos, per_page=20)
     
-    # Ordenar departamentos alfabéticamente
-    todos_departamentos.sort()
+    # Paginación por cursor (sin COUNT(*) ni OFFSET)
+    documentos_paginados = paginador.get_page(request.GET.get('cursor'))
     
-    # Para las materias, necesitamos procesarlas ya que están almacenadas como texto separado por comas
-    todas_materias = []
-    for doc_materias in DocumentoSimplificado.objects.exclude(materias__isnull=True).exclude(materias='').values_list('materias', flat=True).distinct():
-        if doc_materias:
-            for materia in doc_materias.split(','):
-                materia = materia.strip()
-                if materia and materia not in todas_materias:
-                    todas_materias.append(materia)
+    # Valores de los desplegables desde las tablas de facetas precalculadas
+    todos_departamentos, todas_materias = opciones_filtros()
     
-    # Ordenar materias alfabéticamente
-    todas_materias.sort()
-    
-    # Imprimir información de depuración
-    print(f"Total de documentos en la base de datos: {DocumentoSimplificado.objects.count()}")
-    print(f"Departamentos encontrados: {todos_departamentos}")
-    print(f"Materias encontradas: {todas_materias}")
-    if isinstance(documentos, list):
-        print(f"Documentos filtrados: {len(documentos)}")
-    else:
-        print(f"Documentos filtrados: {documentos.count()}")
-    print(f"Términos de búsqueda: '{query}' (normalizado: '{normalizar_texto(query)}')")
-    print(f"Búsqueda semántica: {'Activada' if busqueda_semantica else 'Desactivada'}")
-    
-    # Paginación
-    if isinstance(documentos, list):
-        # Paginación manual para listas (resultados de búsqueda semántica)
-        paginator = Paginator(documentos, 20)  # 20 documentos por página
+    # Recuentos de facetas de los resultados: sin filtros se leen las tablas precalculadas,
+    # con filtros se agrupa en la base de datos y en búsqueda semántica se cuenta la página actual
+    if isinstance(paginador, PaginadorSemantico):
+        facetas = contar_facetas(documentos_paginados.object_list)
+    elif query or departamento or materias or fecha_desde or fecha_hasta:
+        facetas = contar_facetas(documentos)
     else:
-        # Paginación normal para querysets
-        paginator = Paginator(documentos, 20)  # 20 documentos por página
-    
-    page = request.GET.get('page', 1)
-    documentos_paginados = paginator.get_page(page)
+        facetas = contar_facetas()
     
     return render(request, 'boe_analisis/documentos/busqueda_avanzada.html', {
         'documentos': documentos_paginados,
@@ -203,6 +162,7 @@ def busqueda_avanzada(request):
         'fecha_hasta': fecha_hasta if isinstance(fecha_hasta, str) else fecha_hasta.strftime('%Y-%m-%d') if fecha_hasta else '',
         'todos_departamentos': todos_departamentos,
         'todas_materias': todas_materias,
+        'facetas': facetas,
         'busqueda_semantica': busqueda_semantica,  # Pasamos el estado de la búsqueda semántica a la plantilla
     })
 
@@ -164,8 +164,7 @@ def generar_texto_ejemplo():
     """
     try:
         # Obtener documentos con texto muy corto
-        docs_texto_corto = DocumentoSimplificado.objects.filter(texto__isnull=False).exclude(texto='')
-        docs_texto_corto = [doc for doc in docs_texto_corto if len(doc.texto) < 50]
+        docs_texto_corto = list(DocumentoSimplificado.objects.filter(longitud_texto__lt=50))
         
         logger.info(f"Documentos con texto corto: {len(docs_texto_corto)}")
         
@@ -78,7 +78,7 @@ def test_busqueda_tolerante():
     Prueba la búsqueda tolerante a errores
     """
     try:
-        from boe_analisis.utils_busqueda import busqueda_tolerante
+        from boe_analisis.utils_busqueda import busqueda_multiple_campos
         
         # Términos de búsqueda con errores ortográficos
         terminos_prueba = [
@@ -94,7 +94,7 @@ def test_busqueda_tolerante():
             
             # Buscar en todos los documentos
             documentos = DocumentoSimplificado.objects.all()
-            resultados = busqueda_tolerante(documentos, 'texto', termino)
+            resultados = busqueda_multiple_campos(documentos, ['titulo'], termino, cuerpo=True)
             
             logger.info(f"Resultados encontrados: {len(resultados)}")
             
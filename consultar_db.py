@@ -31,8 +31,8 @@ def consultar_documentos(fecha_str='2025-03-10'):
             # Estadísticas de textos en documentos simplificados
             docs_con_texto = DocumentoSimplificado.objects.filter(
                 fecha_publicacion=fecha, 
-                texto__isnull=False
-            ).exclude(texto='').count()
+                longitud_texto__isnull=False
+            ).count()
             
             docs_sin_texto = total_docs_simpl - docs_con_texto
             
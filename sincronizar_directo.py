@@ -1,6 +1,7 @@
 import os
 import sys
 import sqlite3
+import zlib
 import logging
 from datetime import datetime
 import dotenv
@@ -14,6 +15,11 @@ from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct
 
+try:
+    import zstandard
+except ImportError:  # Solo hace falta para los textos comprimidos con zstd
+    zstandard = None
+
 # Cargar variables de entorno
 dotenv.load_dotenv()
 
@@ -290,6 +296,33 @@ class TavilySincronizador:
             return False
 
 
+def descomprimir_texto(cursor, formato, contenido, diccionario_id):
+    """
+    Descomprime un texto de la tabla boe_analisis_textodocumento
+    (ver boe_analisis.utils_textos, que los comprime con zstd o zlib)
+    
+    Args:
+        cursor: Cursor de la base de datos, para leer el diccionario de zstd
+        formato: 'zstd' o 'zlib'
+        contenido: Texto comprimido
+        diccionario_id: Diccionario de zstd con el que se comprimió (o None)
+    
+    Returns:
+        str: Texto original
+    """
+    if formato == 'zlib':
+        return zlib.decompress(contenido).decode('utf-8')
+    if zstandard is None:
+        raise RuntimeError("Hace falta el paquete zstandard para leer textos comprimidos con zstd")
+    if diccionario_id:
+        cursor.execute("SELECT datos FROM boe_analisis_diccionariotexto WHERE id = ?", (diccionario_id,))
+        diccionario = zstandard.ZstdCompressionDict(cursor.fetchone()[0])
+        descompresor = zstandard.ZstdDecompressor(dict_data=diccionario)
+    else:
+        descompresor = zstandard.ZstdDecompressor()
+    return descompresor.decompress(contenido).decode('utf-8')
+
+
 def obtener_documentos_sqlite(fecha_str=None, db_path="boe/boe.db", max_docs=None):
     """
     Obtiene documentos de la base de datos SQLite para una fecha específica
@@ -323,13 +356,15 @@ def obtener_documentos_sqlite(fecha_str=None, db_path="boe/boe.db", max_docs=Non
         conn.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
         cursor = conn.cursor()
         
-        # Consulta SQL
+        # Consulta SQL (el texto completo se guarda comprimido en otra tabla)
         query = """
-            SELECT identificador, titulo, texto, fecha_publicacion, 
-                   departamento, codigo_departamento, materias, 
-                   palabras_clave, url_pdf, url_xml
-            FROM boe_analisis_documentosimplificado 
-            WHERE fecha_publicacion = ?
+            SELECT d.identificador, d.titulo, d.fecha_publicacion, 
+                   d.departamento, d.codigo_departamento, d.materias, 
+                   d.palabras_clave, d.url_pdf, d.url_xml,
+                   t.formato, t.contenido, t.diccionario_id
+            FROM boe_analisis_documentosimplificado d
+            LEFT JOIN boe_analisis_textodocumento t ON t.documento_id = d.identificador
+            WHERE d.fecha_publicacion = ?
         """
         
         # Agregar límite si se especifica
@@ -346,6 +381,8 @@ def obtener_documentos_sqlite(fecha_str=None, db_path="boe/boe.db", max_docs=Non
         documentos = []
         for row in rows:
             doc = dict(row)
+            formato, contenido, diccionario_id = doc.pop('formato'), doc.pop('contenido'), doc.pop('diccionario_id')
+            doc['texto'] = descomprimir_texto(cursor, formato, contenido, diccionario_id) if contenido else None
             documentos.append(doc)
         
         # Cerrar conexión
@@ -17,6 +17,7 @@ django.setup()
 
 # Importar los modelos
 from boe_analisis.models_simplified import DocumentoSimplificado
+from boe_analisis.utils_textos import precargar_textos
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -56,7 +57,8 @@ def sincronizar_tavily(fecha_str=None, api_key=None, max_docs=None):
         if max_docs:
             query = query[:max_docs]
         
-        documentos = list(query)
+        # Los textos de todos los documentos en una sola consulta
+        documentos = precargar_textos(query)
         total_docs = len(documentos)
         
         if total_docs == 0:
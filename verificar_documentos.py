@@ -38,8 +38,8 @@ def verificar_documentos(fecha_str=None):
         
         docs_con_texto = DocumentoSimplificado.objects.filter(
             fecha_publicacion=fecha, 
-            texto__isnull=False
-        ).exclude(texto='').count()
+            longitud_texto__isnull=False
+        ).count()
         
         docs_sin_texto = total_docs - docs_con_texto
         
@@ -63,8 +63,8 @@ def verificar_documentos(fecha_str=None):
             count_con_texto = DocumentoSimplificado.objects.filter(
                 fecha_publicacion=fecha,
                 departamento=dept['departamento'],
-                texto__isnull=False
-            ).exclude(texto='').count()
+                longitud_texto__isnull=False
+            ).count()
             
             print(f"- {dept_name}: {count} documentos ({count_con_texto} con texto)")
         
@@ -1,8 +1,40 @@
 import os
 import sqlite3
+import zlib
 import datetime
 from pathlib import Path
 
+try:
+    import zstandard
+except ImportError:  # Solo hace falta para los textos comprimidos con zstd
+    zstandard = None
+
+def descomprimir_texto(cursor, formato, contenido, diccionario_id):
+    """
+    Descomprime un texto de la tabla boe_analisis_textodocumento
+    (ver boe_analisis.utils_textos, que los comprime con zstd o zlib)
+    
+    Args:
+        cursor: Cursor de la base de datos, para leer el diccionario de zstd
+        formato: 'zstd' o 'zlib'
+        contenido: Texto comprimido
+        diccionario_id: Diccionario de zstd con el que se comprimió (o None)
+    
+    Returns:
+        str: Texto original
+    """
+    if formato == 'zlib':
+        return zlib.decompress(contenido).decode('utf-8')
+    if zstandard is None:
+        raise RuntimeError("Hace falta el paquete zstandard para leer textos comprimidos con zstd")
+    if diccionario_id:
+        cursor.execute("SELECT datos FROM boe_analisis_diccionariotexto WHERE id = ?", (diccionario_id,))
+        diccionario = zstandard.ZstdCompressionDict(cursor.fetchone()[0])
+        descompresor = zstandard.ZstdDecompressor(dict_data=diccionario)
+    else:
+        descompresor = zstandard.ZstdDecompressor()
+    return descompresor.decompress(contenido).decode('utf-8')
+
 def verificar_documentos_sqlite(fecha_str=None):
     """
     Verifica el estado de los documentos en la base de datos SQLite para una fecha específica
@@ -49,8 +81,7 @@ def verificar_documentos_sqlite(fecha_str=None):
             SELECT COUNT(*) 
             FROM boe_analisis_documentosimplificado 
             WHERE fecha_publicacion = ? 
-            AND texto IS NOT NULL 
-            AND texto != ''
+            AND longitud_texto IS NOT NULL
         """, (fecha_sqlite,))
         docs_con_texto = cursor.fetchone()[0]
         
@@ -83,8 +114,7 @@ def verificar_documentos_sqlite(fecha_str=None):
                 FROM boe_analisis_documentosimplificado 
                 WHERE fecha_publicacion = ? 
                 AND departamento = ?
-                AND texto IS NOT NULL 
-                AND texto != ''
+                AND longitud_texto IS NOT NULL
             """, (fecha_sqlite, dept_row[0]))
             
             count_con_texto = cursor.fetchone()[0]
@@ -94,9 +124,11 @@ def verificar_documentos_sqlite(fecha_str=None):
         # Mostrar algunos ejemplos de documentos
         print("\nEjemplos de documentos:")
         cursor.execute("""
-            SELECT identificador, titulo, departamento, url_xml, texto
-            FROM boe_analisis_documentosimplificado 
-            WHERE fecha_publicacion = ?
+            SELECT d.identificador, d.titulo, d.departamento, d.url_xml,
+                   t.formato, t.contenido, t.diccionario_id
+            FROM boe_analisis_documentosimplificado d
+            LEFT JOIN boe_analisis_textodocumento t ON t.documento_id = d.identificador
+            WHERE d.fecha_publicacion = ?
             ORDER BY RANDOM()
             LIMIT 5
         """, (fecha_sqlite,))
@@ -104,7 +136,8 @@ def verificar_documentos_sqlite(fecha_str=None):
         documentos = cursor.fetchall()
         
         for i, doc in enumerate(documentos):
-            identificador, titulo, departamento, url_xml, texto = doc
+            identificador, titulo, departamento, url_xml, formato, contenido, diccionario_id = doc
+            texto = descomprimir_texto(cursor, formato, contenido, diccionario_id) if contenido else None
             
             print(f"\n{i+1}. {identificador} - {titulo[:100]}...")
             print(f"   Departamento: {departamento or 'No especificado'}")